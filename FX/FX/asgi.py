@@ -1,7 +1,8 @@
 """
 ASGI config for FX project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+It exposes the ASGI callable as a module-level variable named ``application``. HTTP requests go to Django;
+WebSocket connections to ``/ws/market-data/`` go to the market data stream.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +14,37 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "FX.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up.
+from api_trade.consumers import market_data_socket  # noqa: E402
+from api_trade.scripts.market_data_hub import close_hub  # noqa: E402
+
+websocket_routes = {
+    "/ws/market-data/": market_data_socket,
+}
+
+
+async def lifespan(scope, receive, send):
+    """Close upstream market data streams when the server shuts down."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_hub()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        return await django_application(scope, receive, send)
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    consumer = websocket_routes.get(scope["path"])
+    if consumer is None:
+        await receive()
+        await send({"type": "websocket.close"})
+        return
+    return await consumer(scope, receive, send)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import json
 import os
+import socket
+from decimal import Decimal
 from pathlib import Path
 
 # from dotenv import load_dotenv
@@ -104,7 +106,7 @@ REDIS_PORT = os.getenv("REDIS_PORT")
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 REDIS_DATABASE = os.getenv("REDIS_DATABASE")
 REDIS_POOL_MAX_CONNECTIONS = os.getenv("REDIS_POOL_MAX_CONNECTIONS")
-REDIS_EXPIRE_KEY = os.getenv("REDIS_EXPIRE_KEY")
+REDIS_EXPIRE_KEY = int(os.getenv("REDIS_EXPIRE_KEY") or 3600)
 
 CACHES = {
     "default": {
@@ -171,6 +173,113 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 API_KEY_ALPACA = os.getenv("API_KEY_ALPACA")
 SECRET_KEY_ALPACA = os.getenv("API_SECRET_ALPACA")
+
+# Pooled Alpaca HTTP clients (api_trade/scripts/alpaca_clients.py)
+ALPACA_HTTP_POOL_CONNECTIONS = int(os.getenv("ALPACA_HTTP_POOL_CONNECTIONS", "4"))
+ALPACA_HTTP_POOL_MAXSIZE = int(os.getenv("ALPACA_HTTP_POOL_MAXSIZE", "10"))
+ALPACA_HTTP_POOL_BLOCK = bool(int(os.getenv("ALPACA_HTTP_POOL_BLOCK", "0")))
+# Seconds a pooled client may sit unused before it is rebuilt with fresh connections (0 disables).
+ALPACA_CLIENT_MAX_IDLE = int(os.getenv("ALPACA_CLIENT_MAX_IDLE", "300"))
+# Async order client (api_trade/scripts/alpaca_async.py): broker calls one worker may have in flight at once.
+ALPACA_ASYNC_MAX_CONNECTIONS = int(os.getenv("ALPACA_ASYNC_MAX_CONNECTIONS", "500"))
+ALPACA_ASYNC_TIMEOUT = float(os.getenv("ALPACA_ASYNC_TIMEOUT", "30"))
+# Batch order endpoint: orders accepted per request, and broker calls one request may have in flight.
+ALPACA_BATCH_MAX_ORDERS = int(os.getenv("ALPACA_BATCH_MAX_ORDERS", "100"))
+ALPACA_BATCH_CONCURRENCY = int(os.getenv("ALPACA_BATCH_CONCURRENCY", "50"))
+# Rate limit governor shared by all workers through Redis (api_trade/scripts/rate_limiter.py).
+ALPACA_RATE_LIMIT_ENABLED = bool(int(os.getenv("ALPACA_RATE_LIMIT_ENABLED", "1")))
+# api: (requests per minute, burst, priority of calls that do not set one). The broker allows 200 requests per
+# minute and key; the rate plus the burst stays within that over any minute.
+ALPACA_RATE_LIMITS = {
+    "trading": (int(os.getenv("ALPACA_TRADING_RATE_LIMIT", "180")), 20, "account"),
+    "data": (int(os.getenv("ALPACA_DATA_RATE_LIMIT", "180")), 20, "market_data"),
+}
+# priority: (share of the burst left to the priorities above it, seconds a call may wait for a token before it is
+# shed). Orders come first; background jobs can wait longest.
+ALPACA_RATE_LIMIT_PRIORITIES = {
+    "orders": (0.0, 10),
+    "account": (0.2, 5),
+    "market_data": (0.4, 3),
+    "background": (0.6, 60),
+}
+# Seconds to connect to the broker and to wait for its answer, for the pooled clients.
+ALPACA_HTTP_TIMEOUT = (3.05, float(os.getenv("ALPACA_HTTP_READ_TIMEOUT", "10")))
+# Circuit breakers per endpoint class (api_trade/scripts/circuit_breaker.py): over the last WINDOW calls (at least
+# MIN_CALLS), the breaker opens when ERROR_RATE of them failed or SLOW_RATE took SLOW_SECONDS or more. It stays open
+# for OPEN_SECONDS, then lets PROBES calls through to test the broker.
+ALPACA_BREAKER_WINDOW = 20
+ALPACA_BREAKER_MIN_CALLS = 5
+ALPACA_BREAKER_ERROR_RATE = 0.5
+ALPACA_BREAKER_SLOW_SECONDS = float(os.getenv("ALPACA_BREAKER_SLOW_SECONDS", "5"))
+ALPACA_BREAKER_SLOW_RATE = 0.5
+ALPACA_BREAKER_OPEN_SECONDS = int(os.getenv("ALPACA_BREAKER_OPEN_SECONDS", "30"))
+ALPACA_BREAKER_PROBES = 1
+# Seconds after which a GET the broker has not answered is sent a second time (0 disables hedged reads).
+ALPACA_HEDGE_READS_AFTER = float(os.getenv("ALPACA_HEDGE_READS_AFTER", "0"))
+
+# Market data read-through cache (api_trade/scripts/market_data_cache.py).
+# endpoint: (seconds a value is fresh, further seconds a stale value is served while it is refreshed)
+ALPACA_MARKET_DATA_CACHE_TTLS = {
+    "crypto_bars": (60, 300),
+    "crypto_trades": (10, 30),
+    "crypto_latest_bar": (5, 15),
+    "crypto_latest_quote": (1, 4),
+    "crypto_latest_trade": (1, 4),
+    "crypto_snapshot": (2, 8),
+    "stock_latest_quote": (1, 4),
+}
+ALPACA_MARKET_DATA_LOCK_TIMEOUT = 10
+# Seconds the last value of every cached read is kept to answer with while the broker is unavailable.
+ALPACA_FALLBACK_TTL = int(os.getenv("ALPACA_FALLBACK_TTL", "3600"))
+# Multi-symbol snapshots (api_trade/scripts/snapshot_coalescer.py): seconds during which concurrent requests are
+# merged into one upstream call, and the most symbols one upstream call may ask for.
+ALPACA_SNAPSHOT_COALESCE_WINDOW = float(os.getenv("ALPACA_SNAPSHOT_COALESCE_WINDOW", "0.01"))
+ALPACA_SNAPSHOT_BATCH_MAX_SYMBOLS = int(os.getenv("ALPACA_SNAPSHOT_BATCH_MAX_SYMBOLS", "200"))
+# Positions and account snapshots (api_trade/scripts/portfolio_snapshots.py), same format. Order events invalidate
+# them right away; the TTL only bounds how long market moves take to show up.
+ALPACA_PORTFOLIO_CACHE_TTLS = {
+    "positions": (5, 10),
+    "account": (5, 10),
+}
+# Fee charged per unit of traded notional, by asset class, used to estimate the fees of fills.
+ALPACA_FEE_RATES = {"crypto": float(os.getenv("ALPACA_CRYPTO_FEE_RATE", "0.0025"))}
+# Seconds between checks of the asset catalog for changes by each worker's asset index
+# (api_trade/scripts/asset_catalog.py).
+ALPACA_ASSET_INDEX_CHECK_SECONDS = int(os.getenv("ALPACA_ASSET_INDEX_CHECK_SECONDS", "30"))
+# Upper bound on the number of bars requested from Alpaca in one call when filling the local bar store.
+ALPACA_BAR_FETCH_CHUNK = 10000
+
+# Real-time quotes over WebSockets (api_trade/consumers.py). By default the workers of a node share one upstream
+# stream, run by an elected leader and relayed through Redis pub/sub (api_trade/scripts/quote_relay.py).
+# api_trade.scripts.market_data_hub.LocalQuoteFeed generates quotes without an Alpaca connection.
+MARKET_DATA_FEED = os.getenv("MARKET_DATA_FEED", "api_trade.scripts.quote_relay.RedisQuoteFeed")
+MARKET_DATA_UPSTREAM_FEED = os.getenv("MARKET_DATA_UPSTREAM_FEED", "api_trade.scripts.market_data_hub.AlpacaQuoteFeed")
+MARKET_DATA_NODE = os.getenv("MARKET_DATA_NODE") or socket.gethostname()
+# Milliseconds before the leader lock of a dead worker expires and another worker takes over the upstream stream.
+MARKET_DATA_LEADER_TTL = int(os.getenv("MARKET_DATA_LEADER_TTL", "5000"))
+MARKET_DATA_MAX_SYMBOLS = int(os.getenv("MARKET_DATA_MAX_SYMBOLS", "100"))
+# Seconds a single send may wait on a client that stopped reading before its socket is closed.
+MARKET_DATA_SEND_TIMEOUT = int(os.getenv("MARKET_DATA_SEND_TIMEOUT", "10"))
+# Smallest deposit and withdrawal accepted by the wallet API, in units of the wallet's currency.
+WALLET_MIN_DEPOSIT = Decimal(os.getenv("WALLET_MIN_DEPOSIT", "1"))
+WALLET_MIN_WITHDRAWAL = Decimal(os.getenv("WALLET_MIN_WITHDRAWAL", "1"))
+# A wallet's balances are checkpointed every this many ledger entries (and with its first entry of each day).
+WALLET_CHECKPOINT_EVERY = int(os.getenv("WALLET_CHECKPOINT_EVERY", "1000"))
+# Monthly partitions of the transaction table (wallet/partitions.py): months created ahead of the current one, and
+# months kept attached before older ones are archived to WALLET_TRANSACTION_ARCHIVE_DIR (unset: never archive).
+WALLET_TRANSACTION_PARTITIONS_AHEAD = int(os.getenv("WALLET_TRANSACTION_PARTITIONS_AHEAD", "3"))
+WALLET_TRANSACTION_RETAIN_MONTHS = int(os.getenv("WALLET_TRANSACTION_RETAIN_MONTHS", "0")) or None
+WALLET_TRANSACTION_ARCHIVE_DIR = os.getenv("WALLET_TRANSACTION_ARCHIVE_DIR", os.path.join(BASE_DIR, "archive"))
+# Payment gateway webhooks (wallet/webhooks.py): shared secret the gateway signs them with (unset: every webhook is
+# refused), and seconds a signature stays valid.
+WALLET_GATEWAY_WEBHOOK_SECRET = os.getenv("WALLET_GATEWAY_WEBHOOK_SECRET", "")
+WALLET_GATEWAY_WEBHOOK_TOLERANCE = int(os.getenv("WALLET_GATEWAY_WEBHOOK_TOLERANCE", "300"))
+# Redis stream the webhooks are queued on for the process_webhooks workers, events settled per batch, milliseconds an
+# event may stay unacknowledged before another worker retries it, and deliveries before it is dead-lettered.
+WALLET_WEBHOOK_STREAM = os.getenv("WALLET_WEBHOOK_STREAM", "wallet:webhooks")
+WALLET_WEBHOOK_BATCH_SIZE = int(os.getenv("WALLET_WEBHOOK_BATCH_SIZE", "200"))
+WALLET_WEBHOOK_CLAIM_IDLE_MS = int(os.getenv("WALLET_WEBHOOK_CLAIM_IDLE_MS", "30000"))
+WALLET_WEBHOOK_MAX_DELIVERIES = int(os.getenv("WALLET_WEBHOOK_MAX_DELIVERIES", "5"))
 CORS_ALLOW_ALL_ORIGINS = True
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,116 @@
+"""
+ASGI WebSocket endpoint streaming real-time quotes.
+
+Clients connect to ``/ws/market-data/?token=<JWT access token>`` and send
+``{"action": "subscribe" | "unsubscribe", "symbols": ["BTC/USD", ...]}``. The server pushes
+``{"type": "quotes", "data": [...]}`` batches holding the latest quote of every symbol that changed since the
+previous batch.
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .scripts.market_data_hub import Subscription, get_hub
+
+logger = logging.getLogger(__name__)
+
+# Application-defined close codes (4000-4999).
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_TOO_SLOW = 4008
+
+
+@sync_to_async
+def authenticate(scope):
+    """Return the user of the ``token`` query parameter, or None."""
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+    if not token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token[0]))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def send_json(send, payload):
+    await send({"type": "websocket.send", "text": json.dumps(payload)})
+
+
+async def _send_ticks(subscription, send):
+    while True:
+        ticks = await subscription.next_batch()
+        # Ticks are already encoded by the hub; joining them avoids one json.dumps per tick per client.
+        text = '{"type": "quotes", "data": [' + ", ".join(ticks) + "]}"
+        # While this send waits for a slow socket, new ticks only replace older ones in the subscription.
+        async with asyncio.timeout(settings.MARKET_DATA_SEND_TIMEOUT):
+            await send({"type": "websocket.send", "text": text})
+
+
+async def _handle_message(hub, subscription, send, message):
+    try:
+        request = json.loads(message.get("text") or message.get("bytes") or b"")
+        action, symbols = request["action"], request["symbols"]
+        if action not in ("subscribe", "unsubscribe") or not isinstance(symbols, list):
+            raise ValueError
+        symbols = [str(symbol).upper() for symbol in symbols]
+    except (ValueError, KeyError, TypeError):
+        await send_json(send, {"type": "error", "detail": 'Expected {"action": "subscribe", "symbols": [...]}.'})
+        return
+
+    if action == "unsubscribe":
+        await hub.unsubscribe(subscription, symbols)
+    elif len(subscription.symbols | set(symbols)) > settings.MARKET_DATA_MAX_SYMBOLS:
+        await send_json(
+            send, {"type": "error", "detail": f"At most {settings.MARKET_DATA_MAX_SYMBOLS} symbols per connection."}
+        )
+        return
+    else:
+        await hub.subscribe(subscription, symbols)
+    await send_json(send, {"type": "subscribed", "symbols": sorted(subscription.symbols)})
+
+
+async def market_data_socket(scope, receive, send):
+    """ASGI application for one market data WebSocket connection."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    user = await authenticate(scope)
+    if user is None and settings.API_ENV != "local":
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+    await send({"type": "websocket.accept"})
+
+    hub = get_hub()
+    subscription = Subscription()
+    sender = asyncio.create_task(_send_ticks(subscription, send))
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                error = sender.exception()
+                if isinstance(error, TimeoutError):
+                    logger.info("Closing market data socket of a client that stopped reading")
+                    await send({"type": "websocket.close", "code": CLOSE_TOO_SLOW})
+                else:
+                    logger.debug("Market data socket failed while sending", exc_info=error)
+                return
+            message = receiver.result()
+            if message["type"] == "websocket.disconnect":
+                return
+            await _handle_message(hub, subscription, send, message)
+            receiver = asyncio.create_task(receive())
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        # Retrieve failures of a send racing the disconnect so they are not reported as unhandled.
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+        await hub.unsubscribe(subscription)
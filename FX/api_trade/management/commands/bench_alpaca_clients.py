@@ -0,0 +1,62 @@
+"""
+Django command to benchmark pooled Alpaca clients against a client per request.
+"""
+
+import statistics
+import time
+
+from alpaca.trading.client import TradingClient
+from api_trade.scripts.alpaca_clients import AlpacaClientRegistry
+from api_trade.scripts.local_alpaca_stub import LocalAlpacaStub
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    """Compare reusing a pooled ``TradingClient`` with constructing one per call against a local stand-in."""
+
+    help = "Benchmark pooled Alpaca clients against constructing a client per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+
+    # Measures client overhead; the stub does not limit the request rate.
+    @override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        total = options["requests"]
+
+        with LocalAlpacaStub() as stub:
+
+            def per_request():
+                TradingClient("bench-key", "bench-secret", url_override=stub.url).get_clock()
+
+            pooled_registry = AlpacaClientRegistry()
+
+            def pooled():
+                pooled_registry.get_trading_client("bench-key", "bench-secret", url_override=stub.url).get_clock()
+
+            for name, call in (("construct-per-request", per_request), ("pooled", pooled)):
+                connections_before = stub.connections
+                timings = self._run(call, total)
+                self._report(name, timings, stub.connections - connections_before)
+
+            pooled_registry.reset()
+
+    @staticmethod
+    def _run(call, total):
+        timings = []
+        for _ in range(total):
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def _report(self, name, timings, connections):
+        timings = sorted(timings)
+        p50 = statistics.median(timings) * 1000
+        p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+        self.stdout.write(
+            f"{name:>22}: {len(timings)} calls in {sum(timings):.3f}s, "
+            f"p50={p50:.3f}ms p99={p99:.3f}ms, tcp connections={connections}"
+        )
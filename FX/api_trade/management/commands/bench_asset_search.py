@@ -0,0 +1,51 @@
+"""
+Django command to micro-benchmark asset index lookups and searches.
+"""
+
+import random
+import string
+import timeit
+import uuid
+
+from api_trade.scripts.asset_catalog import AssetIndex
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Time symbol lookups, prefix and fuzzy searches over a synthetic catalog the size of Alpaca's."""
+
+    help = "Micro-benchmark the in-process asset index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=12_000)
+        parser.add_argument("--number", type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rng = random.Random(0)
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(3000)]
+        assets = {}
+        while len(assets) < options["assets"]:
+            symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+            assets[symbol] = {
+                "id": uuid.uuid4(),
+                "symbol": symbol,
+                "name": " ".join(rng.choices(words, k=rng.randint(2, 5))).title(),
+                "asset_class": "us_equity",
+                "exchange": rng.choice(["NASDAQ", "NYSE", "ARCA"]),
+                "tradable": rng.random() < 0.9,
+            }
+
+        build = min(timeit.repeat(lambda: AssetIndex(assets.values()), number=1, repeat=3))
+        index = AssetIndex(assets.values())
+        word = words[0]
+        self.stdout.write(f"{len(index)} assets, index built in {build * 1000:.1f} ms")
+        for name, call in (
+            ("lookup", lambda: index.get("AB")),
+            ("symbol prefix", lambda: index.search("AB", limit=10, fuzzy=False)),
+            ("name prefix", lambda: index.search(word[:3].lower(), limit=10, fuzzy=False)),
+            ("filtered prefix", lambda: index.search("A", limit=10, exchange="ARCA", tradable=True)),
+            ("fuzzy", lambda: index.search(word[1:] + "x", limit=10)),
+        ):
+            best = min(timeit.repeat(call, number=options["number"], repeat=3)) / options["number"]
+            self.stdout.write(f"  {name:>16}: {best * 1e6:>9.1f} us")
@@ -0,0 +1,73 @@
+"""
+Django command to compare payload size and serialization time of the bar response formats.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from api_trade.renderers import COLUMNAR_RENDERER_CLASSES
+from api_trade.scripts.bar_store import BAR_COLUMNS, bars_to_columns
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+SYMBOLS = ["BTC/USD", "ETH/USD"]
+
+
+def synthetic_rows(count):
+    """Return ``count`` bar rows shaped like ``BarStore.iter_bars`` output."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    price = 40000.0
+    for i in range(count):
+        price *= 1 + random.uniform(-0.001, 0.001)
+        rows.append(
+            (
+                SYMBOLS[i % len(SYMBOLS)],
+                start + timedelta(minutes=i // len(SYMBOLS)),
+                price,
+                price * 1.001,
+                price * 0.999,
+                price,
+                random.uniform(0, 10),
+                float(random.randint(1, 100)),
+                price,
+            )
+        )
+    return rows
+
+
+class Command(BaseCommand):
+    """Render the same bars as JSON and as every available columnar format."""
+
+    help = "Benchmark payload size and serialization time of the historical bar formats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for size in options["sizes"]:
+            rows = synthetic_rows(size)
+            self.stdout.write(f"{size} bars")
+            self._measure("json", lambda rows=rows: JSONRenderer().render(self._as_json(rows)))
+            for renderer_class in COLUMNAR_RENDERER_CLASSES:
+                self._measure(
+                    renderer_class.format,
+                    lambda rows=rows, renderer_class=renderer_class: renderer_class().render(
+                        {"next": None, "data": bars_to_columns(rows, SYMBOLS)}
+                    ),
+                )
+
+    @staticmethod
+    def _as_json(rows):
+        data = {symbol: [] for symbol in SYMBOLS}
+        for row in rows:
+            data[row[0]].append(dict(zip(BAR_COLUMNS, row)))
+        return {"next": None, "data": data}
+
+    def _measure(self, name, render):
+        started = time.perf_counter()
+        payload = render()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {name:>9}: {len(payload) / 1024:>10.1f} KiB in {elapsed * 1000:>9.1f} ms")
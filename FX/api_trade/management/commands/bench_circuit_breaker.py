@@ -0,0 +1,73 @@
+"""
+Django command to benchmark hedged reads and the circuit breaker against a faulty broker stand-in.
+"""
+
+import statistics
+import time
+import uuid
+
+from api_trade.scripts.alpaca_clients import AlpacaClientRegistry
+from api_trade.scripts.circuit_breaker import CircuitOpen
+from api_trade.scripts.local_alpaca_stub import LocalAlpacaStub
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    """Time reads against a stub where some answers are slow, with and without hedging, then time calls during
+    an outage (every answer hangs) with the breaker failing them fast."""
+
+    help = "Benchmark hedged reads and the circuit breaker against a local broker stub injecting faults."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--slow-rate", type=float, default=0.05, help="Share of slow answers.")
+        parser.add_argument("--slow-latency", type=float, default=0.5, help="Seconds a slow answer takes.")
+        parser.add_argument("--hedge-after", type=float, default=0.05)
+
+    @override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        with LocalAlpacaStub(slow_rate=options["slow_rate"], slow_latency=options["slow_latency"], seed=1) as stub:
+            for name, hedge_after in (("unhedged", 0), ("hedged", options["hedge_after"])):
+                with override_settings(ALPACA_HEDGE_READS_AFTER=hedge_after):
+                    sent = len(stub.requests)
+                    timings = self._run(stub.url, options["requests"])[0]
+                    self._report(name, timings, len(stub.requests) - sent)
+
+        with LocalAlpacaStub(slow_rate=1.0, slow_latency=2.0) as stub, override_settings(
+            ALPACA_HTTP_TIMEOUT=(1, 0.5), ALPACA_HEDGE_READS_AFTER=0
+        ):
+            timings, rejected = self._run(stub.url, 50)
+            self.stdout.write(
+                f"{'outage':>10}: 50 calls in {sum(timings):.2f}s, {len(stub.requests)} reached the broker, "
+                f"{rejected} failed fast with the breaker open"
+            )
+
+    @staticmethod
+    def _run(url, count):
+        registry = AlpacaClientRegistry()
+        # A new account fingerprint, so every run starts with closed breakers.
+        client = registry.get_trading_client(api_key=f"bench-{uuid.uuid4().hex}", secret_key="bench", url_override=url)
+        client._retry = 0
+        timings, rejected = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                client.get_clock()
+            except CircuitOpen:
+                rejected += 1
+            except Exception:  # noqa: B902
+                pass
+            timings.append(time.perf_counter() - started)
+        registry.reset()
+        return timings, rejected
+
+    def _report(self, name, timings, sent):
+        timings = sorted(timings)
+        p50 = statistics.median(timings) * 1000
+        p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+        self.stdout.write(
+            f"{name:>10}: {len(timings)} reads, p50={p50:.1f}ms p99={p99:.1f}ms max={timings[-1] * 1000:.1f}ms, "
+            f"{sent} requests sent"
+        )
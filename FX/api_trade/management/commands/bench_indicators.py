@@ -0,0 +1,43 @@
+"""
+Django command to micro-benchmark the indicator kernels.
+"""
+
+import timeit
+
+import numpy as np
+from api_trade.scripts import indicators
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Time every indicator kernel over a synthetic price series."""
+
+    help = "Micro-benchmark the vectorized indicator kernels."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rng = np.random.default_rng(0)
+        for size in options["sizes"]:
+            close = 40000 + np.cumsum(rng.normal(0, 50, size))
+            self.stdout.write(f"{size} bars (best of {options['repeat']})")
+            for name, kernel in self._kernels(close, rng.uniform(0, 10, size)).items():
+                best = min(timeit.repeat(kernel, number=1, repeat=options["repeat"]))
+                self.stdout.write(f"  {name:>16}: {best * 1000:>9.3f} ms  ({best / size * 1e9:.1f} ns/bar)")
+
+    @staticmethod
+    def _kernels(close, volume):
+        high, low = close * 1.001, close * 0.999
+        return {
+            "sma(20)": lambda: indicators.sma(close, 20),
+            "sma(200)": lambda: indicators.sma(close, 200),
+            "ema(20)": lambda: indicators.ema(close, 20),
+            "ema(200)": lambda: indicators.ema(close, 200),
+            "rsi(14)": lambda: indicators.rsi(close, 14),
+            "vwap": lambda: indicators.vwap(high, low, close, volume),
+            "vwap(20)": lambda: indicators.vwap(high, low, close, volume, 20),
+            "bollinger(20, 2)": lambda: indicators.bollinger(close, 20, 2),
+        }
@@ -0,0 +1,66 @@
+"""
+Django command to compare order submissions through the sync and async Alpaca clients against a slow broker.
+"""
+
+import asyncio
+import time
+
+from api_trade.scripts.alpaca_async import AsyncAlpacaIntegrationOrders
+from api_trade.scripts.alpaca_clients import registry
+from api_trade.scripts.alpaca_integration import market_order_request
+from api_trade.scripts.local_alpaca_stub import ORDER_RESPONSE, LocalAlpacaStub
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+ORDER = {"symbol": "BTC/USD", "qty": 1, "side": "buy", "time_in_force": "gtc"}
+
+
+class Command(BaseCommand):
+    """Submit the same orders one at a time (a sync worker), all at once (one async worker) and as a basket."""
+
+    help = "Benchmark sync vs async order submission against a local broker stub with added latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.1, help="Seconds the stub takes to answer.")
+
+    # Measures client overhead; the stub does not limit the request rate.
+    @override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        count = options["orders"]
+        with LocalAlpacaStub({("POST", "/orders"): ORDER_RESPONSE}, latency=options["latency"]) as stub:
+            client = registry.get_trading_client(api_key="bench", secret_key="bench", url_override=stub.url)
+            started = time.perf_counter()
+            for _ in range(count):
+                client.submit_order(order_data=market_order_request(ORDER))
+            self._report("sync", count, time.perf_counter() - started, stub)
+
+            stub.max_in_flight = 0
+            started = time.perf_counter()
+            asyncio.run(self._submit_async(stub.url, count))
+            self._report("async", count, time.perf_counter() - started, stub)
+
+            stub.max_in_flight = 0
+            started = time.perf_counter()
+            asyncio.run(self._submit_batch(stub.url, count))
+            self._report("batch", count, time.perf_counter() - started, stub)
+
+    @staticmethod
+    async def _submit_async(url, count):
+        orders = AsyncAlpacaIntegrationOrders(url_override=url)
+        await asyncio.gather(*(orders.place_order(ORDER) for _ in range(count)))
+        await orders.trading_client.aclose()
+
+    @staticmethod
+    async def _submit_batch(url, count):
+        orders = AsyncAlpacaIntegrationOrders(url_override=url)
+        await orders.place_orders([ORDER] * count, concurrency=settings.ALPACA_BATCH_CONCURRENCY)
+        await orders.trading_client.aclose()
+
+    def _report(self, name, count, elapsed, stub):
+        self.stdout.write(
+            f"{name:>5}: {count} orders in {elapsed:.2f}s ({count / elapsed:,.0f} orders/s), "
+            f"max {stub.max_in_flight} in flight"
+        )
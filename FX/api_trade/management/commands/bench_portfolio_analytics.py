@@ -0,0 +1,52 @@
+"""
+Django command to micro-benchmark the P&L curve kernel against replaying fills bar by bar.
+"""
+
+import timeit
+
+import numpy as np
+from api_trade.scripts.portfolio_analytics import apply_fill_to_position, drawdown, pnl_curve
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Time the vectorized P&L curve and the per-fill position update over synthetic fills and bars."""
+
+    help = "Micro-benchmark the portfolio analytics kernels."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fills", type=int, default=100_000)
+        parser.add_argument("--bars", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rng = np.random.default_rng(0)
+        fill_times = np.sort(rng.uniform(0, options["bars"], options["fills"]))
+        fill_qty = rng.normal(0, 1, options["fills"])
+        fill_price = 40000 + rng.normal(0, 500, options["fills"])
+        times = np.arange(options["bars"], dtype=np.float64)
+        closes = 40000 + np.cumsum(rng.normal(0, 50, options["bars"]))
+
+        def vectorized():
+            drawdown(pnl_curve(fill_times, fill_qty, fill_price, times, closes))
+
+        def replay():
+            curve, position, cash, index = np.empty(len(times)), 0.0, 0.0, 0
+            for point, t in enumerate(times):
+                while index < len(fill_times) and fill_times[index] <= t:
+                    position += fill_qty[index]
+                    cash -= fill_qty[index] * fill_price[index]
+                    index += 1
+                curve[point] = cash + position * closes[point]
+            drawdown(curve)
+
+        def incremental():
+            apply_fill_to_position(1.5, 40000.0, 0.0, -0.5, 40100.0)
+
+        self.stdout.write(f"{options['fills']} fills, {options['bars']} bars (best of {options['repeat']})")
+        for name, kernel in (("vectorized curve", vectorized), ("replayed curve", replay)):
+            best = min(timeit.repeat(kernel, number=1, repeat=options["repeat"]))
+            self.stdout.write(f"  {name:>16}: {best * 1000:>9.3f} ms")
+        best = min(timeit.repeat(incremental, number=10_000, repeat=options["repeat"])) / 10_000
+        self.stdout.write(f"  {'one fill update':>16}: {best * 1e6:>9.3f} us")
@@ -0,0 +1,107 @@
+"""
+Django command to measure the quote relay throughput in messages per second per worker.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+
+from api_trade.scripts.quote_relay import RedisQuoteFeed, encode_batch, quotes_channel
+from api_trade.scripts.redis_client import get_redis, reset
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+
+def _worker(symbols, seconds, ready, results):
+    """Run a relay subscriber like a gunicorn worker would and count the quotes it receives."""
+    reset()
+    received = {"count": 0, "first": None, "last": None}
+
+    def publish(symbol, tick):
+        now = time.perf_counter()
+        received["first"] = received["first"] or now
+        received["last"] = now
+        received["count"] += 1
+
+    async def run():
+        feed = RedisQuoteFeed(publish)
+        await feed.subscribe(symbols)
+        ready.release()
+        await asyncio.sleep(seconds + 1)
+        await feed.close()
+
+    asyncio.run(run())
+    elapsed = (received["last"] or 0) - (received["first"] or 0)
+    results.put((received["count"], elapsed))
+
+
+class Command(BaseCommand):
+    """Publish synthetic quotes as the node leader and count what every worker process receives."""
+
+    help = "Benchmark the Redis pub/sub quote relay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--symbols", type=int, default=50)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--rate", type=int, default=1000, help="Messages published per second (0: unthrottled).")
+        parser.add_argument("--pipeline", type=int, default=20, help="Messages published per round trip.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        node = f"bench-{uuid.uuid4().hex[:8]}"
+        with override_settings(MARKET_DATA_NODE=node):
+            self._run(node, options)
+
+    def _run(self, node, options):
+        symbols = [f"SYM{i}/USD" for i in range(options["symbols"])]
+        client = get_redis()
+        # Holding the leader lock keeps the workers from starting an upstream feed; this process plays the leader.
+        leader_key = f"md:{node}:leader"
+        client.set(leader_key, "bench", px=int((options["seconds"] + 30) * 1000))
+
+        context = multiprocessing.get_context("fork")
+        ready, results = context.Semaphore(0), context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(symbols, options["seconds"], ready, results))
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            ready.acquire()
+
+        # Each batch carries a quote for every symbol, like a leader flush while all symbols are moving.
+        tick = json.dumps({"bid_price": 100.0, "bid_size": 1.0, "ask_price": 100.1, "ask_size": 1.0})
+        batch = encode_batch(dict.fromkeys(symbols, tick))
+        batches = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < options["seconds"]:
+            pipe = client.pipeline(transaction=False)
+            for _ in range(options["pipeline"]):
+                pipe.publish(quotes_channel(), batch)
+            pipe.execute()
+            batches += options["pipeline"]
+            if options["rate"]:
+                time.sleep(max(0.0, started + batches / options["rate"] - time.perf_counter()))
+        elapsed = time.perf_counter() - started
+        published = batches * len(symbols)
+
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        client.delete(leader_key)
+
+        self.stdout.write(
+            f"node {node} ({settings.REDIS_HOST}): {options['workers']} workers, {len(symbols)} symbols, "
+            f"{len(symbols)} quotes per message"
+        )
+        self.stdout.write(
+            f"  published: {batches} messages, {batches / elapsed:,.0f} msg/s, {published / elapsed:,.0f} quotes/s"
+        )
+        for index, (count, worker_elapsed) in enumerate(reports):
+            rate = count / worker_elapsed if worker_elapsed else 0
+            self.stdout.write(f"  worker {index}: {count} quotes ({count / published:.1%}), {rate:,.0f} quotes/s")
@@ -0,0 +1,90 @@
+"""
+Django command to benchmark the shared rate limit governor against a rate-limited broker stand-in.
+"""
+
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import Counter
+
+from api_trade.scripts import redis_client
+from api_trade.scripts.alpaca_clients import registry
+from api_trade.scripts.local_alpaca_stub import LocalAlpacaStub
+from api_trade.scripts.rate_limiter import RateLimited, priority
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+PRIORITIES = ("orders", "account", "background")
+
+
+def _worker(url, key, threads, seconds):
+    """One gunicorn-like worker process: ``threads`` threads calling the broker in a loop for ``seconds``."""
+    redis_client.reset()
+    registry.reset()
+    counts = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def run(name):
+        client = registry.get_trading_client(api_key=key, secret_key=key, url_override=url)
+        # Count the broker's 429s instead of retrying them.
+        client._retry = 0
+        with priority(name):
+            while time.monotonic() < deadline:
+                try:
+                    client.get_clock()
+                    outcome = "ok"
+                except RateLimited:
+                    outcome = "shed"
+                except Exception:  # noqa: B902
+                    outcome = "error"
+                with lock:
+                    counts[(name, outcome)] += 1
+
+    workers = [threading.Thread(target=run, args=(PRIORITIES[index % len(PRIORITIES)],)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counts
+
+
+class Command(BaseCommand):
+    """Run several worker processes against a stub allowing ``--limit`` requests per second, with and without
+    the governor, and report the 429s the broker answered and the calls completed per priority."""
+
+    help = "Benchmark the Redis rate limit governor shared by worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=6)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--limit", type=int, default=50, help="Requests per second the stub allows.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        limit = options["limit"]
+        # Over any second, the bucket's burst plus its refill stays within the stub's limit.
+        limits = {
+            "trading": (limit * 48, max(1, limit // 5), "account"),
+            "data": (limit * 48, max(1, limit // 5), "market_data"),
+        }
+        priorities = {"orders": (0.0, 1), "account": (0.3, 0.5), "background": (0.6, 0.5)}
+        for enabled in (False, True):
+            with LocalAlpacaStub(rate_limit=limit) as stub, override_settings(
+                ALPACA_RATE_LIMIT_ENABLED=enabled, ALPACA_RATE_LIMITS=limits, ALPACA_RATE_LIMIT_PRIORITIES=priorities
+            ):
+                key = f"bench-{uuid.uuid4().hex}"
+                args = [(stub.url, key, options["threads"], options["seconds"])] * options["workers"]
+                with multiprocessing.get_context("fork").Pool(options["workers"]) as pool:
+                    counts = sum(pool.starmap(_worker, args), Counter())
+                self._report("governed" if enabled else "ungoverned", counts, stub, options["seconds"])
+
+    def _report(self, name, counts, stub, seconds):
+        completed = ", ".join(f"{label} {counts[(label, 'ok')]}" for label in PRIORITIES)
+        shed = sum(counts[(label, "shed")] for label in PRIORITIES)
+        self.stdout.write(
+            f"{name:>10}: {len(stub.requests)} broker requests ({len(stub.requests) / seconds:.0f}/s), "
+            f"{stub.throttled} answered 429, {shed} shed locally; completed by priority: {completed}"
+        )
@@ -0,0 +1,56 @@
+"""
+Django command to measure how request coalescing cuts upstream snapshot calls.
+"""
+
+import random
+import threading
+import time
+
+from api_trade.scripts.snapshot_coalescer import SnapshotCoalescer
+from django.core.management.base import BaseCommand
+
+SYMBOLS = [f"SYM{index}/USD" for index in range(50)]
+
+
+class Command(BaseCommand):
+    """Simulate polling clients against a fake upstream with a fixed latency and count the upstream calls."""
+
+    help = "Benchmark the multi-symbol snapshot coalescer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=200)
+        parser.add_argument("--seconds", type=float, default=3.0)
+        parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake upstream takes.")
+        parser.add_argument("--window", type=float, default=0.01)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        def fetch(symbols):
+            time.sleep(options["latency"])
+            return {symbol: {"symbol": symbol} for symbol in symbols}
+
+        coalescer = SnapshotCoalescer(fetch, window=options["window"])
+        deadline = time.monotonic() + options["seconds"]
+        latencies = []
+
+        def client(seed):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                coalescer.get(rng.sample(SYMBOLS, 10))
+                latencies.append(time.monotonic() - started)
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(options["clients"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = coalescer.stats()
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        self.stdout.write(
+            f"{options['clients']} clients, {stats['requests']} requests, {stats['upstream_calls']} upstream calls "
+            f"({stats['upstream_calls'] / options['seconds']:.1f}/s); p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms"
+        )
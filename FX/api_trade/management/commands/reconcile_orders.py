@@ -0,0 +1,20 @@
+"""
+Django command to repair the local order mirror from the broker's order list.
+"""
+
+from api_trade.scripts.order_mirror import reconcile_orders
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Re-read recent orders from Alpaca; schedule it periodically next to ``sync_trade_updates``."""
+
+    help = "Reconcile the local order mirror with the orders Alpaca reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Reconcile orders submitted in the last N days.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        seen, drifted = reconcile_orders(days=options["days"])
+        self.stdout.write(f"Reconciled {seen} orders, {drifted} were missing or out of date")
@@ -0,0 +1,37 @@
+"""
+Django command to materialize the daily portfolio summaries.
+"""
+
+from datetime import date, timedelta
+
+from api_trade.models import DailyPortfolioSummary
+from api_trade.scripts.portfolio_rollups import rollup_portfolios
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """Roll up yesterday by default; run it nightly after midnight UTC, and with ``--today`` for intraday figures."""
+
+    help = "Materialize per-user daily portfolio summaries (equity, P&L, turnover, fees)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, help="Roll up this day (YYYY-MM-DD).")
+        parser.add_argument("--since", type=date.fromisoformat, help="Roll up every day from this one to today.")
+        parser.add_argument("--today", action="store_true", help="Refresh today's partial summary only.")
+        parser.add_argument("--rebuild", action="store_true", help="Drop every summary and roll up all history.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        today = timezone.now().date()
+        if options["rebuild"]:
+            DailyPortfolioSummary.objects.all().delete()
+            start, end = date.min + timedelta(days=1), today
+        elif options["since"]:
+            start, end = options["since"], today
+        elif options["today"]:
+            start = end = today
+        else:
+            start = end = options["date"] or today - timedelta(days=1)
+        written = rollup_portfolios(start, end)
+        self.stdout.write(f"Wrote {written} daily portfolio summaries")
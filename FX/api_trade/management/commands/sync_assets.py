@@ -0,0 +1,17 @@
+"""
+Django command to sync the asset catalog from the broker.
+"""
+
+from api_trade.scripts.asset_catalog import sync_assets
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Copy Alpaca's active assets into the catalog; schedule it a few times a day."""
+
+    help = "Sync the asset catalog with the assets Alpaca lists."
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        stored, deactivated = sync_assets()
+        self.stdout.write(f"Synced {stored} assets, deactivated {deactivated}")
@@ -0,0 +1,63 @@
+"""
+Django command to keep the local order mirror in sync with the broker's trade update stream.
+"""
+
+import json
+import queue
+import threading
+
+from alpaca.trading.models import TradeUpdate
+from alpaca.trading.stream import TradingStream
+from api_trade.scripts.local_alpaca_stub import LocalTradeStream
+from api_trade.scripts.order_mirror import apply_trade_update
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Apply every trade update of the account to ``BrokerOrder``; run one instance per account.
+
+    The stream runs in a background thread and hands messages over through a queue, so slow database writes
+    never stall the websocket.
+    """
+
+    help = "Stream Alpaca trade updates into the local order mirror (or replay recorded ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--replay", help="JSONL file of recorded stream messages to apply instead of the stream.")
+        parser.add_argument("--record", help="Append every live stream message to this JSONL file.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options["replay"]:
+            with open(options["replay"], encoding="utf-8") as replay:
+                stream = LocalTradeStream([json.loads(line) for line in replay if line.strip()])
+        else:
+            stream = TradingStream(settings.API_KEY_ALPACA, settings.SECRET_KEY_ALPACA, paper=True, raw_data=True)
+        messages = queue.Queue()
+
+        async def on_message(message):
+            messages.put(message)
+
+        stream.subscribe_trade_updates(on_message)
+        threading.Thread(target=self._run_stream, args=(stream, messages), daemon=True).start()
+
+        record = open(options["record"], "a", encoding="utf-8") if options["record"] else None
+        applied = 0
+        try:
+            while (message := messages.get()) is not None:
+                if record is not None:
+                    record.write(json.dumps(message, default=str) + "\n")
+                apply_trade_update(TradeUpdate(**message["data"]))
+                applied += 1
+        finally:
+            if record is not None:
+                record.close()
+            self.stdout.write(f"Applied {applied} trade updates")
+
+    @staticmethod
+    def _run_stream(stream, messages):
+        try:
+            stream.run()
+        finally:
+            messages.put(None)
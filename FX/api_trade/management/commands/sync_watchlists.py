@@ -0,0 +1,30 @@
+"""
+Django command to copy watchlist changes to the broker.
+"""
+
+import time
+
+from api_trade.scripts.watchlists import sync_watchlists
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Write-behind worker for watchlists; run one next to the web workers (several may run at once)."""
+
+    help = "Push queued watchlist changes to Alpaca."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Push what is due and exit.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait when nothing is due.")
+        parser.add_argument("--batch", type=int, default=100, help="Changes to claim at a time.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            synced, failed = sync_watchlists(limit=options["batch"])
+            if synced or failed:
+                self.stdout.write(f"Synced {synced} watchlists, {failed} failed")
+            if options["once"]:
+                return
+            if synced + failed < options["batch"]:
+                time.sleep(options["interval"])
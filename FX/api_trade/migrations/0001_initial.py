@@ -0,0 +1,69 @@
+# Generated by Django 5.0.2 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoricalBar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=25)),
+                ("timeframe", models.CharField(max_length=10)),
+                ("timestamp", models.DateTimeField()),
+                ("open", models.FloatField()),
+                ("high", models.FloatField()),
+                ("low", models.FloatField()),
+                ("close", models.FloatField()),
+                ("volume", models.FloatField()),
+                ("trade_count", models.FloatField(blank=True, null=True)),
+                ("vwap", models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HistoricalBarCoverage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=25)),
+                ("timeframe", models.CharField(max_length=10)),
+                ("start", models.DateTimeField()),
+                ("end", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="historicalbar",
+            constraint=models.UniqueConstraint(
+                fields=("symbol", "timeframe", "timestamp"),
+                name="unique_historical_bar",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historicalbarcoverage",
+            index=models.Index(
+                fields=["symbol", "timeframe", "start"],
+                name="api_trade_h_symbol_649b13_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api_trade", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BrokerOrder",
+            fields=[
+                ("id", models.UUIDField(primary_key=True, serialize=False)),
+                ("client_order_id", models.CharField(max_length=128, unique=True)),
+                ("symbol", models.CharField(max_length=25)),
+                ("asset_class", models.CharField(max_length=20)),
+                ("order_class", models.CharField(max_length=10)),
+                ("order_type", models.CharField(max_length=20)),
+                ("side", models.CharField(max_length=10)),
+                ("time_in_force", models.CharField(max_length=5)),
+                ("qty", models.FloatField(blank=True, null=True)),
+                ("notional", models.FloatField(blank=True, null=True)),
+                ("filled_qty", models.FloatField(default=0.0)),
+                ("filled_avg_price", models.FloatField(blank=True, null=True)),
+                ("limit_price", models.FloatField(blank=True, null=True)),
+                ("stop_price", models.FloatField(blank=True, null=True)),
+                ("status", models.CharField(max_length=25)),
+                ("extended_hours", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("submitted_at", models.DateTimeField(blank=True, null=True)),
+                ("filled_at", models.DateTimeField(blank=True, null=True)),
+                ("canceled_at", models.DateTimeField(blank=True, null=True)),
+                ("expired_at", models.DateTimeField(blank=True, null=True)),
+                ("failed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="broker_orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["-created_at"], name="broker_order_created"),
+                    models.Index(fields=["status", "-created_at"], name="broker_order_status"),
+                    models.Index(fields=["symbol", "-created_at"], name="broker_order_symbol"),
+                    models.Index(fields=["user", "-created_at"], name="broker_order_user"),
+                ],
+            },
+        ),
+    ]
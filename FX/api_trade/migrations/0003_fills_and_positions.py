@@ -0,0 +1,105 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api_trade", "0002_broker_order"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PositionState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=25)),
+                ("asset_class", models.CharField(max_length=20)),
+                ("qty", models.FloatField(default=0.0)),
+                ("avg_price", models.FloatField(default=0.0)),
+                ("realized_pl", models.FloatField(default=0.0)),
+                ("fill_count", models.PositiveIntegerField(default=0)),
+                ("last_fill_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="position_states",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Fill",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("execution_id", models.UUIDField(unique=True)),
+                ("symbol", models.CharField(max_length=25)),
+                ("asset_class", models.CharField(max_length=20)),
+                ("side", models.CharField(max_length=10)),
+                ("qty", models.FloatField()),
+                ("price", models.FloatField()),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fills",
+                        to="api_trade.brokerorder",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="fills",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user", "symbol", "timestamp"], name="fill_user_symbol"),
+                    models.Index(fields=["user", "timestamp"], name="fill_user_timestamp"),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="positionstate",
+            constraint=models.UniqueConstraint(fields=("user", "symbol"), name="unique_position_state"),
+        ),
+        migrations.AddConstraint(
+            model_name="positionstate",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user", None)),
+                fields=("symbol",),
+                name="unique_unattributed_position_state",
+            ),
+        ),
+    ]
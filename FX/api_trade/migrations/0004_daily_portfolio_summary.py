@@ -0,0 +1,72 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api_trade", "0003_fills_and_positions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fill",
+            name="fee",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="fill",
+            name="realized_pl",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name="DailyPortfolioSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("equity", models.FloatField()),
+                ("pnl", models.FloatField()),
+                ("realized_pl", models.FloatField()),
+                ("turnover", models.FloatField()),
+                ("fees", models.FloatField()),
+                ("fill_count", models.PositiveIntegerField()),
+                ("cash", models.FloatField()),
+                ("positions", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_portfolio_summaries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailyportfoliosummary",
+            constraint=models.UniqueConstraint(fields=("user", "date"), name="unique_daily_portfolio_summary"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyportfoliosummary",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user", None)),
+                fields=("date",),
+                name="unique_unattributed_daily_portfolio_summary",
+            ),
+        ),
+    ]
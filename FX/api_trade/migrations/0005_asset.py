@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api_trade", "0004_daily_portfolio_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Asset",
+            fields=[
+                ("id", models.UUIDField(primary_key=True, serialize=False)),
+                ("symbol", models.CharField(max_length=25, unique=True)),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("asset_class", models.CharField(max_length=20)),
+                ("exchange", models.CharField(max_length=20)),
+                ("status", models.CharField(max_length=20)),
+                ("tradable", models.BooleanField(default=False)),
+                ("marginable", models.BooleanField(default=False)),
+                ("shortable", models.BooleanField(default=False)),
+                ("easy_to_borrow", models.BooleanField(default=False)),
+                ("fractionable", models.BooleanField(default=False)),
+                ("min_order_size", models.FloatField(blank=True, null=True)),
+                ("min_trade_increment", models.FloatField(blank=True, null=True)),
+                ("price_increment", models.FloatField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:45
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api_trade", "0005_asset"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Watchlist",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=64)),
+                ("broker_id", models.UUIDField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="watchlists",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="WatchlistItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=25)),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "watchlist",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="api_trade.watchlist",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.CreateModel(
+            name="WatchlistSyncTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("watchlist_id", models.UUIDField(unique=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("upsert", "upsert"), ("delete", "delete")],
+                        max_length=10,
+                    ),
+                ),
+                ("broker_id", models.UUIDField(blank=True, null=True)),
+                ("token", models.UUIDField(default=uuid.uuid4)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("claimed_until", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["next_attempt_at"],
+                        name="api_trade_w_next_at_f1f6d3_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="watchlist",
+            constraint=models.UniqueConstraint(fields=("user", "name"), name="unique_watchlist_name"),
+        ),
+        migrations.AddConstraint(
+            model_name="watchlistitem",
+            constraint=models.UniqueConstraint(fields=("watchlist", "symbol"), name="unique_watchlist_symbol"),
+        ),
+    ]
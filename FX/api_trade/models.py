@@ -1,3 +1,300 @@
-# from django.db import models
+import uuid
 
-# Create your models here.
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class HistoricalBar(models.Model):
+    """One OHLCV bar fetched from Alpaca, stored so repeated requests only fetch what is missing."""
+
+    symbol = models.CharField(max_length=25)
+    timeframe = models.CharField(max_length=10)
+    timestamp = models.DateTimeField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.FloatField()
+    trade_count = models.FloatField(blank=True, null=True)
+    vwap = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Also serves as the composite (symbol, timeframe, timestamp) index for window reads.
+            models.UniqueConstraint(fields=["symbol", "timeframe", "timestamp"], name="unique_historical_bar"),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.timeframe} {self.timestamp:%Y-%m-%d %H:%M}"
+
+
+class HistoricalBarCoverage(models.Model):
+    """A time range [start, end) for which every bar of a symbol and timeframe is in the store."""
+
+    symbol = models.CharField(max_length=25)
+    timeframe = models.CharField(max_length=10)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["symbol", "timeframe", "start"])]
+
+    def __str__(self):
+        return f"{self.symbol} {self.timeframe} {self.start:%Y-%m-%d %H:%M} - {self.end:%Y-%m-%d %H:%M}"
+
+
+class BrokerOrder(models.Model):
+    """Local copy of an Alpaca order, kept current from the trade update stream and periodic reconciliation."""
+
+    # Statuses Alpaca no longer changes; everything else counts as open.
+    CLOSED_STATUSES = ["filled", "canceled", "expired", "rejected", "replaced", "done_for_day"]
+
+    id = models.UUIDField(primary_key=True)
+    client_order_id = models.CharField(max_length=128, unique=True)
+    # Set for orders placed through this API; orders placed elsewhere on the account have no user.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        db_index=False,
+        related_name="broker_orders",
+    )
+    symbol = models.CharField(max_length=25)
+    asset_class = models.CharField(max_length=20)
+    order_class = models.CharField(max_length=10)
+    order_type = models.CharField(max_length=20)
+    side = models.CharField(max_length=10)
+    time_in_force = models.CharField(max_length=5)
+    qty = models.FloatField(blank=True, null=True)
+    notional = models.FloatField(blank=True, null=True)
+    filled_qty = models.FloatField(default=0.0)
+    filled_avg_price = models.FloatField(blank=True, null=True)
+    limit_price = models.FloatField(blank=True, null=True)
+    stop_price = models.FloatField(blank=True, null=True)
+    status = models.CharField(max_length=25)
+    extended_hours = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    # Broker-side update time; older trade updates never overwrite newer state.
+    updated_at = models.DateTimeField()
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    filled_at = models.DateTimeField(blank=True, null=True)
+    canceled_at = models.DateTimeField(blank=True, null=True)
+    expired_at = models.DateTimeField(blank=True, null=True)
+    failed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="broker_order_created"),
+            models.Index(fields=["status", "-created_at"], name="broker_order_status"),
+            models.Index(fields=["symbol", "-created_at"], name="broker_order_symbol"),
+            models.Index(fields=["user", "-created_at"], name="broker_order_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.side} {self.symbol} {self.status} ({self.id})"
+
+
+class Fill(models.Model):
+    """One execution of a ``BrokerOrder``, from a ``fill`` or ``partial_fill`` trade update."""
+
+    execution_id = models.UUIDField(unique=True)
+    order = models.ForeignKey(BrokerOrder, on_delete=models.CASCADE, related_name="fills")
+    # Copied from the order so per-user analytics never join through it.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        db_index=False,
+        related_name="fills",
+    )
+    symbol = models.CharField(max_length=25)
+    asset_class = models.CharField(max_length=20)
+    side = models.CharField(max_length=10)
+    qty = models.FloatField()
+    price = models.FloatField()
+    # Estimated from ``ALPACA_FEE_RATES``; trade updates do not report fees.
+    fee = models.FloatField(default=0.0)
+    # P&L this fill realized on the position it reduced, by the average-cost method.
+    realized_pl = models.FloatField(default=0.0)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "symbol", "timestamp"], name="fill_user_symbol"),
+            models.Index(fields=["user", "timestamp"], name="fill_user_timestamp"),
+        ]
+
+    def __str__(self):
+        return f"{self.side} {self.qty} {self.symbol} @ {self.price}"
+
+    @property
+    def signed_qty(self):
+        return self.qty if self.side == "buy" else -self.qty
+
+
+class PositionState(models.Model):
+    """Running average-cost position of a user in a symbol, updated with every fill instead of recomputed."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="position_states",
+    )
+    symbol = models.CharField(max_length=25)
+    asset_class = models.CharField(max_length=20)
+    # Signed: negative for short positions.
+    qty = models.FloatField(default=0.0)
+    avg_price = models.FloatField(default=0.0)
+    realized_pl = models.FloatField(default=0.0)
+    fill_count = models.PositiveIntegerField(default=0)
+    last_fill_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "symbol"], name="unique_position_state"),
+            # Orders placed outside this API have no user; they share one position per symbol. A partial index, as
+            # nulls_distinct=False needs PostgreSQL 15.
+            models.UniqueConstraint(
+                fields=["symbol"], condition=models.Q(user=None), name="unique_unattributed_position_state"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.qty} {self.symbol}"
+
+
+class DailyPortfolioSummary(models.Model):
+    """End-of-day (UTC) portfolio figures of a user, materialized by ``rollup_portfolios``.
+
+    ``equity`` is the cash flow of all fills so far plus the market value of the positions at the day's close,
+    i.e. the cumulative P&L since the first fill. ``cash`` and ``positions`` carry the state the next day's rollup
+    starts from.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="daily_portfolio_summaries",
+    )
+    date = models.DateField()
+    equity = models.FloatField()
+    pnl = models.FloatField()
+    realized_pl = models.FloatField()
+    turnover = models.FloatField()
+    fees = models.FloatField()
+    fill_count = models.PositiveIntegerField()
+    cash = models.FloatField()
+    # {symbol: [qty, mark price, asset class]}
+    positions = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the index chart reads use.
+            models.UniqueConstraint(fields=["user", "date"], name="unique_daily_portfolio_summary"),
+            # The unattributed fills' summaries; a partial index, as nulls_distinct=False needs PostgreSQL 15.
+            models.UniqueConstraint(
+                fields=["date"], condition=models.Q(user=None), name="unique_unattributed_daily_portfolio_summary"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.date}"
+
+
+class Asset(models.Model):
+    """An asset of the Alpaca catalog, synced by ``sync_assets`` and searched through the in-process asset index."""
+
+    id = models.UUIDField(primary_key=True)
+    symbol = models.CharField(max_length=25, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    asset_class = models.CharField(max_length=20)
+    exchange = models.CharField(max_length=20)
+    # "inactive" also marks assets the broker stopped listing.
+    status = models.CharField(max_length=20)
+    tradable = models.BooleanField(default=False)
+    marginable = models.BooleanField(default=False)
+    shortable = models.BooleanField(default=False)
+    easy_to_borrow = models.BooleanField(default=False)
+    fractionable = models.BooleanField(default=False)
+    min_order_size = models.FloatField(blank=True, null=True)
+    min_trade_increment = models.FloatField(blank=True, null=True)
+    price_increment = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.symbol} ({self.asset_class})"
+
+
+class Watchlist(models.Model):
+    """A user's watchlist, served from the database and copied to the broker by ``sync_watchlists``."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="watchlists")
+    name = models.CharField(max_length=64)
+    # The broker's id for this watchlist, once it was created there.
+    broker_id = models.UUIDField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the index the per-user list reads.
+            models.UniqueConstraint(fields=["user", "name"], name="unique_watchlist_name"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.name}"
+
+
+class WatchlistItem(models.Model):
+    """A symbol on a watchlist, in the order the user added it."""
+
+    watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name="items")
+    symbol = models.CharField(max_length=25)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["watchlist", "symbol"], name="unique_watchlist_symbol"),
+        ]
+
+    def __str__(self):
+        return f"{self.watchlist} {self.symbol}"
+
+
+class WatchlistSyncTask(models.Model):
+    """Pending copy of a watchlist change to the broker (write-behind outbox).
+
+    There is at most one task per watchlist: later changes replace the pending one, because the worker always sends
+    the watchlist's current state. ``token`` changes with every replacement, so a worker only deletes the task it
+    actually synced.
+    """
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+    ACTIONS = [(UPSERT, "upsert"), (DELETE, "delete")]
+
+    watchlist_id = models.UUIDField(unique=True)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    broker_id = models.UUIDField(blank=True, null=True)
+    token = models.UUIDField(default=uuid.uuid4)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.action} {self.watchlist_id}"
@@ -0,0 +1,105 @@
+import json
+
+import msgpack
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON.
+
+    Views stream large results in this format themselves; the renderer only handles regular responses such as
+    validation errors, which it writes as a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data, cls=JSONEncoder).encode("utf-8") + b"\n"
+
+
+class ColumnarRenderer(BaseRenderer):
+    """Columnar MessagePack.
+
+    Views that support it pass each series as parallel NumPy arrays. Every array is written as
+    ``{"dtype": "<f8", "data": <raw bytes>}`` so clients can wrap it in a typed array (``Float64Array``,
+    ``BigInt64Array``) without parsing numbers one by one. Other values are plain MessagePack.
+    """
+
+    media_type = "application/vnd.fx.columnar+msgpack"
+    format = "columnar"
+    charset = None
+    render_style = "binary"
+    columnar = True
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value, dtype=value.dtype.newbyteorder("<"))
+            return {"dtype": value.dtype.str, "data": value.tobytes()}
+        return JSONEncoder().default(value)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self._default, use_bin_type=True)
+
+
+class ArrowRenderer(BaseRenderer):
+    """Apache Arrow IPC stream, available when ``pyarrow`` is installed.
+
+    Columnar payloads of the form ``{"data": {series: {column: array}}}`` become one record batch with a
+    ``symbol`` column; every other top level key is stored in the schema metadata.
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        series = data.get("data") if isinstance(data, dict) else None
+        if not isinstance(series, dict):
+            # Errors and other non-columnar payloads.
+            series = {}
+        metadata = {key: json.dumps(value, cls=JSONEncoder) for key, value in data.items() if key != "data"}
+
+        arrays = {}
+        for symbol, columns in series.items():
+            length = len(next(iter(columns.values()), []))
+            arrays.setdefault("symbol", []).append(np.full(length, symbol, dtype=object))
+            for name, values in columns.items():
+                arrays.setdefault(name, []).append(values)
+        table = pyarrow.table(
+            {name: _arrow_column(name, np.concatenate(parts)) for name, parts in arrays.items()},
+        ).replace_schema_metadata(metadata)
+
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+def _arrow_column(name, values):
+    if name == "symbol":
+        return pyarrow.array(values, type=pyarrow.string()).dictionary_encode()
+    if name == "timestamp":
+        return pyarrow.array(values, type=pyarrow.timestamp("ms", tz="UTC"))
+    return pyarrow.array(values, from_pandas=True)
+
+
+COLUMNAR_RENDERER_CLASSES = [ColumnarRenderer, ArrowRenderer] if pyarrow is not None else [ColumnarRenderer]
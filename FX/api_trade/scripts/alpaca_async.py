@@ -0,0 +1,218 @@
+"""
+Async Alpaca trading client for views served under ASGI.
+
+``TradingClient`` blocks its thread for the whole broker round trip. ``AsyncTradingClient`` mirrors the order
+endpoints it exposes on top of ``httpx.AsyncClient``, so one worker can keep hundreds of broker calls in flight
+while its event loop keeps serving other requests. Like the pooled clients, every request passes the circuit
+breaker of its endpoint class and takes a token of the shared rate limiter first.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import List
+from uuid import UUID
+
+import httpx
+from alpaca import __version__ as alpaca_version
+from alpaca.common.enums import BaseURL
+from alpaca.common.exceptions import APIError
+from alpaca.common.utils import validate_uuid_id_param
+from alpaca.trading.models import Order
+from alpaca.trading.requests import CancelOrderResponse
+from django.conf import settings
+from pydantic import TypeAdapter
+
+from .alpaca_clients import _fingerprint
+from .alpaca_integration import closed_orders_request, limit_order_request, market_order_request, short_sale_request
+from .circuit_breaker import get_breaker
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def error_message(error):
+    """Return the broker's message from an ``APIError``, whose text is usually the JSON error body."""
+    try:
+        return json.loads(f"{error}")["message"]
+    except (ValueError, KeyError, TypeError):
+        return f"{error}"
+
+
+def is_duplicate_client_order_id(error):
+    """Whether the broker rejected an order because its ``client_order_id`` was already used."""
+    return error.status_code == 422 and "client_order_id" in error_message(error)
+
+
+class AsyncTradingClient:
+    """The order endpoints of ``TradingClient``, as coroutines returning the same models."""
+
+    # Same retry policy as alpaca-py's RESTClient.
+    retry_codes = (429, 504)
+    retry_attempts = 3
+    retry_wait_seconds = 3
+
+    def __init__(self, api_key, secret_key, paper=True, url_override=None):
+        base_url = url_override or (BaseURL.TRADING_PAPER if paper else BaseURL.TRADING_LIVE).value
+        self._account_key = _fingerprint(api_key, secret_key, url_override)
+        self._client = httpx.AsyncClient(
+            base_url=f"{base_url}/v2",
+            headers={
+                "APCA-API-KEY-ID": api_key or "",
+                "APCA-API-SECRET-KEY": secret_key or "",
+                "User-Agent": f"APCA-PY/{alpaca_version}",
+            },
+            limits=httpx.Limits(
+                max_connections=settings.ALPACA_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ALPACA_HTTP_POOL_MAXSIZE,
+            ),
+            timeout=settings.ALPACA_ASYNC_TIMEOUT,
+        )
+
+    async def _request(self, method, path, params=None, body=None, priority=None):
+        breaker = get_breaker("trading", self._account_key, path)
+        for attempt in range(self.retry_attempts + 1):
+            breaker.allow()
+            try:
+                await rate_limiter.acquire_async("trading", self._account_key, priority)
+                started = time.monotonic()
+                response = await self._client.request(method, path, params=params, json=body)
+            except httpx.TransportError as error:
+                breaker.record(False, time.monotonic() - started)
+                # No HTTP status to report; the views answer 502 for APIErrors without one.
+                logger.warning("Alpaca %s %s failed: %r", method, path, error)
+                raise APIError(json.dumps({"message": "Could not reach the broker."})) from error
+            except BaseException:  # noqa: B902
+                breaker.release()
+                raise
+            breaker.record(response.status_code < 500, time.monotonic() - started)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as http_error:
+                if response.status_code == 429:
+                    await asyncio.to_thread(rate_limiter.throttled, "trading", self._account_key)
+                if response.status_code in self.retry_codes and attempt < self.retry_attempts:
+                    logger.warning("Alpaca returned %s, retrying in %ss", response.status_code, self.retry_wait_seconds)
+                    await asyncio.sleep(self.retry_wait_seconds)
+                    continue
+                raise APIError(response.text, http_error) from http_error
+            return response.json() if response.content else None
+
+    async def get_orders(self, filter=None):  # noqa: A002
+        """See ``TradingClient.get_orders``."""
+        params = filter.to_request_fields() if filter is not None else {}
+        if isinstance(params.get("symbols"), list):
+            params["symbols"] = ",".join(params["symbols"])
+        return TypeAdapter(List[Order]).validate_python(await self._request("GET", "/orders", params=params))
+
+    async def get_order_by_id(self, order_id):
+        """See ``TradingClient.get_order_by_id``."""
+        order_id = validate_uuid_id_param(order_id, "order_id")
+        return Order(**await self._request("GET", f"/orders/{order_id}"))
+
+    async def get_order_by_client_id(self, client_id):
+        """See ``TradingClient.get_order_by_client_id``."""
+        return Order(**await self._request("GET", "/orders:by_client_order_id", params={"client_order_id": client_id}))
+
+    async def submit_order(self, order_data):
+        """See ``TradingClient.submit_order``."""
+        return Order(**await self._request("POST", "/orders", body=order_data.to_request_fields(), priority="orders"))
+
+    async def cancel_order_by_id(self, order_id):
+        """See ``TradingClient.cancel_order_by_id``."""
+        order_id = validate_uuid_id_param(order_id, "order_id")
+        await self._request("DELETE", f"/orders/{order_id}", priority="orders")
+
+    async def cancel_orders(self):
+        """See ``TradingClient.cancel_orders``."""
+        return TypeAdapter(List[CancelOrderResponse]).validate_python(
+            await self._request("DELETE", "/orders", priority="orders")
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# httpx clients are bound to the event loop that created their connections; keep one set per loop.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_trading_client(api_key=None, secret_key=None, paper=True, url_override=None):
+    """Return the pooled ``AsyncTradingClient`` of the running event loop for the given credentials and mode."""
+    api_key = api_key or settings.API_KEY_ALPACA
+    secret_key = secret_key or settings.SECRET_KEY_ALPACA
+    key = (_fingerprint(api_key, secret_key), bool(paper), url_override)
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if key not in clients:
+        clients[key] = AsyncTradingClient(api_key, secret_key, paper=paper, url_override=url_override)
+    return clients[key]
+
+
+class AsyncAlpacaIntegrationOrders:
+    """Async counterpart of ``AlpacaIntegrationOrders``, with the same methods as coroutines."""
+
+    def __init__(self, url_override=None):
+        self.trading_client = get_async_trading_client(paper=True, url_override=url_override)
+
+    async def get_orders(self):
+        """Get orders."""
+        return await self.trading_client.get_orders(filter=closed_orders_request())
+
+    async def get_order(self, order_id: UUID):
+        """Get order."""
+        return await self.trading_client.get_order_by_id(order_id)
+
+    async def place_order(self, request_data):
+        """Place order."""
+        return await self.trading_client.submit_order(order_data=market_order_request(request_data))
+
+    async def place_limit_order_data(self, request_data):
+        """Place limit order."""
+        return await self.trading_client.submit_order(order_data=limit_order_request(request_data))
+
+    async def place_order_data(self, request_data):
+        """Place a limit order if the payload asks for one, a market order otherwise."""
+        if request_data.get("type") == "limit":
+            return await self.place_limit_order_data(request_data)
+        return await self.place_order(request_data)
+
+    async def place_orders(self, orders_data, concurrency):
+        """Place a basket of orders with at most ``concurrency`` broker calls in flight.
+
+        Returns one ``{"index", "status", "order"}`` or ``{"index", "status", "error"}`` result per order, in
+        order. Re-sending an order whose ``client_order_id`` the broker already accepted returns the existing
+        order, so a retried basket does not trade twice.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def place(index, request_data):
+            async with semaphore:
+                try:
+                    return {"index": index, "status": 201, "order": await self.place_order_data(request_data)}
+                except APIError as error:
+                    client_order_id = request_data.get("client_order_id")
+                    if client_order_id and is_duplicate_client_order_id(error):
+                        try:
+                            order = await self.trading_client.get_order_by_client_id(client_order_id)
+                            return {"index": index, "status": 200, "order": order}
+                        except APIError as lookup_error:
+                            error = lookup_error
+                    return {"index": index, "status": error.status_code or 502, "error": error_message(error)}
+                except ValueError as error:
+                    return {"index": index, "status": 400, "error": f"{error}"}
+
+        return await asyncio.gather(*(place(index, data) for index, data in enumerate(orders_data)))
+
+    async def cancel_order(self, order_id: UUID):
+        """Cancel order."""
+        return await self.trading_client.cancel_order_by_id(order_id)
+
+    async def cancel_all_orders(self):
+        """Cancel all orders."""
+        return await self.trading_client.cancel_orders()
+
+    async def submit_shortsale(self):
+        """Submit short sale."""
+        return await self.trading_client.submit_order(order_data=short_sale_request())
@@ -0,0 +1,234 @@
+"""
+Per-process registry of long-lived Alpaca clients.
+
+Building a ``TradingClient`` creates a new ``requests.Session``, so constructing one per request pays a fresh
+TCP/TLS handshake on every call. The registry hands out one client per (credentials, mode, base url) and keeps
+its connection pool alive between requests.
+
+Every request of a pooled client goes through ``BrokerAdapter``: it passes the circuit breaker of its endpoint class
+(``circuit_breaker``), takes a token of the shared rate limiter (``rate_limiter``) and is sent with a timeout. Reads
+can be hedged: when ``ALPACA_HEDGE_READS_AFTER`` seconds pass without an answer, the same GET is sent again and the
+first answer wins, which cuts the tail latency of a slow connection or broker node.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+
+from alpaca.data.historical import CryptoHistoricalDataClient, StockHistoricalDataClient
+from alpaca.trading.client import TradingClient
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from .circuit_breaker import HALF_OPEN, get_breaker
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(*parts):
+    """Return a short, non-reversible fingerprint of credentials for use in keys and logs."""
+    raw = "\x00".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="alpaca-hedge")
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+class BrokerAdapter(HTTPAdapter):
+    """``HTTPAdapter`` guarding every request to ``api`` for the account ``key``, retries included.
+
+    The request must pass the circuit breaker of its endpoint class and take a rate limiter token; it is sent with
+    ``ALPACA_HTTP_TIMEOUT`` unless the caller set a timeout, and its outcome and latency are reported to the
+    breaker. A 429 answer empties the rate limiter's bucket.
+    """
+
+    def __init__(self, api, key, **kwargs):
+        self.api = api
+        self.key = key
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        breaker = get_breaker(self.api, self.key, request.path_url)
+        breaker.allow()
+        try:
+            rate_limiter.acquire(self.api, self.key)
+        except BaseException:  # noqa: B902
+            breaker.release()
+            raise
+        kwargs["timeout"] = kwargs.get("timeout") or settings.ALPACA_HTTP_TIMEOUT
+        started = time.monotonic()
+        try:
+            if request.method == "GET" and settings.ALPACA_HEDGE_READS_AFTER and breaker.state != HALF_OPEN:
+                response = self._send_hedged(request, breaker, kwargs)
+            else:
+                response = super().send(request, **kwargs)
+        except RequestException:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        except BaseException:  # noqa: B902
+            breaker.release()
+            raise
+        breaker.record(response.status_code < 500, time.monotonic() - started)
+        if response.status_code == 429:
+            rate_limiter.throttled(self.api, self.key)
+        return response
+
+    def _send_hedged(self, request, breaker, kwargs):
+        """Send ``request``, and send it again if it is not answered in time; return the first answer."""
+        primary = _hedge_executor.submit(super().send, request, **kwargs)
+        try:
+            return primary.result(timeout=settings.ALPACA_HEDGE_READS_AFTER)
+        except FutureTimeoutError:
+            pass
+        if not rate_limiter.try_acquire(self.api, self.key):
+            return primary.result()
+        breaker.count("hedged")
+        hedge = _hedge_executor.submit(super().send, request.copy(), **kwargs)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        first = done.pop()
+        second = hedge if first is primary else primary
+        if first.exception() is not None:
+            # The faster request failed; the other one may still succeed.
+            return second.result()
+        second.add_done_callback(_close_response)
+        if first is hedge:
+            breaker.count("hedge_wins")
+        return first.result()
+
+
+class _PooledClient:
+    """A pooled client and its bookkeeping."""
+
+    __slots__ = ("client", "created_at", "last_used_at")
+
+    def __init__(self, client):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class AlpacaClientRegistry:
+    """Hand out long-lived, keep-alive pooled Alpaca clients.
+
+    Clients are keyed by credentials, paper/live mode and base url. The registry is per process; gunicorn
+    workers must call ``reset`` after fork so they never share sockets inherited from the master.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get_trading_client(self, api_key=None, secret_key=None, paper=True, url_override=None):
+        """Return the pooled ``TradingClient`` for the given credentials and mode."""
+        api_key = api_key or settings.API_KEY_ALPACA
+        secret_key = secret_key or settings.SECRET_KEY_ALPACA
+        key = ("trading", _fingerprint(api_key, secret_key), bool(paper), url_override)
+        return self._get(
+            key,
+            lambda: TradingClient(api_key, secret_key, paper=paper, url_override=url_override),
+            ("trading", _fingerprint(api_key, secret_key, url_override)),
+        )
+
+    def get_crypto_data_client(self, api_key=None, secret_key=None, url_override=None):
+        """Return the pooled ``CryptoHistoricalDataClient``."""
+        key = ("crypto-data", _fingerprint(api_key, secret_key), False, url_override)
+        return self._get(
+            key,
+            lambda: CryptoHistoricalDataClient(api_key, secret_key, url_override=url_override),
+            ("data", _fingerprint(api_key, secret_key, url_override)),
+        )
+
+    def get_stock_data_client(self, api_key=None, secret_key=None, url_override=None):
+        """Return the pooled ``StockHistoricalDataClient``; unlike crypto data, stock data needs credentials."""
+        api_key = api_key or settings.API_KEY_ALPACA
+        secret_key = secret_key or settings.SECRET_KEY_ALPACA
+        key = ("stock-data", _fingerprint(api_key, secret_key), False, url_override)
+        return self._get(
+            key,
+            lambda: StockHistoricalDataClient(api_key, secret_key, url_override=url_override),
+            ("data", _fingerprint(api_key, secret_key, url_override)),
+        )
+
+    def _get(self, key, factory, rate_limit):
+        max_idle = settings.ALPACA_CLIENT_MAX_IDLE
+        now = time.monotonic()
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is not None and max_idle and now - pooled.last_used_at > max_idle:
+                # The broker has most likely dropped our idle sockets already; start from a clean pool.
+                self._close(self._clients.pop(key))
+                pooled = None
+            if pooled is None:
+                pooled = _PooledClient(self._configure(factory(), *rate_limit))
+                self._clients[key] = pooled
+                logger.debug("Created pooled Alpaca client %s", key[:3])
+            pooled.last_used_at = now
+            return pooled.client
+
+    @staticmethod
+    def _configure(client, api, rate_limit_key):
+        """Mount a sized keep-alive connection pool, guarded by ``BrokerAdapter``, on the client's session."""
+        adapter = BrokerAdapter(
+            api,
+            rate_limit_key,
+            pool_connections=settings.ALPACA_HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.ALPACA_HTTP_POOL_MAXSIZE,
+            pool_block=settings.ALPACA_HTTP_POOL_BLOCK,
+        )
+        client._session.mount("https://", adapter)
+        client._session.mount("http://", adapter)
+        return client
+
+    @staticmethod
+    def _close(pooled):
+        try:
+            pooled.client._session.close()
+        except Exception:  # noqa: B902
+            logger.exception("Failed to close pooled Alpaca client session")
+
+    def check_health(self):
+        """Ping every pooled trading client and evict the ones that fail.
+
+        Returns a mapping of client key to ``True``/``False``. Data clients have no cheap authenticated
+        endpoint, so they are only recycled through the idle timeout.
+        """
+        with self._lock:
+            entries = [(key, pooled) for key, pooled in self._clients.items() if key[0] == "trading"]
+
+        results = {}
+        for key, pooled in entries:
+            try:
+                pooled.client.get_clock()
+                results[key] = True
+            except Exception:  # noqa: B902
+                logger.warning("Evicting unhealthy Alpaca client %s", key[:3], exc_info=True)
+                results[key] = False
+                with self._lock:
+                    if self._clients.get(key) is pooled:
+                        del self._clients[key]
+                self._close(pooled)
+        return results
+
+    def reset(self):
+        """Drop every pooled client. Call from gunicorn ``post_fork``."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for pooled in clients.values():
+            self._close(pooled)
+
+    def __len__(self):
+        return len(self._clients)
+
+
+registry = AlpacaClientRegistry()
@@ -1,15 +1,23 @@
 from uuid import UUID
 
-from alpaca.data.historical import CryptoHistoricalDataClient
 from alpaca.data.requests import CryptoBarsRequest
 from alpaca.data.timeframe import TimeFrame
-from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import AssetClass, OrderSide, QueryOrderStatus, TimeInForce
-from alpaca.trading.requests import GetAssetsRequest, GetOrdersRequest, LimitOrderRequest, MarketOrderRequest
-from django.conf import settings
+from alpaca.trading.enums import AssetStatus, OrderSide, QueryOrderStatus, TimeInForce
+from alpaca.trading.requests import (
+    CreateWatchlistRequest,
+    GetAssetsRequest,
+    GetOrdersRequest,
+    LimitOrderRequest,
+    MarketOrderRequest,
+    UpdateWatchlistRequest,
+)
 from django.core.exceptions import ValidationError
 from rest_framework import status
 
+from .alpaca_clients import registry
+from .market_data_cache import cached_market_data
+from .rate_limiter import priority
+
 
 class AlpacaIntegrationAccount:
     """Alpaca integration."""
@@ -17,10 +25,7 @@ class AlpacaIntegrationAccount:
     restricted_message = "Account is currently restricted from trading."
 
     def __init__(self):
-        self.trading_client = TradingClient(
-            settings.API_KEY_ALPACA,
-            settings.SECRET_KEY_ALPACA,
-        )
+        self.trading_client = registry.get_trading_client()
 
     def get_account_info(self):
         """Get account info."""
@@ -35,9 +40,9 @@ class AlpacaIntegrationAccount:
 
         return account
 
-    def get_view_gain_loss_portfolio(self):
-        """Get view gain loss portfolio."""
-        account = self.trading_client.get_account()
+    def get_view_gain_loss_portfolio(self, account=None):
+        """Get view gain loss portfolio, from an already fetched ``account`` if given."""
+        account = account or self.trading_client.get_account()
         if account.trading_blocked:
             raise ValidationError(
                 self.restricted_message,
@@ -50,45 +55,51 @@ class AlpacaIntegrationAccount:
 class AlpacaIntegrationDataHistorical:
     """Alpaca integration data."""
 
-    def __init__(self):
-        self.client = CryptoHistoricalDataClient()
+    def __init__(self, symbols=None):
+        self.client = registry.get_crypto_data_client()
         # TODO: update to use request_params to filter data
         self.request_params = CryptoBarsRequest(
-            symbol_or_symbols=["BTC/USD", "ETH/USD"],
+            symbol_or_symbols=list(symbols or ["BTC/USD", "ETH/USD"]),
             timeframe=TimeFrame.Day,
             start="2024-02-13",
         )
 
+    @cached_market_data("crypto_bars")
     def get_crypto_bars(self):
         """Get crypto bars."""
 
         bars = self.client.get_crypto_bars(self.request_params)
         return bars
 
+    @cached_market_data("crypto_trades")
     def get_crypto_trades(self):
         """Get crypto trades."""
 
         trades = self.client.get_crypto_trades(self.request_params)
         return trades
 
+    @cached_market_data("crypto_latest_bar")
     def get_crypto_latest_bar(self):
         """Get crypto quotes."""
 
         quotes = self.client.get_crypto_latest_bar(self.request_params)
         return quotes
 
+    @cached_market_data("crypto_latest_quote")
     def get_crypto_latest_quote(self):
         """Get crypto quotes."""
 
         quotes = self.client.get_crypto_latest_quote(self.request_params)
         return quotes
 
+    @cached_market_data("crypto_latest_trade")
     def get_crypto_latest_trade(self):
         """Get crypto quotes."""
 
         quotes = self.client.get_crypto_latest_trade(self.request_params)
         return quotes
 
+    @cached_market_data("crypto_snapshot")
     def get_crypto_snapshot(self):
         """Get crypto quotes."""
 
@@ -100,33 +111,27 @@ class AlpacaIntegrationAssets:
     """Alpaca integration assets."""
 
     def __init__(self):
-        self.trading_client = TradingClient(
-            settings.API_KEY_ALPACA,
-            settings.SECRET_KEY_ALPACA,
-        )
-
-    def get_assets(self):
-        """Get assets."""
-        # TODO: update to use request_params to search for any equities
-        # search for US equities
-        search_params = GetAssetsRequest(asset_class=AssetClass.US_EQUITY)
+        self.trading_client = registry.get_trading_client()
 
-        return search_params
+    def get_assets(self, asset_class=None, asset_status=AssetStatus.ACTIVE):
+        """Get all assets of a class (every class by default) and status."""
+        search_params = GetAssetsRequest(asset_class=asset_class, status=asset_status)
+        return self.trading_client.get_all_assets(search_params)
 
     def get_asset(self, symbol):
         """Get asset."""
         asset = self.trading_client.get_asset(symbol)
         return asset
 
-    def add_asset_to_watchlist_by_id(self, asset_id):
-        """Get asset by id."""
-        asset = self.trading_client.add_asset_to_watchlist_by_id(asset_id)
-        return asset
+    def add_asset_to_watchlist_by_id(self, watchlist_id, symbol):
+        """Add an asset to a watchlist."""
+        watchlist = self.trading_client.add_asset_to_watchlist_by_id(watchlist_id, symbol)
+        return watchlist
 
-    def remove_asset_from_watchlist_by_id(self, asset_id):
+    def remove_asset_from_watchlist_by_id(self, watchlist_id, symbol):
         """Remove asset from watchlist."""
-        asset = self.trading_client.remove_asset_from_watchlist_by_id(asset_id)
-        return asset
+        watchlist = self.trading_client.remove_asset_from_watchlist_by_id(watchlist_id, symbol)
+        return watchlist
 
     def get_watchlists(self):
         """Get watchlist."""
@@ -138,9 +143,9 @@ class AlpacaIntegrationAssets:
         watchlist = self.trading_client.get_watchlist_by_id(watchlist_id)
         return watchlist
 
-    def create_watchlist(self, name):
+    def create_watchlist(self, name, symbols=()):
         """Create watchlist."""
-        watchlist = self.trading_client.create_watchlist(name)
+        watchlist = self.trading_client.create_watchlist(CreateWatchlistRequest(name=name, symbols=list(symbols)))
         return watchlist
 
     def delete_watchlist_by_id(self, watchlist_id):
@@ -148,31 +153,63 @@ class AlpacaIntegrationAssets:
         watchlist = self.trading_client.delete_watchlist_by_id(watchlist_id)
         return watchlist
 
-    def update_watchlist_by_id(self, watchlist_id, name):
-        """Update watchlist by id."""
-        watchlist = self.trading_client.update_watchlist_by_id(watchlist_id, name)
+    def update_watchlist_by_id(self, watchlist_id, name=None, symbols=None):
+        """Replace the name and/or the symbols of a watchlist."""
+        watchlist = self.trading_client.update_watchlist_by_id(
+            watchlist_id, UpdateWatchlistRequest(name=name, symbols=symbols)
+        )
         return watchlist
 
 
+def closed_orders_request():
+    """Filter used to list orders."""
+    # TODO: update to use request_params to filter orders
+    return GetOrdersRequest(
+        status=QueryOrderStatus.CLOSED,
+        limit=100,
+        nested=True,  # show nested multi-leg orders
+    )
+
+
+def market_order_request(request_data):
+    """Build a market order from the order payload."""
+    return MarketOrderRequest(
+        symbol=str(request_data["symbol"]).upper(),
+        qty=request_data.get("qty"),
+        notional=request_data.get("notional"),
+        side=request_data["side"],
+        time_in_force=request_data["time_in_force"],
+        client_order_id=request_data.get("client_order_id"),
+    )
+
+
+def limit_order_request(request_data):
+    """Build a limit order from the order payload."""
+    return LimitOrderRequest(
+        symbol=str(request_data["symbol"]).upper(),
+        limit_price=request_data["limit_price"],
+        qty=request_data.get("qty"),
+        notional=request_data.get("notional"),
+        side=request_data["side"],
+        time_in_force=request_data["time_in_force"],
+        client_order_id=request_data.get("client_order_id"),
+    )
+
+
+def short_sale_request():
+    """Build the short sale market order."""
+    return MarketOrderRequest(symbol="SPY", qty=1, side=OrderSide.SELL, time_in_force=TimeInForce.GTC)
+
+
 class AlpacaIntegrationOrders:
     """Alpaca integration orders."""
 
     def __init__(self):
-        self.trading_client = TradingClient(
-            settings.API_KEY_ALPACA,
-            settings.SECRET_KEY_ALPACA,
-            paper=True,  # use paper trading environment
-        )
+        self.trading_client = registry.get_trading_client(paper=True)  # use paper trading environment
 
     def get_orders(self):
         """Get orders."""
-        # TODO: update to use request_params to filter orders
-        get_orders_data = GetOrdersRequest(
-            status=QueryOrderStatus.CLOSED,
-            limit=100,
-            nested=True,  # show nested multi-leg orders
-        )
-        orders = self.trading_client.get_orders(filter=get_orders_data)
+        orders = self.trading_client.get_orders(filter=closed_orders_request())
         return orders
 
     def get_order(self, order_id: UUID):
@@ -180,59 +217,45 @@ class AlpacaIntegrationOrders:
         order = self.trading_client.get_order_by_id(order_id)
         return order
 
+    @priority("orders")
     def place_order(
         self,
         request_data,
     ):
         """Place order."""
-        # preparing market order
-        market_order_data = MarketOrderRequest(
-            symbol=str(request_data["symbol"]).upper(),
-            qty=float(request_data["qty"]),
-            side=request_data["side"],
-            time_in_force=request_data["time_in_force"],
-        )
-
         # Market order
-        market_order = self.trading_client.submit_order(order_data=market_order_data)  # noqa
+        market_order = self.trading_client.submit_order(order_data=market_order_request(request_data))  # noqa
 
         return market_order
 
+    @priority("orders")
     def place_limit_order_data(
         self,
         request_data,
     ):
         """Place limit order."""
-        # preparing limit order
-        limit_order_data = LimitOrderRequest(
-            symbol=str(request_data["symbol"]).upper(),
-            limit_price=request_data["limit_price"],
-            notional=request_data["notional"],
-            side=request_data["side"],
-            time_in_force=request_data["time_in_force"],
-        )
-
         # Limit order
-        limit_order = self.trading_client.submit_order(order_data=limit_order_data)
+        limit_order = self.trading_client.submit_order(order_data=limit_order_request(request_data))
 
         return limit_order
 
+    @priority("orders")
     def cancel_order(self, order_id: UUID):
         """Cancel order."""
         order = self.trading_client.cancel_order_by_id(order_id)
         return order
 
+    @priority("orders")
     def cancel_all_orders(self):
         """Cancel all orders."""
         orders = self.trading_client.cancel_orders()
         return orders
 
+    @priority("orders")
     def submit_shortsale(self):
         """Submit short sale."""
-        market_order_data = MarketOrderRequest(symbol="SPY", qty=1, side=OrderSide.SELL, time_in_force=TimeInForce.GTC)
-
         # Market order
-        market_order = self.trading_client.submit_order(order_data=market_order_data)
+        market_order = self.trading_client.submit_order(order_data=short_sale_request())
 
         return market_order
 
@@ -241,10 +264,7 @@ class AlpacaIntegrationPositions:
     """Alpaca integration positions."""
 
     def __init__(self):
-        self.trading_client = TradingClient(
-            settings.API_KEY_ALPACA,
-            settings.SECRET_KEY_ALPACA,
-        )
+        self.trading_client = registry.get_trading_client()
 
     def get_positions(self):
         """Get positions."""
@@ -254,11 +274,13 @@ class AlpacaIntegrationPositions:
         #     print("{} shares of {}".format(position.qty, position.symbol))
         return positions
 
+    @priority("orders")
     def close_position(self, symbol):
         """Close position."""
         position = self.trading_client.close_position(symbol)
         return position
 
+    @priority("orders")
     def close_all_positions(self):
         """Close all positions."""
         positions = self.trading_client.close_all_positions()
@@ -0,0 +1,260 @@
+"""
+Catalog of the broker's assets.
+
+``sync_assets`` copies the broker's asset list into ``Asset``; it changes a few times a day at most, so a periodic
+sync is enough. Every worker keeps an ``AssetIndex`` of the active assets in memory: symbol lookups are dictionary
+reads and autocomplete is a binary search over sorted keys, with a trigram index as the fuzzy fallback. Workers
+check the catalog for changes every ``ALPACA_ASSET_INDEX_CHECK_SECONDS``, build a new index next to the current one
+and then swap the module reference, so readers never wait for a rebuild.
+"""
+
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from ..models import Asset
+from .alpaca_integration import AlpacaIntegrationAssets
+from .rate_limiter import priority
+
+logger = logging.getLogger(__name__)
+
+ASSET_FIELDS = [
+    "symbol",
+    "name",
+    "asset_class",
+    "exchange",
+    "status",
+    "tradable",
+    "marginable",
+    "shortable",
+    "easy_to_borrow",
+    "fractionable",
+    "min_order_size",
+    "min_trade_increment",
+    "price_increment",
+]
+# What the index keeps of an asset, and what searches return.
+INDEX_FIELDS = ["id"] + [name for name in ASSET_FIELDS if name != "status"]
+
+# Share of the query's trigrams an asset must contain to be a fuzzy match.
+FUZZY_CUTOFF = 0.4
+
+
+def asset_fields(asset):
+    """Map an alpaca-py ``Asset`` to ``Asset`` field values."""
+    fields = {}
+    for name in ASSET_FIELDS:
+        value = getattr(asset, name)
+        # Enums are stored by value; increments arrive as strings or floats.
+        value = getattr(value, "value", value)
+        if name in ("min_order_size", "min_trade_increment", "price_increment"):
+            value = float(value) if value is not None else None
+        fields[name] = value
+    fields["name"] = fields["name"] or ""
+    return fields
+
+
+@priority("background")
+def sync_assets(integration=None):
+    """Store the broker's active assets and mark the ones it no longer lists inactive.
+
+    Returns ``(assets stored, assets deactivated)``.
+    """
+    assets = (integration or AlpacaIntegrationAssets()).get_assets()
+    rows = [Asset(id=asset.id, **asset_fields(asset)) for asset in assets]
+    ids = [row.id for row in rows]
+    with transaction.atomic():
+        # A relisted symbol gets a new asset id; drop the old row so the symbol stays unique.
+        Asset.objects.filter(symbol__in=[row.symbol for row in rows]).exclude(id__in=ids).delete()
+        Asset.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=ASSET_FIELDS + ["updated_at"],
+        )
+        deactivated = (
+            Asset.objects.filter(status="active")
+            .exclude(id__in=ids)
+            .update(status="inactive", tradable=False, updated_at=timezone.now())
+        )
+    reset_asset_index()
+    logger.info("Synced %s assets, deactivated %s", len(rows), deactivated)
+    return len(rows), deactivated
+
+
+def _words(text):
+    return re.sub(r"[^0-9a-z ]+", "", text.casefold()).split()
+
+
+def _symbol_key(symbol):
+    """``"BTC/USD"``, ``"btcusd"`` and ``"BTC-USD"`` all look up the same symbol."""
+    return re.sub(r"[^0-9A-Z]+", "", symbol.upper())
+
+
+def _trigrams(words):
+    padded = [f" {word} " for word in words]
+    return {"".join(chars) for text in padded for chars in zip(text, text[1:], text[2:])}
+
+
+class AssetIndex:
+    """Immutable search structure over a list of assets (dicts of ``INDEX_FIELDS``).
+
+    Symbol keys and name words are kept in sorted tuples pointing back at the assets, so every prefix is a
+    contiguous range found with ``bisect``. Fuzzy search counts the trigrams a query shares with each asset's symbol
+    and name words, through an inverted index from trigram to assets.
+    """
+
+    def __init__(self, assets):
+        self.assets = tuple(sorted(assets, key=lambda asset: asset["symbol"]))
+        self._by_symbol = {}
+        symbol_keys, word_keys, postings = [], set(), defaultdict(list)
+        for position, asset in enumerate(self.assets):
+            key = _symbol_key(asset["symbol"])
+            self._by_symbol[asset["symbol"]] = position
+            self._by_symbol.setdefault(key, position)
+            symbol_keys.append((key, position))
+            words = _words(asset["name"])
+            # The whole name too, so "apple inc" matches as typed.
+            word_keys.update((word, position) for word in words + [" ".join(words)])
+            for trigram in _trigrams([key.lower()] + words):
+                postings[trigram].append(position)
+        symbol_keys.sort()
+        word_keys = sorted(word_keys)
+        self._symbol_keys = tuple(key for key, _ in symbol_keys)
+        self._symbol_positions = tuple(position for _, position in symbol_keys)
+        self._word_keys = tuple(key for key, _ in word_keys)
+        self._word_positions = tuple(position for _, position in word_keys)
+        self._trigrams = {trigram: tuple(positions) for trigram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, symbol):
+        """The asset with this symbol, spelled with or without separators, or ``None``."""
+        position = self._by_symbol.get(symbol)
+        if position is None:
+            position = self._by_symbol.get(_symbol_key(symbol))
+        return self.assets[position] if position is not None else None
+
+    def search(self, query="", limit=20, asset_class=None, exchange=None, tradable=None, fuzzy=True):
+        """Up to ``limit`` assets matching ``query`` and the filters, best first.
+
+        Symbols starting with the query come first (an exact symbol first of all), then names with a word starting
+        with it, then, if ``fuzzy`` and there is still room, assets whose symbol or name is close to it.
+        """
+
+        def accept(asset):
+            return (
+                (asset_class is None or asset["asset_class"] == asset_class)
+                and (exchange is None or asset["exchange"] == exchange)
+                and (tradable is None or asset["tradable"] == tradable)
+            )
+
+        results, seen = [], set()
+
+        def collect(positions):
+            for position in positions:
+                if len(results) >= limit:
+                    return
+                if position not in seen and accept(self.assets[position]):
+                    seen.add(position)
+                    results.append(self.assets[position])
+
+        if not query.strip():
+            collect(range(len(self.assets)))
+            return results
+        symbol, words = _symbol_key(query), _words(query)
+        if symbol:
+            collect(self._prefix(self._symbol_keys, self._symbol_positions, symbol))
+        if words:
+            collect(self._prefix(self._word_keys, self._word_positions, " ".join(words)))
+        if fuzzy and words and len(results) < limit:
+            collect(self._fuzzy(words))
+        return results
+
+    @staticmethod
+    def _prefix(keys, positions, prefix):
+        start = bisect_left(keys, prefix)
+        for index in range(start, len(keys)):
+            if not keys[index].startswith(prefix):
+                return
+            yield positions[index]
+
+    def _fuzzy(self, words):
+        query = _trigrams(words)
+        shared = Counter()
+        for trigram in query:
+            shared.update(self._trigrams.get(trigram, ()))
+        matches = [
+            (-count, len(self.assets[position]["symbol"]), position)
+            for position, count in shared.items()
+            if count >= FUZZY_CUTOFF * len(query)
+        ]
+        return [position for _, _, position in sorted(matches)]
+
+    @classmethod
+    def from_db(cls):
+        """Index of the active assets in the catalog."""
+        return cls(Asset.objects.filter(status="active").values(*INDEX_FIELDS).iterator(chunk_size=5000))
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def _catalog_version():
+    return tuple(Asset.objects.aggregate(count=Count("id"), updated=Max("updated_at")).values())
+
+
+def get_asset_index():
+    """This process's ``AssetIndex``, rebuilt when the catalog changed since the last check.
+
+    Only the first call waits for a build; afterwards one caller checks for changes while the others keep reading
+    the current index.
+    """
+    global _index, _index_version, _checked_at
+    index = _index
+    if index is not None and time.monotonic() < _checked_at + settings.ALPACA_ASSET_INDEX_CHECK_SECONDS:
+        return index
+    if not _build_lock.acquire(blocking=index is None):
+        return index
+    try:
+        version = _catalog_version()
+        if _index is None or version != _index_version:
+            _index, _index_version = AssetIndex.from_db(), version
+            logger.info("Indexed %s assets", len(_index))
+        _checked_at = time.monotonic()
+        return _index
+    finally:
+        _build_lock.release()
+
+
+def reset_asset_index():
+    """Make the next ``get_asset_index`` call of this process check the catalog right away."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def get_asset(symbol):
+    """The indexed asset with this symbol; unknown symbols are looked up at the broker and stored."""
+    asset = get_asset_index().get(symbol)
+    if asset is not None:
+        return asset
+    stored = Asset.objects.filter(symbol=symbol).values(*INDEX_FIELDS).first()
+    if stored is not None:
+        return stored
+    asset = AlpacaIntegrationAssets().get_asset(symbol)
+    fields = asset_fields(asset)
+    Asset.objects.update_or_create(id=asset.id, defaults=fields)
+    return {"id": asset.id, **{name: fields[name] for name in INDEX_FIELDS if name != "id"}}
@@ -0,0 +1,205 @@
+"""
+Local store of historical bars.
+
+Bars are read from Postgres. Only the parts of the requested window that are not covered yet are fetched from
+Alpaca and upserted in bulk, so the cost of a request depends on the window asked for, not on total history.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from alpaca.data.requests import CryptoBarsRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import HistoricalBar, HistoricalBarCoverage
+from .alpaca_clients import registry
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAMES = {
+    "1Min": (TimeFrame(1, TimeFrameUnit.Minute), timedelta(minutes=1)),
+    "5Min": (TimeFrame(5, TimeFrameUnit.Minute), timedelta(minutes=5)),
+    "15Min": (TimeFrame(15, TimeFrameUnit.Minute), timedelta(minutes=15)),
+    "1Hour": (TimeFrame(1, TimeFrameUnit.Hour), timedelta(hours=1)),
+    "1Day": (TimeFrame(1, TimeFrameUnit.Day), timedelta(days=1)),
+    "1Week": (TimeFrame(1, TimeFrameUnit.Week), timedelta(weeks=1)),
+}
+
+BAR_FIELDS = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+BAR_COLUMNS = ["symbol", "timestamp", *BAR_FIELDS]
+
+
+def missing_ranges(covered, start, end):
+    """Return the sub-ranges of [start, end) not contained in ``covered``.
+
+    ``covered`` is an iterable of (start, end) ranges sorted by start; they may overlap.
+    """
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching (start, end) ranges."""
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+def bars_to_columns(rows, symbols):
+    """Group ``BAR_COLUMNS`` rows into per-symbol NumPy columns.
+
+    Timestamps become int64 epoch milliseconds; missing ``trade_count``/``vwap`` values become NaN.
+    """
+    grouped = {symbol: [] for symbol in symbols}
+    for row in rows:
+        grouped[row[0]].append(row)
+
+    result = {}
+    for symbol, symbol_rows in grouped.items():
+        columns = list(zip(*symbol_rows)) or [()] * len(BAR_COLUMNS)
+        result[symbol] = {
+            "timestamp": np.array([round(timestamp.timestamp() * 1000) for timestamp in columns[1]], dtype=np.int64),
+            **{field: np.array(values, dtype=np.float64) for field, values in zip(BAR_FIELDS, columns[2:])},
+        }
+    return result
+
+
+class BarStore:
+    """Serve crypto bars from Postgres, filling gaps from Alpaca."""
+
+    def __init__(self, client=None):
+        self.client = client or registry.get_crypto_data_client()
+
+    def get_bars(self, symbols, timeframe, start, end=None):
+        """Return a queryset of the stored bars in [start, end), fetching missing ranges first."""
+        end = min(end or timezone.now(), timezone.now())
+        self.fill(symbols, timeframe, start, end)
+        return HistoricalBar.objects.filter(
+            symbol__in=symbols,
+            timeframe=timeframe,
+            timestamp__gte=start,
+            timestamp__lt=end,
+        )
+
+    def iter_bars(self, symbols, timeframe, start, end=None, after=None, fields=BAR_COLUMNS):
+        """Yield stored bars of [start, end) as tuples of ``fields``, ordered by (timestamp, symbol).
+
+        The window is filled and read in slices of ``ALPACA_BAR_FETCH_CHUNK`` bars, so the first rows are
+        available before the whole window has been fetched and memory stays bounded. ``after`` is a
+        (timestamp, symbol) position to resume from.
+        """
+        end = min(end or timezone.now(), timezone.now())
+        _, duration = TIMEFRAMES[timeframe]
+        position = max(start, after[0]) if after else start
+        for window_start, window_end in self._chunks(position, end, duration):
+            self.fill(symbols, timeframe, window_start, window_end)
+            bars = HistoricalBar.objects.filter(
+                symbol__in=symbols,
+                timeframe=timeframe,
+                timestamp__gte=window_start,
+                timestamp__lt=window_end,
+            )
+            if after:
+                bars = bars.filter(Q(timestamp__gt=after[0]) | Q(timestamp=after[0], symbol__gt=after[1]))
+            yield from bars.order_by("timestamp", "symbol").values_list(*fields).iterator(chunk_size=2000)
+
+    def fill(self, symbols, timeframe, start, end):
+        """Fetch and store every bar of [start, end) that is not covered yet."""
+        _, duration = TIMEFRAMES[timeframe]
+        # The latest bar is still forming, so never mark it as covered.
+        settled_end = timezone.now() - duration
+
+        symbols_by_gap = defaultdict(list)
+        for symbol in symbols:
+            covered = HistoricalBarCoverage.objects.filter(
+                symbol=symbol,
+                timeframe=timeframe,
+                end__gt=start,
+                start__lt=end,
+            ).order_by("start")
+            for gap in missing_ranges(covered.values_list("start", "end"), start, end):
+                symbols_by_gap[gap].append(symbol)
+
+        # Symbols missing the same range (usually the recent tail) share one upstream request.
+        for (gap_start, gap_end), gap_symbols in symbols_by_gap.items():
+            for chunk_start, chunk_end in self._chunks(gap_start, gap_end, duration):
+                self._fetch(gap_symbols, timeframe, chunk_start, chunk_end)
+            if gap_start < settled_end:
+                self._mark_covered(gap_symbols, timeframe, gap_start, min(gap_end, settled_end))
+
+    @staticmethod
+    def _chunks(start, end, duration):
+        """Split a range so a single upstream request never returns more than ``ALPACA_BAR_FETCH_CHUNK`` bars."""
+        step = duration * settings.ALPACA_BAR_FETCH_CHUNK
+        while start < end:
+            yield start, min(start + step, end)
+            start += step
+
+    def _fetch(self, symbols, timeframe, start, end):
+        request_params = CryptoBarsRequest(
+            symbol_or_symbols=symbols,
+            timeframe=TIMEFRAMES[timeframe][0],
+            start=start,
+            end=end,
+        )
+        bar_set = self.client.get_crypto_bars(request_params)
+        bars = [
+            HistoricalBar(
+                symbol=bar.symbol,
+                timeframe=timeframe,
+                timestamp=bar.timestamp,
+                **{field: getattr(bar, field) for field in BAR_FIELDS},
+            )
+            for symbol_bars in bar_set.data.values()
+            for bar in symbol_bars
+            # Alpaca treats ``end`` as inclusive; the store works with half-open ranges.
+            if bar.timestamp < end
+        ]
+        HistoricalBar.objects.bulk_create(
+            bars,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["symbol", "timeframe", "timestamp"],
+            update_fields=BAR_FIELDS,
+        )
+        logger.debug("Stored %s %s bars for %s between %s and %s", len(bars), timeframe, symbols, start, end)
+
+    @staticmethod
+    @transaction.atomic
+    def _mark_covered(symbols, timeframe, start, end):
+        for symbol in symbols:
+            overlapping = HistoricalBarCoverage.objects.select_for_update().filter(
+                symbol=symbol,
+                timeframe=timeframe,
+                end__gte=start,
+                start__lte=end,
+            )
+            ranges = merge_ranges([(start, end), *overlapping.values_list("start", "end")])
+            overlapping.delete()
+            HistoricalBarCoverage.objects.bulk_create(
+                HistoricalBarCoverage(symbol=symbol, timeframe=timeframe, start=range_start, end=range_end)
+                for range_start, range_end in ranges
+            )
@@ -0,0 +1,178 @@
+"""
+Circuit breakers in front of the broker.
+
+When Alpaca slows down or fails, every call waiting on it holds a worker until it times out. Each class of broker
+endpoints (orders, account, assets, watchlists, other trading calls, market data) of each account has a
+``CircuitBreaker`` that watches the outcome and latency of its last calls. Once too many of them failed or were
+slow, it opens: calls fail at once with ``CircuitOpen`` instead of joining the queue, and reads are answered from
+the last value the caches hold (``market_data_cache``). After ``ALPACA_BREAKER_OPEN_SECONDS`` it lets a probe
+through (half-open); a fast success closes it again, anything else keeps it open for another period.
+
+Breakers live in process memory: every worker finds out about an outage from its own calls, without a shared
+store on the failure path.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from alpaca.common.exceptions import APIError
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Broker path prefixes (after the version) and the endpoint class they belong to; other trading paths are "trading".
+ENDPOINT_CLASSES = {
+    "orders": "orders",
+    "positions": "account",
+    "account": "account",
+    "assets": "assets",
+    "watchlists": "watchlists",
+}
+
+
+class CircuitOpen(APIError):
+    """A broker call was refused because the breaker of its endpoint class is open."""
+
+    def __init__(self, endpoint, retry_after):
+        message = f"The broker's {endpoint} endpoints are unavailable, retry in {retry_after:.0f}s."
+        super().__init__(json.dumps({"message": message}))
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self):
+        return 503
+
+
+def endpoint_class(api, path):
+    """The endpoint class of a request to ``api`` (``trading`` or ``data``) for ``path``, e.g. ``/v2/orders``."""
+    if api == "data":
+        return "market_data"
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    resource = parts[1] if len(parts) > 1 and parts[0][:1] == "v" else parts[0]
+    return ENDPOINT_CLASSES.get(resource.split(":", 1)[0], "trading")
+
+
+def is_unavailable(error):
+    """Whether ``error`` means the broker could not answer (down, slow, overloaded), rather than refused a call."""
+    if isinstance(error, requests.RequestException):
+        return True
+    if isinstance(error, APIError):
+        return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a window of the last ``ALPACA_BREAKER_WINDOW`` calls.
+
+    It opens once at least ``ALPACA_BREAKER_MIN_CALLS`` calls are in the window and the share of failed calls
+    reaches ``ALPACA_BREAKER_ERROR_RATE`` or the share of calls slower than ``ALPACA_BREAKER_SLOW_SECONDS`` reaches
+    ``ALPACA_BREAKER_SLOW_RATE``. Callers ``allow`` a call, then ``record`` its outcome, or ``release`` it if it never
+    reached the broker.
+    """
+
+    def __init__(self, name, endpoint=None):
+        self.name = name
+        self.endpoint = endpoint or name
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=settings.ALPACA_BREAKER_WINDOW)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.counts = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0, "hedged": 0, "hedge_wins": 0}
+
+    def allow(self):
+        """Admit a call or raise ``CircuitOpen``; in half-open state only ``ALPACA_BREAKER_PROBES`` at a time."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_after = self._opened_at + settings.ALPACA_BREAKER_OPEN_SECONDS - time.monotonic()
+                if retry_after > 0:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpen(self.endpoint, retry_after)
+                self.state, self._probes = HALF_OPEN, 0
+                logger.info("Circuit %s half-open, probing the broker", self.name)
+            if self.state == HALF_OPEN:
+                if self._probes >= settings.ALPACA_BREAKER_PROBES:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpen(self.endpoint, settings.ALPACA_BREAKER_OPEN_SECONDS)
+                self._probes += 1
+
+    def release(self):
+        """An admitted call did not reach the broker after all."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes -= 1
+
+    def record(self, ok, elapsed):
+        """Count the outcome of an admitted call that took ``elapsed`` seconds."""
+        slow = elapsed >= settings.ALPACA_BREAKER_SLOW_SECONDS
+        with self._lock:
+            self.counts["calls"] += 1
+            self.counts["failures"] += not ok
+            self.counts["slow"] += slow
+            if self.state == HALF_OPEN:
+                self._probes -= 1
+                if ok and not slow:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    logger.warning("Circuit %s closed, the broker recovered", self.name)
+                else:
+                    self._open()
+                return
+            if self.state == OPEN:
+                # A call admitted before the breaker opened.
+                return
+            self._outcomes.append((ok, slow))
+            if len(self._outcomes) < settings.ALPACA_BREAKER_MIN_CALLS:
+                return
+            failures = sum(not ok for ok, _ in self._outcomes) / len(self._outcomes)
+            slow_calls = sum(slow for _, slow in self._outcomes) / len(self._outcomes)
+            if failures >= settings.ALPACA_BREAKER_ERROR_RATE or slow_calls >= settings.ALPACA_BREAKER_SLOW_RATE:
+                self._open()
+
+    def count(self, event):
+        with self._lock:
+            self.counts[event] += 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.counts["opened"] += 1
+        logger.warning("Circuit %s open for %ss", self.name, settings.ALPACA_BREAKER_OPEN_SECONDS)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, **self.counts}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(api, key, path):
+    """The breaker of the endpoint class of ``path`` on ``api`` for the account ``key``."""
+    endpoint = endpoint_class(api, path)
+    name = f"{api}:{endpoint}:{key}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name, endpoint))
+    return breaker
+
+
+def stats():
+    """State and counters of this process's breakers."""
+    return {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+
+
+def reset_breakers():
+    """Forget every breaker, e.g. after fork or between tests."""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,152 @@
+"""
+Vectorized technical indicators.
+
+Every kernel is a pure function over NumPy float arrays and returns arrays of the same length as its input,
+with NaN where the indicator is not defined yet (the warm-up period).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest exponent used when rescaling inside ``_exponential_filter``; e**300 keeps every term far from overflow.
+_MAX_EXPONENT = 300.0
+
+
+def _as_float_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _exponential_filter(values, alpha, initial):
+    """Compute ``y[i] = (1 - alpha) * y[i - 1] + alpha * values[i]`` with ``y[-1] = initial`` without a Python loop.
+
+    Unrolled, ``y[i] = decay**(i + 1) * (initial + alpha * sum(values[j] / decay**(j + 1) for j <= i))``, which
+    is a cumulative sum. The series is processed in blocks short enough for ``decay**-block`` not to overflow.
+    """
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return values.copy()
+
+    out = np.empty_like(values)
+    block = max(1, int(_MAX_EXPONENT / -np.log(decay)))
+    carry = initial
+    for start in range(0, len(values), block):
+        stop = min(start + block, len(values))
+        powers = decay ** np.arange(1, stop - start + 1)
+        out[start:stop] = powers * (carry + alpha * np.cumsum(values[start:stop] / powers))
+        carry = out[stop - 1]
+    return out
+
+
+def _rolling_sum(values, period):
+    """Sum of every window of ``period`` values, aligned to the window end."""
+    out = np.full(len(values), np.nan)
+    first = period - 1
+    if period <= len(values):
+        # Centering keeps the running sum small, which bounds the cancellation error of the differences.
+        centered = np.cumsum(np.concatenate(([0.0], values - values.mean())))
+        out[first:] = centered[period:] - centered[:-period] + period * values.mean()
+    return out
+
+
+def sma(values, period):
+    """Simple moving average."""
+    values = _as_float_array(values)
+    return _rolling_sum(values, period) / period
+
+
+def ema(values, period):
+    """Exponential moving average with ``alpha = 2 / (period + 1)``, seeded with the SMA of the first window."""
+    values = _as_float_array(values)
+    out = np.full(len(values), np.nan)
+    if period > len(values):
+        return out
+    seed = values[:period].mean()
+    out[period - 1] = seed
+    out[period:] = _exponential_filter(values[period:], 2.0 / (period + 1), seed)
+    return out
+
+
+def rsi(values, period=14):
+    """Relative strength index with Wilder's smoothing."""
+    values = _as_float_array(values)
+    out = np.full(len(values), np.nan)
+    if period >= len(values):
+        return out
+
+    deltas = np.diff(values)
+    gains = np.clip(deltas, 0.0, None)
+    losses = np.clip(-deltas, 0.0, None)
+    alpha = 1.0 / period
+    average_gain = np.concatenate(
+        ([gains[:period].mean()], _exponential_filter(gains[period:], alpha, gains[:period].mean()))
+    )
+    average_loss = np.concatenate(
+        ([losses[:period].mean()], _exponential_filter(losses[period:], alpha, losses[:period].mean()))
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_strength = average_gain / average_loss
+        out[period:] = np.where(average_loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + relative_strength))
+    return out
+
+
+def vwap(high, low, close, volume, period=None):
+    """Volume weighted average of the typical price, cumulative or over a rolling window of ``period`` bars."""
+    typical_price = (_as_float_array(high) + _as_float_array(low) + _as_float_array(close)) / 3.0
+    volume = _as_float_array(volume)
+    if period is None:
+        weighted, total = np.cumsum(typical_price * volume), np.cumsum(volume)
+    else:
+        weighted, total = _rolling_sum(typical_price * volume, period), _rolling_sum(volume, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0.0, weighted / total, np.nan)
+
+
+def bollinger(values, period=20, num_std=2.0):
+    """Bollinger bands; returns ``(middle, upper, lower)``."""
+    values = _as_float_array(values)
+    middle = sma(values, period)
+    deviation = np.full(len(values), np.nan)
+    first = period - 1
+    if period <= len(values):
+        deviation[first:] = sliding_window_view(values, period).std(axis=1)
+    return middle, middle + num_std * deviation, middle - num_std * deviation
+
+
+class Indicator:
+    """Binds a kernel to bar columns for the indicators endpoint."""
+
+    def __init__(self, kernel, defaults=(), warmup_periods=1):
+        self.kernel = kernel
+        self.defaults = defaults
+        # Exponential kernels depend on every previous bar; a few periods of warm-up make the seed negligible.
+        self.warmup_periods = warmup_periods
+
+    def warmup(self, params):
+        """Number of bars needed before the first meaningful value."""
+        return int(params[0]) * self.warmup_periods if params else 0
+
+    def compute(self, name, params, columns):
+        """Return a mapping of output name to array, e.g. ``{"sma_20": ...}``."""
+        label = "_".join([name, *(f"{param:g}" for param in params)])
+        result = self.kernel(columns, *params)
+        if isinstance(result, dict):
+            return {f"{label}_{part}": values for part, values in result.items()}
+        return {label: result}
+
+
+def _vwap_columns(columns, period=None):
+    return vwap(columns["high"], columns["low"], columns["close"], columns["volume"], period)
+
+
+def _bollinger_columns(columns, period=20, num_std=2.0):
+    middle, upper, lower = bollinger(columns["close"], period, num_std)
+    return {"middle": middle, "upper": upper, "lower": lower}
+
+
+INDICATORS = {
+    "sma": Indicator(lambda columns, period: sma(columns["close"], period), defaults=(20,)),
+    "ema": Indicator(lambda columns, period: ema(columns["close"], period), defaults=(20,), warmup_periods=3),
+    "rsi": Indicator(lambda columns, period: rsi(columns["close"], period), defaults=(14,), warmup_periods=3),
+    "vwap": Indicator(_vwap_columns),
+    "bollinger": Indicator(_bollinger_columns, defaults=(20, 2)),
+}
@@ -0,0 +1,249 @@
+"""
+Local stand-ins for the Alpaca REST API and trade update stream, used by benchmarks and tests.
+
+The REST stub speaks HTTP/1.1 with keep-alive so connection reuse behaves like it does against the real broker.
+"""
+
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLOCK_RESPONSE = {
+    "timestamp": "2024-02-13T10:00:00-05:00",
+    "is_open": True,
+    "next_open": "2024-02-14T09:30:00-05:00",
+    "next_close": "2024-02-13T16:00:00-05:00",
+}
+
+ORDER_RESPONSE = {
+    "id": "61e69015-8549-4bfd-b9c3-01e75843f47d",
+    "client_order_id": "eb9e2aaa-f71a-4f51-b5b4-52a6c565dad4",
+    "created_at": "2024-02-13T15:00:00.000000Z",
+    "updated_at": "2024-02-13T15:00:00.000000Z",
+    "submitted_at": "2024-02-13T15:00:00.000000Z",
+    "filled_at": None,
+    "asset_id": "276e2673-764b-4ab6-a611-caf665ca6340",
+    "symbol": "BTC/USD",
+    "asset_class": "crypto",
+    "qty": "1",
+    "filled_qty": "0",
+    "order_class": "simple",
+    "order_type": "market",
+    "type": "market",
+    "side": "buy",
+    "time_in_force": "gtc",
+    "status": "accepted",
+    "extended_hours": False,
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Avoid Nagle/delayed-ACK stalls between the header and body writes on reused connections.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002
+        """Keep benchmark and test output quiet."""
+
+    def _respond(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests.append((self.command, self.path))
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        slow, error = stub.faults()
+        if slow:
+            time.sleep(stub.slow_latency)
+        if stub.over_rate_limit():
+            status, payload = 429, {"code": 42910000, "message": "rate limit exceeded"}
+        elif error:
+            status, payload = stub.error_status, {"code": 50010000, "message": "injected fault"}
+        else:
+            status, payload = stub.route(self.command, self.path.split("?", 1)[0], body)
+        with stub.lock:
+            stub.in_flight -= 1
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond  # noqa: N815
+    do_POST = _respond  # noqa: N815
+    do_DELETE = _respond  # noqa: N815
+    do_PATCH = _respond  # noqa: N815
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once.
+    request_queue_size = 1024
+
+    def __init__(self, address, stub):
+        self.stub = stub
+        self.connections = 0
+        super().__init__(address, _StubHandler)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or hedge a request drop their connection before the answer is written.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def process_request(self, request, client_address):
+        with self.stub.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class LocalAlpacaStub:
+    """Serve canned Alpaca responses on ``127.0.0.1``.
+
+    ``routes`` maps ``(method, path)`` to a JSON payload or a ``(status, payload)`` tuple. Paths are matched
+    without the API version prefix, e.g. ``("GET", "/clock")``. A callable route is called with the decoded JSON
+    request body and returns either form. ``latency`` seconds are added to every response to imitate a slow broker.
+    Beyond ``rate_limit`` requests in any second, requests are answered with ``429`` like the broker does.
+
+    Faults can be injected to test how callers cope with a failing broker: a share ``error_rate`` of the requests
+    is answered with ``error_status``, and a share ``slow_rate`` takes ``slow_latency`` more seconds. Both can be
+    changed while the stub runs.
+    """
+
+    def __init__(
+        self,
+        routes=None,
+        latency=0.0,
+        rate_limit=None,
+        error_rate=0.0,
+        error_status=503,
+        slow_rate=0.0,
+        slow_latency=1.0,
+        seed=None,
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self.throttled = 0
+        self._recent = deque()
+        self.routes = {("GET", "/clock"): CLOCK_RESPONSE}
+        self.routes.update(routes or {})
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        # Highest number of requests the stub was answering at the same time.
+        self.max_in_flight = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def connections(self):
+        """Number of TCP connections accepted so far."""
+        return self._server.connections
+
+    def faults(self):
+        """Draw the faults of a request: ``(slow, error)``."""
+        with self.lock:
+            return self._random.random() < self.slow_rate, self._random.random() < self.error_rate
+
+    def over_rate_limit(self):
+        """Count a request against ``rate_limit``; return whether it must be answered with 429."""
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.throttled += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def route(self, method, path, body=None):
+        """Return ``(status, payload)`` for a request."""
+        # Strip the "/v2" style version prefix the Alpaca clients put in front of every path.
+        parts = path.split("/", 2)
+        if len(parts) == 3 and parts[1][:1] == "v":
+            path = "/" + parts[2]
+        response = self.routes.get((method, path))
+        if response is None:
+            return 404, {"code": 40410000, "message": "not found"}
+        if callable(response):
+            response = response(body)
+        if isinstance(response, tuple):
+            return response
+        return 200, response
+
+    def start(self):
+        self._server = _StubServer(("127.0.0.1", 0), self)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def trade_update_message(event, order, timestamp=None, **fields):
+    """Build a ``trade_updates`` stream message for an order payload like ``ORDER_RESPONSE``."""
+    return {
+        "stream": "trade_updates",
+        "data": {"event": event, "order": order, "timestamp": timestamp or order["updated_at"], **fields},
+    }
+
+
+class LocalTradeStream:
+    """Replay recorded trade update messages through the interface of a raw-data ``TradingStream``.
+
+    ``messages`` are decoded stream messages (``{"stream": "trade_updates", "data": {...}}``), e.g. the lines
+    ``sync_trade_updates --record`` wrote.
+    """
+
+    def __init__(self, messages, delay=0.0):
+        self.messages = messages
+        self.delay = delay
+        self._handler = None
+
+    def subscribe_trade_updates(self, handler):
+        self._handler = handler
+
+    async def _run_forever(self):
+        for message in self.messages:
+            if message.get("stream") == "trade_updates" and self._handler is not None:
+                await self._handler(message)
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    def run(self):
+        asyncio.run(self._run_forever())
+
+    def stop(self):
+        """Nothing to close; replay ends with the messages."""
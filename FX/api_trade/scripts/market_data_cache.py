@@ -0,0 +1,217 @@
+"""
+Read-through cache in front of Alpaca market data calls.
+
+Entries are stored in the default (Redis) cache as ``(fresh_until, value)``. A fresh entry is returned as is. A
+stale entry is still returned, while a single background refresh replaces it (stale-while-revalidate). On a miss
+only the caller holding the per-key lock goes upstream; concurrent callers wait for its result (single-flight).
+Every value is also kept for ``ALPACA_FALLBACK_TTL`` as a fallback, returned on a miss while the broker is
+unavailable (its circuit breaker is open, it times out, fails or sheds the call).
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .circuit_breaker import is_unavailable
+
+logger = logging.getLogger(__name__)
+
+CACHE_EVENTS = ("hit", "stale", "miss", "coalesced", "error", "fallback")
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="market-data-refresh")
+
+
+def _json_default(value):
+    return getattr(value, "value", str(value))
+
+
+def increment(cache, key):
+    """Add one to the counter ``key`` of ``cache``, created without expiry if missing; returns the new value."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+class ReadThroughCache:
+    """Read-through cache with per-endpoint TTLs, stale-while-revalidate and single-flight locking.
+
+    ``ttls_setting`` names a setting mapping endpoint name to ``(fresh_seconds, stale_seconds)``. Endpoints not
+    listed fall back to ``default_ttl``. The total lifetime of an entry is capped by ``REDIS_EXPIRE_KEY``.
+    """
+
+    poll_interval = 0.025
+
+    def __init__(self, namespace, ttls_setting, default_ttl=(5, 30), cache_alias="default"):
+        self.namespace = namespace
+        self.ttls_setting = ttls_setting
+        self.default_ttl = default_ttl
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        """The Django cache backing this instance."""
+        return caches[self.cache_alias]
+
+    def ttl_for(self, endpoint):
+        """Return ``(fresh_seconds, stale_seconds)`` for an endpoint."""
+        return getattr(settings, self.ttls_setting, {}).get(endpoint, self.default_ttl)
+
+    def key_for(self, endpoint, params):
+        """Derive a cache key from the endpoint and its request parameters."""
+        if hasattr(params, "to_request_fields"):
+            params = params.to_request_fields()
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=_json_default).encode("utf-8"),
+            usedforsecurity=False,
+        ).hexdigest()
+        return f"{self.namespace}:{endpoint}:{digest}"
+
+    def get_or_fetch(self, endpoint, params, fetch, fallback_params=None):
+        """Return the cached value for ``params`` or call ``fetch`` to produce it.
+
+        The fallback is kept under ``fallback_params`` (``params`` by default), for keys that change more often than
+        the value they hold.
+        """
+        key = self.key_for(endpoint, params)
+        fallback_key = self._fallback_key(endpoint, params if fallback_params is None else fallback_params)
+        try:
+            entry = self.cache.get(key)
+        except Exception:  # noqa: B902
+            logger.warning("Cache unavailable for %s, calling upstream directly", endpoint, exc_info=True)
+            self._count(endpoint, "error")
+            return fetch()
+
+        if entry is not None:
+            fresh_until, value = entry
+            if time.time() < fresh_until:
+                self._count(endpoint, "hit")
+            else:
+                self._count(endpoint, "stale")
+                token = self._acquire(key)
+                if token:
+                    _refresh_executor.submit(self._refresh, endpoint, key, fallback_key, token, fetch)
+            return value
+
+        self._count(endpoint, "miss")
+        deadline = time.monotonic() + settings.ALPACA_MARKET_DATA_LOCK_TIMEOUT
+        while True:
+            token = self._acquire(key)
+            if token:
+                try:
+                    value = fetch()
+                except Exception as error:  # noqa: B902
+                    return self._fallback(endpoint, fallback_key, error)
+                else:
+                    return self._store(endpoint, key, fallback_key, value)
+                finally:
+                    self._release(key, token)
+
+            # Somebody else is fetching this key; wait for their result instead of going upstream too.
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                entry = self.cache.get(key)
+                if entry is not None:
+                    self._count(endpoint, "coalesced")
+                    return entry[1]
+                if self.cache.get(self._lock_key(key)) is None:
+                    # The holder gave up without storing a value; compete for the lock again.
+                    break
+            else:
+                try:
+                    return fetch()
+                except Exception as error:  # noqa: B902
+                    return self._fallback(endpoint, fallback_key, error)
+
+    def invalidate(self, endpoint, params):
+        """Drop the cached value for ``params``."""
+        self.cache.delete(self.key_for(endpoint, params))
+
+    def stats(self, endpoints=None):
+        """Return the hit/stale/miss counters for each endpoint."""
+        endpoints = endpoints or list(getattr(settings, self.ttls_setting, {}))
+        keys = {self._stats_key(endpoint, event): (endpoint, event) for endpoint in endpoints for event in CACHE_EVENTS}
+        values = self.cache.get_many(list(keys))
+        stats = {endpoint: dict.fromkeys(CACHE_EVENTS, 0) for endpoint in endpoints}
+        for key, count in values.items():
+            endpoint, event = keys[key]
+            stats[endpoint][event] = count
+        return stats
+
+    def _fallback(self, endpoint, fallback_key, error):
+        """The fallback value to answer with after ``fetch`` raised ``error``; re-raise it if there is none."""
+        value = self.cache.get(fallback_key) if is_unavailable(error) else None
+        if value is None:
+            raise error
+        logger.warning("Broker unavailable for %s, answering with the last known value: %s", endpoint, error)
+        self._count(endpoint, "fallback")
+        return value
+
+    def _store(self, endpoint, key, fallback_key, value):
+        fresh, stale = self.ttl_for(endpoint)
+        timeout = min(fresh + stale, settings.REDIS_EXPIRE_KEY)
+        self.cache.set(key, (time.time() + fresh, value), timeout=timeout)
+        self.cache.set(fallback_key, value, timeout=settings.ALPACA_FALLBACK_TTL)
+        return value
+
+    def _refresh(self, endpoint, key, fallback_key, token, fetch):
+        try:
+            self._store(endpoint, key, fallback_key, fetch())
+        except Exception:  # noqa: B902
+            logger.warning("Background refresh of %s failed", key, exc_info=True)
+        finally:
+            self._release(key, token)
+
+    def _fallback_key(self, endpoint, params):
+        return f"{self.key_for(endpoint, params)}:fallback"
+
+    def _lock_key(self, key):
+        return f"{key}:lock"
+
+    def _acquire(self, key):
+        token = uuid.uuid4().hex
+        # The lock expires on its own so a crashed worker cannot block the key forever.
+        if self.cache.add(self._lock_key(key), token, timeout=settings.ALPACA_MARKET_DATA_LOCK_TIMEOUT):
+            return token
+        return None
+
+    def _release(self, key, token):
+        lock_key = self._lock_key(key)
+        if self.cache.get(lock_key) == token:
+            self.cache.delete(lock_key)
+
+    def _stats_key(self, endpoint, event):
+        return f"{self.namespace}:stats:{endpoint}:{event}"
+
+    def _count(self, endpoint, event):
+        try:
+            increment(self.cache, self._stats_key(endpoint, event))
+        except Exception:  # noqa: B902
+            logger.debug("Could not record cache %s for %s", event, endpoint, exc_info=True)
+
+
+market_data_cache = ReadThroughCache("alpaca:md", "ALPACA_MARKET_DATA_CACHE_TTLS")
+
+
+def cached_market_data(endpoint):
+    """Serve an ``AlpacaIntegrationDataHistorical`` method through the market data cache.
+
+    The cache key is derived from the instance's ``request_params``.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self):
+            return market_data_cache.get_or_fetch(endpoint, self.request_params, lambda: method(self))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,205 @@
+"""
+In-process fan-out of real-time quotes to WebSocket clients.
+
+Each process keeps at most one upstream subscription per symbol, whatever the number of connected clients. Ticks
+are encoded once and handed to every subscriber. A subscriber only keeps the latest tick per symbol until its
+socket is ready again, so a slow client receives fewer, fresher ticks instead of an ever-growing backlog.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from alpaca.data.live import CryptoDataStream
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def quote_to_tick(quote):
+    """Encode an Alpaca ``Quote`` as the JSON object sent to clients."""
+    return json.dumps(
+        {
+            "symbol": quote.symbol,
+            "timestamp": quote.timestamp.isoformat(),
+            "bid_price": quote.bid_price,
+            "bid_size": quote.bid_size,
+            "ask_price": quote.ask_price,
+            "ask_size": quote.ask_size,
+        }
+    )
+
+
+class Subscription:
+    """Pending ticks of one client, coalesced per symbol."""
+
+    def __init__(self):
+        self.symbols = set()
+        self.dropped = 0
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, symbol, tick):
+        """Queue ``tick``, replacing any tick of the same symbol the client has not received yet."""
+        if symbol in self._pending:
+            self.dropped += 1
+        self._pending[symbol] = tick
+        self._ready.set()
+
+    async def next_batch(self):
+        """Wait for ticks and return every pending one, at most one per symbol."""
+        await self._ready.wait()
+        self._ready.clear()
+        batch, self._pending = self._pending, {}
+        return list(batch.values())
+
+
+class BaseQuoteFeed(ABC):
+    """Upstream source of quotes; calls ``publish(symbol, tick)`` on the hub's event loop."""
+
+    def __init__(self, publish):
+        self.publish = publish
+
+    @abstractmethod
+    async def subscribe(self, symbols):
+        """Start receiving quotes for ``symbols``."""
+
+    @abstractmethod
+    async def unsubscribe(self, symbols):
+        """Stop receiving quotes for ``symbols``."""
+
+    async def close(self):  # noqa: B027
+        """Release upstream resources."""
+
+
+class AlpacaQuoteFeed(BaseQuoteFeed):
+    """Quotes from the Alpaca crypto data stream.
+
+    ``CryptoDataStream`` runs its own event loop, so it lives in a daemon thread and forwards quotes back to the
+    hub's loop. The stream only connects once the first symbol is subscribed.
+    """
+
+    def __init__(self, publish):
+        super().__init__(publish)
+        self.stream = CryptoDataStream(settings.API_KEY_ALPACA, settings.SECRET_KEY_ALPACA)
+        self._loop = None
+        self._thread = None
+
+    async def subscribe(self, symbols):
+        self._loop = asyncio.get_running_loop()
+        # Blocks until the stream has sent the subscription, so keep it off the hub's loop.
+        await asyncio.to_thread(self.stream.subscribe_quotes, self._on_quote, *symbols)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.stream.run, name="alpaca-quote-feed", daemon=True)
+            self._thread.start()
+
+    async def unsubscribe(self, symbols):
+        await asyncio.to_thread(self.stream.unsubscribe_quotes, *symbols)
+
+    async def close(self):
+        if self._thread is not None:
+            await asyncio.to_thread(self.stream.stop)
+
+    async def _on_quote(self, quote):
+        self._loop.call_soon_threadsafe(self.publish, quote.symbol, quote_to_tick(quote))
+
+
+class LocalQuoteFeed(BaseQuoteFeed):
+    """Random-walk quotes for development and tests, without an Alpaca connection."""
+
+    interval = 0.1
+
+    def __init__(self, publish):
+        super().__init__(publish)
+        self._tasks = {}
+
+    async def subscribe(self, symbols):
+        for symbol in symbols:
+            self._tasks[symbol] = asyncio.create_task(self._run(symbol))
+
+    async def unsubscribe(self, symbols):
+        for symbol in symbols:
+            self._tasks.pop(symbol).cancel()
+
+    async def close(self):
+        await self.unsubscribe(list(self._tasks))
+
+    async def _run(self, symbol):
+        price = 100.0
+        while True:
+            price *= 1 + random.uniform(-0.001, 0.001)
+            tick = {"symbol": symbol, "bid_price": round(price * 0.9995, 2), "ask_price": round(price * 1.0005, 2)}
+            self.publish(symbol, json.dumps(tick))
+            await asyncio.sleep(self.interval)
+
+
+class MarketDataHub:
+    """Reference-counted upstream subscriptions shared by every client of the process."""
+
+    def __init__(self, feed_class):
+        self.feed = feed_class(self.publish)
+        self._subscribers = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, subscription, symbols):
+        """Add ``symbols`` to a client; symbols nobody watched before are subscribed upstream."""
+        symbols = list(dict.fromkeys(symbols))
+        async with self._lock:
+            new = [symbol for symbol in symbols if not self._subscribers[symbol]]
+            for symbol in symbols:
+                self._subscribers[symbol].add(subscription)
+                subscription.symbols.add(symbol)
+            if new:
+                await self.feed.subscribe(new)
+
+    async def unsubscribe(self, subscription, symbols=None):
+        """Remove ``symbols`` (default: all) from a client; symbols nobody watches any more are released upstream."""
+        async with self._lock:
+            released = []
+            for symbol in list(subscription.symbols if symbols is None else symbols):
+                subscription.symbols.discard(symbol)
+                subscribers = self._subscribers.get(symbol)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[symbol]
+                    released.append(symbol)
+            if released:
+                await self.feed.unsubscribe(released)
+
+    def publish(self, symbol, tick):
+        """Hand an encoded tick to every subscriber of ``symbol``."""
+        for subscription in self._subscribers.get(symbol, ()):
+            subscription.offer(symbol, tick)
+
+    def stats(self):
+        """Number of clients per upstream symbol."""
+        return {symbol: len(subscribers) for symbol, subscribers in self._subscribers.items()}
+
+    async def close(self):
+        await self.feed.close()
+
+
+_hub = None
+
+
+def get_hub():
+    """Return the process-wide hub, creating it with ``MARKET_DATA_FEED`` on first use."""
+    global _hub
+    if _hub is None:
+        _hub = MarketDataHub(import_string(settings.MARKET_DATA_FEED))
+    return _hub
+
+
+async def close_hub():
+    """Close the upstream feed; called on ASGI lifespan shutdown."""
+    global _hub
+    if _hub is not None:
+        hub, _hub = _hub, None
+        await hub.close()
@@ -0,0 +1,130 @@
+"""
+Local mirror of the account's Alpaca orders.
+
+Every order event on the broker's trade update stream is applied to ``BrokerOrder``, and orders placed through this
+API are recorded as soon as the broker accepts them, so order reads are indexed queries instead of broker round
+trips. ``reconcile_orders`` re-reads recent orders from the broker to repair anything the stream missed (for
+example while it was reconnecting).
+"""
+
+import logging
+from datetime import timedelta
+
+from alpaca.common.enums import Sort
+from alpaca.trading.enums import QueryOrderStatus
+from alpaca.trading.requests import GetOrdersRequest
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import BrokerOrder
+from .alpaca_clients import registry
+from .portfolio_analytics import assign_fills, record_fill
+from .portfolio_snapshots import invalidate_portfolio
+from .rate_limiter import priority
+
+logger = logging.getLogger(__name__)
+
+ORDER_FIELDS = [
+    "client_order_id",
+    "symbol",
+    "asset_class",
+    "order_class",
+    "order_type",
+    "side",
+    "time_in_force",
+    "qty",
+    "notional",
+    "filled_qty",
+    "filled_avg_price",
+    "limit_price",
+    "stop_price",
+    "status",
+    "extended_hours",
+    "created_at",
+    "updated_at",
+    "submitted_at",
+    "filled_at",
+    "canceled_at",
+    "expired_at",
+    "failed_at",
+]
+
+
+def order_fields(order):
+    """Map an alpaca-py ``Order`` to ``BrokerOrder`` field values."""
+    fields = {}
+    for name in ORDER_FIELDS:
+        value = getattr(order, name)
+        # Enums are stored by value; numeric fields arrive as strings.
+        value = getattr(value, "value", value)
+        if name in ("qty", "notional", "filled_qty", "filled_avg_price", "limit_price", "stop_price"):
+            value = float(value) if value is not None else None
+        fields[name] = value
+    fields["filled_qty"] = fields["filled_qty"] or 0.0
+    fields["extended_hours"] = bool(fields["extended_hours"])
+    return fields
+
+
+def record_order(order, user=None):
+    """Store the broker's view of an order unless a newer one is already stored; return the stored row."""
+    fields = order_fields(order)
+    updated = BrokerOrder.objects.filter(pk=order.id, updated_at__lte=fields["updated_at"]).update(**fields)
+    if not updated:
+        # Either the order is new or the stored row is newer; the insert is a no-op in the second case.
+        BrokerOrder.objects.bulk_create([BrokerOrder(id=order.id, user=user, **fields)], ignore_conflicts=True)
+    stored = BrokerOrder.objects.get(pk=order.id)
+    if user is not None and stored.user_id is None:
+        # The stream may have stored the order, and even fills, before the view that placed it got the answer.
+        BrokerOrder.objects.filter(pk=order.id, user__isnull=True).update(user=user)
+        stored.user = user
+        assign_fills(stored, user)
+    return stored
+
+
+@transaction.atomic
+def record_orders(orders, user=None):
+    """Store several orders, e.g. the ones a basket placed."""
+    return [record_order(order, user) for order in orders]
+
+
+@transaction.atomic
+def apply_trade_update(update):
+    """Apply one ``TradeUpdate`` from the broker's trade update stream, including the execution of fills."""
+    order = record_order(update.order)
+    record_fill(update, order)
+    # Any order event can change positions, equity or buying power.
+    invalidate_portfolio()
+    logger.debug("Applied %s for order %s, now %s", update.event, order.pk, order.status)
+    return order
+
+
+@priority("background")
+def reconcile_orders(days=7, client=None, page_size=500):
+    """Re-read the orders submitted in the last ``days`` from the broker and store them.
+
+    Returns ``(orders read, orders whose stored status was missing or out of date)``.
+    """
+    client = client or registry.get_trading_client(paper=True)
+    after = timezone.now() - timedelta(days=days)
+    seen = drifted = 0
+    while True:
+        orders = client.get_orders(
+            filter=GetOrdersRequest(
+                status=QueryOrderStatus.ALL, after=after, limit=page_size, direction=Sort.ASC, nested=False
+            )
+        )
+        stored = dict(BrokerOrder.objects.filter(pk__in=[order.id for order in orders]).values_list("pk", "status"))
+        for order in orders:
+            if stored.get(order.id) != getattr(order.status, "value", order.status):
+                drifted += 1
+            record_order(order)
+        seen += len(orders)
+        if len(orders) < page_size:
+            break
+        # ``after`` is exclusive; orders sharing the last timestamp of a full page are re-read with the next one,
+        # unless the whole page shares it.
+        last = orders[-1].submitted_at or orders[-1].created_at
+        after = last - timedelta(microseconds=1) if last - timedelta(microseconds=1) > after else last
+    if drifted:
+        logger.warning("Reconciled %s of %s orders that were missing or out of date", drifted, seen)
+    return seen, drifted
@@ -0,0 +1,259 @@
+"""
+Server-side P&L and exposure analytics over stored fills and bars.
+
+Positions are kept incrementally: every fill updates the ``PositionState`` of its user and symbol with the
+average-cost method, so current realized and unrealized P&L are a single-row read per position. Curves over time
+are computed from the stored fills and bars with NumPy: positions and cash at every bar are cumulative sums of the
+fills looked up with ``searchsorted``, so the cost grows with the number of fills and bars, not their product.
+"""
+
+import logging
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import Fill, HistoricalBar, PositionState
+from .bar_store import BarStore
+from .portfolio_snapshots import get_positions_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Quantities smaller than this are rounding left-overs of a closed position.
+QTY_EPSILON = 1e-9
+
+FILL_EVENTS = ("fill", "partial_fill")
+
+
+def apply_fill_to_position(qty, avg_price, realized_pl, fill_qty, fill_price):
+    """Average-cost update of a position for one signed fill; returns ``(qty, avg_price, realized_pl)``.
+
+    Adding to a position moves the average price. Reducing it realizes ``(price - average) * closed qty`` (reversed
+    for shorts). A fill larger than the position closes it and opens the remainder the other way at the fill price.
+    """
+    new_qty = qty + fill_qty
+    if abs(qty) < QTY_EPSILON or (qty > 0) == (fill_qty > 0):
+        return new_qty, (avg_price * abs(qty) + fill_price * abs(fill_qty)) / abs(new_qty), realized_pl
+
+    closed = min(abs(qty), abs(fill_qty))
+    realized_pl += closed * (fill_price - avg_price) * (1.0 if qty > 0 else -1.0)
+    if abs(new_qty) < QTY_EPSILON:
+        return 0.0, 0.0, realized_pl
+    if abs(fill_qty) > abs(qty):
+        return new_qty, fill_price, realized_pl
+    return new_qty, avg_price, realized_pl
+
+
+def record_fill(update, order):
+    """Store the execution of a fill trade update and fold it into the position; duplicates are ignored."""
+    if update.event not in FILL_EVENTS or update.execution_id is None or not update.qty:
+        return None
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                fill = Fill.objects.create(
+                    execution_id=update.execution_id,
+                    order=order,
+                    user=order.user,
+                    symbol=order.symbol,
+                    asset_class=order.asset_class,
+                    side=order.side,
+                    qty=abs(float(update.qty)),
+                    price=float(update.price),
+                    fee=abs(float(update.qty) * float(update.price))
+                    * settings.ALPACA_FEE_RATES.get(order.asset_class, 0.0),
+                    timestamp=update.timestamp,
+                )
+        except IntegrityError:
+            logger.debug("Execution %s was already recorded", update.execution_id)
+            return None
+        position = _locked_position(fill.user, fill.symbol, fill.asset_class)
+        _apply(position, fill)
+        position.save()
+        fill.save(update_fields=["realized_pl"])
+    return fill
+
+
+def _locked_position(user, symbol, asset_class):
+    PositionState.objects.bulk_create(
+        [PositionState(user=user, symbol=symbol, asset_class=asset_class)], ignore_conflicts=True
+    )
+    return PositionState.objects.select_for_update().get(user=user, symbol=symbol)
+
+
+def _apply(position, fill):
+    realized_before = position.realized_pl
+    position.qty, position.avg_price, position.realized_pl = apply_fill_to_position(
+        position.qty, position.avg_price, position.realized_pl, fill.signed_qty, fill.price
+    )
+    fill.realized_pl = position.realized_pl - realized_before
+    position.fill_count += 1
+    position.last_fill_at = max(position.last_fill_at or fill.timestamp, fill.timestamp)
+
+
+@transaction.atomic
+def rebuild_position(user, symbol):
+    """Recompute a ``PositionState`` from all of its fills, e.g. after fills were attributed to another user."""
+    fills = list(Fill.objects.filter(user=user, symbol=symbol).order_by("timestamp", "id"))
+    if not fills:
+        PositionState.objects.filter(user=user, symbol=symbol).delete()
+        return None
+    position = _locked_position(user, symbol, fills[0].asset_class)
+    position.qty = position.avg_price = position.realized_pl = 0.0
+    position.fill_count = 0
+    position.last_fill_at = None
+    for fill in fills:
+        _apply(position, fill)
+    position.save()
+    Fill.objects.bulk_update(fills, ["realized_pl"], batch_size=1000)
+    return position
+
+
+def assign_fills(order, user):
+    """Attribute the fills of an order that was stored before its user was known."""
+    symbols = set(Fill.objects.filter(order=order, user__isnull=True).values_list("symbol", flat=True))
+    if symbols:
+        Fill.objects.filter(order=order, user__isnull=True).update(user=user)
+        for symbol in symbols:
+            rebuild_position(None, symbol)
+            rebuild_position(user, symbol)
+
+
+def current_prices(symbols):
+    """Latest known price per symbol: the broker's position price if the account holds it, else the last bar."""
+    prices = {}
+    try:
+        for position in get_positions_snapshot().data:
+            prices[position.symbol] = float(position.current_price) if position.current_price else None
+    except Exception:  # noqa: B902
+        logger.warning("Positions unavailable, pricing from stored bars only", exc_info=True)
+    result = {}
+    for symbol in symbols:
+        # Broker positions spell crypto pairs without the slash ("BTCUSD").
+        price = prices.get(symbol) or prices.get(symbol.replace("/", ""))
+        if price is None:
+            bar = HistoricalBar.objects.filter(symbol=symbol).order_by("-timestamp").values_list("close").first()
+            price = bar[0] if bar else None
+        result[symbol] = price
+    return result
+
+
+def position_pnl(user):
+    """Per-position quantity, average price, mark, realized and unrealized P&L of a user, with totals."""
+    positions = list(PositionState.objects.filter(user=user).order_by("symbol"))
+    prices = current_prices([position.symbol for position in positions if abs(position.qty) >= QTY_EPSILON])
+    rows = []
+    for position in positions:
+        price = prices.get(position.symbol)
+        unrealized = position.qty * (price - position.avg_price) if price is not None else 0.0
+        rows.append(
+            {
+                "symbol": position.symbol,
+                "asset_class": position.asset_class,
+                "qty": position.qty,
+                "avg_price": position.avg_price,
+                "price": price,
+                "market_value": position.qty * price if price is not None else None,
+                "unrealized_pl": unrealized,
+                "realized_pl": position.realized_pl,
+            }
+        )
+    return {
+        "positions": rows,
+        "unrealized_pl": sum(row["unrealized_pl"] for row in rows),
+        "realized_pl": sum(row["realized_pl"] for row in rows),
+    }
+
+
+def exposure(user):
+    """Long, short, gross and net market value of a user's open positions by asset class."""
+    by_class = defaultdict(lambda: {"long": 0.0, "short": 0.0})
+    for row in position_pnl(user)["positions"]:
+        if row["market_value"] is None or abs(row["qty"]) < QTY_EPSILON:
+            continue
+        by_class[row["asset_class"]]["long" if row["qty"] > 0 else "short"] += row["market_value"]
+    result = {}
+    for asset_class, values in sorted(by_class.items()):
+        result[asset_class] = {
+            **values,
+            "gross": values["long"] - values["short"],
+            "net": values["long"] + values["short"],
+        }
+    totals = {key: sum(values[key] for values in result.values()) for key in ("long", "short", "gross", "net")}
+    return {"by_asset_class": result, **totals}
+
+
+def pnl_curve(fill_times, fill_qty, fill_price, times, closes):
+    """P&L of one symbol's fills marked at ``closes`` on the ``times`` grid: cash plus position value.
+
+    ``fill_times`` must be sorted. A fill counts from the first grid time at or after it. Grid points without a
+    close (NaN) are marked at the last fill price instead.
+    """
+    index = np.searchsorted(fill_times, times, side="right")
+    position = np.concatenate(([0.0], np.cumsum(fill_qty)))[index]
+    cash = np.concatenate(([0.0], np.cumsum(-fill_qty * fill_price)))[index]
+    last_fill_price = np.concatenate(([0.0], fill_price))[index]
+    marks = np.where(np.isnan(closes), last_fill_price, closes)
+    return cash + position * marks
+
+
+def drawdown(curve):
+    """Distance of every point below the running peak (zero or negative), and the largest one."""
+    if not len(curve):
+        return curve, 0.0
+    below_peak = curve - np.maximum.accumulate(curve)
+    return below_peak, float(below_peak.min())
+
+
+def equity_curve(user, timeframe, start, end=None, bar_store=None):
+    """Cumulative P&L of a user's fills at every bar of [start, end), with its drawdown.
+
+    Fills before ``start`` count too, so the curve starts at the P&L carried into the window. Crypto symbols are
+    marked at the stored bar closes (missing bars are fetched); other symbols at their last fill price.
+    """
+    end = min(end or timezone.now(), timezone.now())
+    fills = Fill.objects.filter(user=user, timestamp__lt=end).order_by("timestamp", "id")
+    columns = defaultdict(list)
+    for symbol, asset_class, side, qty, price, timestamp in fills.values_list(
+        "symbol", "asset_class", "side", "qty", "price", "timestamp"
+    ).iterator(chunk_size=5000):
+        columns[(symbol, asset_class)].append((timestamp.timestamp(), qty if side == "buy" else -qty, price))
+
+    crypto = [symbol for symbol, asset_class in columns if asset_class == "crypto"]
+    closes = defaultdict(dict)
+    if crypto:
+        store = bar_store or BarStore()
+        for symbol, timestamp, close in store.iter_bars(
+            crypto, timeframe, start, end, fields=["symbol", "timestamp", "close"]
+        ):
+            closes[symbol][timestamp.timestamp()] = close
+    times = np.array(sorted({timestamp for symbol_closes in closes.values() for timestamp in symbol_closes}))
+    if not len(times):
+        # No bars (no crypto fills, or none stored yet): evaluate at the fills inside the window.
+        times = np.array(
+            sorted({t for symbol_fills in columns.values() for t, _, _ in symbol_fills if t >= start.timestamp()})
+        )
+
+    curve = np.zeros(len(times))
+    for (symbol, _), symbol_fills in columns.items():
+        fill_times, fill_qty, fill_price = (np.array(column, dtype=np.float64) for column in zip(*symbol_fills))
+        symbol_closes = np.array([closes[symbol].get(t, np.nan) for t in times]) if len(times) else np.array([])
+        curve += pnl_curve(fill_times, fill_qty, fill_price, times, _forward_fill(symbol_closes))
+    below_peak, max_drawdown = drawdown(curve)
+    return {
+        "timestamp": (times * 1000).round().astype(np.int64).tolist(),
+        "pnl": curve.tolist(),
+        "drawdown": below_peak.tolist(),
+        "max_drawdown": max_drawdown,
+    }
+
+
+def _forward_fill(values):
+    """Replace every NaN with the last value before it (leading NaNs stay)."""
+    if not len(values):
+        return values
+    index = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    return values[index]
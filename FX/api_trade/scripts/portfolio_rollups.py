@@ -0,0 +1,167 @@
+"""
+Daily portfolio rollups.
+
+``DailyPortfolioSummary`` rows hold each user's end-of-day equity, P&L, turnover and fees, so history charts read
+one row per day instead of scanning fills. A day is computed from the previous day's row (cash and positions) and
+one grouped query over that day's fills, so the nightly run only touches the latest day; backfills walk forward
+from the last row before the requested range.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Min, Q, Sum, When
+from django.db.models.functions import TruncDate
+
+from ..models import DailyPortfolioSummary, Fill, HistoricalBar
+from .bar_store import BarStore
+from .portfolio_analytics import QTY_EPSILON
+from .rate_limiter import priority
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ["equity", "pnl", "realized_pl", "turnover", "fees", "fill_count", "cash", "positions"]
+
+
+def day_start(day):
+    """Midnight UTC at the start of ``day``."""
+    return datetime.combine(day, time(), tzinfo=dt_timezone.utc)
+
+
+def _daily_flows(user_id, start, end):
+    """``{day: {symbol: aggregates}}`` of a user's fills from ``start`` to ``end`` (inclusive dates)."""
+    rows = (
+        Fill.objects.filter(
+            user_id=user_id, timestamp__gte=day_start(start), timestamp__lt=day_start(end + timedelta(days=1))
+        )
+        .annotate(day=TruncDate("timestamp", tzinfo=dt_timezone.utc))
+        .values("day", "symbol", "asset_class")
+        .annotate(
+            net_qty=Sum(Case(When(side="buy", then=F("qty")), default=-F("qty"))),
+            traded_qty=Sum("qty"),
+            notional=Sum(F("qty") * F("price")),
+            cash=Sum(Case(When(side="buy", then=-F("qty") * F("price")), default=F("qty") * F("price"))),
+            fees=Sum("fee"),
+            realized_pl=Sum("realized_pl"),
+            fill_count=Count("id"),
+        )
+    )
+    flows = defaultdict(dict)
+    for row in rows:
+        flows[row["day"]][row["symbol"]] = row
+    return flows
+
+
+def _daily_closes(symbols, start, end, bar_store=None):
+    """``{(symbol, day): close}`` of the daily bars of crypto ``symbols``, fetching missing bars first."""
+    if not symbols:
+        return {}
+    (bar_store or BarStore()).fill(sorted(symbols), "1Day", day_start(start), day_start(end + timedelta(days=1)))
+    bars = HistoricalBar.objects.filter(
+        symbol__in=symbols,
+        timeframe="1Day",
+        timestamp__gte=day_start(start),
+        timestamp__lt=day_start(end + timedelta(days=1)),
+    )
+    return {
+        (symbol, timestamp.date()): close
+        for symbol, timestamp, close in bars.values_list("symbol", "timestamp", "close")
+    }
+
+
+def rollup_user(user_id, start, end, bar_store=None):
+    """Materialize the summaries of a user from ``start`` to ``end`` (inclusive dates); return how many."""
+    base = DailyPortfolioSummary.objects.filter(user_id=user_id, date__lt=start).order_by("-date").first()
+    if base is not None:
+        cash, equity, first = base.cash, base.equity, base.date + timedelta(days=1)
+        positions = {symbol: list(state) for symbol, state in base.positions.items()}
+    else:
+        first_fill = Fill.objects.filter(user_id=user_id).aggregate(first=Min("timestamp"))["first"]
+        if first_fill is None:
+            return 0
+        # No earlier summary to start from: walk from the first fill, writing the days before ``start`` too.
+        cash, equity, first, positions = 0.0, 0.0, first_fill.date(), {}
+    if first > end:
+        return 0
+
+    flows = _daily_flows(user_id, first, end)
+    crypto = {
+        symbol for day_flows in flows.values() for symbol, row in day_flows.items() if row["asset_class"] == "crypto"
+    }
+    crypto |= {symbol for symbol, (_, _, asset_class) in positions.items() if asset_class == "crypto"}
+    closes = _daily_closes(crypto, first, end, bar_store)
+
+    summaries = []
+    day = first
+    while day <= end:
+        day_flows = flows.get(day, {})
+        for symbol, row in day_flows.items():
+            state = positions.setdefault(symbol, [0.0, None, row["asset_class"]])
+            state[0] += row["net_qty"]
+            # Without a bar, mark at the day's average fill price.
+            state[1] = row["notional"] / row["traded_qty"]
+        for symbol, state in positions.items():
+            state[1] = closes.get((symbol, day), state[1])
+        cash += sum(row["cash"] - row["fees"] for row in day_flows.values())
+        value = sum(state[0] * state[1] for state in positions.values())
+        positions = {symbol: state for symbol, state in positions.items() if abs(state[0]) >= QTY_EPSILON}
+        if day_flows or positions:
+            summaries.append(
+                DailyPortfolioSummary(
+                    user_id=user_id,
+                    date=day,
+                    equity=cash + value,
+                    pnl=cash + value - equity,
+                    realized_pl=sum(row["realized_pl"] for row in day_flows.values()),
+                    turnover=sum(row["notional"] for row in day_flows.values()),
+                    fees=sum(row["fees"] for row in day_flows.values()),
+                    fill_count=sum(row["fill_count"] for row in day_flows.values()),
+                    cash=cash,
+                    positions={symbol: list(state) for symbol, state in positions.items()},
+                )
+            )
+        equity = cash + value
+        day += timedelta(days=1)
+
+    if user_id is None:
+        # ON CONFLICT (date) cannot name the partial index of the unattributed summaries: replace them instead.
+        with transaction.atomic():
+            DailyPortfolioSummary.objects.filter(user=None, date__gte=first, date__lte=end).delete()
+            DailyPortfolioSummary.objects.bulk_create(summaries, batch_size=1000)
+        return len(summaries)
+    DailyPortfolioSummary.objects.bulk_create(
+        summaries,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["user", "date"],
+        update_fields=SUMMARY_FIELDS,
+    )
+    return len(summaries)
+
+
+def users_to_roll_up(start, end):
+    """Users with fills in the range, positions open before it, or fills never rolled up; ``None`` is unattributed."""
+    with_fills = Fill.objects.filter(
+        timestamp__gte=day_start(start), timestamp__lt=day_start(end + timedelta(days=1))
+    ).values_list("user", flat=True)
+    holding = (
+        DailyPortfolioSummary.objects.filter(date=start - timedelta(days=1))
+        .filter(~Q(positions={}))
+        .values_list("user", flat=True)
+    )
+    rolled_up = set(DailyPortfolioSummary.objects.values_list("user", flat=True).distinct())
+    earlier = set(Fill.objects.filter(timestamp__lt=day_start(start)).values_list("user", flat=True).distinct())
+    return set(with_fills.distinct()) | set(holding) | (earlier - rolled_up)
+
+
+@priority("background")
+def rollup_portfolios(start, end, bar_store=None):
+    """Materialize the summaries of every user with activity from ``start`` to ``end``; return rows written."""
+    written = 0
+    for user_id in users_to_roll_up(start, end):
+        written += rollup_user(user_id, start, end, bar_store)
+    logger.info("Rolled up %s daily portfolio summaries from %s to %s", written, start, end)
+    return written
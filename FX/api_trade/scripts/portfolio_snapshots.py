@@ -0,0 +1,108 @@
+"""
+Snapshot cache for account positions and equity.
+
+Dashboards poll these every second, but they only change when an order event arrives. Snapshots are fetched
+through a ``ReadThroughCache`` in Redis (short TTL, single-flight) and kept in process memory on top of that. Every
+cache key contains the account's generation, a Redis counter that ``invalidate_portfolio`` bumps on trade events,
+so all workers stop serving the old snapshot at once. Each snapshot carries an ETag derived from its content, for
+conditional GETs.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .alpaca_clients import _fingerprint, registry
+from .market_data_cache import ReadThroughCache, increment
+
+logger = logging.getLogger(__name__)
+
+portfolio_cache = ReadThroughCache("alpaca:portfolio", "ALPACA_PORTFOLIO_CACHE_TTLS", default_ttl=(5, 0))
+
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+class Snapshot:
+    """A fetched value with the time it was fetched and its ETag."""
+
+    def __init__(self, data, etag, fetched_at):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+def account_key(api_key=None, secret_key=None):
+    """Identify the trading account of a set of credentials (the configured ones by default)."""
+    return _fingerprint(api_key or settings.API_KEY_ALPACA, secret_key or settings.SECRET_KEY_ALPACA)
+
+
+def _generation_key(account):
+    return f"{portfolio_cache.namespace}:generation:{account}"
+
+
+def _etag(kind, data):
+    payload = "\n".join(item.model_dump_json() for item in (data if isinstance(data, list) else [data]))
+    return f'"{kind}-{hashlib.sha1(payload.encode("utf-8"), usedforsecurity=False).hexdigest()[:20]}"'
+
+
+def get_snapshot(kind, fetch, account=None):
+    """Return the current ``Snapshot`` of ``kind`` (``positions`` or ``account``), calling ``fetch`` on a miss."""
+    account = account or account_key()
+    try:
+        generation = portfolio_cache.cache.get(_generation_key(account), 0)
+    except Exception:  # noqa: B902
+        logger.warning("Portfolio cache unavailable, calling upstream directly", exc_info=True)
+        data = fetch()
+        return Snapshot(data, _etag(kind, data), time.time())
+
+    params = {"account": account, "generation": generation}
+    key = portfolio_cache.key_for(kind, params)
+    fresh, _ = portfolio_cache.ttl_for(kind)
+    with _memory_lock:
+        cached_key, snapshot = _memory.get((kind, account), (None, None))
+    if cached_key == key and time.time() < snapshot.fetched_at + fresh:
+        return snapshot
+
+    def fetch_snapshot():
+        data = fetch()
+        return Snapshot(data, _etag(kind, data), time.time())
+
+    # The fallback outlives generations: after an order event the last snapshot beats none while the broker is down.
+    snapshot = portfolio_cache.get_or_fetch(kind, params, fetch_snapshot, fallback_params={"account": account})
+    with _memory_lock:
+        _memory[(kind, account)] = (key, snapshot)
+    return snapshot
+
+
+def invalidate_portfolio(account=None):
+    """Make every worker fetch fresh positions and account data on the next read."""
+    account = account or account_key()
+    try:
+        increment(portfolio_cache.cache, _generation_key(account))
+    except Exception:  # noqa: B902
+        logger.warning("Could not invalidate the portfolio snapshots of %s", account, exc_info=True)
+
+
+def get_positions_snapshot():
+    """Snapshot of all open positions."""
+    return get_snapshot("positions", lambda: registry.get_trading_client().get_all_positions())
+
+
+def get_account_snapshot():
+    """Snapshot of the trading account (equity, buying power, restrictions)."""
+    return get_snapshot("account", lambda: registry.get_trading_client().get_account())
+
+
+def snapshot_response(request, snapshot, data):
+    """Answer with ``data`` and the snapshot's ETag, or 304 if the client already has this snapshot."""
+    response = get_conditional_response(request, etag=snapshot.etag) or Response(data)
+    response["ETag"] = snapshot.etag
+    # Clients may keep the body but must revalidate it on every use.
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,209 @@
+"""
+Pre-trade checks run before an order is sent to the broker.
+
+The broker rejects orders for unknown or untradable symbols, quantities the asset does not support, missing limit
+prices or a lack of buying power, but only after a round trip. ``check_orders`` applies the same rules in process,
+against the asset index (``asset_catalog``) and the cached account snapshot (``portfolio_snapshots``), and rejects
+such orders with structured errors before any broker call. Checks that need data this process does not have (an
+empty catalog, an unreachable account, no price for a market order) are skipped and left to the broker.
+"""
+
+import logging
+
+from django.core.cache import cache
+
+from .asset_catalog import get_asset_index
+from .market_data_cache import increment
+from .portfolio_analytics import current_prices
+from .portfolio_snapshots import get_account_snapshot
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_TYPES = ("market", "limit")
+CRYPTO_TIME_IN_FORCE = ("gtc", "ioc")
+
+REJECTION_CODES = [
+    "unsupported_order_type",
+    "qty_or_notional",
+    "not_positive",
+    "limit_price_required",
+    "unknown_symbol",
+    "not_tradable",
+    "fractional_not_supported",
+    "below_min_order_size",
+    "qty_increment",
+    "price_increment",
+    "unsupported_time_in_force",
+    "account_restricted",
+    "insufficient_buying_power",
+]
+# Answer with the status the broker uses for these; every other rejection is a 422 like the broker's.
+REJECTION_STATUS = {"account_restricted": 403, "insufficient_buying_power": 403}
+
+STATS_NAMESPACE = "alpaca:pretrade:stats"
+
+
+class OrderRejected(Exception):
+    """An order failed the pre-trade checks; ``errors`` holds one ``{"field", "code", "message"}`` per failure."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors[0]["message"])
+
+    @property
+    def status_code(self):
+        return rejection_status(self.errors)
+
+
+def rejection(field, code, message):
+    return {"field": field, "code": code, "message": message}
+
+
+def rejection_status(errors):
+    """HTTP status to answer a rejected order with."""
+    return REJECTION_STATUS.get(errors[0]["code"], 422)
+
+
+def _is_multiple(value, increment):
+    steps = value / increment
+    return abs(steps - round(steps)) < 1e-6
+
+
+def check_order_fields(order):
+    """Rules that only need the order itself."""
+    errors = []
+    order_type = order.get("type", "market")
+    if order_type not in SUPPORTED_TYPES:
+        errors.append(rejection("type", "unsupported_order_type", f"{order_type} orders are not supported."))
+    if ("qty" in order) == ("notional" in order):
+        errors.append(rejection("qty", "qty_or_notional", "Give either qty or notional."))
+    for field in ("qty", "notional", "limit_price"):
+        if order.get(field) is not None and order[field] <= 0:
+            errors.append(rejection(field, "not_positive", f"{field} must be positive."))
+    if order_type == "limit" and order.get("limit_price") is None:
+        errors.append(rejection("limit_price", "limit_price_required", "Limit orders need a limit_price."))
+    return errors
+
+
+def check_order_asset(order, asset):
+    """Rules of the traded asset: listed and tradable, supported quantities, increments and time in force."""
+    if asset is None:
+        return [rejection("symbol", "unknown_symbol", f"Unknown asset {order['symbol']}.")]
+    if not asset["tradable"]:
+        return [rejection("symbol", "not_tradable", f"{asset['symbol']} is not tradable.")]
+    errors = []
+    qty = order.get("qty")
+    fractional = "notional" in order or (qty is not None and qty != int(qty))
+    if fractional and not asset["fractionable"]:
+        errors.append(rejection("qty", "fractional_not_supported", f"{asset['symbol']} only trades in whole units."))
+    if qty is not None and asset["min_order_size"] and qty < asset["min_order_size"] - 1e-12:
+        message = f"The minimum order size of {asset['symbol']} is {asset['min_order_size']}."
+        errors.append(rejection("qty", "below_min_order_size", message))
+    if qty is not None and asset["min_trade_increment"] and not _is_multiple(qty, asset["min_trade_increment"]):
+        message = f"qty must be a multiple of {asset['min_trade_increment']}."
+        errors.append(rejection("qty", "qty_increment", message))
+    limit_price = order.get("limit_price")
+    if limit_price and asset["price_increment"] and not _is_multiple(limit_price, asset["price_increment"]):
+        message = f"limit_price must be a multiple of {asset['price_increment']}."
+        errors.append(rejection("limit_price", "price_increment", message))
+    if asset["asset_class"] == "crypto" and order["time_in_force"] not in CRYPTO_TIME_IN_FORCE:
+        message = f"Crypto orders must be {' or '.join(CRYPTO_TIME_IN_FORCE)}."
+        errors.append(rejection("time_in_force", "unsupported_time_in_force", message))
+    return errors
+
+
+def _account():
+    try:
+        return get_account_snapshot().data
+    except Exception:  # noqa: B902
+        logger.warning("Account unavailable, leaving the buying power check to the broker", exc_info=True)
+        return None
+
+
+def check_buying_power(orders, assets, account):
+    """Reject buys the account cannot pay for; each accepted buy uses up buying power for the ones after it.
+
+    Crypto is paid from non-marginable buying power. Market orders for a quantity are priced at the current price.
+    """
+    if account.trading_blocked or account.account_blocked:
+        restricted = rejection("symbol", "account_restricted", "Account is currently restricted from trading.")
+        return [[restricted] for _ in orders]
+    errors = [[] for _ in orders]
+    remaining = {
+        "crypto": float(account.non_marginable_buying_power or 0),
+        "other": float(account.buying_power or 0),
+    }
+    buys = [(position, order) for position, order in enumerate(orders) if order["side"] == "buy"]
+    market_symbols = [order["symbol"] for _, order in buys if "qty" in order and order.get("limit_price") is None]
+    prices = current_prices(market_symbols) if market_symbols else {}
+    for position, order in buys:
+        asset = assets[position]
+        pool = "crypto" if (asset or {}).get("asset_class") == "crypto" else "other"
+        price = order.get("limit_price") or prices.get(order["symbol"])
+        if "notional" in order:
+            cost = order["notional"]
+        elif price is not None:
+            cost = order["qty"] * price
+        else:
+            continue
+        if cost > remaining[pool]:
+            message = f"Insufficient buying power: the order costs {cost:.2f}, {remaining[pool]:.2f} is available."
+            errors[position].append(rejection("qty", "insufficient_buying_power", message))
+        else:
+            remaining[pool] -= cost
+    return errors
+
+
+def check_orders(orders):
+    """Run every check on a list of validated ``OrderSerializer`` payloads; returns the errors of each order.
+
+    Orders with an empty error list can be sent to the broker.
+    """
+    orders = [{**order, "symbol": str(order["symbol"]).upper()} for order in orders]
+    errors = [check_order_fields(order) for order in orders]
+    index = get_asset_index()
+    assets = [index.get(order["symbol"]) for order in orders]
+    if len(index):
+        for position, order in enumerate(orders):
+            if not errors[position]:
+                errors[position] = check_order_asset(order, assets[position])
+
+    pending = [position for position, order_errors in enumerate(errors) if not order_errors]
+    account = _account() if pending else None
+    if account is not None:
+        buying_power_errors = check_buying_power(
+            [orders[position] for position in pending], [assets[position] for position in pending], account
+        )
+        for position, order_errors in zip(pending, buying_power_errors):
+            errors[position] = order_errors
+
+    for order_errors in errors:
+        _count(order_errors[0]["code"] if order_errors else "passed")
+    return errors
+
+
+def check_order(order):
+    """Run every check on one order; raise ``OrderRejected`` if it fails."""
+    errors = check_orders([order])[0]
+    if errors:
+        raise OrderRejected(errors)
+
+
+def _stats_key(event):
+    return f"{STATS_NAMESPACE}:{event}"
+
+
+def _count(event):
+    try:
+        increment(cache, _stats_key(event))
+    except Exception:  # noqa: B902
+        logger.debug("Could not count pre-trade check %s", event, exc_info=True)
+
+
+def stats():
+    """Orders that passed the checks and orders rejected in process, i.e. broker calls avoided, by reason."""
+    events = ["passed"] + REJECTION_CODES
+    values = cache.get_many([_stats_key(event) for event in events])
+    counts = {event: values.get(_stats_key(event), 0) for event in events}
+    passed = counts.pop("passed")
+    return {"passed": passed, "avoided_upstream_calls": sum(counts.values()), "rejected": counts}
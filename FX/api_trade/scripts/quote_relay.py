@@ -0,0 +1,191 @@
+"""
+Cross-process quote relay through Redis pub/sub.
+
+Every worker of a node uses ``RedisQuoteFeed`` as its hub feed and records the symbols its clients want in Redis.
+One worker per node, elected with an expiring Redis lock, runs the real upstream feed (``MARKET_DATA_UPSTREAM_FEED``)
+for the union of those symbols and publishes its quotes to a channel every worker reads. If the leader dies, its lock
+expires and another worker takes over.
+
+Quotes are published in batches holding the latest quote of every symbol that changed since the previous publish,
+one ``symbol<TAB>quote`` line each. Pub/sub costs are per message, so a batch per round trip keeps the relay far
+ahead of the upstream rate even though a worker also receives symbols none of its clients watch.
+"""
+
+import asyncio
+import logging
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .market_data_hub import BaseQuoteFeed
+from .redis_client import RedisLock, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _prefix():
+    return f"md:{settings.MARKET_DATA_NODE}"
+
+
+def quotes_channel():
+    """Pub/sub channel carrying the quote batches of this node."""
+    return f"{_prefix()}:quotes"
+
+
+def encode_batch(ticks):
+    """Encode a ``{symbol: tick}`` mapping as one pub/sub message."""
+    return "\n".join(f"{symbol}\t{tick}" for symbol, tick in ticks.items())
+
+
+class RedisQuoteFeed(BaseQuoteFeed):
+    """Hub feed reading quotes from Redis, and running the upstream feed while this worker is the node's leader."""
+
+    def __init__(self, publish):
+        super().__init__(publish)
+        self.worker_id = uuid.uuid4().hex
+        self.symbols = set()
+        self.is_leader = False
+        self._redis = None
+        self._pubsub = None
+        self._lock = None
+        self._tasks = []
+        self._upstream = None
+        self._flush_task = None
+        self._upstream_symbols = set()
+        self._outbox = {}
+        self._outbox_ready = asyncio.Event()
+        self._demand_changed = asyncio.Event()
+        self._quotes_channel = quotes_channel()
+        self._control_channel = f"{_prefix()}:control"
+
+    async def subscribe(self, symbols):
+        await self._connect()
+        self.symbols.update(symbols)
+        await self._announce()
+
+    async def unsubscribe(self, symbols):
+        self.symbols.difference_update(symbols)
+        await self._announce()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis is not None:
+            await self._step_down()
+            await self._redis.delete(self._demand_key(self.worker_id))
+            await self._pubsub.aclose()
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _connect(self):
+        if self._redis is not None:
+            return
+        self._redis = get_async_redis()
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._quotes_channel, self._control_channel)
+        self._lock = RedisLock(self._redis, f"{_prefix()}:leader", settings.MARKET_DATA_LEADER_TTL)
+        self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._heartbeat())]
+
+    def _demand_key(self, worker_id):
+        return f"{_prefix()}:demand:{worker_id}"
+
+    async def _announce(self):
+        """Record this worker's symbols and ask the leader to reconcile its upstream subscriptions."""
+        key = self._demand_key(self.worker_id)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        if self.symbols:
+            pipe.sadd(key, *self.symbols)
+            pipe.pexpire(key, 3 * settings.MARKET_DATA_LEADER_TTL)
+        pipe.publish(self._control_channel, self.worker_id)
+        await pipe.execute()
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception:  # noqa: B902
+                logger.warning("Quote relay lost its Redis subscription, retrying", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            if message["channel"].decode() == self._control_channel:
+                self._demand_changed.set()
+                continue
+            for line in message["data"].decode().split("\n"):
+                symbol, _, tick = line.partition("\t")
+                if symbol in self.symbols:
+                    self.publish(symbol, tick)
+
+    async def _heartbeat(self):
+        interval = settings.MARKET_DATA_LEADER_TTL / 3000
+        while True:
+            try:
+                if self.symbols:
+                    await self._redis.pexpire(self._demand_key(self.worker_id), 3 * settings.MARKET_DATA_LEADER_TTL)
+                if self.is_leader and not await self._lock.renew():
+                    logger.warning("Worker %s lost the market data leadership", self.worker_id)
+                    await self._step_down()
+                elif not self.is_leader and await self._lock.acquire():
+                    await self._step_up()
+                if self.is_leader:
+                    await self._reconcile()
+            except Exception:  # noqa: B902
+                logger.warning("Quote relay heartbeat failed", exc_info=True)
+                # Without Redis this worker cannot prove it still holds the lock; stop publishing.
+                await self._step_down()
+            try:
+                async with asyncio.timeout(interval):
+                    await self._demand_changed.wait()
+            except TimeoutError:
+                pass
+            self._demand_changed.clear()
+
+    async def _step_up(self):
+        logger.info("Worker %s is now the market data leader of %s", self.worker_id, settings.MARKET_DATA_NODE)
+        self.is_leader = True
+        self._upstream = import_string(settings.MARKET_DATA_UPSTREAM_FEED)(self._relay)
+        self._upstream_symbols = set()
+        self._flush_task = asyncio.create_task(self._flush())
+
+    async def _step_down(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        self._flush_task.cancel()
+        upstream, self._upstream = self._upstream, None
+        try:
+            await upstream.close()
+            await self._lock.release()
+        except Exception:  # noqa: B902
+            logger.warning("Could not release the market data leadership cleanly", exc_info=True)
+
+    async def _reconcile(self):
+        """Subscribe the upstream feed to exactly the symbols some worker of the node wants."""
+        keys = [key async for key in self._redis.scan_iter(match=self._demand_key("*"))]
+        wanted = {symbol.decode() for symbol in await self._redis.sunion(keys)} if keys else set()
+        added, removed = wanted - self._upstream_symbols, self._upstream_symbols - wanted
+        if added:
+            await self._upstream.subscribe(sorted(added))
+        if removed:
+            await self._upstream.unsubscribe(sorted(removed))
+        self._upstream_symbols = wanted
+
+    def _relay(self, symbol, tick):
+        # Quotes arriving faster than Redis accepts them are coalesced per symbol like in the hub.
+        self._outbox[symbol] = tick
+        self._outbox_ready.set()
+
+    async def _flush(self):
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            outbox, self._outbox = self._outbox, {}
+            try:
+                await self._redis.publish(self._quotes_channel, encode_batch(outbox))
+            except Exception:  # noqa: B902
+                logger.warning("Could not publish %s quotes", len(outbox), exc_info=True)
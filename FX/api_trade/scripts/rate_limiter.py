@@ -0,0 +1,222 @@
+"""
+Rate limit governor shared by every worker calling Alpaca.
+
+Alpaca limits the requests of each API key per minute and answers ``429`` beyond that; workers calling blindly turn
+a burst into a storm of 429s and retries. Every broker call first takes a token from a bucket kept in Redis, so
+the buckets are shared by all workers of every node. A Lua script refills and takes tokens atomically, using the
+Redis clock. There is one bucket per API (trading, market data) and account, sized by ``ALPACA_RATE_LIMITS``.
+
+Calls have a priority (``ALPACA_RATE_LIMIT_PRIORITIES``): a class may only take a token while the bucket keeps
+its reserve for the classes before it, so orders still go out when reads and background jobs drained the bucket.
+A caller without a token waits for one until its class's deadline, or is shed right away with ``RateLimited`` if
+none will be available by then. When the broker still answers 429 (another client on the same key), the bucket is
+emptied so every worker backs off.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import time
+
+import redis
+from alpaca.common.exceptions import APIError
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_FIELDS = ("granted", "queued", "shed", "wait_ms")
+
+_priority = contextvars.ContextVar("alpaca_rate_limit_priority", default=None)
+
+
+class RateLimited(APIError):
+    """A broker call was shed: no token would have been available before the deadline of its priority."""
+
+    def __init__(self, api, priority, retry_after):
+        message = f"Too many {api} requests to the broker, retry in {retry_after:.1f}s."
+        super().__init__(json.dumps({"message": message}))
+        self.api = api
+        self.priority = priority
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self):
+        return 429
+
+
+@contextlib.contextmanager
+def priority(name):
+    """Run the broker calls made inside the block (or the decorated function) with priority ``name``."""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucketLimiter:
+    """Token buckets in Redis, one per ``(api, key)``, with priority reserves and queueing deadlines.
+
+    ``api`` names an entry of ``ALPACA_RATE_LIMITS`` and ``key`` tells the accounts using it apart. If Redis is
+    unreachable calls are let through, like the market data cache falls back to calling upstream.
+    """
+
+    # KEYS[1]: bucket; ARGV: tokens per second, burst, tokens to leave in the bucket. Returns 0 when a token was
+    # taken, else the milliseconds until one can be.
+    _TAKE = """
+        local now = redis.call('TIME')
+        local now_ms = now[1] * 1000 + math.floor(now[2] / 1000)
+        local rate, burst, reserve = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(state[1]) or burst
+        local ts = tonumber(state[2]) or now_ms
+        tokens = math.min(burst, tokens + math.max(0, now_ms - ts) * rate / 1000)
+        local wait = 0
+        if tokens - 1 >= reserve then
+            tokens = tokens - 1
+        else
+            wait = math.max(1, math.ceil((reserve + 1 - tokens) * 1000 / rate))
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now_ms)
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+        return wait
+    """
+    _DRAIN = """
+        local now = redis.call('TIME')
+        redis.call('HSET', KEYS[1], 'tokens', '0', 'ts', now[1] * 1000 + math.floor(now[2] / 1000))
+        redis.call('PEXPIRE', KEYS[1], ARGV[1])
+        return 1
+    """
+
+    def __init__(self, namespace="alpaca:ratelimit"):
+        self.namespace = namespace
+        self._scripts = None
+
+    def _script(self, name):
+        client = get_redis()
+        if self._scripts is None or self._scripts[0] is not client:
+            self._scripts = (client, client.register_script(self._TAKE), client.register_script(self._DRAIN))
+        return self._scripts[1 if name == "take" else 2]
+
+    @staticmethod
+    def _limits(api):
+        per_minute, burst, _ = settings.ALPACA_RATE_LIMITS[api]
+        return per_minute / 60, burst
+
+    @staticmethod
+    def priority_for(api, name=None):
+        """The priority a call to ``api`` runs with: ``name``, the one set by ``priority``, or the API's default."""
+        return name or _priority.get() or settings.ALPACA_RATE_LIMITS[api][2]
+
+    def _bucket_key(self, api, key):
+        return f"{self.namespace}:{api}:{key}"
+
+    def _stats_key(self, api, name):
+        return f"{self.namespace}:stats:{api}:{name}"
+
+    def _take(self, api, key, name):
+        """Seconds until a token can be taken (0 if one was), or ``None`` if Redis is unavailable."""
+        rate, burst = self._limits(api)
+        reserve = settings.ALPACA_RATE_LIMIT_PRIORITIES[name][0] * burst
+        try:
+            return self._script("take")(keys=[self._bucket_key(api, key)], args=[rate, burst, reserve]) / 1000
+        except redis.RedisError:
+            logger.warning("Rate limiter unavailable, calling the %s API without a token", api)
+            return None
+
+    def _step(self, api, key, name, started, queued):
+        """Try to take a token: ``None`` once the call may proceed, else seconds to wait before trying again.
+
+        ``queued`` tells whether the caller already waited since ``started``.
+        """
+        wait = self._take(api, key, name)
+        if wait is None:
+            return None
+        now = time.monotonic()
+        waited = now - started if queued else None
+        if not wait:
+            self._record(api, name, "granted", waited)
+            return None
+        if now + wait > started + settings.ALPACA_RATE_LIMIT_PRIORITIES[name][1]:
+            self._record(api, name, "shed", waited)
+            raise RateLimited(api, name, wait)
+        return wait
+
+    def acquire(self, api, key, name=None):
+        """Block until a token of ``api`` is taken for ``key``; raise ``RateLimited`` if the call is shed."""
+        if not settings.ALPACA_RATE_LIMIT_ENABLED:
+            return
+        name = self.priority_for(api, name)
+        started, queued = time.monotonic(), False
+        while (wait := self._step(api, key, name, started, queued)) is not None:
+            time.sleep(wait)
+            queued = True
+
+    async def acquire_async(self, api, key, name=None):
+        """``acquire`` for coroutines: waiting for a token only suspends the caller."""
+        if not settings.ALPACA_RATE_LIMIT_ENABLED:
+            return
+        name = self.priority_for(api, name)
+        started, queued = time.monotonic(), False
+        while (wait := await asyncio.to_thread(self._step, api, key, name, started, queued)) is not None:
+            await asyncio.sleep(wait)
+            queued = True
+
+    def try_acquire(self, api, key, name=None):
+        """Take a token of ``api`` for ``key`` if one is available right now; return whether one was taken."""
+        if not settings.ALPACA_RATE_LIMIT_ENABLED:
+            return True
+        name = self.priority_for(api, name)
+        wait = self._take(api, key, name)
+        if wait:
+            return False
+        if wait is not None:
+            self._record(api, name, "granted", None)
+        return True
+
+    def throttled(self, api, key):
+        """The broker answered 429 anyway: empty the bucket so every worker waits for it to refill."""
+        if not settings.ALPACA_RATE_LIMIT_ENABLED:
+            return
+        rate, burst = self._limits(api)
+        try:
+            self._script("drain")(keys=[self._bucket_key(api, key)], args=[int(burst * 1000 / rate) + 1000])
+            get_redis().hincrby(self._stats_key(api, "upstream"), "throttled", 1)
+        except redis.RedisError:
+            logger.debug("Could not record a 429 of the %s API", api, exc_info=True)
+
+    def _record(self, api, name, outcome, waited):
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hincrby(self._stats_key(api, name), outcome, 1)
+            if waited is not None:
+                pipe.hincrby(self._stats_key(api, name), "queued", 1)
+                pipe.hincrby(self._stats_key(api, name), "wait_ms", round(waited * 1000))
+            pipe.execute()
+        except redis.RedisError:
+            logger.debug("Could not record rate limiter %s for %s", outcome, api, exc_info=True)
+
+    def stats(self):
+        """Per API: 429s still received, and per priority the calls granted, queued, shed and their wait time."""
+        apis, names = list(settings.ALPACA_RATE_LIMITS), list(settings.ALPACA_RATE_LIMIT_PRIORITIES)
+        pipe = get_redis().pipeline(transaction=False)
+        for api in apis:
+            pipe.hget(self._stats_key(api, "upstream"), "throttled")
+            for name in names:
+                pipe.hmget(self._stats_key(api, name), STATS_FIELDS)
+        values = iter(pipe.execute())
+        stats = {}
+        for api in apis:
+            stats[api] = {"throttled": int(next(values) or 0), "priorities": {}}
+            for name in names:
+                counts = dict(zip(STATS_FIELDS, (int(value or 0) for value in next(values))))
+                counts["mean_wait_ms"] = counts["wait_ms"] / counts["queued"] if counts["queued"] else 0.0
+                stats[api]["priorities"][name] = counts
+        return stats
+
+
+rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,79 @@
+"""
+Direct Redis access for features the Django cache API does not cover (pub/sub, locks, scripts).
+"""
+
+import uuid
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_client = None
+
+
+def _connection_kwargs():
+    return {
+        "host": settings.REDIS_HOST,
+        "port": int(settings.REDIS_PORT or 6379),
+        "db": int(settings.REDIS_DATABASE or 0),
+        "password": settings.REDIS_PASSWORD or None,
+        "max_connections": int(settings.REDIS_POOL_MAX_CONNECTIONS or 50),
+    }
+
+
+def get_redis():
+    """Return the process-wide synchronous Redis client."""
+    global _client
+    if _client is None:
+        _client = redis.Redis(**_connection_kwargs())
+    return _client
+
+
+def get_async_redis():
+    """Return a new asyncio Redis client; it is bound to the event loop that first uses it."""
+    return redis.asyncio.Redis(**_connection_kwargs())
+
+
+def reset():
+    """Drop the synchronous client so a forked worker opens its own connections."""
+    global _client
+    _client = None
+
+
+class RedisLock:
+    """Expiring lock owned by a random token, for leader election.
+
+    The holder must ``renew`` it more often than ``ttl_ms``; if it stops (crash, network partition) the lock
+    expires and another process can acquire it.
+    """
+
+    _RENEW = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('pexpire', KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+    _RELEASE = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, client, key, ttl_ms):
+        self.client = client
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self.token = uuid.uuid4().hex
+
+    async def acquire(self):
+        """Take the lock if it is free; return whether this instance holds it."""
+        return bool(await self.client.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def renew(self):
+        """Extend the lock; return False if it expired or was taken by someone else."""
+        return bool(await self.client.eval(self._RENEW, 1, self.key, self.token, self.ttl_ms))
+
+    async def release(self):
+        """Give the lock up if this instance still holds it."""
+        await self.client.eval(self._RELEASE, 1, self.key, self.token)
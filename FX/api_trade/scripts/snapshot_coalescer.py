@@ -0,0 +1,95 @@
+"""
+Request coalescing for multi-symbol crypto snapshots.
+
+A watchlist page asks for the snapshots of its symbols, and many pages ask at once. ``SnapshotCoalescer`` merges
+the symbol sets of all callers arriving within a short window into one upstream ``get_crypto_snapshot`` request,
+then hands every caller the snapshots it asked for. The first caller of a window waits for the window to close
+and makes the request; the others wait for its result. A process therefore makes at most one upstream request per
+window, however many clients are polling.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .alpaca_integration import AlpacaIntegrationDataHistorical
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_crypto_snapshots(symbols):
+    """One upstream snapshot request for ``symbols``, through the market data cache."""
+    return AlpacaIntegrationDataHistorical(symbols=symbols).get_crypto_snapshot()
+
+
+class _Batch:
+    def __init__(self):
+        self.symbols = set()
+        self.callers = 0
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SnapshotCoalescer:
+    """Merge concurrent snapshot requests made within ``window`` seconds into one call of ``fetch``.
+
+    ``fetch`` takes a sorted list of symbols and returns ``{symbol: snapshot}``. A batch is closed early when it
+    reaches ``max_symbols``; callers arriving later start the next one.
+    """
+
+    def __init__(self, fetch=fetch_crypto_snapshots, window=None, max_symbols=None):
+        self.fetch = fetch
+        self.window = window
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._batch = None
+        self.requests = 0
+        self.upstream_calls = 0
+
+    def get(self, symbols):
+        """``{symbol: snapshot or None}`` for ``symbols``, from a request shared with concurrent callers."""
+        window = self.window if self.window is not None else settings.ALPACA_SNAPSHOT_COALESCE_WINDOW
+        max_symbols = self.max_symbols or settings.ALPACA_SNAPSHOT_BATCH_MAX_SYMBOLS
+        symbols = set(symbols)
+        with self._lock:
+            self.requests += 1
+            batch = self._batch
+            leader = batch is None or len(batch.symbols | symbols) > max_symbols
+            if leader:
+                batch = self._batch = _Batch()
+            batch.symbols |= symbols
+            batch.callers += 1
+
+        if leader:
+            self._run(batch, window)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return {symbol: batch.result.get(symbol) for symbol in symbols}
+
+    def _run(self, batch, window):
+        try:
+            time.sleep(window)
+            with self._lock:
+                # Close the batch: callers from now on start the next window.
+                if self._batch is batch:
+                    self._batch = None
+                self.upstream_calls += 1
+            logger.debug("Fetching %s snapshots for %s callers", len(batch.symbols), batch.callers)
+            batch.result = self.fetch(sorted(batch.symbols))
+        except Exception as error:  # noqa: B902
+            # Every caller of the batch gets the error, not only the one that made the request.
+            batch.error = error
+        finally:
+            batch.done.set()
+
+    def stats(self):
+        """Snapshot requests received and upstream calls made by this process."""
+        return {"requests": self.requests, "upstream_calls": self.upstream_calls}
+
+
+snapshot_coalescer = SnapshotCoalescer()
@@ -0,0 +1,238 @@
+"""
+Watchlists stored locally and copied to the broker behind the scenes.
+
+Reads never reach the broker: watchlists and their symbols are indexed rows. Every change records a
+``WatchlistSyncTask`` in the same transaction (a transactional outbox), and the ``sync_watchlists`` worker sends the
+watchlist's current state to the broker later, so a burst of edits costs one broker call. Failed calls are retried
+with exponential backoff.
+
+Quotes for a watchlist are fetched with one latest-quote request per asset class for all of its symbols, through
+the market data cache.
+"""
+
+import logging
+from datetime import timedelta
+
+from alpaca.common.exceptions import APIError
+from alpaca.data.requests import CryptoLatestQuoteRequest, StockLatestQuoteRequest
+from django.db import transaction
+from django.db.models import Max, Prefetch, Q
+from django.utils import timezone
+
+from ..models import Watchlist, WatchlistItem, WatchlistSyncTask
+from .alpaca_clients import registry
+from .alpaca_integration import AlpacaIntegrationAssets
+from .asset_catalog import get_asset_index
+from .market_data_cache import market_data_cache
+from .rate_limiter import priority
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker may spend on a claimed task before another worker may take it over.
+CLAIM_SECONDS = 60
+MAX_BACKOFF_SECONDS = 3600
+
+
+def user_watchlists(user):
+    """The user's watchlists with their symbols, newest first, in two queries."""
+    return (
+        Watchlist.objects.filter(user=user)
+        .prefetch_related(Prefetch("items", queryset=WatchlistItem.objects.order_by("position")))
+        .order_by("-created_at")
+    )
+
+
+def watchlist_symbols(watchlist):
+    return [item.symbol for item in watchlist.items.all()]
+
+
+def enqueue_sync(watchlist, action=WatchlistSyncTask.UPSERT):
+    """Queue a sync of ``watchlist`` to the broker; call it in the transaction making the change."""
+    WatchlistSyncTask.objects.bulk_create(
+        [
+            WatchlistSyncTask(
+                watchlist_id=watchlist.pk,
+                action=action,
+                broker_id=watchlist.broker_id,
+                next_attempt_at=timezone.now(),
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["watchlist_id"],
+        update_fields=["action", "broker_id", "token", "attempts", "next_attempt_at", "last_error"],
+    )
+
+
+@transaction.atomic
+def create_watchlist(user, name, symbols=()):
+    watchlist = Watchlist.objects.create(user=user, name=name)
+    WatchlistItem.objects.bulk_create(
+        WatchlistItem(watchlist=watchlist, symbol=symbol, position=position) for position, symbol in enumerate(symbols)
+    )
+    enqueue_sync(watchlist)
+    return watchlist
+
+
+@transaction.atomic
+def update_watchlist(watchlist, name=None, symbols=None):
+    """Rename a watchlist and/or replace its symbols."""
+    if name is not None:
+        watchlist.name = name
+    watchlist.save()
+    if symbols is not None:
+        watchlist.items.exclude(symbol__in=symbols).delete()
+        WatchlistItem.objects.bulk_create(
+            [
+                WatchlistItem(watchlist=watchlist, symbol=symbol, position=position)
+                for position, symbol in enumerate(symbols)
+            ],
+            update_conflicts=True,
+            unique_fields=["watchlist", "symbol"],
+            update_fields=["position"],
+        )
+    enqueue_sync(watchlist)
+    return watchlist
+
+
+@transaction.atomic
+def add_symbol(watchlist, symbol):
+    """Append a symbol to a watchlist; adding one it already has changes nothing."""
+    watchlist = Watchlist.objects.select_for_update().get(pk=watchlist.pk)
+    if not watchlist.items.filter(symbol=symbol).exists():
+        last = watchlist.items.aggregate(last=Max("position"))["last"]
+        WatchlistItem.objects.create(watchlist=watchlist, symbol=symbol, position=0 if last is None else last + 1)
+        watchlist.save(update_fields=["updated_at"])
+        enqueue_sync(watchlist)
+    return watchlist
+
+
+@transaction.atomic
+def remove_symbol(watchlist, symbol):
+    """Remove a symbol from a watchlist; return whether it was on it."""
+    removed, _ = watchlist.items.filter(symbol=symbol).delete()
+    if removed:
+        watchlist.save(update_fields=["updated_at"])
+        enqueue_sync(watchlist)
+    return bool(removed)
+
+
+@transaction.atomic
+def delete_watchlist(watchlist):
+    enqueue_sync(watchlist, WatchlistSyncTask.DELETE)
+    watchlist.delete()
+
+
+def broker_name(watchlist):
+    """Name of the broker's copy; all users share one broker account, whose watchlist names must be unique."""
+    return f"{watchlist.name[:50]} {watchlist.pk.hex[:12]}"
+
+
+def _claim(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            WatchlistSyncTask.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by("next_attempt_at")[:limit]
+        )
+        WatchlistSyncTask.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            claimed_until=now + timedelta(seconds=CLAIM_SECONDS)
+        )
+    return tasks
+
+
+def _push(task, integration):
+    """Bring the broker's copy of one watchlist up to date."""
+    if task.action == WatchlistSyncTask.DELETE:
+        if task.broker_id is not None:
+            try:
+                integration.delete_watchlist_by_id(task.broker_id)
+            except APIError as error:
+                if error.status_code != 404:
+                    raise
+        return
+
+    watchlist = Watchlist.objects.filter(pk=task.watchlist_id).prefetch_related("items").first()
+    if watchlist is None:
+        # Deleted since; its delete task replaces this one.
+        return
+    name, symbols = broker_name(watchlist), watchlist_symbols(watchlist)
+    if watchlist.broker_id is not None:
+        try:
+            integration.update_watchlist_by_id(watchlist.broker_id, name=name, symbols=symbols)
+            return
+        except APIError as error:
+            if error.status_code != 404:
+                raise
+            logger.warning("Watchlist %s is gone from the broker, creating it again", watchlist.pk)
+    created = integration.create_watchlist(name, symbols)
+    Watchlist.objects.filter(pk=watchlist.pk).update(broker_id=created.id)
+    # A delete queued meanwhile must remove the copy just created.
+    WatchlistSyncTask.objects.filter(watchlist_id=watchlist.pk, broker_id__isnull=True).update(broker_id=created.id)
+
+
+@priority("background")
+def sync_watchlists(limit=100, integration=None):
+    """Push up to ``limit`` due watchlist changes to the broker; returns ``(synced, failed)``."""
+    integration = integration or AlpacaIntegrationAssets()
+    synced = failed = 0
+    for task in _claim(limit):
+        try:
+            _push(task, integration)
+        except APIError as error:
+            failed += 1
+            backoff = min(2**task.attempts, MAX_BACKOFF_SECONDS)
+            logger.warning("Could not sync watchlist %s (attempt %s): %s", task.watchlist_id, task.attempts + 1, error)
+            # A task replaced meanwhile holds a newer change, which is due right away.
+            retried = WatchlistSyncTask.objects.filter(pk=task.pk, token=task.token).update(
+                attempts=task.attempts + 1,
+                next_attempt_at=timezone.now() + timedelta(seconds=backoff),
+                claimed_until=None,
+                last_error=f"{error}",
+            )
+            if not retried:
+                WatchlistSyncTask.objects.filter(pk=task.pk).update(claimed_until=None)
+            continue
+        synced += 1
+        # Delete the task unless a newer change replaced it while the broker call ran.
+        if not WatchlistSyncTask.objects.filter(pk=task.pk, token=task.token).delete()[0]:
+            WatchlistSyncTask.objects.filter(pk=task.pk).update(claimed_until=None)
+    return synced, failed
+
+
+def _quote_fields(quote):
+    return {
+        "bid_price": quote.bid_price,
+        "bid_size": quote.bid_size,
+        "ask_price": quote.ask_price,
+        "ask_size": quote.ask_size,
+        "timestamp": quote.timestamp,
+    }
+
+
+def latest_quotes(symbols):
+    """Latest quote of every symbol (``None`` if there is none), with one request per asset class."""
+    index = get_asset_index()
+    crypto, stocks = [], []
+    for symbol in sorted(set(symbols)):
+        asset = index.get(symbol)
+        is_crypto = asset["asset_class"] == "crypto" if asset is not None else "/" in symbol
+        (crypto if is_crypto else stocks).append(symbol)
+
+    quotes = {}
+    if crypto:
+        params = CryptoLatestQuoteRequest(symbol_or_symbols=crypto)
+        quotes.update(
+            market_data_cache.get_or_fetch(
+                "crypto_latest_quote", params, lambda: registry.get_crypto_data_client().get_crypto_latest_quote(params)
+            )
+        )
+    if stocks:
+        params = StockLatestQuoteRequest(symbol_or_symbols=stocks)
+        quotes.update(
+            market_data_cache.get_or_fetch(
+                "stock_latest_quote", params, lambda: registry.get_stock_data_client().get_stock_latest_quote(params)
+            )
+        )
+    return {symbol: _quote_fields(quotes[symbol]) if symbol in quotes else None for symbol in symbols}
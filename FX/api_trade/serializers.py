@@ -1,11 +1,253 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
+from .models import BrokerOrder, DailyPortfolioSummary, Watchlist
+from .scripts.asset_catalog import get_asset_index
+from .scripts.bar_store import TIMEFRAMES
+from .scripts.indicators import INDICATORS
+from .scripts.watchlists import create_watchlist, update_watchlist
+
 
 # Serializer
 class CryptoBarsSerializer(serializers.Serializer):
-    symbol = serializers.CharField(required=True)
-    timeframe = serializers.CharField()
-    start = serializers.DateField()
+    """Crypto bars query parameters.
+
+    Attributes:
+    symbols (List[str]): Symbols to return, repeated (``symbols=BTC/USD&symbols=ETH/USD``) or comma separated.
+    timeframe (str): Bar size, e.g. ``1Min`` or ``1Day``.
+    start (Optional[datetime]): Inclusive start of the window. Defaults to ``limit`` bars before ``end``.
+    end (Optional[datetime]): Exclusive end of the window. Defaults to now.
+    limit (int): Maximum number of bars in one page.
+    cursor (Optional[str]): Opaque position returned as ``next`` by the previous page.
+    """
+
+    symbols = serializers.ListField(
+        child=serializers.CharField(max_length=25),
+        default=lambda: ["BTC/USD", "ETH/USD"],
+    )
+    timeframe = serializers.ChoiceField(choices=list(TIMEFRAMES), default="1Day")
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=10000, default=1000)
+    cursor = serializers.CharField(required=False)
+
+    def validate_symbols(self, value):
+        symbols = []
+        for item in value:
+            for symbol in item.split(","):
+                symbol = symbol.strip().upper()
+                if symbol and symbol not in symbols:
+                    symbols.append(symbol)
+        if not symbols:
+            raise serializers.ValidationError("At least one symbol is required.")
+        return symbols
+
+    def validate(self, attrs):
+        attrs["end"] = min(attrs.get("end") or timezone.now(), timezone.now())
+        if "start" not in attrs:
+            attrs["start"] = attrs["end"] - TIMEFRAMES[attrs["timeframe"]][1] * attrs["limit"]
+        if attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"start": ["start must be before end."]})
+        return attrs
+
+
+class IndicatorsSerializer(CryptoBarsSerializer):
+    """Indicators query parameters.
+
+    Attributes:
+    indicators (List[str]): ``name[:param[:param]]`` specs, e.g. ``sma:50``, ``rsi``, ``vwap``, ``bollinger:20:2``.
+        The first parameter is the period in bars.
+    """
+
+    cursor = None
+    indicators = serializers.ListField(child=serializers.CharField(max_length=50), default=lambda: ["sma"])
+
+    def validate_indicators(self, value):
+        specs = []
+        for item in value:
+            for spec in item.split(","):
+                name, *params = spec.strip().lower().split(":")
+                if name not in INDICATORS:
+                    raise serializers.ValidationError(
+                        f"Unknown indicator '{name}'. Choose from {', '.join(sorted(INDICATORS))}."
+                    )
+                try:
+                    params = [float(param) for param in params] or list(INDICATORS[name].defaults)
+                except ValueError as e:
+                    raise serializers.ValidationError(f"Invalid parameters for '{spec}'.") from e
+                if params and (not float(params[0]).is_integer() or not 1 <= params[0] <= 1000):
+                    raise serializers.ValidationError(f"The period of '{spec}' must be a whole number of bars.")
+                if params:
+                    params[0] = int(params[0])
+                specs.append((name, tuple(params)))
+        return specs
+
+
+class EquityCurveSerializer(serializers.Serializer):
+    """Equity curve query parameters.
+
+    Attributes:
+    timeframe (str): Spacing of the curve points, e.g. ``5Min`` for an intraday curve or ``1Day``.
+    start (Optional[datetime]): Start of the curve. Defaults to midnight UTC for intraday timeframes, a year ago otherwise.
+    end (Optional[datetime]): End of the curve. Defaults to now.
+    """  # noqa
+
+    max_points = 10000
+
+    timeframe = serializers.ChoiceField(choices=list(TIMEFRAMES), default="1Day")
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        attrs["end"] = min(attrs.get("end") or timezone.now(), timezone.now())
+        duration = TIMEFRAMES[attrs["timeframe"]][1]
+        if "start" not in attrs:
+            if duration < timedelta(days=1):
+                attrs["start"] = attrs["end"].replace(hour=0, minute=0, second=0, microsecond=0)
+            else:
+                attrs["start"] = attrs["end"] - timedelta(days=365)
+        if attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"start": ["start must be before end."]})
+        if (attrs["end"] - attrs["start"]) / duration > self.max_points:
+            raise serializers.ValidationError(
+                {"start": [f"The window holds more than {self.max_points} {attrs['timeframe']} points."]}
+            )
+        return attrs
+
+
+class SnapshotsSerializer(serializers.Serializer):
+    """Snapshot query parameters.
+
+    Attributes:
+    symbols (List[str]): Crypto pairs, repeated or comma separated.
+    """
+
+    max_symbols = 100
+
+    symbols = serializers.ListField(child=serializers.CharField(max_length=25), allow_empty=False)
+
+    def validate_symbols(self, value):
+        symbols = CryptoBarsSerializer().validate_symbols(value)
+        if len(symbols) > self.max_symbols:
+            raise serializers.ValidationError(f"At most {self.max_symbols} symbols per request.")
+        return symbols
+
+
+class DailySummaryQuerySerializer(serializers.Serializer):
+    """Daily summary query parameters.
+
+    Attributes:
+    start (Optional[date]): First day. Defaults to 90 days before ``end``.
+    end (Optional[date]): Last day, inclusive. Defaults to today (UTC).
+    """
+
+    max_days = 3660
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault("end", timezone.now().date())
+        attrs.setdefault("start", attrs["end"] - timedelta(days=90))
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError({"start": ["start must not be after end."]})
+        if (attrs["end"] - attrs["start"]).days >= self.max_days:
+            raise serializers.ValidationError({"start": [f"The window is longer than {self.max_days} days."]})
+        return attrs
+
+
+class DailyPortfolioSummarySerializer(serializers.ModelSerializer):
+    """One day of a user's portfolio."""
+
+    class Meta:
+        model = DailyPortfolioSummary
+        fields = ["date", "equity", "pnl", "realized_pl", "turnover", "fees", "fill_count"]
+
+
+class AssetSearchSerializer(serializers.Serializer):
+    """Asset search query parameters.
+
+    Attributes:
+    q (str): Start of a symbol or name word; close spellings match too unless ``fuzzy`` is off.
+    asset_class (Optional[str]): Only assets of this class, e.g. ``us_equity`` or ``crypto``.
+    exchange (Optional[str]): Only assets listed on this exchange, e.g. ``NASDAQ``.
+    tradable (Optional[bool]): Only assets that can (or cannot) be traded.
+    limit (int): Maximum number of assets.
+    """
+
+    q = serializers.CharField(default="", allow_blank=True, max_length=100, trim_whitespace=False)
+    asset_class = serializers.CharField(required=False, max_length=20)
+    exchange = serializers.CharField(required=False, max_length=20)
+    tradable = serializers.BooleanField(required=False, allow_null=True, default=None)
+    fuzzy = serializers.BooleanField(default=True)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate_exchange(self, value):
+        return value.upper()
+
+
+class WatchlistSerializer(serializers.ModelSerializer):
+    """A watchlist and its symbols, in the order they were added.
+
+    Attributes:
+    name (str): Unique among the user's watchlists.
+    symbols (List[str]): Listed asset symbols; duplicates are dropped.
+    """
+
+    max_symbols = 200
+
+    symbols = serializers.ListField(child=serializers.CharField(max_length=25), required=False)
+
+    class Meta:
+        model = Watchlist
+        fields = ["id", "name", "symbols", "created_at", "updated_at"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["symbols"] = [item.symbol for item in instance.items.all()]
+        return data
+
+    def validate_name(self, value):
+        watchlists = Watchlist.objects.filter(user=self.context["request"].user, name=value)
+        if self.instance is not None:
+            watchlists = watchlists.exclude(pk=self.instance.pk)
+        if watchlists.exists():
+            raise serializers.ValidationError("You already have a watchlist with this name.")
+        return value
+
+    def validate_symbols(self, value):
+        symbols = list(dict.fromkeys(validate_symbol(symbol) for symbol in value))
+        if len(symbols) > self.max_symbols:
+            raise serializers.ValidationError(f"A watchlist holds at most {self.max_symbols} symbols.")
+        return symbols
+
+    def create(self, validated_data):
+        return create_watchlist(self.context["request"].user, validated_data["name"], validated_data.get("symbols", []))
+
+    def update(self, instance, validated_data):
+        return update_watchlist(instance, validated_data.get("name"), validated_data.get("symbols"))
+
+
+class WatchlistSymbolSerializer(serializers.Serializer):
+    """A symbol to add to a watchlist."""
+
+    symbol = serializers.CharField(max_length=25)
+
+    def validate_symbol(self, value):
+        return validate_symbol(value)
+
+
+def validate_symbol(value):
+    """Upper-case a symbol and check it is in the asset catalog (when the catalog was synced)."""
+    index = get_asset_index()
+    if not len(index):
+        return value.strip().upper()
+    asset = index.get(value.strip())
+    if asset is None:
+        raise serializers.ValidationError(f"Unknown asset {value}.")
+    return asset["symbol"]
 
 
 class OrderSerializer(serializers.Serializer):
@@ -66,6 +308,31 @@ class OrderSerializer(serializers.Serializer):
     limit_price = serializers.FloatField(required=False)
 
 
+class OrderListSerializer(serializers.Serializer):
+    """Order list query parameters.
+
+    Attributes:
+    status (str): ``open``, ``closed``, ``all`` or a single order status such as ``filled``.
+    symbols (List[str]): Only orders for these symbols, repeated or comma separated.
+    limit (int): Maximum number of orders, newest first.
+    """
+
+    status = serializers.CharField(default="closed", max_length=25)
+    symbols = serializers.ListField(child=serializers.CharField(max_length=25), required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=100)
+
+    def validate_symbols(self, value):
+        return [symbol.strip().upper() for item in value for symbol in item.split(",") if symbol.strip()]
+
+
+class BrokerOrderSerializer(serializers.ModelSerializer):
+    """Mirrored broker order."""
+
+    class Meta:
+        model = BrokerOrder
+        exclude = ["user"]
+
+
 class OrderIdSerializer(serializers.Serializer):
     """Order ID serializer.
 
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ..scripts.alpaca_clients import AlpacaClientRegistry
+from ..scripts.local_alpaca_stub import LocalAlpacaStub
+
+
+class AlpacaClientRegistryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub().start()
+        self.addCleanup(self.stub.stop)
+        self.registry = AlpacaClientRegistry()
+        self.addCleanup(self.registry.reset)
+
+    def get_client(self, **kwargs):
+        params = {"api_key": "key", "secret_key": "secret", "url_override": self.stub.url}
+        params.update(kwargs)
+        return self.registry.get_trading_client(**params)
+
+    def test_same_credentials_share_client(self):
+        """Test the same credentials and mode return the same client."""
+        self.assertIs(self.get_client(), self.get_client())
+
+    def test_mode_and_credentials_are_part_of_the_key(self):
+        """Test paper/live mode and credentials get separate clients."""
+        client = self.get_client()
+
+        self.assertIsNot(client, self.get_client(paper=False))
+        self.assertIsNot(client, self.get_client(api_key="other-key"))
+        self.assertEqual(len(self.registry), 3)
+
+    def test_connections_are_reused(self):
+        """Test consecutive calls reuse one keep-alive connection."""
+        for _ in range(5):
+            self.get_client().get_clock()
+
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(len(self.stub.requests), 5)
+
+    @override_settings(ALPACA_HTTP_POOL_CONNECTIONS=2, ALPACA_HTTP_POOL_MAXSIZE=25)
+    def test_pool_size_settings(self):
+        """Test the mounted adapter uses the configured pool size."""
+        adapter = self.get_client()._session.get_adapter("https://api.alpaca.markets")
+
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 25)
+
+    @override_settings(ALPACA_CLIENT_MAX_IDLE=10)
+    def test_idle_client_is_rebuilt(self):
+        """Test a client idle for longer than the limit is replaced."""
+        client = self.get_client()
+
+        with mock.patch("api_trade.scripts.alpaca_clients.time.monotonic", return_value=10**9):
+            self.assertIsNot(client, self.get_client())
+
+    def test_check_health_evicts_failing_clients(self):
+        """Test clients that fail the health check are evicted."""
+        healthy = self.get_client()
+        broken = self.get_client(url_override="http://127.0.0.1:1")
+
+        results = self.registry.check_health()
+
+        self.assertEqual(sorted(results.values()), [False, True])
+        self.assertIs(self.get_client(), healthy)
+        self.assertIsNot(self.get_client(url_override="http://127.0.0.1:1"), broken)
+
+    def test_reset_drops_clients(self):
+        """Test reset empties the registry."""
+        client = self.get_client()
+
+        self.registry.reset()
+
+        self.assertEqual(len(self.registry), 0)
+        self.assertIsNot(client, self.get_client())
@@ -1,18 +1,151 @@
-from django.test import TestCase
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import msgpack
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, TestCase
 from rest_framework import status
-from rest_framework.test import APIRequestFactory
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 
+from ..renderers import pyarrow
 from ..views.alpaca_historical import get_crypto_bars
+from .test_bar_store import FakeDataClient
+
+BARS_URL = "/api/alpaca/"
 
 
 class AlpacaHistoricalTestCase(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data_client = FakeDataClient()
+        patcher = mock.patch(
+            "api_trade.scripts.bar_store.registry.get_crypto_data_client", return_value=self.data_client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_get_crypto_bars(self):
-        pass
-        request = self.factory.get("/api/alpaca/")
+        request = self.factory.get(BARS_URL)
+        force_authenticate(request, self.user)
         response = get_crypto_bars(request)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        # Add more assertions to validate the response data if needed
+        self.assertEqual(set(response.data["data"]), {"BTC/USD", "ETH/USD"})
+
+    def test_parameters(self):
+        """Test symbols, timeframe and window select the bars returned."""
+        res = self.client.get(
+            BARS_URL,
+            {"symbols": "btc/usd", "timeframe": "1Day", "start": "2024-02-01", "end": "2024-02-11"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data["data"]), ["BTC/USD"])
+        self.assertEqual(len(res.data["data"]["BTC/USD"]), 10)
+        self.assertIsNone(res.data["next"])
+        self.assertEqual(self.data_client.requests[0].symbol_or_symbols, ["BTC/USD"])
+
+    def test_invalid_parameters(self):
+        """Test unknown timeframes and inverted windows are rejected."""
+        res = self.client.get(BARS_URL, {"timeframe": "2Day"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(BARS_URL, {"start": "2024-02-11", "end": "2024-02-01"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(BARS_URL, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        """Test following ``next`` walks every bar exactly once."""
+        params = {"symbols": ["BTC/USD", "ETH/USD"], "start": "2024-02-01", "end": "2024-02-11", "limit": 3}
+        res = self.client.get(BARS_URL, params)
+
+        seen = []
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            for symbol, bars in res.data["data"].items():
+                seen.extend((symbol, bar["timestamp"]) for bar in bars)
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(len(seen), 20)
+        self.assertEqual(len(set(seen)), 20)
+
+    def test_ndjson_stream(self):
+        """Test the streaming mode returns one JSON document per bar."""
+        start = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        end = start + timedelta(days=10)
+        res = self.client.get(
+            BARS_URL,
+            {"symbols": "BTC/USD,ETH/USD", "start": start.isoformat(), "end": end.isoformat(), "format": "ndjson"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(res.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), 20)
+        self.assertEqual(lines[0]["symbol"], "BTC/USD")
+        self.assertEqual(lines[1]["symbol"], "ETH/USD")
+
+    def test_ndjson_stream_under_asgi(self):
+        """Test an ASGI request gets an async stream that reads the bars only as it is consumed."""
+        request = AsyncRequestFactory().get(
+            BARS_URL, {"symbols": "BTC/USD", "start": "2024-02-01", "end": "2024-02-11", "format": "ndjson"}
+        )
+        force_authenticate(request, self.user)
+        res = get_crypto_bars(request)
+
+        self.assertTrue(res.is_async)
+        self.assertEqual(self.data_client.requests, [])
+
+        async def read(content):
+            return b"".join([chunk async for chunk in content])
+
+        lines = async_to_sync(read)(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])["symbol"], "BTC/USD")
+
+    def test_columnar_format(self):
+        """Test the columnar format returns typed arrays per symbol."""
+        params = {"symbols": "BTC/USD,ETH/USD", "start": "2024-02-01", "end": "2024-02-11", "format": "columnar"}
+        res = self.client.get(BARS_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/vnd.fx.columnar+msgpack")
+        payload = msgpack.unpackb(res.content)
+        close = payload["data"]["BTC/USD"]["close"]
+        timestamps = payload["data"]["BTC/USD"]["timestamp"]
+        self.assertEqual(close["dtype"], "<f8")
+        np.testing.assert_array_equal(np.frombuffer(close["data"], dtype=close["dtype"]), [1.5] * 10)
+        self.assertEqual(
+            np.frombuffer(timestamps["data"], dtype=timestamps["dtype"])[0],
+            datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp() * 1000,
+        )
+
+    def test_columnar_format_errors(self):
+        """Test validation errors are still readable in the columnar format."""
+        res = self.client.get(BARS_URL, {"timeframe": "2Day", "format": "columnar"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("timeframe", msgpack.unpackb(res.content))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_format(self):
+        """Test the Arrow format returns one record batch with a symbol column."""
+        params = {"symbols": "BTC/USD,ETH/USD", "start": "2024-02-01", "end": "2024-02-11", "format": "arrow"}
+        res = self.client.get(BARS_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        table = pyarrow.ipc.open_stream(res.content).read_all()
+        self.assertEqual(table.num_rows, 20)
+        self.assertEqual(table.schema.metadata[b"next"], b"null")
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import BrokerOrder
+from ..scripts.alpaca_async import AsyncAlpacaIntegrationOrders, AsyncTradingClient
+from ..scripts.local_alpaca_stub import ORDER_RESPONSE, LocalAlpacaStub
+
+ORDERS_URL = "/api/alpaca/orders/"
+BATCH_URL = "/api/alpaca/orders/batch/"
+ORDER_ID = ORDER_RESPONSE["id"]
+
+
+def stub_routes():
+    return {
+        ("GET", "/orders"): [ORDER_RESPONSE],
+        ("POST", "/orders"): ORDER_RESPONSE,
+        ("GET", f"/orders/{ORDER_ID}"): ORDER_RESPONSE,
+        ("DELETE", f"/orders/{ORDER_ID}"): (204, ""),
+        ("DELETE", "/orders"): [{"id": ORDER_ID, "status": 200}],
+    }
+
+
+# These tests time concurrent broker calls; the rate limit governor is tested on its own.
+@override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+class AsyncAlpacaIntegrationOrdersTestCase(SimpleTestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub(stub_routes(), latency=0.2).start()
+        self.addCleanup(self.stub.stop)
+
+    async def test_orders_in_flight_concurrently(self):
+        """Test many order submissions wait on the broker at the same time instead of one after another."""
+        orders = AsyncAlpacaIntegrationOrders(url_override=self.stub.url)
+        data = {"symbol": "btc/usd", "qty": 1, "side": "buy", "time_in_force": "gtc"}
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(orders.place_order(data) for _ in range(50)))
+
+        self.assertLess(time.monotonic() - started, 50 * 0.2 / 5)
+        self.assertEqual({str(result.id) for result in results}, {ORDER_ID})
+        self.assertEqual(len(self.stub.requests), 50)
+        await orders.trading_client.aclose()
+
+
+class AlpacaOrdersApiTestCase(TestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub(stub_routes()).start()
+        self.addCleanup(self.stub.stop)
+        url = self.stub.url
+        patcher = mock.patch(
+            "api_trade.scripts.alpaca_async.get_async_trading_client",
+            side_effect=lambda **kwargs: AsyncTradingClient("key", "secret", url_override=url),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_authentication_required(self):
+        """Test the async views still enforce DRF authentication."""
+        res = APIClient().get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_create_market_order(self):
+        """Test a market order is validated and submitted to the broker."""
+        payload = {"symbol": "btc/usd", "qty": 1, "side": "buy", "time_in_force": "gtc"}
+
+        res = self.client.post(ORDERS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stub.requests[-1], ("POST", "/v2/orders"))
+        self.assertEqual(BrokerOrder.objects.get(pk=ORDER_ID).user.email, "user@example.com")
+
+    def test_create_invalid_order(self):
+        """Test invalid payloads are rejected before reaching the broker."""
+        res = self.client.post(ORDERS_URL, {"symbol": "BTC/USD", "side": "hold"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_retrieve_and_cancel(self):
+        """Test unknown orders are fetched from the broker and cancels reach the matching broker routes."""
+        self.assertEqual(self.client.get(f"{ORDERS_URL}detail/{ORDER_ID}/").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f"{ORDERS_URL}detail/{ORDER_ID}/").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stub.requests, [("GET", f"/v2/orders/{ORDER_ID}")])
+        res = self.client.delete(f"{ORDERS_URL}detail/{ORDER_ID}/")
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(ORDERS_URL).status_code, status.HTTP_200_OK)
+
+    def test_broker_errors(self):
+        """Test invalid ids and broker errors are returned with a matching status."""
+        res = self.client.get(f"{ORDERS_URL}detail/not-a-uuid/")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.stub.routes[("POST", "/orders")] = (403, {"code": 40310000, "message": "insufficient balance"})
+        payload = {"symbol": "BTC/USD", "qty": 1, "side": "buy", "time_in_force": "gtc"}
+        res = self.client.post(ORDERS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(res.data, {"error": "insufficient balance"})
+
+    def test_broker_unreachable(self):
+        """Test connection failures are reported as a bad gateway instead of a server error."""
+        self.stub.stop()
+
+        res = self.client.get(f"{ORDERS_URL}detail/{ORDER_ID}/")
+
+        self.assertEqual(res.status_code, status.HTTP_502_BAD_GATEWAY)
+
+
+# These tests time concurrent broker calls; the rate limit governor is tested on its own.
+@override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+class AlpacaOrdersBatchApiTestCase(TestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub(stub_routes()).start()
+        self.addCleanup(self.stub.stop)
+        url = self.stub.url
+        patcher = mock.patch(
+            "api_trade.scripts.alpaca_async.get_async_trading_client",
+            side_effect=lambda **kwargs: AsyncTradingClient("key", "secret", url_override=url),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def basket(self, count, **fields):
+        return [
+            {"symbol": f"SYM{index}", "qty": 1, "side": "buy", "time_in_force": "gtc", **fields}
+            for index in range(count)
+        ]
+
+    def test_basket_takes_one_round_trip(self):
+        """Test a basket of orders is submitted concurrently rather than one order after another."""
+        self.stub.latency = 0.2
+
+        started = time.monotonic()
+        res = self.client.post(BATCH_URL, self.basket(50), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLess(time.monotonic() - started, 2 * 0.2 + 1)
+        self.assertEqual(len(self.stub.requests), 50)
+        self.assertEqual([result["index"] for result in res.data["results"]], list(range(50)))
+        self.assertEqual({result["status"] for result in res.data["results"]}, {201})
+
+    def test_partial_failure(self):
+        """Test orders the broker rejects are reported per order next to the ones it accepted."""
+
+        def submit(body):
+            if body["symbol"] == "SYM1":
+                return 422, {"code": 42210000, "message": "asset SYM1 is not tradable"}
+            return ORDER_RESPONSE
+
+        self.stub.routes[("POST", "/orders")] = submit
+
+        res = self.client.post(BATCH_URL, self.basket(3), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result["status"] for result in res.data["results"]], [201, 422, 201])
+        self.assertEqual(res.data["results"][1]["error"], "asset SYM1 is not tradable")
+
+    def test_resent_client_order_id_returns_existing_order(self):
+        """Test re-sending an order the broker already accepted returns that order instead of failing."""
+        self.stub.routes[("POST", "/orders")] = (422, {"code": 40010001, "message": "client_order_id must be unique"})
+        self.stub.routes[("GET", "/orders:by_client_order_id")] = ORDER_RESPONSE
+        basket = [{"symbol": "BTC/USD", "qty": 1, "side": "buy", "time_in_force": "gtc", "client_order_id": "r-1"}]
+
+        res = self.client.post(BATCH_URL, basket, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["status"], 200)
+        self.assertEqual(
+            self.stub.requests, [("POST", "/v2/orders"), ("GET", "/v2/orders:by_client_order_id?client_order_id=r-1")]
+        )
+
+    def test_retried_basket_places_no_new_orders(self):
+        """Test the broker receives each order's client_order_id, so sending a basket again trades nothing new."""
+        placed = {}
+
+        def submit(body):
+            if body["client_order_id"] in placed:
+                return 422, {"code": 40010001, "message": "client_order_id must be unique"}
+            placed[body["client_order_id"]] = body
+            return {**ORDER_RESPONSE, "client_order_id": body["client_order_id"]}
+
+        self.stub.routes[("POST", "/orders")] = submit
+        self.stub.routes[("GET", "/orders:by_client_order_id")] = ORDER_RESPONSE
+        basket = [{**order, "client_order_id": f"r-{index}"} for index, order in enumerate(self.basket(3))]
+
+        first = self.client.post(BATCH_URL, basket, format="json")
+        retry = self.client.post(BATCH_URL, basket, format="json")
+
+        self.assertEqual({result["status"] for result in first.data["results"]}, {201})
+        self.assertEqual({result["status"] for result in retry.data["results"]}, {200})
+        self.assertEqual(sorted(placed), ["r-0", "r-1", "r-2"])
+        self.assertEqual(placed["r-1"]["symbol"], "SYM1")
+
+    def test_invalid_basket(self):
+        """Test a basket is rejected before reaching the broker if any order is invalid."""
+        invalid = self.basket(2)
+        invalid[1]["side"] = "hold"
+        for basket in ([], invalid, self.basket(2, client_order_id="same")):
+            res = self.client.post(BATCH_URL, basket, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(ALPACA_BATCH_MAX_ORDERS=2):
+            res = self.client.post(BATCH_URL, self.basket(3), format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stub.requests, [])
@@ -0,0 +1,144 @@
+import uuid
+from unittest import mock
+
+from alpaca.common.exceptions import APIError
+from alpaca.trading.models import Asset as AlpacaAsset
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Asset
+from ..scripts import asset_catalog
+from ..scripts.asset_catalog import AssetIndex, get_asset_index, reset_asset_index, sync_assets
+
+
+def broker_asset(symbol, name, asset_class="us_equity", exchange="NASDAQ", tradable=True, asset_id=None):
+    return AlpacaAsset(
+        id=asset_id or uuid.uuid4(),
+        symbol=symbol,
+        name=name,
+        exchange=exchange,
+        status="active",
+        tradable=tradable,
+        marginable=True,
+        shortable=False,
+        easy_to_borrow=False,
+        fractionable=True,
+        min_order_size="0.0001" if asset_class == "crypto" else None,
+        **{"class": asset_class},
+    )
+
+
+CATALOG = [
+    broker_asset("AAPL", "Apple Inc. Common Stock"),
+    broker_asset("AAL", "American Airlines Group Inc."),
+    broker_asset("MSFT", "Microsoft Corporation Common Stock"),
+    broker_asset("SPY", "SPDR S&P 500 ETF Trust", exchange="ARCA"),
+    broker_asset("APLE", "Apple Hospitality REIT, Inc.", exchange="NYSE", tradable=False),
+    broker_asset("BTC/USD", "Bitcoin  / US Dollar", asset_class="crypto", exchange="CRYPTO"),
+]
+
+
+def index_entry(asset):
+    fields = asset_catalog.asset_fields(asset)
+    return {"id": asset.id, **{name: fields[name] for name in asset_catalog.INDEX_FIELDS if name != "id"}}
+
+
+class AssetIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = AssetIndex(index_entry(asset) for asset in CATALOG)
+
+    def symbols(self, *args, **kwargs):
+        return [asset["symbol"] for asset in self.index.search(*args, **kwargs)]
+
+    def test_get(self):
+        """Test symbols are found as spelled or without separators."""
+        self.assertEqual(self.index.get("BTC/USD")["name"], "Bitcoin  / US Dollar")
+        self.assertEqual(self.index.get("btcusd")["symbol"], "BTC/USD")
+        self.assertIsNone(self.index.get("NOPE"))
+
+    def test_prefix_search(self):
+        """Test symbol prefixes rank first (exact symbol first), then name word prefixes."""
+        self.assertEqual(self.symbols("aa"), ["AAL", "AAPL"])
+        self.assertEqual(self.symbols("AAPL"), ["AAPL"])
+        self.assertEqual(self.symbols("appl"), ["AAPL", "APLE"])
+        self.assertEqual(self.symbols("btc/"), ["BTC/USD"])
+        self.assertEqual(self.symbols("apple inc", fuzzy=False), ["AAPL"])
+
+    def test_fuzzy_search(self):
+        """Test misspelled names still match when prefixes find nothing."""
+        self.assertEqual(self.symbols("microsfot"), ["MSFT"])
+        self.assertEqual(self.symbols("microsfot", fuzzy=False), [])
+
+    def test_filters(self):
+        """Test class, exchange and tradability filters and the result limit."""
+        self.assertEqual(self.symbols("", asset_class="crypto"), ["BTC/USD"])
+        self.assertEqual(self.symbols("a", exchange="NYSE"), ["APLE"])
+        self.assertEqual(self.symbols("apple", tradable=True), ["AAPL"])
+        self.assertEqual(len(self.symbols("", limit=2)), 2)
+
+
+class AssetCatalogTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        integration = mock.patch.object(asset_catalog, "AlpacaIntegrationAssets")
+        broker = integration.start().return_value
+        self.get_assets, self.get_asset = broker.get_assets, broker.get_asset
+        self.addCleanup(integration.stop)
+        self.get_assets.return_value = CATALOG
+        sync_assets()
+        self.addCleanup(reset_asset_index)
+
+    def test_sync_deactivates_delisted_assets(self):
+        """Test assets the broker stops listing are kept inactive and leave the index."""
+        self.get_assets.return_value = CATALOG[1:]
+
+        self.assertEqual(sync_assets(), (5, 1))
+
+        self.assertEqual(Asset.objects.get(symbol="AAPL").status, "inactive")
+        self.assertIsNone(get_asset_index().get("AAPL"))
+
+    def test_relisted_symbol(self):
+        """Test a symbol listed again under a new asset id replaces the old row."""
+        self.get_assets.return_value = [broker_asset("AAPL", "Apple Inc.")] + CATALOG[1:]
+
+        sync_assets()
+
+        self.assertEqual(Asset.objects.get(symbol="AAPL").name, "Apple Inc.")
+
+    def test_index_swapped_after_check_interval(self):
+        """Test workers keep their index until the next check, then pick up catalog changes."""
+        index = get_asset_index()
+        Asset.objects.filter(symbol="SPY").update(name="Renamed", updated_at=timezone.now())
+
+        self.assertIs(get_asset_index(), index)
+        reset_asset_index()
+        self.assertIsNot(get_asset_index(), index)
+        self.assertEqual(get_asset_index().get("SPY")["name"], "Renamed")
+
+    def test_search_endpoint(self):
+        """Test the search endpoint applies the query and filters."""
+        res = self.client.get("/api/alpaca/assets/", {"q": "a", "tradable": "true", "limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([asset["symbol"] for asset in res.data], ["AAL", "AAPL"])
+        self.assertEqual(res.data[0]["exchange"], "NASDAQ")
+
+    def test_asset_detail(self):
+        """Test known symbols are served from the index and unknown ones looked up at the broker once."""
+        res = self.client.get("/api/alpaca/assets/BTC/USD/")
+        self.assertEqual((res.status_code, res.data["min_order_size"]), (status.HTTP_200_OK, 0.0001))
+
+        self.get_asset.return_value = broker_asset("NVDA", "NVIDIA Corporation")
+        self.assertEqual(self.client.get("/api/alpaca/assets/NVDA/").data["name"], "NVIDIA Corporation")
+        self.assertEqual(self.client.get("/api/alpaca/assets/NVDA/").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_asset.call_count, 1)
+
+        self.get_asset.side_effect = APIError(
+            '{"message": "asset not found"}', mock.Mock(response=mock.Mock(status_code=404))
+        )
+        self.assertEqual(self.client.get("/api/alpaca/assets/NOPE/").status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+from alpaca.data.models import BarSet
+from django.test import TestCase
+
+from ..models import HistoricalBar, HistoricalBarCoverage
+from ..scripts.bar_store import BarStore, merge_ranges, missing_ranges
+
+
+def day(n):
+    return datetime(2024, 2, 1, tzinfo=timezone.utc) + timedelta(days=n)
+
+
+class FakeDataClient:
+    """Return one daily bar per symbol for every day of the requested range."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_crypto_bars(self, request_params):
+        # Request models normalise datetimes to naive UTC, responses carry "Z" timestamps like Alpaca's.
+        self.requests.append(request_params)
+        raw = {}
+        for symbol in request_params.symbol_or_symbols:
+            bars, current = [], request_params.start
+            while current <= request_params.end:
+                bars.append(
+                    {"t": f"{current.isoformat()}Z", "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 10, "n": 3, "vw": 1}
+                )
+                current += timedelta(days=1)
+            raw[symbol] = bars
+        return BarSet(raw)
+
+
+class RangeHelpersTestCase(TestCase):
+    def test_missing_ranges(self):
+        """Test gaps are computed around covered ranges."""
+        covered = [(day(2), day(4)), (day(3), day(6)), (day(8), day(9))]
+
+        self.assertEqual(
+            missing_ranges(covered, day(0), day(10)),
+            [(day(0), day(2)), (day(6), day(8)), (day(9), day(10))],
+        )
+        self.assertEqual(missing_ranges(covered, day(3), day(5)), [])
+        self.assertEqual(missing_ranges([], day(0), day(1)), [(day(0), day(1))])
+
+    def test_merge_ranges(self):
+        """Test overlapping and touching ranges are merged."""
+        self.assertEqual(
+            merge_ranges([(day(5), day(6)), (day(0), day(2)), (day(2), day(3))]),
+            [(day(0), day(3)), (day(5), day(6))],
+        )
+
+
+class BarStoreTestCase(TestCase):
+    def setUp(self):
+        self.client = FakeDataClient()
+        self.store = BarStore(client=self.client)
+
+    def test_bars_are_fetched_once(self):
+        """Test a window that is already stored is served without upstream calls."""
+        bars = self.store.get_bars(["BTC/USD", "ETH/USD"], "1Day", day(0), day(10))
+
+        self.assertEqual(bars.count(), 20)
+        self.assertEqual(len(self.client.requests), 1)
+
+        bars = self.store.get_bars(["BTC/USD", "ETH/USD"], "1Day", day(2), day(8))
+
+        self.assertEqual(bars.count(), 12)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_only_missing_range_is_fetched(self):
+        """Test extending a window only fetches the part that is not stored."""
+        self.store.get_bars(["BTC/USD"], "1Day", day(0), day(10))
+
+        self.store.get_bars(["BTC/USD"], "1Day", day(5), day(15))
+
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.client.requests[1].start, day(10).replace(tzinfo=None))
+        self.assertEqual(HistoricalBar.objects.count(), 15)
+        self.assertEqual(
+            list(HistoricalBarCoverage.objects.values_list("start", "end")),
+            [(day(0), day(15))],
+        )
+
+    def test_symbols_with_same_gap_share_request(self):
+        """Test symbols missing the same range are fetched in one request."""
+        self.store.get_bars(["BTC/USD", "ETH/USD"], "1Day", day(0), day(10))
+
+        self.store.get_bars(["BTC/USD", "ETH/USD"], "1Day", day(0), day(12))
+
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.client.requests[1].symbol_or_symbols, ["BTC/USD", "ETH/USD"])
+        self.assertEqual(HistoricalBar.objects.filter(symbol="ETH/USD").count(), 12)
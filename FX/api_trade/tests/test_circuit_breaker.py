@@ -0,0 +1,248 @@
+import time
+from unittest import mock
+
+import requests
+from alpaca.common.exceptions import APIError
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..scripts.alpaca_async import AsyncTradingClient
+from ..scripts.alpaca_clients import AlpacaClientRegistry
+from ..scripts.alpaca_integration import market_order_request
+from ..scripts.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+    endpoint_class,
+    get_breaker,
+    is_unavailable,
+    reset_breakers,
+)
+from ..scripts.local_alpaca_stub import CLOCK_RESPONSE, ORDER_RESPONSE, LocalAlpacaStub
+from ..scripts.market_data_cache import ReadThroughCache
+from .test_market_data_cache import LOCMEM_CACHES, TTLS
+
+BREAKER_SETTINGS = {
+    "ALPACA_RATE_LIMIT_ENABLED": False,
+    "ALPACA_BREAKER_WINDOW": 4,
+    "ALPACA_BREAKER_MIN_CALLS": 2,
+    "ALPACA_BREAKER_ERROR_RATE": 0.5,
+    "ALPACA_BREAKER_SLOW_SECONDS": 0.2,
+    "ALPACA_BREAKER_SLOW_RATE": 0.5,
+    "ALPACA_BREAKER_OPEN_SECONDS": 0.1,
+    "ALPACA_BREAKER_PROBES": 1,
+}
+
+
+@override_settings(**BREAKER_SETTINGS)
+class CircuitBreakerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("test")
+
+    def call(self, ok=True, elapsed=0.0):
+        self.breaker.allow()
+        self.breaker.record(ok, elapsed)
+
+    def test_opens_on_errors(self):
+        """Test the breaker opens once the share of failed calls reaches the threshold, and then fails fast."""
+        self.call()
+        self.call()
+        self.call(ok=False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.call(ok=False)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.allow()
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_opens_on_slow_calls(self):
+        """Test successful but slow calls open the breaker too."""
+        self.call(elapsed=0.5)
+        self.call(elapsed=0.5)
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe_closes(self):
+        """Test after the open period one probe is let through, and its success closes the breaker."""
+        self.call(ok=False)
+        self.call(ok=False)
+        time.sleep(0.1)
+
+        self.breaker.allow()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.breaker.allow()
+        self.breaker.record(True, 0.01)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.call()
+
+    def test_failed_probe_opens_again(self):
+        """Test a failed or slow probe keeps the breaker open for another period."""
+        self.call(ok=False)
+        self.call(ok=False)
+        time.sleep(0.1)
+
+        self.call(elapsed=0.5)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()["opened"], 2)
+
+    def test_released_probe(self):
+        """Test a probe that never reached the broker frees its slot."""
+        self.call(ok=False)
+        self.call(ok=False)
+        time.sleep(0.1)
+
+        self.breaker.allow()
+        self.breaker.release()
+
+        self.breaker.allow()
+
+    def test_endpoint_class(self):
+        """Test requests are grouped by the resource they address."""
+        self.assertEqual(endpoint_class("trading", "/v2/orders/abc?nested=true"), "orders")
+        self.assertEqual(endpoint_class("trading", "/v2/orders:by_client_order_id"), "orders")
+        self.assertEqual(endpoint_class("trading", "/orders"), "orders")
+        self.assertEqual(endpoint_class("trading", "/v2/positions/BTCUSD"), "account")
+        self.assertEqual(endpoint_class("trading", "/v2/clock"), "trading")
+        self.assertEqual(endpoint_class("data", "/v1beta3/crypto/us/bars"), "market_data")
+
+    def test_is_unavailable(self):
+        """Test outages, overload and fast-fails count as the broker being unavailable, refusals do not."""
+        self.assertTrue(is_unavailable(CircuitOpen("test", 1)))
+        self.assertTrue(is_unavailable(requests.ReadTimeout()))
+        self.assertTrue(is_unavailable(APIError("{}", mock.Mock(response=mock.Mock(status_code=503)))))
+        self.assertFalse(is_unavailable(APIError("{}", mock.Mock(response=mock.Mock(status_code=403)))))
+        self.assertFalse(is_unavailable(ValueError()))
+
+
+@override_settings(**BREAKER_SETTINGS)
+class GuardedClientTestCase(SimpleTestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub().start()
+        self.addCleanup(self.stub.stop)
+        self.registry = AlpacaClientRegistry()
+        self.addCleanup(self.registry.reset)
+        self.addCleanup(reset_breakers)
+        self.client = self.registry.get_trading_client(api_key="key", secret_key="secret", url_override=self.stub.url)
+        # Count every failure once instead of letting alpaca-py retry.
+        self.client._retry = 0
+
+    def breaker(self, path="/v2/clock"):
+        return get_breaker("trading", self.client._session.adapters["http://"].key, path)
+
+    def test_failing_broker_trips_the_breaker(self):
+        """Test once the broker fails often enough, calls fail fast without reaching it until it recovers."""
+        self.stub.error_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(APIError):
+                self.client.get_clock()
+
+        with self.assertRaises(CircuitOpen):
+            self.client.get_clock()
+        self.assertEqual(len(self.stub.requests), 2)
+        # Other endpoint classes are not affected.
+        self.assertEqual(self.breaker("/v2/orders").state, CLOSED)
+
+        self.stub.error_rate = 0.0
+        time.sleep(0.1)
+        self.client.get_clock()
+        self.assertEqual(self.breaker().state, CLOSED)
+
+    @override_settings(ALPACA_HTTP_TIMEOUT=(1, 0.1))
+    def test_timeouts_are_failures(self):
+        """Test a broker that does not answer in time trips the breaker."""
+        self.stub.slow_rate, self.stub.slow_latency = 1.0, 0.5
+        for _ in range(2):
+            with self.assertRaises(requests.Timeout):
+                self.client.get_clock()
+
+        self.assertEqual(self.breaker().state, OPEN)
+
+    @override_settings(ALPACA_HEDGE_READS_AFTER=0.05)
+    def test_slow_read_is_hedged(self):
+        """Test a read not answered in time is sent again and the faster answer is used."""
+        answers = iter([0.5])
+
+        def clock(body):
+            time.sleep(next(answers, 0))
+            return CLOCK_RESPONSE
+
+        self.stub.routes[("GET", "/clock")] = clock
+
+        started = time.monotonic()
+        self.client.get_clock()
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(self.breaker().stats()["hedge_wins"], 1)
+
+    @override_settings(ALPACA_HEDGE_READS_AFTER=0.05)
+    def test_writes_are_not_hedged(self):
+        """Test only idempotent reads are sent twice."""
+        self.stub.routes[("POST", "/orders")] = ORDER_RESPONSE
+        self.stub.latency = 0.1
+
+        self.client.submit_order(
+            market_order_request({"symbol": "BTC/USD", "qty": 1, "side": "buy", "time_in_force": "gtc"})
+        )
+
+        self.assertEqual(self.stub.requests, [("POST", "/v2/orders")])
+
+    async def test_async_client(self):
+        """Test the async order client shares the breaker logic."""
+        self.stub.error_rate = 1.0
+        client = AsyncTradingClient("key", "secret", url_override=self.stub.url)
+        client.retry_attempts = 0
+        try:
+            for _ in range(2):
+                with self.assertRaises(APIError):
+                    await client.get_orders()
+            with self.assertRaises(CircuitOpen):
+                await client.get_orders()
+        finally:
+            await client.aclose()
+
+        self.assertEqual(len(self.stub.requests), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALPACA_MARKET_DATA_CACHE_TTLS=TTLS)
+class CachedFallbackTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = ReadThroughCache("test:md", "ALPACA_MARKET_DATA_CACHE_TTLS")
+        self.cache.get_or_fetch("crypto_snapshot", {"symbols": ["BTC/USD"]}, lambda: "snapshot")
+        # Expire the entry itself; only the fallback is left.
+        self.cache.invalidate("crypto_snapshot", {"symbols": ["BTC/USD"]})
+
+    def test_fallback_while_unavailable(self):
+        """Test a miss is answered with the last value while the broker is unavailable."""
+        fetch = mock.Mock(side_effect=CircuitOpen("market_data", 30))
+
+        value = self.cache.get_or_fetch("crypto_snapshot", {"symbols": ["BTC/USD"]}, fetch)
+
+        self.assertEqual(value, "snapshot")
+        self.assertEqual(self.cache.stats(["crypto_snapshot"])["crypto_snapshot"]["fallback"], 1)
+        # The fallback is not cached as a fresh value: the next read tries the broker again.
+        self.cache.get_or_fetch("crypto_snapshot", {"symbols": ["BTC/USD"]}, fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_refusals_are_raised(self):
+        """Test errors other than the broker being unavailable are not hidden by the fallback."""
+        error = APIError('{"message": "forbidden"}', mock.Mock(response=mock.Mock(status_code=403)))
+
+        with self.assertRaises(APIError):
+            self.cache.get_or_fetch("crypto_snapshot", {"symbols": ["BTC/USD"]}, mock.Mock(side_effect=error))
+
+    def test_no_fallback(self):
+        """Test the error is raised when there is no value to fall back on."""
+        with self.assertRaises(CircuitOpen):
+            self.cache.get_or_fetch(
+                "crypto_snapshot", {"symbols": ["ETH/USD"]}, mock.Mock(side_effect=CircuitOpen("test", 30))
+            )
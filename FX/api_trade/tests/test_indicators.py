@@ -0,0 +1,140 @@
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..scripts import indicators
+from .test_bar_store import FakeDataClient
+
+INDICATORS_URL = "/api/alpaca/indicators/"
+
+
+def naive_ema(values, period, alpha=None):
+    alpha = alpha or 2 / (period + 1)
+    out = np.full(len(values), np.nan)
+    current = values[:period].mean()
+    out[period - 1] = current
+    for i in range(period, len(values)):
+        current = (1 - alpha) * current + alpha * values[i]
+        out[i] = current
+    return out
+
+
+def naive_rsi(values, period):
+    out = np.full(len(values), np.nan)
+    deltas = np.diff(values)
+    gains, losses = np.clip(deltas, 0, None), np.clip(-deltas, 0, None)
+    average_gain, average_loss = gains[:period].mean(), losses[:period].mean()
+    out[period] = 100 - 100 / (1 + average_gain / average_loss)
+    for i in range(period + 1, len(values)):
+        average_gain = (average_gain * (period - 1) + gains[i - 1]) / period
+        average_loss = (average_loss * (period - 1) + losses[i - 1]) / period
+        out[i] = 100 - 100 / (1 + average_gain / average_loss)
+    return out
+
+
+class IndicatorKernelsTestCase(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.close = 40000 + np.cumsum(rng.normal(0, 50, 3000))
+        self.volume = rng.uniform(0, 10, 3000)
+
+    def test_sma(self):
+        """Test the SMA matches a plain rolling mean."""
+        result = indicators.sma(self.close, 20)
+
+        self.assertTrue(np.isnan(result[:19]).all())
+        np.testing.assert_allclose(result[19:], np.convolve(self.close, np.ones(20) / 20, "valid"), rtol=1e-12)
+
+    def test_ema(self):
+        """Test the vectorized EMA matches the recursive definition, including long periods."""
+        for period in (3, 20, 500):
+            np.testing.assert_allclose(indicators.ema(self.close, period), naive_ema(self.close, period), rtol=1e-10)
+
+    def test_rsi(self):
+        """Test the RSI matches Wilder's recursive smoothing."""
+        np.testing.assert_allclose(indicators.rsi(self.close, 14), naive_rsi(self.close, 14), rtol=1e-10)
+
+    def test_rsi_without_losses(self):
+        """Test a series that only rises has an RSI of 100."""
+        self.assertEqual(indicators.rsi(np.arange(30.0), 14)[-1], 100.0)
+
+    def test_vwap(self):
+        """Test cumulative and rolling VWAP."""
+        high, low = self.close + 1, self.close - 1
+        typical = (high + low + self.close) / 3
+
+        np.testing.assert_allclose(
+            indicators.vwap(high, low, self.close, self.volume),
+            np.cumsum(typical * self.volume) / np.cumsum(self.volume),
+        )
+        rolling = indicators.vwap(high, low, self.close, self.volume, 10)
+        expected = (typical[-10:] * self.volume[-10:]).sum() / self.volume[-10:].sum()
+        self.assertAlmostEqual(rolling[-1], expected, places=6)
+
+    def test_bollinger(self):
+        """Test the bands are the SMA plus and minus the rolling standard deviation."""
+        middle, upper, lower = indicators.bollinger(self.close, 20, 2)
+
+        self.assertAlmostEqual(upper[-1] - middle[-1], 2 * self.close[-20:].std(), places=6)
+        self.assertAlmostEqual(middle[-1] - lower[-1], 2 * self.close[-20:].std(), places=6)
+
+    def test_short_series(self):
+        """Test series shorter than the period return only NaN."""
+        self.assertTrue(np.isnan(indicators.sma([1.0, 2.0], 5)).all())
+        self.assertTrue(np.isnan(indicators.ema([1.0, 2.0], 5)).all())
+        self.assertTrue(np.isnan(indicators.rsi([1.0, 2.0], 5)).all())
+
+
+class IndicatorsApiTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        patcher = mock.patch(
+            "api_trade.scripts.bar_store.registry.get_crypto_data_client", return_value=FakeDataClient()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_indicators(self):
+        """Test several indicators for several symbols in one call."""
+        params = {
+            "symbols": "BTC/USD,ETH/USD",
+            "start": "2024-03-01",
+            "end": "2024-03-11",
+            "indicators": "sma:5,ema:5,rsi:3,vwap,bollinger:5:2",
+        }
+        res = self.client.get(INDICATORS_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data["data"]), {"BTC/USD", "ETH/USD"})
+        series = res.data["data"]["BTC/USD"]
+        self.assertEqual(len(series["timestamp"]), 10)
+        self.assertEqual(
+            set(series),
+            {
+                "timestamp",
+                "close",
+                "sma_5",
+                "ema_5",
+                "rsi_3",
+                "vwap",
+                "bollinger_5_2_middle",
+                "bollinger_5_2_upper",
+                "bollinger_5_2_lower",
+            },
+        )
+        # Warm-up bars before ``start`` make the first returned value meaningful.
+        self.assertEqual(series["sma_5"][0], 1.5)
+
+    def test_unknown_indicator(self):
+        """Test unknown indicators and invalid periods are rejected."""
+        res = self.client.get(INDICATORS_URL, {"indicators": "macd"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(INDICATORS_URL, {"indicators": "sma:2.5"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,137 @@
+import threading
+import time
+from unittest import mock
+
+from alpaca.data.requests import CryptoBarsRequest
+from alpaca.data.timeframe import TimeFrame
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..scripts import market_data_cache as cache_module
+from ..scripts.alpaca_integration import AlpacaIntegrationDataHistorical
+from ..scripts.market_data_cache import ReadThroughCache
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+TTLS = {"crypto_bars": (60, 300), "crypto_snapshot": (1, 60)}
+
+
+def bars_request(symbols=("BTC/USD",), start="2024-02-13"):
+    return CryptoBarsRequest(symbol_or_symbols=list(symbols), timeframe=TimeFrame.Day, start=start)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALPACA_MARKET_DATA_CACHE_TTLS=TTLS)
+class ReadThroughCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = ReadThroughCache("test:md", "ALPACA_MARKET_DATA_CACHE_TTLS")
+
+    def test_key_depends_on_parameters(self):
+        """Test keys differ for different symbols and windows but not for equal requests."""
+        key = self.cache.key_for("crypto_bars", bars_request())
+
+        self.assertEqual(key, self.cache.key_for("crypto_bars", bars_request()))
+        self.assertNotEqual(key, self.cache.key_for("crypto_bars", bars_request(symbols=["ETH/USD"])))
+        self.assertNotEqual(key, self.cache.key_for("crypto_bars", bars_request(start="2024-03-01")))
+        self.assertNotEqual(key, self.cache.key_for("crypto_snapshot", bars_request()))
+
+    def test_hit_after_miss(self):
+        """Test the second identical call is served from the cache."""
+        fetch = mock.Mock(return_value="bars")
+
+        self.assertEqual(self.cache.get_or_fetch("crypto_bars", bars_request(), fetch), "bars")
+        self.assertEqual(self.cache.get_or_fetch("crypto_bars", bars_request(), fetch), "bars")
+
+        fetch.assert_called_once()
+        self.assertEqual(self.cache.stats()["crypto_bars"]["miss"], 1)
+        self.assertEqual(self.cache.stats()["crypto_bars"]["hit"], 1)
+
+    def test_stale_value_served_while_refreshing(self):
+        """Test a stale entry is returned immediately and refreshed once in the background."""
+        self.cache.get_or_fetch("crypto_snapshot", bars_request(), lambda: "old")
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return "new"
+
+        with mock.patch.object(cache_module.time, "time", return_value=time.time() + 5):
+            self.assertEqual(self.cache.get_or_fetch("crypto_snapshot", bars_request(), fetch), "old")
+
+        self.assertTrue(refreshed.wait(2))
+        for _ in range(100):
+            if self.cache.get_or_fetch("crypto_snapshot", bars_request(), fetch) == "new":
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get_or_fetch("crypto_snapshot", bars_request(), fetch), "new")
+        self.assertEqual(self.cache.stats()["crypto_snapshot"]["stale"], 1)
+
+    def test_concurrent_misses_fetch_once(self):
+        """Test a burst of identical requests makes a single upstream call."""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return "bars"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.cache.get_or_fetch("crypto_bars", bars_request(), fetch))
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["bars"] * 10)
+        self.assertEqual(self.cache.stats()["crypto_bars"]["coalesced"], 9)
+
+    def test_failed_fetch_releases_lock(self):
+        """Test an upstream error is raised and does not leave the key locked."""
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_fetch("crypto_bars", bars_request(), mock.Mock(side_effect=RuntimeError))
+
+        self.assertEqual(self.cache.get_or_fetch("crypto_bars", bars_request(), lambda: "bars"), "bars")
+
+    def test_integration_methods_are_cached(self):
+        """Test historical data methods only reach the client once per parameter set."""
+        integration = AlpacaIntegrationDataHistorical()
+        with mock.patch.object(integration, "client") as client:
+            client.get_crypto_latest_quote.return_value = "quote"
+            integration.get_crypto_latest_quote()
+            integration.get_crypto_latest_quote()
+
+        client.get_crypto_latest_quote.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALPACA_MARKET_DATA_CACHE_TTLS=TTLS)
+class MarketDataCacheStatsApiTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_stats_require_admin(self):
+        """Test cache stats are restricted to staff users."""
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client.force_authenticate(user)
+
+        res = self.client.get("/api/alpaca/cache-stats/")
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats(self):
+        """Test staff users can read the counters."""
+        admin = get_user_model().objects.create_superuser(email="admin@example.com", password="testpass123")
+        self.client.force_authenticate(admin)
+
+        res = self.client.get("/api/alpaca/cache-stats/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), set(TTLS))
+        self.assertEqual(res.data["crypto_bars"]["hit"], 0)
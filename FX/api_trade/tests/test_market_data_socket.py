@@ -0,0 +1,126 @@
+import json
+
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from FX.asgi import application
+
+from ..scripts import market_data_hub
+from ..scripts.market_data_hub import BaseQuoteFeed, MarketDataHub, Subscription
+
+
+class RecordingFeed(BaseQuoteFeed):
+    """Feed recording upstream (un)subscriptions; ticks are published by the tests."""
+
+    def __init__(self, publish):
+        super().__init__(publish)
+        self.calls = []
+
+    async def subscribe(self, symbols):
+        self.calls.append(("subscribe", sorted(symbols)))
+
+    async def unsubscribe(self, symbols):
+        self.calls.append(("unsubscribe", sorted(symbols)))
+
+
+class MarketDataHubTestCase(SimpleTestCase):
+    async def test_one_upstream_subscription_per_symbol(self):
+        """Test clients share upstream subscriptions, which are released with the last client."""
+        hub = MarketDataHub(RecordingFeed)
+        first, second = Subscription(), Subscription()
+
+        await hub.subscribe(first, ["BTC/USD", "ETH/USD"])
+        await hub.subscribe(second, ["BTC/USD"])
+        await hub.unsubscribe(first)
+
+        self.assertEqual(hub.stats(), {"BTC/USD": 1})
+        await hub.unsubscribe(second)
+        self.assertEqual(
+            hub.feed.calls,
+            [("subscribe", ["BTC/USD", "ETH/USD"]), ("unsubscribe", ["ETH/USD"]), ("unsubscribe", ["BTC/USD"])],
+        )
+
+    async def test_ticks_are_coalesced_per_symbol(self):
+        """Test a client that has not read yet only gets the latest tick of each symbol."""
+        hub = MarketDataHub(RecordingFeed)
+        subscription = Subscription()
+        await hub.subscribe(subscription, ["BTC/USD", "ETH/USD"])
+
+        for price in (1, 2, 3):
+            hub.publish("BTC/USD", f'{{"price": {price}}}')
+        hub.publish("ETH/USD", '{"price": 10}')
+        hub.publish("SOL/USD", '{"price": 100}')
+
+        self.assertEqual(await subscription.next_batch(), ['{"price": 3}', '{"price": 10}'])
+        self.assertEqual(subscription.dropped, 2)
+
+    def test_feed_must_implement_subscriptions(self):
+        """Test a feed without ``unsubscribe`` is refused when created."""
+
+        class IncompleteFeed(BaseQuoteFeed):
+            async def subscribe(self, symbols):
+                pass
+
+        with self.assertRaises(TypeError):
+            IncompleteFeed(lambda symbol, tick: None)
+
+
+@override_settings(MARKET_DATA_FEED="api_trade.tests.test_market_data_socket.RecordingFeed", API_ENV=None)
+class MarketDataSocketTestCase(TestCase):
+    def setUp(self):
+        market_data_hub._hub = None
+        self.addCleanup(setattr, market_data_hub, "_hub", None)
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+
+    async def connect(self, token=None):
+        query_string = f"token={token}".encode() if token else b""
+        communicator = ApplicationCommunicator(
+            application, {"type": "websocket", "path": "/ws/market-data/", "query_string": query_string}
+        )
+        await communicator.send_input({"type": "websocket.connect"})
+        return communicator
+
+    async def send(self, communicator, payload):
+        await communicator.send_input({"type": "websocket.receive", "text": json.dumps(payload)})
+        return json.loads((await communicator.receive_output(1))["text"])
+
+    async def test_token_required(self):
+        """Test connections without a valid access token are closed."""
+        for token in (None, "invalid"):
+            communicator = await self.connect(token)
+            self.assertEqual(await communicator.receive_output(1), {"type": "websocket.close", "code": 4001})
+
+    async def test_subscribe_and_receive_quotes(self):
+        """Test a client receives quotes of the symbols it subscribed to and releases them on disconnect."""
+        communicator = await self.connect(AccessToken.for_user(self.user))
+        self.assertEqual((await communicator.receive_output(1))["type"], "websocket.accept")
+
+        response = await self.send(communicator, {"action": "subscribe", "symbols": ["btc/usd"]})
+        self.assertEqual(response, {"type": "subscribed", "symbols": ["BTC/USD"]})
+
+        hub = market_data_hub.get_hub()
+        hub.publish("BTC/USD", '{"symbol": "BTC/USD", "bid_price": 1.0}')
+        quotes = json.loads((await communicator.receive_output(1))["text"])
+        self.assertEqual(quotes, {"type": "quotes", "data": [{"symbol": "BTC/USD", "bid_price": 1.0}]})
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait(1)
+        self.assertEqual(hub.stats(), {})
+        self.assertEqual(hub.feed.calls[-1], ("unsubscribe", ["BTC/USD"]))
+
+    async def test_invalid_messages(self):
+        """Test malformed requests and too many symbols are answered with an error."""
+        communicator = await self.connect(AccessToken.for_user(self.user))
+        await communicator.receive_output(1)
+
+        response = await self.send(communicator, {"action": "buy"})
+        self.assertEqual(response["type"], "error")
+
+        with self.settings(MARKET_DATA_MAX_SYMBOLS=1):
+            response = await self.send(communicator, {"action": "subscribe", "symbols": ["BTC/USD", "ETH/USD"]})
+        self.assertEqual(response["type"], "error")
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait(1)
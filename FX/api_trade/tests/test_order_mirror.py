@@ -0,0 +1,127 @@
+import io
+import json
+import tempfile
+import uuid
+
+from alpaca.trading.models import TradeUpdate
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import BrokerOrder
+from ..scripts.alpaca_clients import AlpacaClientRegistry
+from ..scripts.local_alpaca_stub import ORDER_RESPONSE, LocalAlpacaStub, trade_update_message
+from ..scripts.order_mirror import apply_trade_update, reconcile_orders, record_order
+
+ORDERS_URL = "/api/alpaca/orders/"
+
+
+def order_payload(**fields):
+    return {**ORDER_RESPONSE, "id": str(uuid.uuid4()), "client_order_id": uuid.uuid4().hex, **fields}
+
+
+def trade_update(event, order, **fields):
+    return TradeUpdate(**trade_update_message(event, order, **fields)["data"])
+
+
+class OrderMirrorTestCase(TestCase):
+    def test_trade_updates_follow_the_order(self):
+        """Test new, partial fill and fill events leave the mirror with the final order state."""
+        order = order_payload(status="new")
+        apply_trade_update(trade_update("new", order))
+        partial = {**order, "status": "partially_filled", "filled_qty": "0.4", "updated_at": "2024-02-13T15:00:01Z"}
+        apply_trade_update(trade_update("partial_fill", partial, price=100.0, qty=0.4))
+        filled = {
+            **order,
+            "status": "filled",
+            "filled_qty": "1",
+            "filled_avg_price": "100.5",
+            "filled_at": "2024-02-13T15:00:02Z",
+            "updated_at": "2024-02-13T15:00:02Z",
+        }
+        apply_trade_update(trade_update("fill", filled, price=101.0, qty=0.6))
+
+        stored = BrokerOrder.objects.get(pk=order["id"])
+        self.assertEqual(stored.status, "filled")
+        self.assertEqual(stored.filled_qty, 1.0)
+        self.assertEqual(stored.filled_avg_price, 100.5)
+        self.assertEqual(stored.side, "buy")
+
+    def test_stale_update_is_ignored(self):
+        """Test an update delivered late never overwrites a newer order state."""
+        order = order_payload(status="filled", updated_at="2024-02-13T15:00:05Z")
+        apply_trade_update(trade_update("fill", order))
+        apply_trade_update(trade_update("new", {**order, "status": "new", "updated_at": "2024-02-13T15:00:00Z"}))
+
+        self.assertEqual(BrokerOrder.objects.get(pk=order["id"]).status, "filled")
+
+    def test_placing_user_is_kept(self):
+        """Test the user who placed an order is recorded even if the stream stored the order first."""
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        order = order_payload()
+        apply_trade_update(trade_update("new", order))
+        record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, user)
+
+        self.assertEqual(BrokerOrder.objects.get(pk=order["id"]).user, user)
+
+    def test_replay_command(self):
+        """Test ``sync_trade_updates --replay`` applies a recorded stream."""
+        orders = [order_payload(), order_payload()]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as replay:
+            replay.write("\n".join(json.dumps(trade_update_message("new", order)) for order in orders))
+            replay.flush()
+            call_command("sync_trade_updates", replay=replay.name, stdout=io.StringIO())
+
+        self.assertEqual(BrokerOrder.objects.count(), 2)
+
+    def test_reconcile(self):
+        """Test reconciliation stores missing orders and repairs stale statuses."""
+        known = order_payload(status="new")
+        apply_trade_update(trade_update("new", known))
+        broker_orders = [{**known, "status": "canceled", "updated_at": "2024-02-13T16:00:00Z"}, order_payload()]
+        with LocalAlpacaStub({("GET", "/orders"): broker_orders}) as stub:
+            client = AlpacaClientRegistry().get_trading_client("key", "secret", url_override=stub.url)
+            seen, drifted = reconcile_orders(client=client)
+
+        self.assertEqual((seen, drifted), (2, 2))
+        self.assertEqual(BrokerOrder.objects.get(pk=known["id"]).status, "canceled")
+        self.assertEqual(BrokerOrder.objects.count(), 2)
+
+
+class OrderMirrorApiTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.orders = [
+            order_payload(symbol="BTC/USD", status="filled", created_at="2024-02-13T15:00:00Z"),
+            order_payload(symbol="ETH/USD", status="canceled", created_at="2024-02-13T15:00:01Z"),
+            order_payload(symbol="BTC/USD", status="new", created_at="2024-02-13T15:00:02Z"),
+        ]
+        for order in self.orders:
+            apply_trade_update(trade_update("new", order))
+
+    def ids(self, res):
+        return [order["id"] for order in res.data]
+
+    def test_list_filters(self):
+        """Test the order list is read from the mirror, newest first, filtered by status and symbol."""
+        with self.assertNumQueries(1):
+            res = self.client.get(ORDERS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(res), [self.orders[1]["id"], self.orders[0]["id"]])
+
+        self.assertEqual(self.ids(self.client.get(ORDERS_URL, {"status": "open"})), [self.orders[2]["id"]])
+        res = self.client.get(ORDERS_URL, {"status": "all", "symbols": "btc/usd", "limit": 1})
+        self.assertEqual(self.ids(res), [self.orders[2]["id"]])
+        self.assertEqual(self.ids(self.client.get(ORDERS_URL, {"status": "canceled"})), [self.orders[1]["id"]])
+
+    def test_retrieve_from_mirror(self):
+        """Test retrieving a mirrored order does not call the broker."""
+        res = self.client.get(f"{ORDERS_URL}detail/{self.orders[0]['id']}/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["status"], "filled")
+        self.assertEqual(res.data["symbol"], "BTC/USD")
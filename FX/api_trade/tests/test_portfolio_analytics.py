@@ -0,0 +1,217 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+from alpaca.trading.models import TradeUpdate
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Fill, HistoricalBar, PositionState
+from ..scripts import portfolio_analytics
+from ..scripts.bar_store import BarStore
+from ..scripts.local_alpaca_stub import ORDER_RESPONSE, trade_update_message
+from ..scripts.order_mirror import apply_trade_update, record_order
+from ..scripts.portfolio_analytics import apply_fill_to_position, drawdown, pnl_curve, rebuild_position
+from ..scripts.portfolio_snapshots import Snapshot
+
+START = datetime(2024, 2, 13, tzinfo=timezone.utc)
+
+
+def fill_update(order, qty, price, at, execution_id=None):
+    order = {**order, "status": "partially_filled", "updated_at": at.isoformat()}
+    message = trade_update_message(
+        "partial_fill",
+        order,
+        timestamp=at.isoformat(),
+        execution_id=execution_id or str(uuid.uuid4()),
+        qty=qty,
+        price=price,
+    )
+    return TradeUpdate(**message["data"])
+
+
+def new_order(symbol="BTC/USD", asset_class="crypto", side="buy"):
+    return {
+        **ORDER_RESPONSE,
+        "id": str(uuid.uuid4()),
+        "client_order_id": uuid.uuid4().hex,
+        "symbol": symbol,
+        "asset_class": asset_class,
+        "side": side,
+        "created_at": (START - timedelta(days=1)).isoformat(),
+        "updated_at": (START - timedelta(days=1)).isoformat(),
+    }
+
+
+class PositionKernelTestCase(SimpleTestCase):
+    def test_average_cost(self):
+        """Test adding moves the average, reducing realizes P&L and crossing zero reopens at the fill price."""
+        state = apply_fill_to_position(0.0, 0.0, 0.0, 1.0, 100.0)
+        state = apply_fill_to_position(*state, 1.0, 110.0)
+        self.assertEqual(state, (2.0, 105.0, 0.0))
+
+        state = apply_fill_to_position(*state, -0.5, 125.0)
+        self.assertEqual(state, (1.5, 105.0, 10.0))
+
+        state = apply_fill_to_position(*state, -2.5, 120.0)
+        self.assertEqual(state, (-1.0, 120.0, 32.5))
+
+        self.assertEqual(apply_fill_to_position(*state, 1.0, 100.0), (0.0, 0.0, 52.5))
+
+    def test_pnl_curve_matches_loop(self):
+        """Test the vectorized curve equals marking the replayed fills at every grid point."""
+        rng = np.random.default_rng(7)
+        fill_times = np.sort(rng.uniform(0, 100, 200))
+        fill_qty = rng.normal(0, 1, 200)
+        fill_price = rng.uniform(90, 110, 200)
+        times = np.arange(0, 110, 5.0)
+        closes = rng.uniform(90, 110, len(times))
+        closes[3] = np.nan
+
+        curve = pnl_curve(fill_times, fill_qty, fill_price, times, closes)
+
+        for point, t in enumerate(times):
+            done = fill_times <= t
+            position, cash = fill_qty[done].sum(), -(fill_qty[done] * fill_price[done]).sum()
+            mark = closes[point] if not np.isnan(closes[point]) else (fill_price[done][-1] if done.any() else 0.0)
+            self.assertAlmostEqual(curve[point], cash + position * mark)
+
+    def test_drawdown(self):
+        """Test drawdown is measured from the running peak."""
+        below_peak, max_drawdown = drawdown(np.array([0.0, 5.0, 2.0, 6.0, 1.0, 3.0]))
+
+        self.assertEqual(below_peak.tolist(), [0.0, 0.0, -3.0, 0.0, -5.0, -3.0])
+        self.assertEqual(max_drawdown, -5.0)
+
+
+class PositionStateTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+
+    def test_fills_update_positions_incrementally(self):
+        """Test each fill updates the position once, and a redelivered execution is ignored."""
+        order = new_order()
+        record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+        execution_id = str(uuid.uuid4())
+        apply_trade_update(fill_update(order, 1, 100.0, START, execution_id))
+        apply_trade_update(fill_update(order, 1, 100.0, START, execution_id))
+        apply_trade_update(fill_update(new_order(side="sell"), 0.5, 120.0, START + timedelta(minutes=1)))
+
+        position = PositionState.objects.get(user=self.user, symbol="BTC/USD")
+        self.assertEqual(Fill.objects.filter(user=self.user).count(), 1)
+        self.assertEqual((position.qty, position.avg_price, position.fill_count), (1.0, 100.0, 1))
+        self.assertEqual(PositionState.objects.get(user=None).qty, -0.5)
+
+    def test_fills_share_one_position(self):
+        """Test fills of two orders for the same user and symbol, or of two unattributed orders, update one row."""
+        for minute in range(2):
+            order = new_order()
+            record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+            apply_trade_update(fill_update(order, 1, 100.0 + minute, START + timedelta(minutes=minute)))
+            apply_trade_update(fill_update(new_order(), 1, 100.0, START + timedelta(minutes=minute)))
+
+        position = PositionState.objects.get(user=self.user, symbol="BTC/USD")
+        self.assertEqual((position.qty, position.avg_price, position.fill_count), (2.0, 100.5, 2))
+        self.assertEqual(PositionState.objects.get(user=None, symbol="BTC/USD").fill_count, 2)
+
+    def test_incremental_matches_rebuild(self):
+        """Test the incrementally kept position equals a recomputation from all fills."""
+        random.seed(3)
+        for minute in range(60):
+            order = new_order(side=random.choice(["buy", "sell"]))
+            record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+            qty = round(random.uniform(0.1, 2), 3)
+            apply_trade_update(fill_update(order, qty, random.uniform(90, 110), START + timedelta(minutes=minute)))
+        incremental = PositionState.objects.get(user=self.user)
+
+        rebuilt = rebuild_position(self.user, "BTC/USD")
+
+        self.assertAlmostEqual(incremental.qty, rebuilt.qty)
+        self.assertAlmostEqual(incremental.avg_price, rebuilt.avg_price)
+        self.assertAlmostEqual(incremental.realized_pl, rebuilt.realized_pl)
+
+    def test_fills_before_user_is_known(self):
+        """Test fills applied before the placing view recorded the order move to that user's position."""
+        order = new_order()
+        apply_trade_update(fill_update(order, 2, 100.0, START))
+        self.assertEqual(PositionState.objects.get(user=None).qty, 2.0)
+
+        record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+
+        self.assertEqual(PositionState.objects.get(user=self.user).qty, 2.0)
+        self.assertFalse(PositionState.objects.filter(user=None).exists())
+
+
+class PortfolioAnalyticsApiTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for symbol, asset_class, side, qty, price, minutes in (
+            ("BTC/USD", "crypto", "buy", 2, 100.0, 0),
+            ("BTC/USD", "crypto", "sell", 1, 130.0, 120),
+            ("SPY", "us_equity", "sell", 10, 500.0, 60),
+        ):
+            order = new_order(symbol, asset_class, side)
+            record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+            apply_trade_update(fill_update(order, qty, price, START + timedelta(minutes=minutes)))
+        snapshot = mock.patch.object(
+            portfolio_analytics, "get_positions_snapshot", return_value=Snapshot([], '"positions-0"', 0)
+        )
+        snapshot.start()
+        self.addCleanup(snapshot.stop)
+        HistoricalBar.objects.bulk_create(
+            HistoricalBar(
+                symbol="BTC/USD",
+                timeframe="1Hour",
+                timestamp=START + timedelta(hours=hour),
+                open=0,
+                high=0,
+                low=0,
+                close=close,
+                volume=0,
+            )
+            for hour, close in enumerate([100.0, 140.0, 110.0, 150.0])
+        )
+
+    def test_position_pnl(self):
+        """Test realized and unrealized P&L per position, marked at the last stored bar."""
+        res = self.client.get("/api/alpaca/accounts/pnl/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        btc = res.data["positions"][0]
+        self.assertEqual((btc["symbol"], btc["qty"], btc["price"]), ("BTC/USD", 1.0, 150.0))
+        self.assertEqual((btc["realized_pl"], btc["unrealized_pl"]), (30.0, 50.0))
+        self.assertEqual(res.data["realized_pl"], 30.0)
+
+    def test_exposure(self):
+        """Test exposure is grouped by asset class; short positions without a price are left out."""
+        res = self.client.get("/api/alpaca/accounts/exposure/")
+
+        self.assertEqual(
+            res.data["by_asset_class"], {"crypto": {"long": 150.0, "short": 0.0, "gross": 150.0, "net": 150.0}}
+        )
+
+    def test_equity_curve(self):
+        """Test the curve marks the fills at every stored bar and reports the drawdown."""
+        with mock.patch.object(BarStore, "fill"):
+            res = self.client.get(
+                "/api/alpaca/accounts/equity/",
+                {"timeframe": "1Hour", "start": START.isoformat(), "end": (START + timedelta(hours=4)).isoformat()},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # BTC: 2 @ 100, 1 sold @ 130 after 2h; SPY: 10 short @ 500 after 1h, marked at its fill price.
+        self.assertEqual(res.data["pnl"], [0.0, 80.0, 40.0, 80.0])
+        self.assertEqual(res.data["drawdown"], [0.0, 0.0, -40.0, 0.0])
+        self.assertEqual(res.data["max_drawdown"], -40.0)
+
+    def test_equity_curve_window_limit(self):
+        """Test windows with too many points are rejected."""
+        res = self.client.get("/api/alpaca/accounts/equity/", {"timeframe": "1Min", "start": "2020-01-01T00:00:00Z"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
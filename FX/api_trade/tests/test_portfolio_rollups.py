@@ -0,0 +1,156 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from alpaca.trading.models import TradeUpdate
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import DailyPortfolioSummary, Fill, HistoricalBar
+from ..scripts.bar_store import BarStore
+from ..scripts.local_alpaca_stub import trade_update_message
+from ..scripts.order_mirror import apply_trade_update, record_order
+from ..scripts.portfolio_rollups import rollup_portfolios
+from .test_portfolio_analytics import START, fill_update, new_order
+
+DAY = START.date()
+VALUES = ["date", "equity", "pnl", "realized_pl", "turnover", "fees", "fill_count"]
+
+
+class PortfolioRollupTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        for symbol, asset_class, side, qty, price, at in (
+            ("BTC/USD", "crypto", "buy", 2, 100.0, START + timedelta(hours=1)),
+            ("SPY", "us_equity", "sell", 10, 500.0, START + timedelta(hours=2)),
+            ("BTC/USD", "crypto", "sell", 1, 130.0, START + timedelta(days=1, hours=3)),
+        ):
+            order = new_order(symbol, asset_class, side)
+            record_order(TradeUpdate(**trade_update_message("new", order)["data"]).order, self.user)
+            apply_trade_update(fill_update(order, qty, price, at))
+        HistoricalBar.objects.bulk_create(
+            HistoricalBar(
+                symbol="BTC/USD",
+                timeframe="1Day",
+                timestamp=START + timedelta(days=day),
+                open=0,
+                high=0,
+                low=0,
+                close=close,
+                volume=0,
+            )
+            for day, close in enumerate([110.0, 120.0, 140.0])
+        )
+        bar_fill = mock.patch.object(BarStore, "fill")
+        bar_fill.start()
+        self.addCleanup(bar_fill.stop)
+
+    def summaries(self, user=None):
+        return list(DailyPortfolioSummary.objects.filter(user=user or self.user).order_by("date").values_list(*VALUES))
+
+    def test_fees_and_realized_pl_are_stored_per_fill(self):
+        """Test crypto fills carry the estimated fee and each fill the P&L it realized."""
+        fills = Fill.objects.order_by("timestamp")
+
+        self.assertEqual([fill.fee for fill in fills], [0.5, 0.0, 0.325])
+        self.assertEqual([fill.realized_pl for fill in fills], [0.0, 0.0, 30.0])
+
+    def test_rollup(self):
+        """Test daily equity marks positions at the daily close, net of fees, and quiet days with positions count."""
+        rollup_portfolios(DAY, DAY + timedelta(days=2))
+
+        expected = [
+            # Cash 5000 - 200 - 0.5 fees; 2 BTC at 110; 10 SPY short at its fill price.
+            (DAY, 19.5, 19.5, 0.0, 5200.0, 0.5, 2),
+            (DAY + timedelta(days=1), 49.175, 29.675, 30.0, 130.0, 0.325, 1),
+            (DAY + timedelta(days=2), 69.175, 20.0, 0.0, 0.0, 0.0, 0),
+        ]
+        for row, expected_row in zip(self.summaries(), expected, strict=True):
+            self.assertEqual(row[0], expected_row[0])
+            for value, expected_value in zip(row[1:], expected_row[1:], strict=True):
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_incremental_matches_full_rollup(self):
+        """Test rolling up one day at a time, or the latest day twice, gives the same rows as one backfill."""
+        rollup_portfolios(DAY, DAY + timedelta(days=2))
+        full = self.summaries()
+        DailyPortfolioSummary.objects.all().delete()
+
+        for offset in (0, 1, 2, 2):
+            rollup_portfolios(DAY + offset * timedelta(days=1), DAY + offset * timedelta(days=1))
+
+        self.assertEqual(self.summaries(), full)
+
+    def test_rollup_starts_from_first_fill(self):
+        """Test a day without earlier summaries is computed from the user's first fill."""
+        rollup_portfolios(DAY + timedelta(days=2), DAY + timedelta(days=2))
+
+        self.assertEqual(len(self.summaries()), 3)
+        self.assertAlmostEqual(self.summaries()[-1][1], 69.175)
+
+    def test_unattributed_fills(self):
+        """Test fills of orders without a user are summarized under no user, and re-rolling their days replaces them."""
+        order = new_order()
+        apply_trade_update(fill_update(order, 1, 100.0, START + timedelta(hours=5)))
+
+        rollup_portfolios(DAY, DAY)
+        rollup_portfolios(DAY, DAY)
+        self.assertEqual(DailyPortfolioSummary.objects.filter(user=None).count(), 1)
+
+        rollup_portfolios(DAY, DAY + timedelta(days=2))
+        unattributed = DailyPortfolioSummary.objects.filter(user=None).order_by("date")
+        rows = list(unattributed.values_list(*VALUES))
+        rollup_portfolios(DAY + timedelta(days=2), DAY + timedelta(days=2))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(unattributed.values_list(*VALUES)), rows)
+
+    def test_command(self):
+        """Test the command rolls up the given day."""
+        out = StringIO()
+
+        call_command("rollup_portfolios", "--date", DAY.isoformat(), stdout=out)
+
+        self.assertIn("Wrote 1 daily portfolio summaries", out.getvalue())
+        self.assertEqual(len(self.summaries()), 1)
+
+
+class DailySummaryApiTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        other = get_user_model().objects.create_user(email="other@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        DailyPortfolioSummary.objects.bulk_create(
+            DailyPortfolioSummary(
+                user=user,
+                date=DAY + timedelta(days=offset),
+                equity=offset,
+                pnl=0,
+                realized_pl=0,
+                turnover=0,
+                fees=0,
+                fill_count=0,
+                cash=0,
+                positions={},
+            )
+            for user in (self.user, other)
+            for offset in (2, 0, 1)
+        )
+
+    def test_daily_summaries(self):
+        """Test the caller's rows in the window are returned oldest first."""
+        res = self.client.get("/api/alpaca/accounts/daily/", {"start": DAY.isoformat(), "end": DAY + timedelta(1)})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["equity"] for row in res.data], [0.0, 1.0])
+        self.assertEqual(set(res.data[0]), set(VALUES))
+
+    def test_invalid_window(self):
+        """Test a window ending before it starts is rejected."""
+        res = self.client.get("/api/alpaca/accounts/daily/", {"start": DAY + timedelta(1), "end": DAY.isoformat()})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from alpaca.trading.models import TradeUpdate
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..scripts import portfolio_snapshots
+from ..scripts.alpaca_clients import AlpacaClientRegistry
+from ..scripts.local_alpaca_stub import ORDER_RESPONSE, LocalAlpacaStub, trade_update_message
+from ..scripts.order_mirror import apply_trade_update
+from ..scripts.portfolio_snapshots import get_positions_snapshot, invalidate_portfolio
+from .test_market_data_cache import LOCMEM_CACHES
+
+POSITIONS_URL = "/api/alpaca/positions/"
+ACCOUNTS_URL = "/api/alpaca/accounts/"
+
+POSITION = {
+    "asset_id": "276e2673-764b-4ab6-a611-caf665ca6340",
+    "symbol": "BTCUSD",
+    "exchange": "CRYPTO",
+    "asset_class": "crypto",
+    "avg_entry_price": "40000",
+    "qty": "1",
+    "side": "long",
+    "cost_basis": "40000",
+    "market_value": "41000",
+    "unrealized_pl": "1000",
+}
+ACCOUNT = {
+    "id": "8f8c8cee-1a6f-4b5e-9c5f-3d0f7c6f2a11",
+    "account_number": "PA0000000001",
+    "status": "ACTIVE",
+    "equity": "101000",
+    "last_equity": "100000",
+    "trading_blocked": False,
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALPACA_PORTFOLIO_CACHE_TTLS={"positions": (60, 0), "account": (60, 0)})
+class PortfolioSnapshotTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        portfolio_snapshots._memory.clear()
+        self.stub = LocalAlpacaStub({("GET", "/positions"): [POSITION], ("GET", "/account"): ACCOUNT}).start()
+        self.addCleanup(self.stub.stop)
+        client = AlpacaClientRegistry().get_trading_client("key", "secret", url_override=self.stub.url)
+        patcher = mock.patch.object(portfolio_snapshots.registry, "get_trading_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_repeated_reads_served_from_cache(self):
+        """Test polling reads are answered from memory or Redis without calling the broker again."""
+        first = get_positions_snapshot()
+        portfolio_snapshots._memory.clear()
+        second = get_positions_snapshot()
+        third = get_positions_snapshot()
+
+        self.assertEqual(self.stub.requests, [("GET", "/v2/positions")])
+        self.assertEqual(first.etag, second.etag)
+        self.assertIs(second, third)
+
+    def test_trade_update_invalidates(self):
+        """Test an order event makes the next read fetch fresh positions."""
+        get_positions_snapshot()
+        message = trade_update_message("fill", {**ORDER_RESPONSE, "status": "filled"})
+        apply_trade_update(TradeUpdate(**message["data"]))
+        get_positions_snapshot()
+
+        self.assertEqual(self.stub.requests, [("GET", "/v2/positions")] * 2)
+
+    def test_etag_unchanged_for_equal_content(self):
+        """Test a refetch that returns the same positions keeps the ETag, so clients still get 304s."""
+        etag = get_positions_snapshot().etag
+        invalidate_portfolio()
+        self.assertEqual(get_positions_snapshot().etag, etag)
+
+        self.stub.routes[("GET", "/positions")] = [{**POSITION, "qty": "2"}]
+        invalidate_portfolio()
+        self.assertNotEqual(get_positions_snapshot().etag, etag)
+
+    def test_conditional_get(self):
+        """Test a client sending the current ETag gets 304 without a body."""
+        res = self.client.get(POSITIONS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Cache-Control"], "private, no-cache")
+
+        res = self.client.get(POSITIONS_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+        res = self.client.get(POSITIONS_URL, HTTP_IF_NONE_MATCH='"positions-outdated"')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_account_gain_loss(self):
+        """Test the gain/loss endpoint is computed from the cached account snapshot."""
+        res = self.client.get(ACCOUNTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, 1000.0)
+
+        res = self.client.get(ACCOUNTS_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.stub.requests, [("GET", "/v2/account")])
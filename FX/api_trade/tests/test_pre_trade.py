@@ -0,0 +1,160 @@
+from unittest import mock
+
+from alpaca.trading.models import TradeAccount
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Asset
+from ..scripts import pre_trade
+from ..scripts.alpaca_async import AsyncTradingClient
+from ..scripts.asset_catalog import asset_fields, reset_asset_index
+from ..scripts.local_alpaca_stub import LocalAlpacaStub
+from ..scripts.portfolio_snapshots import Snapshot
+from ..scripts.pre_trade import check_buying_power, check_order_asset, check_order_fields
+from .test_alpaca_orders import BATCH_URL, ORDERS_URL, stub_routes
+from .test_asset_catalog import CATALOG, broker_asset, index_entry
+from .test_market_data_cache import LOCMEM_CACHES
+from .test_portfolio_snapshots import ACCOUNT
+
+CHECKS_URL = "/api/alpaca/orders/checks/"
+
+BTC = index_entry(CATALOG[-1])
+AAPL = index_entry(CATALOG[0])
+WHOLE_SHARES = index_entry(broker_asset("BRK.A", "Berkshire Hathaway Inc."))
+WHOLE_SHARES["fractionable"] = False
+
+
+def account(buying_power="1000", crypto_buying_power="500", **fields):
+    return TradeAccount(
+        **{**ACCOUNT, "buying_power": buying_power, "non_marginable_buying_power": crypto_buying_power, **fields}
+    )
+
+
+def order(**fields):
+    """An order payload; pass ``qty=None`` to leave the quantity out."""
+    fields = {"symbol": "BTC/USD", "qty": 1.0, "side": "buy", "time_in_force": "gtc", **fields}
+    return {name: value for name, value in fields.items() if value is not None}
+
+
+def codes(errors):
+    return [error["code"] for error in errors]
+
+
+class PreTradeRulesTestCase(SimpleTestCase):
+    def test_order_fields(self):
+        """Test quantity, price and order type rules that need no data."""
+        self.assertEqual(check_order_fields(order()), [])
+        self.assertEqual(codes(check_order_fields(order(notional=10.0))), ["qty_or_notional"])
+        self.assertEqual(codes(check_order_fields(order(qty=-1.0))), ["not_positive"])
+        self.assertEqual(codes(check_order_fields(order(type="limit"))), ["limit_price_required"])
+        self.assertEqual(codes(check_order_fields(order(type="stop"))), ["unsupported_order_type"])
+
+    def test_asset_rules(self):
+        """Test listing, tradability, fractional quantities, increments and crypto time in force."""
+        self.assertEqual(check_order_asset(order(), BTC), [])
+        self.assertEqual(codes(check_order_asset(order(symbol="NOPE"), None)), ["unknown_symbol"])
+        self.assertEqual(codes(check_order_asset(order(), {**BTC, "tradable": False})), ["not_tradable"])
+        self.assertEqual(codes(check_order_asset(order(qty=0.00001), BTC)), ["below_min_order_size"])
+        self.assertEqual(codes(check_order_asset(order(time_in_force="day"), BTC)), ["unsupported_time_in_force"])
+        self.assertEqual(codes(check_order_asset(order(qty=0.5), WHOLE_SHARES)), ["fractional_not_supported"])
+        self.assertEqual(check_order_asset(order(qty=0.5, time_in_force="day"), AAPL), [])
+
+        increments = {**AAPL, "min_trade_increment": 0.01, "price_increment": 0.01}
+        self.assertEqual(check_order_asset(order(qty=0.07, limit_price=187.3, time_in_force="day"), increments), [])
+        self.assertEqual(
+            codes(check_order_asset(order(qty=0.075, limit_price=187.305, time_in_force="day"), increments)),
+            ["qty_increment", "price_increment"],
+        )
+
+    def test_buying_power(self):
+        """Test buys use up buying power in order, crypto from the non-marginable pool, and sells are not checked."""
+        orders = [
+            order(qty=None, notional=300.0),
+            order(qty=1.0, limit_price=250.0),
+            order(symbol="AAPL", qty=4.0, limit_price=200.0),
+            order(side="sell", qty=100.0),
+        ]
+        assets = [BTC, BTC, AAPL, BTC]
+
+        self.assertEqual(
+            [codes(errors) for errors in check_buying_power(orders, assets, account())],
+            [[], ["insufficient_buying_power"], [], []],
+        )
+        restricted = check_buying_power(orders, assets, account(trading_blocked=True))
+        self.assertEqual({code for errors in restricted for code in codes(errors)}, {"account_restricted"})
+
+    def test_market_orders_priced_at_current_price(self):
+        """Test market orders for a quantity are priced at the current price, and skipped without one."""
+        with mock.patch.object(pre_trade, "current_prices", return_value={"BTC/USD": 600.0}):
+            self.assertEqual(codes(check_buying_power([order()], [BTC], account())[0]), ["insufficient_buying_power"])
+        with mock.patch.object(pre_trade, "current_prices", return_value={"BTC/USD": None}):
+            self.assertEqual(check_buying_power([order()], [BTC], account())[0], [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PreTradeApiTestCase(TestCase):
+    def setUp(self):
+        self.stub = LocalAlpacaStub(stub_routes()).start()
+        self.addCleanup(self.stub.stop)
+        url = self.stub.url
+        patcher = mock.patch(
+            "api_trade.scripts.alpaca_async.get_async_trading_client",
+            side_effect=lambda **kwargs: AsyncTradingClient("key", "secret", url_override=url),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        snapshot = mock.patch.object(pre_trade, "get_account_snapshot", return_value=Snapshot(account(), '"a"', 0))
+        snapshot.start()
+        self.addCleanup(snapshot.stop)
+        Asset.objects.bulk_create(Asset(id=asset.id, **asset_fields(asset)) for asset in CATALOG)
+        reset_asset_index()
+        self.addCleanup(reset_asset_index)
+        cache.clear()
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_rejected_without_broker_call(self):
+        """Test a rejected order gets structured errors and the broker's status without a broker call."""
+        res = self.client.post(ORDERS_URL, order(symbol="NOPE"), format="json")
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(
+            res.data["errors"], [{"field": "symbol", "code": "unknown_symbol", "message": "Unknown asset NOPE."}]
+        )
+
+        res = self.client.post(ORDERS_URL, order(qty=2.0, limit_price=300.0, type="limit"), format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_accepted_order_reaches_broker(self):
+        """Test an order passing every check is submitted."""
+        res = self.client.post(ORDERS_URL, order(symbol="btc/usd", qty=0.5, limit_price=100.0, type="limit"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stub.requests, [("POST", "/v2/orders")])
+
+    def test_batch_dispatches_accepted_orders_only(self):
+        """Test a basket reports in-process rejections next to broker results and sends only the rest."""
+        basket = [
+            order(qty=1.0, limit_price=100.0, type="limit"),
+            order(symbol="NOPE"),
+            order(qty=None, notional=450.0),
+        ]
+
+        res = self.client.post(BATCH_URL, basket, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result["status"] for result in res.data["results"]], [201, 422, 403])
+        self.assertEqual(res.data["results"][2]["errors"][0]["code"], "insufficient_buying_power")
+        self.assertEqual(len(self.stub.requests), 1)
+
+        self.assertEqual(self.client.get(CHECKS_URL).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(email="admin@example.com", password="testpass123")
+        )
+        stats = self.client.get(CHECKS_URL).data
+        self.assertEqual((stats["passed"], stats["avoided_upstream_calls"]), (1, 2))
+        self.assertEqual(stats["rejected"]["unknown_symbol"], 1)
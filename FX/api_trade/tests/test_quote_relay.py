@@ -0,0 +1,125 @@
+import asyncio
+import unittest
+import uuid
+
+import redis
+from django.test import SimpleTestCase, override_settings
+
+from ..scripts.quote_relay import RedisQuoteFeed
+from ..scripts.redis_client import RedisLock, get_async_redis, get_redis
+from .test_market_data_socket import RecordingFeed
+
+
+def redis_available():
+    try:
+        return get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+class UpstreamFeed(RecordingFeed):
+    """Upstream stand-in; every instance is kept so the tests can push quotes through the leader."""
+
+    instances = []
+
+    def __init__(self, publish):
+        super().__init__(publish)
+        self.symbols = set()
+        self.closed = False
+        self.instances.append(self)
+
+    async def subscribe(self, symbols):
+        await super().subscribe(symbols)
+        self.symbols.update(symbols)
+
+    async def unsubscribe(self, symbols):
+        await super().unsubscribe(symbols)
+        self.symbols.difference_update(symbols)
+
+    async def close(self):
+        self.closed = True
+
+
+async def wait_until(condition, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+class RedisLockTestCase(SimpleTestCase):
+    async def test_lock_has_a_single_owner(self):
+        """Test only the holder can renew and release the lock, after which another process can take it."""
+        client = get_async_redis()
+        key = f"test:lock:{uuid.uuid4().hex}"
+        first, second = RedisLock(client, key, 1000), RedisLock(client, key, 1000)
+
+        self.assertTrue(await first.acquire())
+        self.assertFalse(await second.acquire())
+        self.assertTrue(await first.renew())
+        self.assertFalse(await second.renew())
+        await second.release()
+        self.assertFalse(await second.acquire())
+
+        await first.release()
+        self.assertTrue(await second.acquire())
+        await second.release()
+        await client.aclose()
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+class RedisQuoteFeedTestCase(SimpleTestCase):
+    def setUp(self):
+        UpstreamFeed.instances = []
+        overrides = override_settings(
+            MARKET_DATA_NODE=f"test-{uuid.uuid4().hex}",
+            MARKET_DATA_UPSTREAM_FEED="api_trade.tests.test_quote_relay.UpstreamFeed",
+            MARKET_DATA_LEADER_TTL=300,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    async def test_one_upstream_for_all_workers(self):
+        """Test a single elected worker streams the union of all symbols and every worker receives its quotes."""
+        received = {"first": [], "second": []}
+        first = RedisQuoteFeed(lambda symbol, tick: received["first"].append((symbol, tick)))
+        second = RedisQuoteFeed(lambda symbol, tick: received["second"].append((symbol, tick)))
+        try:
+            await first.subscribe(["BTC/USD"])
+            await second.subscribe(["BTC/USD", "ETH/USD"])
+            await wait_until(
+                lambda: UpstreamFeed.instances and UpstreamFeed.instances[0].symbols == {"BTC/USD", "ETH/USD"}
+            )
+
+            self.assertEqual([first.is_leader, second.is_leader].count(True), 1)
+            self.assertEqual(len(UpstreamFeed.instances), 1)
+
+            upstream = UpstreamFeed.instances[0]
+            upstream.publish("BTC/USD", '{"bid_price": 1}')
+            upstream.publish("ETH/USD", '{"bid_price": 2}')
+            await wait_until(lambda: len(received["second"]) == 2 and received["first"])
+
+            self.assertEqual(received["first"], [("BTC/USD", '{"bid_price": 1}')])
+            await second.unsubscribe(["ETH/USD"])
+            await wait_until(lambda: upstream.symbols == {"BTC/USD"})
+        finally:
+            await first.close()
+            await second.close()
+
+    async def test_failover(self):
+        """Test another worker takes over the upstream stream when the leader goes away."""
+        first = RedisQuoteFeed(lambda symbol, tick: None)
+        second = RedisQuoteFeed(lambda symbol, tick: None)
+        try:
+            await first.subscribe(["BTC/USD"])
+            await wait_until(lambda: first.is_leader)
+            await second.subscribe(["BTC/USD"])
+            await first.close()
+
+            await wait_until(lambda: second.is_leader)
+            self.assertTrue(UpstreamFeed.instances[0].closed)
+            await wait_until(lambda: UpstreamFeed.instances[-1].symbols == {"BTC/USD"})
+        finally:
+            await second.close()
@@ -0,0 +1,200 @@
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import redis
+from alpaca.common.exceptions import APIError
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from requests.adapters import HTTPAdapter
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..scripts import alpaca_async, alpaca_clients
+from ..scripts.alpaca_async import AsyncTradingClient
+from ..scripts.alpaca_clients import BrokerAdapter
+from ..scripts.alpaca_integration import market_order_request
+from ..scripts.circuit_breaker import reset_breakers
+from ..scripts.local_alpaca_stub import ORDER_RESPONSE, LocalAlpacaStub
+from ..scripts.rate_limiter import RateLimited, TokenBucketLimiter, priority
+from ..scripts.redis_client import get_redis
+from .test_quote_relay import redis_available
+
+# A token every 100ms, at most 4 in the bucket.
+LIMITS = {"trading": (600, 4, "account")}
+PRIORITIES = {"orders": (0.0, 1), "account": (0.5, 0.05), "background": (0.5, 1)}
+
+
+def delete_keys(namespace):
+    keys = list(get_redis().scan_iter(match=f"{namespace}:*"))
+    if keys:
+        get_redis().delete(*keys)
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+@override_settings(ALPACA_RATE_LIMIT_ENABLED=True, ALPACA_RATE_LIMITS=LIMITS, ALPACA_RATE_LIMIT_PRIORITIES=PRIORITIES)
+class TokenBucketLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.limiter = TokenBucketLimiter(f"test:ratelimit:{uuid.uuid4().hex}")
+        self.addCleanup(delete_keys, self.limiter.namespace)
+
+    def stats(self, name):
+        return self.limiter.stats()["trading"]["priorities"][name]
+
+    def test_burst_then_refill(self):
+        """Test the burst is granted at once and the next call waits for the bucket to refill."""
+        started = time.monotonic()
+        for _ in range(4):
+            self.limiter.acquire("trading", "key", "orders")
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        self.limiter.acquire("trading", "key", "orders")
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(self.stats("orders")["granted"], 5)
+        self.assertEqual(self.stats("orders")["queued"], 1)
+
+    def test_lower_priorities_leave_a_reserve(self):
+        """Test a class is shed once only the reserve of the classes before it is left, while orders go on."""
+        self.limiter.acquire("trading", "key")
+        self.limiter.acquire("trading", "key")
+
+        with self.assertRaises(RateLimited) as raised:
+            self.limiter.acquire("trading", "key")
+        self.limiter.acquire("trading", "key", "orders")
+        self.limiter.acquire("trading", "key", "orders")
+
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(raised.exception.priority, "account")
+        self.assertEqual(self.stats("account")["granted"], 2)
+        self.assertEqual(self.stats("account")["shed"], 1)
+        self.assertEqual(self.stats("orders")["granted"], 2)
+
+    def test_priority_context(self):
+        """Test calls made inside ``priority`` use it instead of the API's default."""
+        with priority("background"):
+            self.limiter.acquire("trading", "key")
+        self.limiter.acquire("trading", "key")
+
+        self.assertEqual(self.stats("background")["granted"], 1)
+        self.assertEqual(self.stats("account")["granted"], 1)
+
+    def test_queued_call_waits_until_its_deadline(self):
+        """Test a call without a token waits for one when it comes before its deadline."""
+        for _ in range(4):
+            self.limiter.acquire("trading", "key", "orders")
+
+        self.limiter.acquire("trading", "key", "background")
+
+        self.assertEqual(self.stats("background")["granted"], 1)
+        self.assertGreaterEqual(self.stats("background")["wait_ms"], 100)
+
+    def test_accounts_have_their_own_bucket(self):
+        """Test draining one account's bucket does not hold back another account."""
+        self.limiter.acquire("trading", "first")
+        self.limiter.acquire("trading", "first")
+
+        self.limiter.acquire("trading", "second")
+
+        with self.assertRaises(RateLimited):
+            self.limiter.acquire("trading", "first")
+
+    def test_broker_429_empties_the_bucket(self):
+        """Test a 429 from the broker makes every caller wait for the bucket to refill."""
+        self.limiter.throttled("trading", "key")
+
+        with self.assertRaises(RateLimited):
+            self.limiter.acquire("trading", "key")
+        self.assertEqual(self.limiter.stats()["trading"]["throttled"], 1)
+
+    async def test_acquire_async(self):
+        """Test coroutines share the bucket and wait without blocking the event loop."""
+        for _ in range(4):
+            await self.limiter.acquire_async("trading", "key", "orders")
+
+        await self.limiter.acquire_async("trading", "key", "orders")
+        with self.assertRaises(RateLimited):
+            await self.limiter.acquire_async("trading", "key")
+
+        self.assertEqual(self.stats("orders")["queued"], 1)
+
+    def test_redis_unavailable(self):
+        """Test calls go through without a token when Redis is unreachable."""
+        with mock.patch.object(self.limiter, "_script", side_effect=redis.ConnectionError), self.assertLogs(
+            "api_trade.scripts.rate_limiter", "WARNING"
+        ):
+            for _ in range(10):
+                self.limiter.acquire("trading", "key")
+
+    @override_settings(ALPACA_RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        """Test the governor can be turned off."""
+        for _ in range(10):
+            self.limiter.acquire("trading", "key")
+        self.assertEqual(self.stats("account")["granted"], 0)
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+@override_settings(ALPACA_RATE_LIMIT_ENABLED=True, ALPACA_RATE_LIMITS=LIMITS, ALPACA_RATE_LIMIT_PRIORITIES=PRIORITIES)
+class RateLimitedClientsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.limiter = TokenBucketLimiter(f"test:ratelimit:{uuid.uuid4().hex}")
+        self.addCleanup(delete_keys, self.limiter.namespace)
+        self.addCleanup(reset_breakers)
+        for module in (alpaca_clients, alpaca_async):
+            patcher = mock.patch.object(module, "rate_limiter", self.limiter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_adapter_takes_a_token_per_request(self):
+        """Test every request sent through the adapter takes a token, and a 429 empties the bucket."""
+        adapter = BrokerAdapter("trading", "key")
+        request = mock.Mock(method="POST", path_url="/v2/orders")
+        with mock.patch.object(HTTPAdapter, "send", return_value=mock.Mock(status_code=429)) as send:
+            adapter.send(request)
+
+            with self.assertRaises(RateLimited):
+                adapter.send(request)
+
+        send.assert_called_once()
+        self.assertEqual(self.limiter.stats()["trading"]["throttled"], 1)
+
+    async def test_async_client_backs_off_after_a_429(self):
+        """Test a 429 answered to the async client makes the next order wait, and it is shed past its deadline."""
+        stub = LocalAlpacaStub({("POST", "/orders"): ORDER_RESPONSE}, rate_limit=0).start()
+        self.addCleanup(stub.stop)
+        client = AsyncTradingClient("key", "secret", url_override=stub.url)
+        client.retry_attempts = 0
+        order = market_order_request({"symbol": "BTC/USD", "qty": 1, "side": "buy", "time_in_force": "gtc"})
+
+        try:
+            with self.assertRaises(APIError) as raised:
+                await client.submit_order(order)
+            self.assertEqual(raised.exception.status_code, 429)
+            with override_settings(ALPACA_RATE_LIMIT_PRIORITIES={**PRIORITIES, "orders": (0.0, 0.01)}):
+                with self.assertRaises(RateLimited):
+                    await client.submit_order(order)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(self.limiter.stats()["trading"]["throttled"], 1)
+
+
+class RateLimitStatsApiTestCase(TestCase):
+    def test_admin_only(self):
+        """Test the governor's counters are reserved to admins."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(email="user@example.com", password="pass1234"))
+        self.assertEqual(client.get("/api/alpaca/rate-limits/").status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(
+            get_user_model().objects.create_superuser(email="admin@example.com", password="pass1234")
+        )
+        stats = {"trading": {"throttled": 0, "priorities": {}}}
+        with mock.patch("api_trade.views.alpaca_historical.rate_limiter.stats", return_value=stats):
+            res = client.get("/api/alpaca/rate-limits/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, stats)
@@ -0,0 +1,114 @@
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+from alpaca.data.models import Snapshot
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..scripts.snapshot_coalescer import SnapshotCoalescer
+from ..views import alpaca_historical
+
+SNAPSHOTS_URL = "/api/alpaca/snapshots/"
+
+
+def run_concurrently(calls):
+    results = [None] * len(calls)
+
+    def run(index, call):
+        results[index] = call()
+
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SnapshotCoalescerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.fetched = []
+
+        def fetch(symbols):
+            self.fetched.append(symbols)
+            time.sleep(0.05)
+            return {symbol: f"snapshot {symbol}" for symbol in symbols if symbol != "NOPE/USD"}
+
+        self.fetch = fetch
+
+    def test_concurrent_callers_share_one_request(self):
+        """Test callers within one window are served by a single upstream call with the union of their symbols."""
+        coalescer = SnapshotCoalescer(self.fetch, window=0.05, max_symbols=100)
+
+        results = run_concurrently(
+            [lambda: coalescer.get(["BTC/USD", "ETH/USD"]), lambda: coalescer.get(["ETH/USD", "NOPE/USD"])] * 10
+        )
+
+        self.assertEqual(self.fetched, [["BTC/USD", "ETH/USD", "NOPE/USD"]])
+        self.assertEqual(results[0], {"BTC/USD": "snapshot BTC/USD", "ETH/USD": "snapshot ETH/USD"})
+        self.assertEqual(results[1], {"ETH/USD": "snapshot ETH/USD", "NOPE/USD": None})
+        self.assertEqual(coalescer.stats(), {"requests": 20, "upstream_calls": 1})
+
+    def test_full_batch_starts_a_new_one(self):
+        """Test a caller whose symbols do not fit the open batch starts the next one."""
+        coalescer = SnapshotCoalescer(self.fetch, window=0.05, max_symbols=2)
+
+        run_concurrently([lambda: coalescer.get(["BTC/USD", "ETH/USD"]), lambda: coalescer.get(["SOL/USD"])])
+
+        self.assertEqual(sorted(self.fetched), [["BTC/USD", "ETH/USD"], ["SOL/USD"]])
+
+    def test_error_reaches_every_caller(self):
+        """Test an upstream failure is raised to every caller of the batch."""
+
+        def fetch(symbols):
+            raise ValueError("upstream down")
+
+        coalescer = SnapshotCoalescer(fetch, window=0.05)
+        errors = []
+
+        def call():
+            try:
+                coalescer.get(["BTC/USD"])
+            except ValueError as error:
+                errors.append(error)
+
+        run_concurrently([call] * 5)
+
+        self.assertEqual(len(errors), 5)
+
+
+class SnapshotsApiTestCase(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_snapshots(self):
+        """Test snapshots of several symbols come back keyed by symbol, with null for unknown ones."""
+        snapshot = Snapshot(
+            "BTC/USD",
+            {
+                "latestTrade": {"t": datetime(2024, 2, 13, tzinfo=timezone.utc), "p": 52000.0, "s": 1, "i": 1},
+                "latestQuote": None,
+                "minuteBar": None,
+                "dailyBar": None,
+                "prevDailyBar": None,
+            },
+        )
+        fetch = mock.Mock(return_value={"BTC/USD": snapshot})
+
+        with mock.patch.object(alpaca_historical, "snapshot_coalescer", SnapshotCoalescer(fetch)):
+            res = self.client.get(SNAPSHOTS_URL, {"symbols": "btc/usd,ETH/USD"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["BTC/USD"]["latest_trade"]["price"], 52000.0)
+        self.assertIsNone(res.data["ETH/USD"])
+        fetch.assert_called_once_with(["BTC/USD", "ETH/USD"])
+
+    def test_symbols_required(self):
+        """Test a request without symbols is rejected."""
+        self.assertEqual(self.client.get(SNAPSHOTS_URL).status_code, status.HTTP_400_BAD_REQUEST)
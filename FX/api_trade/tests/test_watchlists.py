@@ -0,0 +1,156 @@
+import uuid
+from datetime import datetime, timezone
+from unittest import mock
+
+from alpaca.common.exceptions import APIError
+from alpaca.data.models import Quote
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Asset, Watchlist, WatchlistSyncTask
+from ..scripts import watchlists
+from ..scripts.asset_catalog import asset_fields, reset_asset_index
+from ..scripts.watchlists import add_symbol, sync_watchlists
+from .test_asset_catalog import CATALOG
+from .test_market_data_cache import LOCMEM_CACHES
+
+WATCHLISTS_URL = "/api/alpaca/watchlists/"
+
+
+def broker_error(status_code):
+    return APIError('{"message": "broker error"}', mock.Mock(response=mock.Mock(status_code=status_code)))
+
+
+def quote(symbol, bid):
+    return Quote(
+        symbol,
+        {"t": datetime(2024, 2, 13, tzinfo=timezone.utc), "bp": bid, "bs": 1, "ap": bid + 1, "as": 1},
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WatchlistTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        Asset.objects.bulk_create(Asset(id=asset.id, **asset_fields(asset)) for asset in CATALOG)
+        reset_asset_index()
+        self.addCleanup(reset_asset_index)
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.broker = mock.Mock()
+        self.broker.create_watchlist.side_effect = lambda name, symbols: mock.Mock(id=uuid.uuid4())
+
+    def create(self, name="Tech", symbols=("AAPL", "msft")):
+        res = self.client.post(WATCHLISTS_URL, {"name": name, "symbols": list(symbols)}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res.data["id"]
+
+    def test_crud_served_locally(self):
+        """Test watchlists are created, read, edited and deleted without waiting for the broker."""
+        watchlist_id = self.create()
+        other = get_user_model().objects.create_user(email="other@example.com", password="testpass123")
+        Watchlist.objects.create(user=other, name="Other")
+        detail = f"{WATCHLISTS_URL}{watchlist_id}/"
+
+        res = self.client.get(WATCHLISTS_URL)
+        self.assertEqual([(row["name"], row["symbols"]) for row in res.data], [("Tech", ["AAPL", "MSFT"])])
+
+        self.client.post(f"{detail}symbols/", {"symbol": "btcusd"})
+        self.client.post(f"{detail}symbols/", {"symbol": "AAPL"})
+        self.assertEqual(self.client.delete(f"{detail}symbols/MSFT/").status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(f"{detail}symbols/MSFT/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(detail).data["symbols"], ["AAPL", "BTC/USD"])
+        self.assertEqual(self.client.delete(f"{detail}symbols/BTC/USD/").status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.patch(detail, {"name": "Renamed"}, format="json")
+        self.assertEqual((res.data["name"], res.data["symbols"]), ("Renamed", ["AAPL"]))
+        self.assertEqual(self.client.delete(detail).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Watchlist.objects.filter(user=self.user).exists())
+
+    def test_invalid_changes(self):
+        """Test unknown symbols and duplicate names are rejected."""
+        self.create()
+
+        res = self.client.post(WATCHLISTS_URL, {"name": "Tech"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(WATCHLISTS_URL, {"name": "New", "symbols": ["NOPE"]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changes_coalesce_into_one_broker_call(self):
+        """Test a burst of edits is one queued task, synced as the watchlist's final state."""
+        watchlist_id = self.create()
+        detail = f"{WATCHLISTS_URL}{watchlist_id}/"
+        self.client.post(f"{detail}symbols/", {"symbol": "SPY"})
+        self.client.delete(f"{detail}symbols/AAPL/")
+
+        self.assertEqual(WatchlistSyncTask.objects.count(), 1)
+        self.assertEqual(sync_watchlists(integration=self.broker), (1, 0))
+
+        name, symbols = self.broker.create_watchlist.call_args.args
+        self.assertEqual(symbols, ["MSFT", "SPY"])
+        self.assertTrue(name.startswith("Tech "))
+        self.assertIsNotNone(Watchlist.objects.get(pk=watchlist_id).broker_id)
+        self.assertFalse(WatchlistSyncTask.objects.exists())
+
+        self.client.patch(detail, {"symbols": ["AAPL"]}, format="json")
+        sync_watchlists(integration=self.broker)
+        broker_id = Watchlist.objects.get(pk=watchlist_id).broker_id
+        self.broker.update_watchlist_by_id.assert_called_once_with(broker_id, name=name, symbols=["AAPL"])
+
+        self.client.delete(detail)
+        sync_watchlists(integration=self.broker)
+        self.broker.delete_watchlist_by_id.assert_called_once_with(broker_id)
+        self.assertEqual(self.broker.create_watchlist.call_count, 1)
+
+    def test_failed_sync_backs_off(self):
+        """Test a failed broker call is retried later, not right away."""
+        self.create()
+        self.broker.create_watchlist.side_effect = broker_error(500)
+
+        self.assertEqual(sync_watchlists(integration=self.broker), (0, 1))
+        self.assertEqual(sync_watchlists(integration=self.broker), (0, 0))
+
+        task = WatchlistSyncTask.objects.get()
+        self.assertEqual(task.attempts, 1)
+        self.assertIn("broker error", task.last_error)
+
+    def test_change_during_sync_is_kept(self):
+        """Test a change made while its watchlist was being synced is synced again afterwards."""
+        watchlist = Watchlist.objects.get(pk=self.create())
+
+        def create_and_edit(name, symbols):
+            add_symbol(watchlist, "SPY")
+            return mock.Mock(id=uuid.uuid4())
+
+        self.broker.create_watchlist.side_effect = create_and_edit
+        sync_watchlists(integration=self.broker)
+
+        task = WatchlistSyncTask.objects.get()
+        self.assertIsNone(task.claimed_until)
+        self.assertEqual(sync_watchlists(integration=self.broker), (1, 0))
+        self.broker.update_watchlist_by_id.assert_called_once()
+
+    def test_quotes_batched_per_asset_class(self):
+        """Test the quotes of a watchlist take one request per asset class."""
+        watchlist_id = self.create(symbols=["AAPL", "MSFT", "BTC/USD"])
+        stocks, crypto = mock.Mock(), mock.Mock()
+        stocks.get_stock_latest_quote.return_value = {"AAPL": quote("AAPL", 180.0), "MSFT": quote("MSFT", 400.0)}
+        crypto.get_crypto_latest_quote.return_value = {"BTC/USD": quote("BTC/USD", 52000.0)}
+
+        with (
+            mock.patch.object(watchlists.registry, "get_stock_data_client", return_value=stocks),
+            mock.patch.object(watchlists.registry, "get_crypto_data_client", return_value=crypto),
+        ):
+            res = self.client.get(f"{WATCHLISTS_URL}{watchlist_id}/quotes/")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {symbol: row["bid_price"] for symbol, row in res.data.items()},
+            {"AAPL": 180.0, "MSFT": 400.0, "BTC/USD": 52000.0},
+        )
+        self.assertEqual(stocks.get_stock_latest_quote.call_args.args[0].symbol_or_symbols, ["AAPL", "MSFT"])
+        self.assertEqual(crypto.get_crypto_latest_quote.call_count, 1)
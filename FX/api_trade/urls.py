@@ -2,28 +2,48 @@ from api_trade.views import (
     alpaca_account_view,
     alpaca_assets_view,
     alpaca_historical,
+    alpaca_indicators_view,
     alpaca_order_view,
     alpaca_position_view,
+    alpaca_watchlist_view,
 )
-from django.urls import path
+from django.urls import include, path
 from rest_framework import routers
 
 router = routers.DefaultRouter()
+router.register(r"alpaca/watchlists", alpaca_watchlist_view.WatchlistViewSet, basename="watchlists")
 
 
 app_name = "api_trade"
 
 urlpatterns = [
     path("alpaca/", alpaca_historical.get_crypto_bars, name="historical-data"),
+    path("alpaca/indicators/", alpaca_indicators_view.get_indicators, name="indicators"),
+    path("alpaca/snapshots/", alpaca_historical.get_crypto_snapshots, name="snapshots"),
+    path(
+        "alpaca/cache-stats/",
+        alpaca_historical.get_market_data_cache_stats,
+        name="market-data-cache-stats",
+    ),
+    path("alpaca/rate-limits/", alpaca_historical.get_rate_limit_stats, name="rate-limit-stats"),
+    path("alpaca/breakers/", alpaca_historical.get_circuit_breaker_stats, name="circuit-breaker-stats"),
     path("alpaca/assets/", alpaca_assets_view.get_assets, name="assets"),
+    # Crypto symbols contain a slash ("BTC/USD").
+    path("alpaca/assets/<path:symbol>/", alpaca_assets_view.get_asset, name="assets-detail"),
     path(
         "alpaca/orders/",
-        alpaca_order_view.AlpacaOrdersViewSet.as_view({"get": "list", "post": "create", "delete": "cancel_all"}),
+        alpaca_order_view.AlpacaOrdersView.as_view(),
         name="orders",
     ),
+    path(
+        "alpaca/orders/batch/",
+        alpaca_order_view.AlpacaOrdersBatchView.as_view(),
+        name="orders-batch",
+    ),
+    path("alpaca/orders/checks/", alpaca_order_view.get_pre_trade_stats, name="orders-checks"),
     path(
         "alpaca/orders/detail/<str:order_id>/",
-        alpaca_order_view.AlpacaOrdersViewSet.as_view({"get": "retrieve", "delete": "destroy"}),
+        alpaca_order_view.AlpacaOrderDetailView.as_view(),
         name="orders-detail",
     ),
     path("alpaca/positions/", alpaca_position_view.get_positions, name="positions"),
@@ -32,4 +52,9 @@ urlpatterns = [
         alpaca_account_view.get_view_gain_loss_portfolio,
         name="accounts",
     ),
+    path("alpaca/accounts/pnl/", alpaca_account_view.get_position_pnl, name="accounts-pnl"),
+    path("alpaca/accounts/exposure/", alpaca_account_view.get_exposure, name="accounts-exposure"),
+    path("alpaca/accounts/equity/", alpaca_account_view.get_equity_curve, name="accounts-equity"),
+    path("alpaca/accounts/daily/", alpaca_account_view.get_daily_summaries, name="accounts-daily"),
+    path("", include(router.urls)),
 ]
@@ -1,13 +1,57 @@
 from rest_framework.decorators import api_view, schema
 from rest_framework.response import Response
 
+from ..models import DailyPortfolioSummary
+from ..scripts import portfolio_analytics
 from ..scripts.alpaca_integration import AlpacaIntegrationAccount
+from ..scripts.portfolio_snapshots import get_account_snapshot, snapshot_response
+from ..serializers import DailyPortfolioSummarySerializer, DailySummaryQuerySerializer, EquityCurveSerializer
 
 
 @api_view(["GET"])
 @schema(None)
 def get_view_gain_loss_portfolio(request):
+    """Equity change since the previous close, served from the snapshot cache; supports ``If-None-Match``."""
+    snapshot = get_account_snapshot()
+    result = AlpacaIntegrationAccount().get_view_gain_loss_portfolio(account=snapshot.data)
 
-    result = AlpacaIntegrationAccount().get_view_gain_loss_portfolio()
+    return snapshot_response(request, snapshot, result)
 
-    return Response(result)
+
+@api_view(["GET"])
+@schema(None)
+def get_position_pnl(request):
+    """Realized and unrealized P&L of each position opened through the caller's orders."""
+    return Response(portfolio_analytics.position_pnl(request.user))
+
+
+@api_view(["GET"])
+@schema(None)
+def get_exposure(request):
+    """Long, short, gross and net exposure of the caller's positions by asset class."""
+    return Response(portfolio_analytics.exposure(request.user))
+
+
+@api_view(["GET"])
+@schema(None)
+def get_equity_curve(request):
+    """Cumulative P&L of the caller's fills at every ``timeframe`` bar of a window, with drawdown."""
+    serializer = EquityCurveSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+
+    return Response(portfolio_analytics.equity_curve(request.user, params["timeframe"], params["start"], params["end"]))
+
+
+@api_view(["GET"])
+@schema(None)
+def get_daily_summaries(request):
+    """The caller's materialized end-of-day equity, P&L, turnover and fees, one row per day with activity."""
+    serializer = DailySummaryQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+
+    summaries = DailyPortfolioSummary.objects.filter(
+        user=request.user, date__gte=params["start"], date__lte=params["end"]
+    ).order_by("date")
+    return Response(DailyPortfolioSummarySerializer(summaries, many=True).data)
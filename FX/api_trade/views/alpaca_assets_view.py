@@ -1,13 +1,39 @@
+from alpaca.common.exceptions import APIError
+from rest_framework import status
 from rest_framework.decorators import api_view, schema
 from rest_framework.response import Response
 
-from ..scripts.alpaca_integration import AlpacaIntegrationAssets
+from ..scripts.asset_catalog import get_asset as lookup_asset
+from ..scripts.asset_catalog import get_asset_index
+from ..serializers import AssetSearchSerializer
 
 
 @api_view(["GET"])
 @schema(None)
 def get_assets(request):
+    """Search the asset catalog by symbol or name prefix, with fuzzy matches as a fallback."""
+    serializer = AssetSearchSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
 
-    result = AlpacaIntegrationAssets().get_assets()
-
+    result = get_asset_index().search(
+        params["q"],
+        limit=params["limit"],
+        asset_class=params.get("asset_class"),
+        exchange=params.get("exchange"),
+        tradable=params["tradable"],
+        fuzzy=params["fuzzy"],
+    )
     return Response(result)
+
+
+@api_view(["GET"])
+@schema(None)
+def get_asset(request, symbol):
+    """One asset by symbol, from the catalog or else from the broker."""
+    try:
+        return Response(lookup_asset(symbol))
+    except APIError as error:
+        if error.status_code == status.HTTP_404_NOT_FOUND:
+            return Response({"detail": f"Unknown asset {symbol}."}, status=status.HTTP_404_NOT_FOUND)
+        raise
@@ -1,12 +1,142 @@
-from rest_framework.decorators import api_view, schema
+import base64
+import json
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, schema
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+from ..renderers import COLUMNAR_RENDERER_CLASSES, NDJSONRenderer
+from ..scripts import circuit_breaker
+from ..scripts.bar_store import BAR_COLUMNS, BarStore, bars_to_columns
+from ..scripts.market_data_cache import market_data_cache
+from ..scripts.rate_limiter import rate_limiter
+from ..scripts.snapshot_coalescer import snapshot_coalescer
+from ..serializers import CryptoBarsSerializer, SnapshotsSerializer
+
+STREAM_LINES_PER_CHUNK = 500
+
+
+def encode_cursor(timestamp, symbol):
+    position = json.dumps([timestamp.isoformat(), symbol]).encode("utf-8")
+    return base64.urlsafe_b64encode(position).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, symbol = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), symbol
+    except (TypeError, ValueError) as e:
+        raise ValidationError({"cursor": ["Invalid cursor."]}) from e
+
+
+def stream_bars(rows):
+    """Encode bar rows as NDJSON, a few hundred lines per chunk."""
+    encoder = JSONEncoder()
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(BAR_COLUMNS, row))))
+        if len(lines) == STREAM_LINES_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
 
-from ..scripts.alpaca_integration import AlpacaIntegrationDataHistorical
+
+async def astream_bars(rows):
+    """``stream_bars`` for ASGI servers, which would otherwise read a sync iterator whole before sending it: each
+    chunk is read and encoded in the request's sync thread, where the database cursor lives."""
+    chunks = stream_bars(rows)
+    try:
+        while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
 
 
 @api_view(["GET"])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, *COLUMNAR_RENDERER_CLASSES])
 @schema(None)
 def get_crypto_bars(request):
-    result = AlpacaIntegrationDataHistorical().get_crypto_bars()
+    """Crypto bars for a window, cursor paginated, or streamed in full as NDJSON (``?format=ndjson``).
+
+    Pages are also available as typed columns: ``?format=columnar`` (MessagePack) or ``?format=arrow``.
+    """
+    serializer = CryptoBarsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    after = decode_cursor(params["cursor"]) if "cursor" in params else None
+
+    rows = BarStore().iter_bars(params["symbols"], params["timeframe"], params["start"], params["end"], after=after)
+
+    if isinstance(request.accepted_renderer, NDJSONRenderer):
+        chunks = astream_bars(rows) if isinstance(request._request, ASGIRequest) else stream_bars(rows)
+        return StreamingHttpResponse(chunks, content_type=NDJSONRenderer.media_type)
+
+    page = list(islice(rows, params["limit"] + 1))
+    rows.close()
+    next_url = None
+    if len(page) > params["limit"]:
+        page = page[: params["limit"]]
+        last = page[-1]
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", encode_cursor(last[1], last[0]))
+
+    if getattr(request.accepted_renderer, "columnar", False):
+        return Response({"next": next_url, "data": bars_to_columns(page, params["symbols"])})
+
+    result = {symbol: [] for symbol in params["symbols"]}
+    for row in page:
+        result[row[0]].append(dict(zip(BAR_COLUMNS, row)))
+
+    return Response({"next": next_url, "data": result})
 
-    return Response(result)
+
+@api_view(["GET"])
+@schema(None)
+def get_crypto_snapshots(request):
+    """Latest trade, quote and bars of many crypto pairs (``?symbols=BTC/USD,ETH/USD``), ``null`` for unknown ones.
+
+    Concurrent requests are merged into one upstream call.
+    """
+    serializer = SnapshotsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+
+    snapshots = snapshot_coalescer.get(serializer.validated_data["symbols"])
+    return Response(
+        {
+            symbol: snapshot.model_dump(mode="json") if snapshot is not None else None
+            for symbol, snapshot in snapshots.items()
+        }
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@schema(None)
+def get_market_data_cache_stats(request):
+    """Hit/stale/miss counters of the market data cache, per endpoint."""
+    return Response(market_data_cache.stats())
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@schema(None)
+def get_rate_limit_stats(request):
+    """Broker calls granted, queued and shed by the rate limit governor, per API and priority."""
+    return Response(rate_limiter.stats())
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@schema(None)
+def get_circuit_breaker_stats(request):
+    """State and counters of the circuit breakers of the worker answering the request."""
+    return Response(circuit_breaker.stats())
@@ -0,0 +1,51 @@
+import numpy as np
+from rest_framework.decorators import api_view, renderer_classes, schema
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from ..renderers import COLUMNAR_RENDERER_CLASSES
+from ..scripts.bar_store import BAR_COLUMNS, TIMEFRAMES, BarStore, bars_to_columns
+from ..scripts.indicators import INDICATORS
+from ..serializers import IndicatorsSerializer
+
+
+def _to_list(values):
+    """JSON friendly list: NaN becomes ``None``."""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+@api_view(["GET"])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, *COLUMNAR_RENDERER_CLASSES])
+@schema(None)
+def get_indicators(request):
+    """Indicators over stored bars for several symbols in one call.
+
+    Each symbol gets parallel arrays: epoch millisecond ``timestamp``, ``close`` and one array per indicator output.
+    """
+    serializer = IndicatorsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    specs = params["indicators"]
+
+    # Read enough bars before ``start`` for every indicator to be warmed up at the first returned bar.
+    warmup_bars = max(INDICATORS[name].warmup(indicator_params) for name, indicator_params in specs)
+    warmup_start = params["start"] - TIMEFRAMES[params["timeframe"]][1] * warmup_bars
+    bars = BarStore().get_bars(params["symbols"], params["timeframe"], warmup_start, params["end"])
+    rows = bars.order_by("symbol", "timestamp").values_list(*BAR_COLUMNS)
+
+    start_ms = params["start"].timestamp() * 1000
+    columnar = getattr(request.accepted_renderer, "columnar", False)
+    result = {}
+    for symbol, columns in bars_to_columns(rows, params["symbols"]).items():
+        series = {"timestamp": columns["timestamp"], "close": columns["close"]}
+        for name, indicator_params in specs:
+            series.update(INDICATORS[name].compute(name, indicator_params, columns))
+        first = np.searchsorted(columns["timestamp"], start_ms)
+        series = {key: values[first:] for key, values in series.items()}
+        if not columnar:
+            series = {
+                key: values.tolist() if key == "timestamp" else _to_list(values) for key, values in series.items()
+            }
+        result[symbol] = series
+
+    return Response({"data": result})
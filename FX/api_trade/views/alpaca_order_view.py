@@ -1,60 +1,157 @@
 from uuid import UUID
 
-from api_trade.serializers import OrderSerializer
-from rest_framework import status, viewsets
-from rest_framework.decorators import action
+from alpaca.common.exceptions import APIError
+from alpaca.common.utils import validate_uuid_id_param
+from api_trade.models import BrokerOrder
+from api_trade.serializers import BrokerOrderSerializer, OrderListSerializer, OrderSerializer
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes, schema
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
-from ..scripts.alpaca_integration import AlpacaIntegrationOrders
+from ..scripts.alpaca_async import AsyncAlpacaIntegrationOrders, error_message
+from ..scripts.order_mirror import record_order, record_orders
+from ..scripts.portfolio_snapshots import invalidate_portfolio
+from ..scripts.pre_trade import OrderRejected, check_order, check_orders, rejection_status
+from ..scripts.pre_trade import stats as pre_trade_stats
+from .async_api_view import AsyncAPIView
 
 
-class AlpacaOrdersViewSet(viewsets.ViewSet):
+class AlpacaOrdersBaseView(AsyncAPIView):
     """
-    ViewSet to handle Alpaca orders.
+    Async views around the Alpaca orders API; a slow broker only holds the event loop, not a worker.
     """
 
     serializer_class = OrderSerializer
 
-    def list(self, request):
+    def handle_exception(self, exc):
+        if isinstance(exc, APIError):
+            return Response({"error": error_message(exc)}, status=exc.status_code or status.HTTP_502_BAD_GATEWAY)
+        if isinstance(exc, OrderRejected):
+            return Response({"error": f"{exc}", "errors": exc.errors}, status=exc.status_code)
+        if isinstance(exc, ValueError):
+            return Response({"error": f"{exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
+
+
+class AlpacaOrdersView(AlpacaOrdersBaseView):
+    """
+    List, create and cancel Alpaca orders.
+    """
+
+    async def get(self, request):
         """
-        Return a list of all orders.
+        Return the newest orders from the local order mirror, filtered by ``status`` and ``symbols``.
         """
-        result = AlpacaIntegrationOrders().get_orders()
-        return Response(result)
+        serializer = OrderListSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        orders = BrokerOrder.objects.order_by("-created_at")
+        if params["status"] == "open":
+            orders = orders.exclude(status__in=BrokerOrder.CLOSED_STATUSES)
+        elif params["status"] == "closed":
+            orders = orders.filter(status__in=BrokerOrder.CLOSED_STATUSES)
+        elif params["status"] != "all":
+            orders = orders.filter(status=params["status"])
+        if params.get("symbols"):
+            orders = orders.filter(symbol__in=params["symbols"])
+        result = await sync_to_async(list)(orders[: params["limit"]])
+        return Response(BrokerOrderSerializer(result, many=True).data)
 
-    def create(self, request):
+    async def post(self, request):
         """
-        Create a new order.
+        Create a new order; limit orders go to the limit endpoint, everything else is a market order.
         """
-        # print(request.data)
-        result = AlpacaIntegrationOrders().place_order(request.data)
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        await sync_to_async(check_order)(serializer.validated_data)
+        result = await AsyncAlpacaIntegrationOrders().place_order_data(serializer.validated_data)
+        await sync_to_async(record_order)(result, request.user)
+        await sync_to_async(invalidate_portfolio)()
         return Response(result)
 
-    def retrieve(self, request, order_id: UUID = None):
+    async def delete(self, request):
         """
-        Retrieve a specific order by ID.
+        Cancel all orders.
         """
-        try:
-            result = AlpacaIntegrationOrders().get_order(order_id=order_id)
-            return Response(result)
-        except ValueError as e:
-            return Response({"error": f"{e}"}, status=400)
+        result = await AsyncAlpacaIntegrationOrders().cancel_all_orders()
+        await sync_to_async(invalidate_portfolio)()
+        return Response(result)
 
-    def destroy(self, request, order_id: UUID = None):
+
+class AlpacaOrdersBatchView(AlpacaOrdersBaseView):
+    """
+    Place a basket of orders in one request.
+    """
+
+    async def post(self, request):
         """
-        Delete an order by id.
+        Validate every order, then submit the ones that pass the pre-trade checks to the broker concurrently.
+
+        Answers 200 when every order was placed (or already existed) and 207 with the per-order results otherwise.
         """
-        try:
-            result = AlpacaIntegrationOrders().cancel_order(order_id)
-            return Response(result, status=status.HTTP_204_NO_CONTENT)
+        serializer = self.serializer_class(
+            data=request.data, many=True, allow_empty=False, max_length=settings.ALPACA_BATCH_MAX_ORDERS
+        )
+        serializer.is_valid(raise_exception=True)
+        client_order_ids = [
+            order["client_order_id"] for order in serializer.validated_data if "client_order_id" in order
+        ]
+        if len(client_order_ids) != len(set(client_order_ids)):
+            raise serializers.ValidationError({"client_order_id": ["client_order_id values must be unique."]})
+
+        orders = serializer.validated_data
+        rejections = await sync_to_async(check_orders)(orders)
+        accepted = [index for index, errors in enumerate(rejections) if not errors]
+        results = await AsyncAlpacaIntegrationOrders().place_orders(
+            [orders[index] for index in accepted], concurrency=settings.ALPACA_BATCH_CONCURRENCY
+        )
+        for result in results:
+            result["index"] = accepted[result["index"]]
+        results += [
+            {"index": index, "status": rejection_status(errors), "error": errors[0]["message"], "errors": errors}
+            for index, errors in enumerate(rejections)
+            if errors
+        ]
+        results.sort(key=lambda result: result["index"])
+        await sync_to_async(record_orders)(
+            [result["order"] for result in results if result["status"] == 201], request.user
+        )
+        await sync_to_async(invalidate_portfolio)()
+        failed = any("error" in result for result in results)
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK)
 
-        except ValueError as e:
-            return Response({"error": f"{e}"}, status=400)
 
-    @action(detail=False, methods=["delete"])
-    def cancel_all(self, request):
+class AlpacaOrderDetailView(AlpacaOrdersBaseView):
+    """
+    Retrieve and cancel a single Alpaca order.
+    """
+
+    async def get(self, request, order_id: UUID = None):
         """
-        Cancel all orders.
+        Retrieve a specific order by ID, from the broker if the local order mirror does not have it yet.
         """
-        result = AlpacaIntegrationOrders().cancel_all_orders()
-        return Response(result)
+        order = await BrokerOrder.objects.filter(pk=validate_uuid_id_param(order_id, "order_id")).afirst()
+        if order is None:
+            result = await AsyncAlpacaIntegrationOrders().get_order(order_id=order_id)
+            order = await sync_to_async(record_order)(result)
+        return Response(BrokerOrderSerializer(order).data)
+
+    async def delete(self, request, order_id: UUID = None):
+        """
+        Delete an order by id.
+        """
+        result = await AsyncAlpacaIntegrationOrders().cancel_order(order_id)
+        await sync_to_async(invalidate_portfolio)()
+        return Response(result, status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@schema(None)
+def get_pre_trade_stats(request):
+    """Orders that passed the pre-trade checks and the broker calls avoided by rejecting the others, by reason."""
+    return Response(pre_trade_stats())
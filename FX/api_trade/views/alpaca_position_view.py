@@ -1,13 +1,12 @@
 from rest_framework.decorators import api_view, schema
-from rest_framework.response import Response
 
-from ..scripts.alpaca_integration import AlpacaIntegrationPositions
+from ..scripts.portfolio_snapshots import get_positions_snapshot, snapshot_response
 
 
 @api_view(["GET"])
 @schema(None)
 def get_positions(request):
+    """Open positions, served from the snapshot cache; supports ``If-None-Match``."""
+    snapshot = get_positions_snapshot()
 
-    result = AlpacaIntegrationPositions().get_positions()
-
-    return Response(result)
+    return snapshot_response(request, snapshot, snapshot.data)
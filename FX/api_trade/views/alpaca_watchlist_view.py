@@ -0,0 +1,41 @@
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from ..scripts.watchlists import add_symbol, delete_watchlist, latest_quotes, remove_symbol, user_watchlists
+from ..serializers import WatchlistSerializer, WatchlistSymbolSerializer
+
+
+class WatchlistViewSet(viewsets.ModelViewSet):
+    """The caller's watchlists, read from the database; changes reach the broker through ``sync_watchlists``."""
+
+    serializer_class = WatchlistSerializer
+
+    def get_queryset(self):
+        """Filter queryset to authenticated user."""
+        return user_watchlists(self.request.user)
+
+    def perform_destroy(self, instance):
+        delete_watchlist(instance)
+
+    @action(detail=True, methods=["post"], url_path="symbols")
+    def add_symbol(self, request, pk=None):
+        """Append a symbol to the watchlist."""
+        watchlist = self.get_object()
+        serializer = WatchlistSymbolSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add_symbol(watchlist, serializer.validated_data["symbol"])
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=True, methods=["delete"], url_path=r"symbols/(?P<symbol>[^/]+(?:/[^/]+)?)")
+    def remove_symbol(self, request, symbol, pk=None):
+        """Remove a symbol (crypto pairs keep their slash, e.g. ``BTC/USD``) from the watchlist."""
+        if not remove_symbol(self.get_object(), symbol.upper()):
+            return Response({"detail": f"{symbol} is not on this watchlist."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["get"])
+    def quotes(self, request, pk=None):
+        """Latest quote of every symbol on the watchlist, fetched in one request per asset class."""
+        watchlist = self.get_object()
+        return Response(latest_quotes([item.symbol for item in watchlist.items.all()]))
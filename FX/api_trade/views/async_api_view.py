@@ -0,0 +1,35 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose handlers are coroutines.
+
+    Authentication, permission and throttle checks may query the database, so they run in a worker thread;
+    only the handler itself runs on the event loop. Django marks the view as async when every handler is.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # ``options`` and ``http_method_not_allowed`` are inherited synchronous handlers.
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:  # noqa: B902
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -43,7 +43,8 @@ max_requests_str = os.getenv("GUNICORN_MAX_REQUESTS", "0")
 
 
 # Gunicorn config variables
-# worker_class = "FX.workers.ConfigurableWorker"
+# Uvicorn workers serve FX.asgi, which adds WebSockets to the Django HTTP app.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
 loglevel = use_loglevel.lower()
 workers = web_concurrency
 bind = use_bind
@@ -61,6 +62,7 @@ max_requests = int(max_requests_str)
 # For debugging and testing
 log_data = {
     "loglevel": loglevel,
+    "worker_class": worker_class,
     "workers": workers,
     "bind": bind,
     "graceful_timeout": graceful_timeout,
@@ -78,3 +80,12 @@ log_data = {
 }
 
 # print(json.dumps(log_data))
+
+
+def post_fork(server, worker):
+    """Make sure every worker builds its own pooled Alpaca and Redis clients instead of sharing the master's sockets."""
+    from api_trade.scripts import redis_client
+    from api_trade.scripts.alpaca_clients import registry
+
+    registry.reset()
+    redis_client.reset()
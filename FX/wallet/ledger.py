@@ -0,0 +1,302 @@
+"""
+Wallet balance postings.
+
+Money moves as double-entry postings: a posting is two ``Transaction`` legs sharing a ``posting`` id, one on the
+wallet and one on the gateway's clearing account, with signed amounts summing to zero. Deposits and withdrawals are
+posted pending, then settled once the gateway answers (``settle``).
+
+Balances are only changed by single ``UPDATE`` statements with ``F()`` expressions, never read, modified and saved
+back: Postgres locks the wallet row for the statement and evaluates it against the latest committed balance, so
+concurrent postings to one wallet queue on the row instead of overwriting each other (``settle_many``, which
+settles a batch of postings, locks the rows before reading the balances it writes back). A withdrawal holds its
+amount out of ``available_balance`` when it is posted, in the same statement that checks enough is available;
+settling debits ``balance``, or releases the hold if the withdrawal failed. A deposit credits both balances once it
+succeeds.
+
+A posting may carry an idempotency key: posting again with the key of an earlier posting to the same wallet returns
+that posting instead of moving money twice.
+
+Every change of a wallet's balances also appends a ``LedgerEntry`` numbered by the wallet's ``ledger_sequence``,
+in the transaction that applies it, and every ``WALLET_CHECKPOINT_EVERY`` entries and with the first entry of each
+day a ``BalanceCheckpoint`` of the balances. The balances at any past time are the nearest checkpoint before it
+plus the few entries after it (``balance_as_of``), and ``verify_ledger`` recomputes the checkpoints from the entries.
+"""
+
+import uuid
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import BalanceCheckpoint, IdempotencyKey, LedgerEntry, Transaction, Wallet
+
+DEPOSIT, WITHDRAWAL = "D", "W"
+PENDING, SUCCESSFUL, FAILED = "P", "S", "F"
+WALLET, GATEWAY = "W", "G"
+
+
+class InsufficientFunds(Exception):
+    """The available balance of the wallet does not cover a withdrawal."""
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different posting."""
+
+
+def post(wallet, type, amount, idempotency_key=None, gateway_ref=""):
+    """Post a pending deposit or withdrawal of ``amount`` to ``wallet``.
+
+    Returns the wallet's leg and whether it was created (``False`` when ``idempotency_key`` was already used for
+    this posting). Raises ``InsufficientFunds`` if a withdrawal is not covered, with nothing posted.
+    """
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError("A posting amount must be positive.")
+    signed = amount if type == DEPOSIT else -amount
+    posting = uuid.uuid4()
+    legs = [
+        Transaction(
+            wallet=wallet, user_id=wallet.user_id, account=WALLET, amount=signed, idempotency_key=idempotency_key
+        ),
+        Transaction(wallet=None, account=GATEWAY, amount=-signed),
+    ]
+    for leg in legs:
+        leg.posting, leg.type, leg.status = posting, type, PENDING
+        leg.currency, leg.gateway_ref = wallet.account_type.name, gateway_ref
+    try:
+        with transaction.atomic():
+            Transaction.objects.bulk_create(legs)
+            if idempotency_key is not None:
+                IdempotencyKey.objects.create(wallet=wallet, key=idempotency_key, transaction=legs[0])
+            if type == WITHDRAWAL:
+                if not _apply(wallet.pk, legs[0], available_change=-amount, available_balance__gte=amount):
+                    raise InsufficientFunds(f"The available balance of wallet {wallet.pk} does not cover {amount}.")
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        # Another posting with the key committed first (or the insert waited on it).
+        leg = IdempotencyKey.objects.select_related("transaction").get(wallet=wallet, key=idempotency_key).transaction
+        if leg.type != type or leg.amount != signed:
+            raise IdempotencyConflict(f"Idempotency key {idempotency_key!r} was used for another posting.")
+        return leg, False
+    return legs[0], True
+
+
+def settle(leg, status):
+    """Settle the pending posting of ``leg`` as ``SUCCESSFUL`` or ``FAILED`` and apply it to the wallet's balances.
+
+    Returns whether this call settled it: a posting that is no longer pending is left alone, so settling twice
+    (e.g. a webhook delivered again) moves money once.
+    """
+    if status not in (SUCCESSFUL, FAILED):
+        raise ValueError(f"Cannot settle a posting as {status!r}.")
+    with transaction.atomic():
+        # Only one caller flips the legs from pending; the others wait on their row locks and then match nothing.
+        if not Transaction.objects.filter(posting=leg.posting, status=PENDING).update(status=status, updated_at=Now()):
+            return False
+        balance_change, available_change = _settlement_changes(leg, status)
+        if balance_change or available_change:
+            _apply(leg.wallet_id, leg, balance_change=balance_change, available_change=available_change)
+    leg.status = status
+    return True
+
+
+def settle_many(settlements):
+    """Settle many pending postings at once, as ``settle`` does one by one.
+
+    ``settlements`` maps posting ids to ``(status, gateway_ref)``; an empty ``gateway_ref`` keeps the legs' one.
+    The pending legs and then their wallets are locked, in id order so concurrent batches cannot deadlock, changed
+    in memory and written back with one ``bulk_update`` each, with the ledger entries and checkpoints inserted in
+    bulk. Postings no longer pending are left alone. Returns the ids of the postings this call settled.
+    """
+    if any(status not in (SUCCESSFUL, FAILED) for status, _ in settlements.values()):
+        raise ValueError("Postings can only be settled as successful or failed.")
+    with transaction.atomic():
+        legs = list(
+            Transaction.objects.select_for_update().filter(posting__in=settlements, status=PENDING).order_by("id")
+        )
+        wallets = Wallet.objects.select_for_update().filter(pk__in={leg.wallet_id for leg in legs if leg.wallet_id})
+        wallets = {wallet.pk: wallet for wallet in wallets.order_by("pk")}
+        last_checkpoints = dict(
+            BalanceCheckpoint.objects.filter(wallet__in=wallets)
+            .order_by("wallet_id", "-sequence")
+            .distinct("wallet_id")
+            .values_list("wallet_id", "created_at")
+        )
+        now = timezone.now()
+        entries, checkpoints = [], []
+        for leg in legs:
+            leg.status, gateway_ref = settlements[leg.posting]
+            leg.gateway_ref = gateway_ref or leg.gateway_ref
+            leg.updated_at = now
+            balance_change, available_change = _settlement_changes(leg, leg.status)
+            if leg.account != WALLET or not (balance_change or available_change):
+                continue
+            wallet = wallets[leg.wallet_id]
+            wallet.balance += balance_change
+            wallet.available_balance += available_change
+            wallet.ledger_sequence += 1
+            wallet.updated_at = now
+            entries.append(
+                LedgerEntry(
+                    wallet=wallet,
+                    sequence=wallet.ledger_sequence,
+                    transaction=leg,
+                    balance_change=balance_change,
+                    available_change=available_change,
+                    created_at=now,
+                )
+            )
+            last = last_checkpoints.get(wallet.pk)
+            if wallet.ledger_sequence % settings.WALLET_CHECKPOINT_EVERY == 0 or (
+                last is None or timezone.localdate(last) != timezone.localdate(now)
+            ):
+                checkpoints.append(
+                    BalanceCheckpoint(
+                        wallet=wallet,
+                        sequence=wallet.ledger_sequence,
+                        balance=wallet.balance,
+                        available_balance=wallet.available_balance,
+                        created_at=now,
+                    )
+                )
+                last_checkpoints[wallet.pk] = now
+        Transaction.objects.bulk_update(legs, ["status", "gateway_ref", "updated_at"])
+        Wallet.objects.bulk_update(wallets.values(), ["balance", "available_balance", "ledger_sequence", "updated_at"])
+        LedgerEntry.objects.bulk_create(entries)
+        BalanceCheckpoint.objects.bulk_create(checkpoints)
+    return {leg.posting for leg in legs}
+
+
+def _settlement_changes(leg, status):
+    """The ``(balance, available_balance)`` changes of settling the posting of the wallet's ``leg`` as ``status``."""
+    amount = abs(leg.amount)
+    if leg.type == DEPOSIT and status == SUCCESSFUL:
+        return amount, amount
+    if leg.type == WITHDRAWAL and status == SUCCESSFUL:
+        return -amount, 0
+    if leg.type == WITHDRAWAL:
+        return 0, amount
+    return 0, 0
+
+
+def _apply(wallet_id, leg, balance_change=0, available_change=0, **condition):
+    """Change the balances of a wallet for ``leg`` and append the ledger entry, if the wallet matches ``condition``.
+
+    Must run in a transaction. Returns whether the wallet was changed.
+    """
+    changed = Wallet.objects.filter(pk=wallet_id, **condition).update(
+        balance=F("balance") + balance_change,
+        available_balance=F("available_balance") + available_change,
+        ledger_sequence=F("ledger_sequence") + 1,
+        updated_at=Now(),
+    )
+    if not changed:
+        return False
+    # The wallet row stays locked until commit, so this reads the balances and sequence the update produced, and
+    # entries of a wallet are numbered and timestamped in the order they were applied.
+    wallet = Wallet.objects.values("balance", "available_balance", "ledger_sequence").get(pk=wallet_id)
+    sequence, now = wallet["ledger_sequence"], timezone.now()
+    LedgerEntry.objects.create(
+        wallet_id=wallet_id,
+        sequence=sequence,
+        transaction=leg,
+        balance_change=balance_change,
+        available_change=available_change,
+        created_at=now,
+    )
+    if sequence % settings.WALLET_CHECKPOINT_EVERY == 0 or _first_entry_today(wallet_id, now):
+        BalanceCheckpoint.objects.create(
+            wallet_id=wallet_id,
+            sequence=sequence,
+            balance=wallet["balance"],
+            available_balance=wallet["available_balance"],
+            created_at=now,
+        )
+    return True
+
+
+def _first_entry_today(wallet_id, now):
+    last = BalanceCheckpoint.objects.filter(wallet_id=wallet_id).order_by("-sequence").values("created_at").first()
+    return last is None or timezone.localdate(last["created_at"]) != timezone.localdate(now)
+
+
+def balance_as_of(wallet, at):
+    """The ``(balance, available_balance)`` of ``wallet`` after the changes applied up to ``at``.
+
+    Reads the last checkpoint before ``at`` and adds the entries after it, at most a day's or
+    ``WALLET_CHECKPOINT_EVERY`` of them.
+    """
+    checkpoint = BalanceCheckpoint.objects.filter(wallet=wallet, created_at__lte=at).order_by("-sequence").first()
+    balance, available, sequence = (
+        (checkpoint.balance, checkpoint.available_balance, checkpoint.sequence) if checkpoint else (0, 0, 0)
+    )
+    tail = LedgerEntry.objects.filter(wallet=wallet, sequence__gt=sequence, created_at__lte=at).aggregate(
+        balance=Sum("balance_change"), available=Sum("available_change")
+    )
+    return balance + (tail["balance"] or 0), available + (tail["available"] or 0)
+
+
+def verify(first_id, last_id):
+    """Recompute the balances of the wallets with ids from ``first_id`` to ``last_id`` from their ledger entries.
+
+    Every checkpoint and the wallets' current balances and sequences are compared with the running sums, in one
+    snapshot of the database, so it must not run inside a transaction. Returns the number of wallets and entries
+    checked and a list of the mismatches found.
+    """
+    problems, entry_count = [], 0
+    with transaction.atomic(durable=True):
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        wallets = list(
+            Wallet.objects.filter(pk__range=(first_id, last_id))
+            .order_by("pk")
+            .values_list("pk", "balance", "available_balance", "ledger_sequence")
+        )
+        checkpoints = {}
+        for wallet_id, sequence, balance, available in (
+            BalanceCheckpoint.objects.filter(wallet__pk__range=(first_id, last_id))
+            .order_by("wallet_id", "sequence")
+            .values_list("wallet_id", "sequence", "balance", "available_balance")
+        ):
+            checkpoints.setdefault(wallet_id, {})[sequence] = (balance, available)
+        entries = groupby(
+            LedgerEntry.objects.filter(wallet__pk__range=(first_id, last_id))
+            .order_by("wallet_id", "sequence")
+            .values_list("wallet_id", "sequence", "balance_change", "available_change")
+            .iterator(chunk_size=10000),
+            key=itemgetter(0),
+        )
+        group = next(entries, None)
+        for wallet_id, balance, available, last_sequence in wallets:
+            wallet_entries = ()
+            if group is not None and group[0] == wallet_id:
+                wallet_entries = group[1]
+            expected = checkpoints.get(wallet_id, {})
+            running, sequence = expected.get(0, (0, 0)), 0
+            for _, entry_sequence, balance_change, available_change in wallet_entries:
+                entry_count += 1
+                if entry_sequence != sequence + 1:
+                    problems.append(f"Wallet {wallet_id}: entry {entry_sequence} follows entry {sequence}")
+                sequence = entry_sequence
+                running = (running[0] + balance_change, running[1] + available_change)
+                if sequence in expected and expected[sequence] != running:
+                    problems.append(
+                        f"Wallet {wallet_id}: checkpoint {sequence} is {expected[sequence]}, "
+                        f"the entries sum to {running}"
+                    )
+            if wallet_entries:
+                group = next(entries, None)
+            if any(checkpoint > sequence for checkpoint in expected):
+                problems.append(f"Wallet {wallet_id}: checkpoints after the last entry {sequence}")
+            if (sequence, running) != (last_sequence, (balance, available)):
+                problems.append(
+                    f"Wallet {wallet_id}: balances {(balance, available)} at entry {last_sequence}, "
+                    f"the entries sum to {running} at entry {sequence}"
+                )
+    return len(wallets), entry_count, problems
@@ -0,0 +1,95 @@
+"""
+Django command to benchmark the transaction history endpoint on a large history.
+"""
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from wallet.models import AccountType, Transaction, Wallet
+from wallet.pagination import KeysetPagination, encode_cursor
+from wallet.partitions import create_partitions
+from wallet.views import TransactionViewSet
+
+FILL_HISTORY = """
+    INSERT INTO wallet_transaction
+        (created_at, updated_at, wallet_id, user_id, account, type, amount, currency, status, gateway_ref)
+    SELECT now() - i * interval '1 second', now(), %(wallet)s, %(user)s, 'W',
+           (ARRAY['D', 'W', 'TD', 'TN'])[i %% 4 + 1], i %% 1000, (ARRAY['USD', 'EUR', 'GBP'])[i %% 3 + 1],
+           CASE WHEN i %% 20 = 0 THEN 'P' ELSE 'S' END, ''
+    FROM generate_series(1, %(rows)s) i
+"""
+
+
+class Command(BaseCommand):
+    """Fill one user's history with ``--rows`` transactions (rolled back afterwards), then time pages at the start,
+    middle and end of the history, with and without filters: through the endpoint, the keyset query alone, and the
+    same page read with an offset."""
+
+    help = "Benchmark keyset pagination of the transaction history against offset pagination."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rows, size = options["rows"], options["page_size"]
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(email="bench-history@example.com", password="bench")
+            account_type = AccountType.objects.create(name="BNCH", is_fiat=True, is_active=True)
+            wallet = Wallet.objects.create(user=user, account_type=account_type)
+            now = timezone.now()
+            create_partitions(now - timedelta(seconds=rows), now)
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(FILL_HISTORY, {"wallet": wallet.pk, "user": user.pk, "rows": rows})
+                cursor.execute("ANALYZE wallet_transaction")
+            self.stdout.write(f"Filled {rows} transactions in {time.perf_counter() - started:.1f}s, page of {size}")
+
+            view = TransactionViewSet.as_view({"get": "list"})
+            history = Transaction.objects.filter(user=user).order_by("-created_at", "-id")
+            for filters in ({}, {"status": "P"}, {"type": "W", "currency": "EUR"}):
+                matching = history.filter(**filters).count()
+                for depth in (0, matching // 2, max(matching - size, 0)):
+                    params = {**filters, "page_size": size}
+                    if depth:
+                        last = history.filter(**filters)[depth - 1]
+                        params["cursor"] = encode_cursor(last.created_at, last.pk)
+                    request = Request(APIRequestFactory().get("/api/wallet/transactions/", params))
+                    page = history.filter(**filters)
+                    endpoint = self._time(options["repeat"], self._get, view, user, params)
+                    keyset = self._time(options["repeat"], KeysetPagination().paginate_queryset, page, request)
+                    offset = self._time(options["repeat"], self._offset_page, page, depth, size)
+                    self.stdout.write(
+                        f"  {str(filters or 'all'):>32} row {depth:>9}: endpoint {endpoint:>7.2f}ms, "
+                        f"keyset query {keyset:>6.2f}ms, offset query {offset:>8.2f}ms"
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _get(view, user, params):
+        request = APIRequestFactory().get("/api/wallet/transactions/", params)
+        force_authenticate(request, user)
+        response = view(request)
+        assert response.status_code == 200, response.data
+
+    @staticmethod
+    def _offset_page(queryset, depth, size):
+        return list(queryset[depth : depth + size])  # noqa: E203
+
+    @staticmethod
+    def _time(repeat, call, *args):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call(*args)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
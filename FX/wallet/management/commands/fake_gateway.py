@@ -0,0 +1,114 @@
+"""
+Django command to load test the webhook pipeline as a payment gateway would.
+"""
+
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from wallet import ledger, webhooks
+from wallet.models import AccountType, Transaction, Wallet
+
+_sessions = threading.local()
+
+
+def send(url, body):
+    """POST a signed event the way a gateway does, again on a 5xx or connection error; returns the status and
+    seconds of the last attempt."""
+    session = getattr(_sessions, "session", None) or requests.Session()
+    _sessions.session = session
+    for attempt in range(3):
+        started = time.perf_counter()
+        try:
+            response = session.post(
+                url,
+                data=body,
+                headers={"Content-Type": "application/json", "Gateway-Signature": webhooks.sign(body)},
+                timeout=10,
+            )
+            code = response.status_code
+        except requests.RequestException:
+            code = None
+        if code is not None and code < 500:
+            break
+        time.sleep(0.1 * 2**attempt)
+    return code, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    """Post ``--events`` pending deposits (and withdrawals, from wallets with funds) over ``--wallets`` test wallets,
+    then fire their webhooks at ``--url`` from ``--concurrency`` threads: ``--failures`` of them failed,
+    ``--duplicates`` of them delivered twice, in random order. Reports the receiver's throughput and latency, then
+    waits for the workers (``process_webhooks``) to settle every posting. The test users and postings are kept."""
+
+    help = "Fire signed payment gateway webhooks at the receiver and time their settlement."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000/api/wallet/webhooks/gateway")
+        parser.add_argument("--events", type=int, default=10_000)
+        parser.add_argument("--wallets", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--failures", type=float, default=0.05)
+        parser.add_argument("--duplicates", type=float, default=0.1)
+        parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the settlements.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        account_type, _ = AccountType.objects.get_or_create(name="FAKE", defaults={"is_fiat": True, "is_active": True})
+        wallets = []
+        for n in range(options["wallets"]):
+            user, _ = get_user_model().objects.get_or_create(email=f"fake-gateway-{n}@example.com")
+            wallet, _ = Wallet.objects.get_or_create(user=user, account_type=account_type)
+            wallets.append(wallet)
+
+        started = time.perf_counter()
+        legs = []
+        for n in range(options["events"]):
+            wallet = wallets[n % len(wallets)]
+            if n % 2 and wallet.available_balance >= 10:
+                legs.append(ledger.post(wallet, ledger.WITHDRAWAL, 10)[0])
+                wallet.available_balance -= 10
+            else:
+                legs.append(ledger.post(wallet, ledger.DEPOSIT, 100)[0])
+        self.stdout.write(f"Posted {len(legs)} pending postings in {time.perf_counter() - started:.1f}s")
+
+        bodies = []
+        for leg in legs:
+            status = "failed" if random.random() < options["failures"] else "succeeded"
+            body = json.dumps({"posting": str(leg.posting), "status": status, "reference": f"fake_{leg.posting.hex}"})
+            bodies.append(body.encode("utf-8"))
+            if random.random() < options["duplicates"]:
+                bodies.append(bodies[-1])
+        random.shuffle(bodies)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            results = list(executor.map(send, [options["url"]] * len(bodies), bodies))
+        elapsed = time.perf_counter() - started
+        codes = Counter(code for code, _ in results)
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        self.stdout.write(
+            f"Sent {len(bodies)} webhooks in {elapsed:.1f}s ({len(bodies) / elapsed:.0f}/s), statuses {dict(codes)}, "
+            f"latency p50 {statistics.median(latencies):.1f}ms p99 {latencies[int(len(latencies) * 0.99)]:.1f}ms"
+        )
+
+        postings = [leg.posting for leg in legs]
+        while (pending := Transaction.objects.filter(posting__in=postings, status=ledger.PENDING).count()) and (
+            time.perf_counter() - started < options["timeout"]
+        ):
+            time.sleep(0.5)
+        if pending:
+            raise CommandError(
+                f"{pending // 2} postings still pending after {options['timeout']:.0f}s: {webhooks.stats()}"
+            )
+        self.stdout.write(
+            f"Settled {len(legs)} postings {time.perf_counter() - started:.1f}s after the first webhook: "
+            f"{webhooks.stats()}"
+        )
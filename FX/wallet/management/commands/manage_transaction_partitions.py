@@ -0,0 +1,35 @@
+"""
+Django command to create upcoming monthly partitions of the transaction table and archive old ones.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wallet.partitions import add_months, archive_partitions, create_partitions, month_start
+
+
+class Command(BaseCommand):
+    """Run daily (e.g. from cron): creates the partitions of the next ``--ahead`` months, and with ``--retain``
+    archives the partitions of the months before the last ``--retain`` ones to gzipped CSV files."""
+
+    help = "Create future partitions of wallet_transaction and archive old ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=settings.WALLET_TRANSACTION_PARTITIONS_AHEAD)
+        parser.add_argument(
+            "--retain",
+            type=int,
+            default=settings.WALLET_TRANSACTION_RETAIN_MONTHS,
+            help="Months kept attached, the current one included. Older ones are archived.",
+        )
+        parser.add_argument("--archive-dir", default=settings.WALLET_TRANSACTION_ARCHIVE_DIR)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        current = month_start(timezone.now())
+        for name in create_partitions(current, add_months(current, options["ahead"])):
+            self.stdout.write(f"Created {name}")
+        if options["retain"]:
+            cutoff = add_months(current, 1 - options["retain"])
+            for name, rows in archive_partitions(cutoff, options["archive_dir"]):
+                self.stdout.write(f"Archived {rows} rows of {name}")
@@ -0,0 +1,74 @@
+"""
+Django command to settle the postings of the queued payment gateway webhooks.
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from wallet.webhooks import WebhookProcessor, replay_dead_letters
+
+
+def process(consumer, batch_size, drain, stop):
+    """Process batches until ``stop`` is set (or, with ``drain``, nothing is left); returns the events handled."""
+    processor = WebhookProcessor(consumer, batch_size)
+    handled = 0
+    try:
+        while not stop.is_set():
+            # As between requests: drop the connection if a failed batch broke it.
+            connection.close_if_unusable_or_obsolete()
+            count = processor.process_batch(block_ms=None if drain else 1000)
+            if drain and not count:
+                break
+            handled += count
+    finally:
+        connection.close()
+    return handled
+
+
+class Command(BaseCommand):
+    """Run ``--workers`` consumers of the webhook stream (wallet/webhooks.py) in threads of this process; run the
+    command on several nodes for more. Each consumer settles a batch of events per transaction."""
+
+    help = "Settle the postings of the queued payment gateway webhooks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=settings.WALLET_WEBHOOK_BATCH_SIZE)
+        parser.add_argument(
+            "--consumer",
+            default=f"{socket.gethostname()}-{os.getpid()}",
+            help="Name of this process in the consumer group; the workers are named <consumer>-<n>.",
+        )
+        parser.add_argument("--drain", action="store_true", help="Exit once no event is left to process.")
+        parser.add_argument(
+            "--replay-dead-letters", action="store_true", help="Queue the dead-lettered events again and exit."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options["replay_dead_letters"]:
+            self.stdout.write(f"Queued {replay_dead_letters()} dead-lettered events again")
+            return
+        stop, started = threading.Event(), time.perf_counter()
+        # Finish the batches in progress and exit on SIGTERM or Ctrl-C.
+        handlers = {signum: signal.signal(signum, lambda *_: stop.set()) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            with ThreadPoolExecutor(options["workers"]) as executor:
+                futures = [
+                    executor.submit(
+                        process, f"{options['consumer']}-{n}", options["batch_size"], options["drain"], stop
+                    )
+                    for n in range(options["workers"])
+                ]
+                handled = sum(future.result() for future in futures)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f"Processed {handled} webhook events in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,52 @@
+"""
+Django command to check wallet balances and checkpoints against the ledger.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from wallet.ledger import verify
+from wallet.models import Wallet
+
+
+def verify_chunk(first_id, last_id):
+    try:
+        return verify(first_id, last_id)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    """Recompute every wallet's running balances from its ledger entries, in parallel chunks of wallets, and compare
+    them with its checkpoints and current balances. Exits with an error if anything does not match."""
+
+    help = "Verify wallet balances and balance checkpoints against the ledger entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Chunks verified at once.")
+        parser.add_argument("--chunk", type=int, default=1000, help="Range of wallet ids per chunk.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        bounds = Wallet.objects.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            self.stdout.write("No wallets to verify")
+            return
+        chunks = [
+            (first_id, min(first_id + options["chunk"] - 1, bounds["last"]))
+            for first_id in range(bounds["first"], bounds["last"] + 1, options["chunk"])
+        ]
+        wallets = entries = 0
+        problems = []
+        with ThreadPoolExecutor(options["workers"]) as executor:
+            for chunk_wallets, chunk_entries, chunk_problems in executor.map(lambda ids: verify_chunk(*ids), chunks):
+                wallets += chunk_wallets
+                entries += chunk_entries
+                problems += chunk_problems
+        for problem in problems:
+            self.stderr.write(problem)
+        self.stdout.write(f"Verified {wallets} wallets and {entries} ledger entries in {len(chunks)} chunks")
+        if problems:
+            raise CommandError(f"{len(problems)} mismatches between the ledger and the balances")
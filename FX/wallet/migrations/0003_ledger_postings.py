@@ -0,0 +1,74 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0002_alter_wallet_unique_together"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="account",
+            field=models.CharField(choices=[("W", "WALLET"), ("G", "GATEWAY")], default="W"),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="posting",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=models.DecimalField(decimal_places=8, max_digits=24),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="wallet",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                to="wallet.wallet",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="wallet",
+            name="available_balance",
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=24),
+        ),
+        migrations.AlterField(
+            model_name="wallet",
+            name="balance",
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=24),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["posting"], name="wallet_tran_posting_c2cb44_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.UniqueConstraint(
+                fields=("wallet", "idempotency_key"),
+                name="unique_wallet_idempotency_key",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="wallet",
+            constraint=models.CheckConstraint(
+                check=models.Q(("available_balance__gte", 0)),
+                name="wallet_available_balance_gte_0",
+            ),
+        ),
+    ]
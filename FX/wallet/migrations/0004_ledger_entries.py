@@ -0,0 +1,123 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+APPEND_ONLY = """
+CREATE FUNCTION wallet_ledgerentry_append_only() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'wallet_ledgerentry is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER wallet_ledgerentry_append_only BEFORE UPDATE OR DELETE ON wallet_ledgerentry
+    FOR EACH ROW EXECUTE FUNCTION wallet_ledgerentry_append_only();
+"""
+
+
+def open_ledgers(apps, schema_editor):
+    """Checkpoint the balances wallets had before the ledger existed, as sequence 0."""
+    Wallet = apps.get_model("wallet", "Wallet")  # noqa: N806
+    BalanceCheckpoint = apps.get_model("wallet", "BalanceCheckpoint")  # noqa: N806
+    BalanceCheckpoint.objects.bulk_create(
+        BalanceCheckpoint(wallet=wallet, sequence=0, balance=wallet.balance, available_balance=wallet.available_balance)
+        for wallet in Wallet.objects.exclude(balance=0, available_balance=0).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0003_ledger_postings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wallet",
+            name="ledger_sequence",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sequence", models.PositiveBigIntegerField()),
+                (
+                    "balance_change",
+                    models.DecimalField(decimal_places=8, max_digits=24),
+                ),
+                (
+                    "available_change",
+                    models.DecimalField(decimal_places=8, max_digits=24),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        to="wallet.transaction",
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to="wallet.wallet"),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="BalanceCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sequence", models.PositiveBigIntegerField()),
+                ("balance", models.DecimalField(decimal_places=8, max_digits=24)),
+                (
+                    "available_balance",
+                    models.DecimalField(decimal_places=8, max_digits=24),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "wallet",
+                    models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to="wallet.wallet"),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "created_at"],
+                        name="wallet_bala_wallet__eb0308_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="balancecheckpoint",
+            constraint=models.UniqueConstraint(fields=("wallet", "sequence"), name="unique_wallet_checkpoint_sequence"),
+        ),
+        migrations.AddConstraint(
+            model_name="ledgerentry",
+            constraint=models.UniqueConstraint(fields=("wallet", "sequence"), name="unique_wallet_ledger_sequence"),
+        ),
+        migrations.RunSQL(
+            APPEND_ONLY,
+            "DROP TRIGGER wallet_ledgerentry_append_only ON wallet_ledgerentry;"
+            "DROP FUNCTION wallet_ledgerentry_append_only();",
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0004_ledger_entries"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunSQL(
+            "UPDATE wallet_transaction SET user_id = wallet_wallet.user_id FROM wallet_wallet "
+            "WHERE wallet_transaction.wallet_id = wallet_wallet.id",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="wallet",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                to="wallet.wallet",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="wallet_tx_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "type", "-created_at", "-id"],
+                name="wallet_tx_user_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "status", "-created_at", "-id"],
+                name="wallet_tx_user_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "currency", "-created_at", "-id"],
+                name="wallet_tx_user_currency_idx",
+            ),
+        ),
+    ]
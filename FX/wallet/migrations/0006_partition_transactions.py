@@ -0,0 +1,148 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:27
+
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Partitions created ahead of the current month; later on, the manage_transaction_partitions command does it.
+# There is no default partition: it would keep Postgres from scanning the partitions in order for the history.
+MONTHS_AHEAD = 3
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _rebuild(schema_editor, partitioned):
+    """Copy wallet_transaction into a new table, partitioned by month on created_at or not, and swap them.
+
+    The indexes and foreign keys of the old table are recreated with the same names.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'wallet_transaction' "
+            "AND indexname <> 'wallet_transaction_pkey'"
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'wallet_transaction'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "CREATE TABLE wallet_transaction_new (LIKE wallet_transaction INCLUDING DEFAULTS INCLUDING IDENTITY)"
+            + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+        )
+        cursor.execute(
+            f"ALTER TABLE wallet_transaction_new ADD PRIMARY KEY ({'id, created_at' if partitioned else 'id'})"
+        )
+        if partitioned:
+            # A partition per month, from the oldest transaction's to MONTHS_AHEAD after the current one.
+            cursor.execute("SELECT min(created_at) FROM wallet_transaction")
+            oldest = cursor.fetchone()[0] or date.today()
+            month, last = date(oldest.year, oldest.month, 1), date.today().replace(day=1)
+            for _ in range(MONTHS_AHEAD):
+                last = _next_month(last)
+            while month <= last:
+                cursor.execute(
+                    f"CREATE TABLE wallet_transaction_{month:%Y_%m} PARTITION OF wallet_transaction_new "
+                    f"FOR VALUES FROM ('{month} 00:00+00') TO ('{_next_month(month)} 00:00+00')"
+                )
+                month = _next_month(month)
+        cursor.execute("INSERT INTO wallet_transaction_new SELECT * FROM wallet_transaction")
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('wallet_transaction_new', 'id'), coalesce(max(id), 0) + 1, false) "
+            "FROM wallet_transaction_new"
+        )
+        cursor.execute("DROP TABLE wallet_transaction")
+        cursor.execute("ALTER TABLE wallet_transaction_new RENAME TO wallet_transaction")
+        cursor.execute(
+            "ALTER TABLE wallet_transaction RENAME CONSTRAINT wallet_transaction_new_pkey TO wallet_transaction_pkey"
+        )
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE wallet_transaction ADD CONSTRAINT {name} {definition}")
+
+
+def partition_transactions(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition_transactions(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0005_transaction_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name="transaction",
+            name="unique_wallet_idempotency_key",
+        ),
+        migrations.AlterField(
+            model_name="ledgerentry",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                to="wallet.transaction",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="wallet",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                to="wallet.wallet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                to="wallet.transaction",
+            ),
+        ),
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="wallet",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to="wallet.wallet"),
+        ),
+        migrations.AddConstraint(
+            model_name="idempotencykey",
+            constraint=models.UniqueConstraint(fields=("wallet", "key"), name="unique_wallet_idempotency_key"),
+        ),
+        migrations.RunSQL(
+            "INSERT INTO wallet_idempotencykey (wallet_id, key, transaction_id, created_at) "
+            "SELECT wallet_id, idempotency_key, id, created_at FROM wallet_transaction "
+            "WHERE wallet_id IS NOT NULL AND idempotency_key IS NOT NULL",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(partition_transactions, unpartition_transactions),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 from users.models import User
@@ -24,11 +25,17 @@ class AccountType(TimeStampedModel):
 class Wallet(TimeStampedModel):
     user = models.ForeignKey(User, on_delete=models.RESTRICT)
     account_type = models.ForeignKey(AccountType, on_delete=models.RESTRICT)
-    balance = models.FloatField(default=0.0)
-    available_balance = models.FloatField(default=0.0)
+    balance = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    # Balance minus the withdrawals still pending (wallet/ledger.py).
+    available_balance = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    # Sequence of the wallet's last ``LedgerEntry``.
+    ledger_sequence = models.PositiveBigIntegerField(default=0)
 
     class Meta:
         unique_together = ["user", "account_type"]
+        constraints = [
+            models.CheckConstraint(check=models.Q(available_balance__gte=0), name="wallet_available_balance_gte_0"),
+        ]
 
     def __str__(self):
         return f"{self.user}-{self.account_type}"
@@ -47,9 +54,82 @@ class Transaction(TimeStampedModel):
         ("F", "FAILED"),
         ("R", "REFUNDED"),
     )
-    wallet = models.ForeignKey(Wallet, on_delete=models.RESTRICT)
+    ACCOUNT_CHOICES = (
+        ("W", "WALLET"),
+        ("G", "GATEWAY"),
+    )
+    # Every posting is two rows sharing ``posting``: the leg on the wallet and the leg on the gateway's clearing
+    # account (without a wallet). Their signed amounts sum to zero.
+    wallet = models.ForeignKey(Wallet, on_delete=models.RESTRICT, null=True, blank=True)
+    # The wallet's owner, copied so a user's history is read from one index range (see Meta.indexes).
+    user = models.ForeignKey(User, on_delete=models.RESTRICT, null=True, blank=True, db_index=False, editable=False)
+    account = models.CharField(choices=ACCOUNT_CHOICES, default="W")
+    posting = models.UUIDField(null=True, blank=True, editable=False)
     type = models.CharField(choices=TYPE_CHOICES)
-    amount = models.FloatField()
+    amount = models.DecimalField(max_digits=24, decimal_places=8)
     currency = models.CharField(max_length=5)
     status = models.CharField(choices=STATUS_CHOICES)
     gateway_ref = models.CharField(max_length=255)
+    # Unique per wallet through ``IdempotencyKey``.
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["posting"]),
+            # A user's history, newest first by (created_at, id) and optionally filtered by one of the columns
+            # between, is a single range scan of one of these, however long the history.
+            models.Index(fields=["user", "-created_at", "-id"], name="wallet_tx_user_created_idx"),
+            models.Index(fields=["user", "type", "-created_at", "-id"], name="wallet_tx_user_type_idx"),
+            models.Index(fields=["user", "status", "-created_at", "-id"], name="wallet_tx_user_status_idx"),
+            models.Index(fields=["user", "currency", "-created_at", "-id"], name="wallet_tx_user_currency_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.wallet_id is not None:
+            self.user_id = self.wallet.user_id
+        super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """An idempotency key used by a posting to ``wallet``, and the wallet's leg of that posting.
+
+    A table of its own: unique constraints of the partitioned transaction table must include ``created_at``.
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.RESTRICT)
+    key = models.CharField(max_length=255)
+    transaction = models.ForeignKey(Transaction, on_delete=models.DO_NOTHING, db_constraint=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["wallet", "key"], name="unique_wallet_idempotency_key")]
+
+
+class LedgerEntry(models.Model):
+    """A change of a wallet's balances. Entries are only ever inserted (a trigger refuses updates and deletes)."""
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.RESTRICT)
+    # 1, 2, 3... per wallet, in the order the changes were applied.
+    sequence = models.PositiveBigIntegerField()
+    # Transactions are partitioned (see wallet/partitions.py) and old partitions archived, so no foreign key.
+    transaction = models.ForeignKey(Transaction, on_delete=models.DO_NOTHING, db_constraint=False)
+    balance_change = models.DecimalField(max_digits=24, decimal_places=8)
+    available_change = models.DecimalField(max_digits=24, decimal_places=8)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["wallet", "sequence"], name="unique_wallet_ledger_sequence")]
+
+
+class BalanceCheckpoint(models.Model):
+    """A wallet's balances after its ledger entry ``sequence`` (0: before the ledger existed)."""
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.RESTRICT)
+    sequence = models.PositiveBigIntegerField()
+    balance = models.DecimalField(max_digits=24, decimal_places=8)
+    available_balance = models.DecimalField(max_digits=24, decimal_places=8)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["wallet", "sequence"], name="unique_wallet_checkpoint_sequence")]
+        indexes = [models.Index(fields=["wallet", "created_at"])]
@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(created_at, pk):
+    position = json.dumps([created_at.isoformat(), pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(position).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError) as e:
+        raise ValidationError({"cursor": ["Invalid cursor."]}) from e
+
+
+class KeysetPagination(BasePagination):
+    """Pages of rows newest first by ``(created_at, id)``, each starting after the last row of the previous one.
+
+    The cursor holds that row's position instead of an offset, so with an index on ``(..., created_at, id)`` every
+    page is one index range scan of ``page_size`` rows, however deep into the history it is. Pages only go forward.
+    """
+
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        self.size = max(1, min(size, self.max_page_size))
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            # The same rows as (created_at, id) < (cursor), written so the index is scanned from created_at down.
+            queryset = queryset.filter(Q(created_at__lte=created_at) & ~Q(created_at=created_at, pk__gte=pk))
+        page = list(queryset.order_by("-created_at", "-id")[: self.size + 1])
+        self.next = None
+        if len(page) > self.size:
+            page = page[: self.size]
+            last = page[-1]
+            self.next = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, encode_cursor(last.created_at, last.pk)
+            )
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.next, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
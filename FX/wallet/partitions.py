@@ -0,0 +1,109 @@
+"""
+Monthly partitions of the transaction table.
+
+``wallet_transaction`` is range partitioned on ``created_at``, one partition per calendar month (UTC) named
+``wallet_transaction_YYYY_MM`` (migration 0006). Queries bounded on ``created_at`` (the history's date filters and
+keyset cursor) only read the partitions of those months, and a page of history newest first reads the partitions
+one after the other from the newest, stopping once the page is full. Old months are dropped as a whole instead of
+deleted row by row.
+
+There is no default partition (it would prevent those ordered scans): inserting a transaction fails unless the
+partition of its month exists, so partitions must be created ahead.
+
+``create_partitions`` adds the partitions of the coming months ahead of time; ``archive_partitions`` detaches the
+partitions of months before a cutoff, writes their rows to gzipped CSV files and drops them. Both are run by the
+``manage_transaction_partitions`` command.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+
+from django.db import connection, transaction
+
+from .ledger import PENDING
+
+logger = logging.getLogger(__name__)
+
+TABLE = "wallet_transaction"
+_BOUNDS = re.compile(r"FOR VALUES FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def partitions():
+    """The monthly partitions as ``(name, first day, first day of the next month)``, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE pg_inherits.inhparent = %s::regclass",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        match = _BOUNDS.match(bound)
+        if match:
+            start, end = (datetime.fromisoformat(value).astimezone(timezone.utc).date() for value in match.groups())
+            result.append((name, start, end))
+    return sorted(result, key=lambda partition: partition[1])
+
+
+def create_partitions(first, last):
+    """Create the missing partitions of the months from ``first`` to ``last`` (dates); return their names."""
+    existing = {start for _, start, _ in partitions()}
+    created = []
+    month, last = month_start(first), month_start(last)
+    with transaction.atomic(), connection.cursor() as cursor:
+        while month <= last:
+            if month not in existing:
+                cursor.execute(
+                    f"CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+                    [f"{month} 00:00+00", f"{add_months(month, 1)} 00:00+00"],
+                )
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def archive_partitions(before, directory):
+    """Detach the partitions of the months ending by ``before``, write each to ``<directory>/<name>.csv.gz`` and
+    drop it. Returns ``(name, rows)`` per archived partition.
+
+    A partition is only dropped once its file is complete; if anything fails it stays attached. Partitions still
+    holding pending transactions are skipped, as their settlement would find no posting.
+    """
+    archived = []
+    os.makedirs(directory, exist_ok=True)
+    for name, _, end in partitions():
+        if end > before:
+            continue
+        path = os.path.join(directory, f"{name}.csv.gz")
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {name} WHERE status = %s LIMIT 1", [PENDING])
+            if cursor.fetchone():
+                logger.warning("Not archiving %s: it still has pending transactions", name)
+                continue
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as archive:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+            os.replace(f"{path}.tmp", path)
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            rows = cursor.fetchone()[0]
+            cursor.execute(f"DROP TABLE {name}")
+        logger.info("Archived %s rows of %s to %s", rows, name, path)
+        archived.append((name, rows))
+    return archived
@@ -7,7 +7,7 @@ class WalletSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Wallet
-        fields = "__all__"
+        fields = ("id", "user", "account_type", "balance", "available_balance", "created_at", "updated_at")
         read_only_fields = (
             "user",
             "balance",
@@ -38,8 +38,43 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
-        fields = "__all__"
+        fields = ("id", "wallet", "type", "amount", "currency", "status", "gateway_ref", "created_at", "updated_at")
         read_only_fields = (
             "created_at",
             "updated_at",
         )
+
+
+class PostingSerializer(serializers.Serializer):
+    """Amount of a deposit or withdrawal; the minimum is passed in the ``min_amount`` context."""
+
+    amount = serializers.DecimalField(max_digits=24, decimal_places=8)
+
+    def validate_amount(self, value):
+        min_amount = self.context["min_amount"]
+        if value < min_amount:
+            raise serializers.ValidationError(f"Ensure this value is greater than or equal to {min_amount}.")
+        return value
+
+
+class BalanceAsOfSerializer(serializers.Serializer):
+    """A wallet's balances at time ``at``, the only query parameter."""
+
+    at = serializers.DateTimeField()
+    balance = serializers.DecimalField(max_digits=24, decimal_places=8, read_only=True)
+    available_balance = serializers.DecimalField(max_digits=24, decimal_places=8, read_only=True)
+
+
+class TransactionFilterSerializer(serializers.Serializer):
+    """Filters of the transaction history, all optional; ``created_after`` is inclusive, ``created_before`` not."""
+
+    type = serializers.ChoiceField(choices=Transaction.TYPE_CHOICES, required=False)
+    status = serializers.ChoiceField(choices=Transaction.STATUS_CHOICES, required=False)
+    currency = serializers.CharField(max_length=5, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if "created_after" in attrs and "created_before" in attrs and attrs["created_after"] >= attrs["created_before"]:
+            raise serializers.ValidationError({"created_before": ["Must be after created_after."]})
+        return attrs
@@ -0,0 +1,385 @@
+import random
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import ledger
+from ..models import AccountType, BalanceCheckpoint, LedgerEntry, Transaction, Wallet
+
+
+def create_wallet(email="user@example.com"):
+    """Create and return a wallet of a new user."""
+    user = get_user_model().objects.create_user(email=email, password="testpass123")
+    account_type, _ = AccountType.objects.get_or_create(name="USD", is_fiat=True, is_active=True)
+    return Wallet.objects.create(user=user, account_type=account_type)
+
+
+def deposit(wallet, amount):
+    """Post and settle a deposit."""
+    leg, _ = ledger.post(wallet, ledger.DEPOSIT, amount)
+    ledger.settle(leg, ledger.SUCCESSFUL)
+
+
+class LedgerTestCase(TestCase):
+    def setUp(self):
+        self.wallet = create_wallet()
+
+    def balances(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.balance, self.wallet.available_balance
+
+    def test_deposit(self):
+        """Test a deposit is posted as two balanced legs and credits the wallet once it succeeds."""
+        leg, created = ledger.post(self.wallet, ledger.DEPOSIT, Decimal("100.5"))
+
+        self.assertTrue(created)
+        legs = Transaction.objects.filter(posting=leg.posting)
+        self.assertEqual(legs.count(), 2)
+        self.assertEqual(legs.aggregate(total=Sum("amount"))["total"], 0)
+        self.assertEqual(self.balances(), (0, 0))
+
+        self.assertTrue(ledger.settle(leg, ledger.SUCCESSFUL))
+
+        self.assertEqual(self.balances(), (Decimal("100.5"), Decimal("100.5")))
+        self.assertEqual(set(legs.values_list("status", flat=True)), {ledger.SUCCESSFUL})
+
+    def test_withdrawal_holds_the_amount(self):
+        """Test a pending withdrawal holds its amount out of the available balance until it is settled."""
+        deposit(self.wallet, 100)
+
+        leg, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+        self.assertEqual(leg.amount, -30)
+        self.assertEqual(self.balances(), (100, 70))
+
+        ledger.settle(leg, ledger.SUCCESSFUL)
+        self.assertEqual(self.balances(), (70, 70))
+
+    def test_failed_withdrawal_releases_the_hold(self):
+        """Test a failed withdrawal gives the held amount back."""
+        deposit(self.wallet, 100)
+        leg, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+
+        ledger.settle(leg, ledger.FAILED)
+
+        self.assertEqual(self.balances(), (100, 100))
+
+    def test_insufficient_funds(self):
+        """Test a withdrawal over the available balance is refused without posting anything."""
+        deposit(self.wallet, 100)
+        ledger.post(self.wallet, ledger.WITHDRAWAL, 80)
+
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+
+        self.assertEqual(Transaction.objects.filter(type=ledger.WITHDRAWAL).count(), 2)
+        self.assertEqual(self.balances(), (100, 20))
+
+    def test_settle_once(self):
+        """Test settling a posting again does not move money twice."""
+        leg, _ = ledger.post(self.wallet, ledger.DEPOSIT, 10)
+        ledger.settle(leg, ledger.SUCCESSFUL)
+
+        self.assertFalse(ledger.settle(leg, ledger.SUCCESSFUL))
+        self.assertFalse(ledger.settle(leg, ledger.FAILED))
+        self.assertEqual(self.balances(), (10, 10))
+
+    def test_idempotency_key(self):
+        """Test posting again with the same key returns the first posting, and reusing it for another is refused."""
+        deposit(self.wallet, 100)
+        leg, created = ledger.post(self.wallet, ledger.WITHDRAWAL, 30, idempotency_key="key-1")
+
+        again, created_again = ledger.post(self.wallet, ledger.WITHDRAWAL, 30, idempotency_key="key-1")
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, leg.pk)
+        self.assertEqual(self.balances(), (100, 70))
+        with self.assertRaises(ledger.IdempotencyConflict):
+            ledger.post(self.wallet, ledger.WITHDRAWAL, 40, idempotency_key="key-1")
+        # Keys are scoped to the wallet.
+        ledger.post(create_wallet("user2@example.com"), ledger.DEPOSIT, 30, idempotency_key="key-1")
+
+    def test_invalid_amount(self):
+        """Test only positive amounts can be posted."""
+        with self.assertRaises(ValueError):
+            ledger.post(self.wallet, ledger.DEPOSIT, 0)
+
+
+@override_settings(WALLET_CHECKPOINT_EVERY=3)
+class LedgerEntriesTestCase(TestCase):
+    def setUp(self):
+        self.wallet = create_wallet()
+
+    def test_entries_and_checkpoints(self):
+        """Test every balance change appends an entry, and balances are checkpointed every few entries."""
+        deposit(self.wallet, 100)
+        leg, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+        ledger.settle(leg, ledger.FAILED)
+
+        entries = LedgerEntry.objects.filter(wallet=self.wallet).order_by("sequence")
+        self.assertEqual(
+            [(entry.sequence, entry.balance_change, entry.available_change) for entry in entries],
+            [(1, 100, 100), (2, 0, -30), (3, 0, 30)],
+        )
+        # The first entry of the day and the third entry.
+        checkpoints = BalanceCheckpoint.objects.filter(wallet=self.wallet).order_by("sequence")
+        self.assertEqual(
+            [(c.sequence, c.balance, c.available_balance) for c in checkpoints], [(1, 100, 100), (3, 100, 100)]
+        )
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.ledger_sequence, 3)
+
+    def test_checkpoint_each_day(self):
+        """Test the first entry of a day is checkpointed."""
+        deposit(self.wallet, 100)
+        tomorrow = timezone.now() + timedelta(days=1)
+
+        with mock.patch("wallet.ledger.timezone.now", return_value=tomorrow):
+            deposit(self.wallet, 10)
+
+        checkpoint = BalanceCheckpoint.objects.filter(wallet=self.wallet).latest("sequence")
+        self.assertEqual((checkpoint.sequence, checkpoint.balance, checkpoint.created_at), (2, 110, tomorrow))
+
+    def test_balance_as_of(self):
+        """Test the balances at past times are rebuilt from the nearest checkpoint and the entries after it."""
+        start = timezone.now()
+        moments = []
+        for hour, amount in enumerate([100, 10, 20, 30, 40], start=1):
+            moment = start + timedelta(hours=hour)
+            with mock.patch("wallet.ledger.timezone.now", return_value=moment):
+                deposit(self.wallet, amount)
+            moments.append(moment)
+        with mock.patch("wallet.ledger.timezone.now", return_value=start + timedelta(hours=6)):
+            ledger.post(self.wallet, ledger.WITHDRAWAL, 50)
+
+        self.assertEqual(ledger.balance_as_of(self.wallet, start), (0, 0))
+        self.assertEqual(ledger.balance_as_of(self.wallet, moments[0]), (100, 100))
+        self.assertEqual(ledger.balance_as_of(self.wallet, moments[1] + timedelta(minutes=1)), (110, 110))
+        self.assertEqual(ledger.balance_as_of(self.wallet, moments[4]), (200, 200))
+        self.assertEqual(ledger.balance_as_of(self.wallet, start + timedelta(days=1)), (200, 150))
+
+    def test_settle_many(self):
+        """Test a batch of settlements changes the balances, entries and checkpoints as settling one by one would."""
+        deposit(self.wallet, 100)
+        other = create_wallet("user2@example.com")
+        withdrawal, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+        failed, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 20)
+        deposits = [ledger.post(self.wallet, ledger.DEPOSIT, 5)[0], ledger.post(other, ledger.DEPOSIT, 7)[0]]
+        failed_deposit, _ = ledger.post(other, ledger.DEPOSIT, 9)
+        done, _ = ledger.post(other, ledger.DEPOSIT, 1)
+        ledger.settle(done, ledger.FAILED)
+
+        settled = ledger.settle_many(
+            {
+                withdrawal.posting: (ledger.SUCCESSFUL, "ref-1"),
+                failed.posting: (ledger.FAILED, ""),
+                deposits[0].posting: (ledger.SUCCESSFUL, ""),
+                deposits[1].posting: (ledger.SUCCESSFUL, ""),
+                failed_deposit.posting: (ledger.FAILED, ""),
+                done.posting: (ledger.SUCCESSFUL, ""),
+            }
+        )
+
+        self.assertEqual(settled, {leg.posting for leg in (withdrawal, failed, failed_deposit, *deposits)})
+        self.wallet.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.wallet.balance, self.wallet.available_balance), (75, 75))
+        self.assertEqual((other.balance, other.available_balance, other.ledger_sequence), (7, 7, 1))
+        entries = LedgerEntry.objects.filter(wallet=self.wallet).order_by("sequence")
+        self.assertEqual(
+            [(entry.sequence, entry.balance_change, entry.available_change) for entry in entries],
+            [(1, 100, 100), (2, 0, -30), (3, 0, -20), (4, -30, 0), (5, 0, 20), (6, 5, 5)],
+        )
+        self.assertEqual(self.wallet.ledger_sequence, 6)
+        checkpoints = BalanceCheckpoint.objects.filter(wallet__in=[self.wallet, other]).order_by("wallet", "sequence")
+        self.assertEqual(
+            [(c.wallet_id, c.sequence, c.balance) for c in checkpoints],
+            [(self.wallet.pk, 1, 100), (self.wallet.pk, 3, 100), (self.wallet.pk, 6, 75), (other.pk, 1, 7)],
+        )
+        self.assertEqual(Transaction.objects.filter(posting=withdrawal.posting, gateway_ref="ref-1").count(), 2)
+        self.assertEqual(Transaction.objects.get(pk=done.pk).status, ledger.FAILED)
+        self.assertEqual(ledger.settle_many({withdrawal.posting: (ledger.FAILED, "")}), set())
+
+    def test_append_only(self):
+        """Test ledger entries cannot be changed or deleted."""
+        deposit(self.wallet, 100)
+        entry = LedgerEntry.objects.get(wallet=self.wallet)
+
+        for change in (lambda: LedgerEntry.objects.filter(pk=entry.pk).update(balance_change=1000), entry.delete):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                change()
+
+    def test_balance_api(self):
+        """Test the balances as of a time are served to the wallet's owner."""
+        deposit(self.wallet, 100)
+        client = APIClient()
+        client.force_authenticate(self.wallet.user)
+        url = f"/api/wallet/wallets/{self.wallet.id}/balance/"
+
+        res = client.get(url, {"at": timezone.now().isoformat()})
+        past = client.get(url, {"at": (timezone.now() - timedelta(days=1)).isoformat()})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(res.data["balance"]), 100)
+        self.assertEqual(Decimal(past.data["available_balance"]), 0)
+        self.assertEqual(client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        client.force_authenticate(create_wallet("user2@example.com").user)
+        self.assertEqual(client.get(url, {"at": timezone.now().isoformat()}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(WALLET_CHECKPOINT_EVERY=3)
+class VerifyLedgerTestCase(TransactionTestCase):
+    def setUp(self):
+        self.wallets = [create_wallet(f"user{index}@example.com") for index in range(3)]
+        for wallet in self.wallets:
+            for amount in (100, 10, 20, 30):
+                deposit(wallet, amount)
+
+    def verify(self):
+        stdout, stderr = mock.Mock(), mock.Mock()
+        call_command("verify_ledger", chunk=2, workers=2, stdout=stdout, stderr=stderr)
+        return stdout, stderr
+
+    def test_consistent(self):
+        """Test a ledger matching the balances passes, checked in chunks."""
+        stdout, _ = self.verify()
+
+        stdout.write.assert_called_with("Verified 3 wallets and 12 ledger entries in 2 chunks\n")
+
+    def test_consistent_after_batch_settlement(self):
+        """Test balances settled in a batch match the ledger."""
+        legs = [
+            ledger.post(wallet, type, 5)[0] for wallet in self.wallets for type in (ledger.DEPOSIT, ledger.WITHDRAWAL)
+        ]
+        ledger.settle_many({leg.posting: (ledger.SUCCESSFUL, "") for leg in legs})
+
+        stdout, _ = self.verify()
+
+        stdout.write.assert_called_with("Verified 3 wallets and 21 ledger entries in 2 chunks\n")
+
+    def test_tampered_checkpoint(self):
+        """Test a checkpoint disagreeing with the entries is reported."""
+        BalanceCheckpoint.objects.filter(wallet=self.wallets[1], sequence=3).update(balance=1)
+
+        with self.assertRaises(CommandError):
+            self.verify()
+
+    def test_tampered_balance(self):
+        """Test a wallet balance changed without a ledger entry is reported."""
+        Wallet.objects.filter(pk=self.wallets[2].pk).update(balance=1000)
+
+        with self.assertRaises(CommandError):
+            self.verify()
+
+
+class ConcurrentPostingsTestCase(TransactionTestCase):
+    def test_parallel_postings_do_not_drift(self):
+        """Test thousands of deposits, withdrawals and retries posted in parallel to one wallet leave exact balances."""
+        wallet = create_wallet()
+        deposit(wallet, 1000)
+        errors = []
+
+        def run(seed, count):
+            rng = random.Random(seed)
+            try:
+                for index in range(count):
+                    type = rng.choice([ledger.DEPOSIT, ledger.WITHDRAWAL])
+                    amount = Decimal(rng.randint(1, 5000)) / 100
+                    key = f"{seed}-{index}"
+                    try:
+                        leg, _ = ledger.post(wallet, type, amount, idempotency_key=key)
+                    except ledger.InsufficientFunds:
+                        continue
+                    if rng.random() < 0.1:
+                        # A retried request.
+                        ledger.post(wallet, type, amount, idempotency_key=key)
+                    ledger.settle(leg, rng.choice([ledger.SUCCESSFUL, ledger.SUCCESSFUL, ledger.FAILED]))
+            except Exception as error:  # noqa: B902
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(seed, 125)) for seed in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        wallet.refresh_from_db()
+        legs = Transaction.objects.filter(wallet=wallet)
+        self.assertGreater(legs.count(), 1000)
+        self.assertFalse(legs.filter(status=ledger.PENDING).exists())
+        settled = legs.filter(status=ledger.SUCCESSFUL).aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(wallet.balance, settled)
+        self.assertEqual(wallet.available_balance, settled)
+        self.assertEqual(Transaction.objects.aggregate(total=Sum("amount"))["total"], 0)
+        self.assertEqual(legs.exclude(idempotency_key=None).count(), legs.count() - 1)
+        call_command("verify_ledger", stdout=mock.Mock())
+
+
+class WalletPostingApiTests(TestCase):
+    def setUp(self):
+        self.wallet = create_wallet()
+        self.client = APIClient()
+        self.client.force_authenticate(self.wallet.user)
+
+    def url(self, action, wallet=None):
+        return f"/api/wallet/wallets/{(wallet or self.wallet).id}/{action}"
+
+    def test_deposit(self):
+        """Test a deposit is posted pending and does not change the balances yet."""
+        res = self.client.post(self.url("deposite"), {"amount": "25.50"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["status"], ledger.PENDING)
+        self.assertEqual(Decimal(res.data["amount"]), Decimal("25.5"))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 0)
+
+    def test_retried_deposit(self):
+        """Test a request retried with the same Idempotency-Key is posted once."""
+        first = self.client.post(self.url("deposite"), {"amount": "25"}, HTTP_IDEMPOTENCY_KEY="abc")
+        second = self.client.post(self.url("deposite"), {"amount": "25"}, HTTP_IDEMPOTENCY_KEY="abc")
+        conflict = self.client.post(self.url("deposite"), {"amount": "30"}, HTTP_IDEMPOTENCY_KEY="abc")
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertFalse({"user", "account", "posting", "idempotency_key"} & set(first.data))
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Transaction.objects.filter(wallet=self.wallet).count(), 1)
+
+    def test_withdraw(self):
+        """Test a withdrawal holds its amount, and one over the available balance is refused."""
+        deposit(self.wallet, 100)
+
+        res = self.client.post(self.url("withdraw"), {"amount": "60"})
+        refused = self.client.post(self.url("withdraw"), {"amount": "60"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(res.data["amount"]), -60)
+        self.assertEqual(refused.status_code, status.HTTP_400_BAD_REQUEST)
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.balance, self.wallet.available_balance), (100, 40))
+
+    def test_invalid_amount(self):
+        """Test amounts under the minimum or malformed are rejected."""
+        for amount in ("0.5", "-10", "abc"):
+            res = self.client.post(self.url("deposite"), {"amount": amount})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_wallet(self):
+        """Test posting to another user's wallet is forbidden."""
+        res = self.client.post(self.url("withdraw", create_wallet("user2@example.com")), {"amount": "10"})
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import TestCase
+
+from ..models import AccountType, Transaction, Wallet
+from ..partitions import add_months, archive_partitions, create_partitions, partition_name, partitions
+
+
+class PartitionsTestCase(TestCase):
+    """Test the monthly partitions of the transaction table."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="partitions@example.com", password="testpass123")
+        account_type = AccountType.objects.create(name="USD", is_fiat=True, is_active=True)
+        self.wallet = Wallet.objects.create(user=user, account_type=account_type)
+
+    def backdated_transaction(self, created_at):
+        tx = Transaction.objects.create(wallet=self.wallet, type="D", amount=10, currency="USD", status="S")
+        Transaction.objects.filter(pk=tx.pk).update(created_at=created_at)
+        return tx
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+
+    def test_create_partitions(self):
+        """Test the missing months are created once."""
+        created = create_partitions(date(2020, 11, 20), date(2021, 1, 5))
+
+        self.assertEqual(
+            created, ["wallet_transaction_2020_11", "wallet_transaction_2020_12", "wallet_transaction_2021_01"]
+        )
+        self.assertIn(("wallet_transaction_2020_12", date(2020, 12, 1), date(2021, 1, 1)), partitions())
+        self.assertEqual(create_partitions(date(2020, 11, 1), date(2021, 1, 1)), [])
+
+    def test_insert_needs_partition(self):
+        """Test a transaction of a month without a partition is rejected."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.backdated_transaction(datetime(2019, 6, 1, tzinfo=timezone.utc))
+
+    def test_archive_partitions(self):
+        """Test old months are written to gzipped CSV files and dropped."""
+        create_partitions(date(2020, 1, 1), date(2020, 2, 1))
+        archived = self.backdated_transaction(datetime(2020, 1, 15, tzinfo=timezone.utc))
+        kept = self.backdated_transaction(datetime(2020, 2, 15, tzinfo=timezone.utc))
+        # Check the foreign keys now, as they would have been long before archiving the month.
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        with tempfile.TemporaryDirectory() as directory:
+            result = archive_partitions(date(2020, 2, 1), directory)
+
+            self.assertEqual(result, [("wallet_transaction_2020_01", 1)])
+            with gzip.open(os.path.join(directory, "wallet_transaction_2020_01.csv.gz"), "rt") as archive:
+                rows = list(csv.DictReader(archive))
+        self.assertEqual([int(row["id"]) for row in rows], [archived.pk])
+        self.assertNotIn(partition_name(date(2020, 1, 1)), [name for name, _, _ in partitions()])
+        self.assertFalse(Transaction.objects.filter(pk=archived.pk).exists())
+        self.assertTrue(Transaction.objects.filter(pk=kept.pk).exists())
+
+    def test_archive_skips_pending_transactions(self):
+        """Test a month with transactions not settled yet stays attached."""
+        create_partitions(date(2020, 1, 1), date(2020, 1, 1))
+        pending = self.backdated_transaction(datetime(2020, 1, 15, tzinfo=timezone.utc))
+        Transaction.objects.filter(pk=pending.pk).update(status="P")
+
+        with tempfile.TemporaryDirectory() as directory, self.assertLogs("wallet.partitions", "WARNING"):
+            self.assertEqual(archive_partitions(date(2020, 2, 1), directory), [])
+
+            self.assertEqual(os.listdir(directory), [])
+        self.assertIn(partition_name(date(2020, 1, 1)), [name for name, _, _ in partitions()])
+        self.assertTrue(Transaction.objects.filter(pk=pending.pk).exists())
+
+    def test_queries_read_only_matching_partitions(self):
+        """Test the date filters and cursor of the history prune the other months."""
+        create_partitions(date(2020, 1, 1), date(2020, 3, 1))
+        history = Transaction.objects.filter(user=self.wallet.user).order_by("-created_at", "-id")
+
+        plan = (
+            history.filter(created_at__gte=datetime(2020, 2, 3, tzinfo=timezone.utc)).filter(
+                created_at__lt=datetime(2020, 2, 10, tzinfo=timezone.utc)
+            )
+        ).explain()
+        self.assertIn("wallet_transaction_2020_02", plan)
+        self.assertNotIn("wallet_transaction_2020_01", plan)
+        self.assertNotIn("wallet_transaction_2020_03", plan)
+
+        cursor = datetime(2020, 2, 15, tzinfo=timezone.utc)
+        plan = history.filter(Q(created_at__lte=cursor) & ~Q(created_at=cursor, pk__gte=1)).explain()
+        self.assertIn("wallet_transaction_2020_01", plan)
+        self.assertIn("wallet_transaction_2020_02", plan)
+        self.assertNotIn("wallet_transaction_2020_03", plan)
+
+    def test_command(self):
+        """Test the command creates the coming months and archives the ones out of retention."""
+        create_partitions(date(2020, 1, 1), date(2020, 1, 1))
+        out = StringIO()
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("manage_transaction_partitions", ahead=12, retain=2, archive_dir=directory, stdout=out)
+
+            self.assertTrue(os.path.exists(os.path.join(directory, "wallet_transaction_2020_01.csv.gz")))
+        self.assertIn("Archived 0 rows of wallet_transaction_2020_01", out.getvalue())
+        self.assertEqual(len([start for _, start, _ in partitions() if start > date.today()]), 12)
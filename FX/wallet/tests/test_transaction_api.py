@@ -1,9 +1,13 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from ..models import AccountType, Transaction, Wallet
+from ..partitions import create_partitions
 from ..serializers import TransactionSerializer
 
 TRANSACTIONS_URL = "/api/wallet/transactions/"
@@ -69,10 +73,10 @@ class PrivateTransactionsApiTests(TestCase):
         create_transaction(self.wallet)
         res = self.client.get(TRANSACTIONS_URL)
 
-        transactions = Transaction.objects.all().order_by("-created_at")
+        transactions = Transaction.objects.all().order_by("-created_at", "-id")
         serializer = TransactionSerializer(transactions, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_transactions_limited_to_user(self):
         """Test list of transactions is limited to authenticated user."""
@@ -85,9 +89,9 @@ class PrivateTransactionsApiTests(TestCase):
         res = self.client.get(TRANSACTIONS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["wallet"], self.wallet.id)
-        self.assertEqual(res.data[0]["id"], transaction_1.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["wallet"], self.wallet.id)
+        self.assertEqual(res.data["results"][0]["id"], transaction_1.id)
 
     def test_get_transaction_details(self):
         """Test retrieving a transaction details."""
@@ -136,3 +140,53 @@ class PrivateTransactionsApiTests(TestCase):
         res = self.client.delete(url)
 
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_keyset_pagination(self):
+        """Test following ``next`` walks every transaction once, newest first, including ones created at once."""
+        transactions = [create_transaction(self.wallet, gateway_ref=f"ref-{index}") for index in range(7)]
+        # Ties on created_at are broken by id.
+        Transaction.objects.filter(pk__in=[t.pk for t in transactions[2:5]]).update(
+            created_at=transactions[2].created_at
+        )
+
+        seen = []
+        res = self.client.get(TRANSACTIONS_URL, {"page_size": 3})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 3)
+            seen.extend(transaction["id"] for transaction in res.data["results"])
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        expected = Transaction.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected."""
+        res = self.client.get(TRANSACTIONS_URL, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters(self):
+        """Test the history is filtered by type, status, currency and creation time."""
+        deposit = create_transaction(self.wallet, type="D", status="S")
+        withdrawal = create_transaction(self.wallet, type="W", status="P", currency="EUR")
+        old = create_transaction(self.wallet, type="D", status="S")
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        create_partitions(ten_days_ago, ten_days_ago)
+        Transaction.objects.filter(pk=old.pk).update(created_at=ten_days_ago)
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+
+        def ids(params):
+            res = self.client.get(TRANSACTIONS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return [transaction["id"] for transaction in res.data["results"]]
+
+        self.assertEqual(ids({"type": "W"}), [withdrawal.id])
+        self.assertEqual(ids({"status": "S"}), [deposit.id, old.id])
+        self.assertEqual(ids({"currency": "EUR"}), [withdrawal.id])
+        self.assertEqual(ids({"type": "D", "created_after": week_ago}), [deposit.id])
+        self.assertEqual(ids({"created_before": week_ago}), [old.id])
+        res = self.client.get(TRANSACTIONS_URL, {"status": "X"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from rest_framework import status
@@ -127,8 +129,8 @@ class PrivateWalletsApiTests(TestCase):
         self.assertNotEqual(res.data["balance"], 100)
         self.assertNotEqual(res.data["available_balance"], 100)
         self.assertNotEqual(res.data["user"], user2.id)
-        self.assertEqual(res.data["balance"], 0.0)
-        self.assertEqual(res.data["available_balance"], 0.0)
+        self.assertEqual(Decimal(res.data["balance"]), 0)
+        self.assertEqual(Decimal(res.data["available_balance"]), 0)
         self.assertEqual(res.data["user"], self.user.id)
 
     def test_update_wallet_not_permitetd(self):
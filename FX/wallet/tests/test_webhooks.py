@@ -0,0 +1,183 @@
+import json
+import time
+import unittest
+import uuid
+from io import StringIO
+from unittest import mock
+
+import redis
+from api_trade.scripts.redis_client import get_redis
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import ledger, webhooks
+from ..models import Transaction
+from .test_ledger import create_wallet, deposit
+
+WEBHOOK_URL = "/api/wallet/webhooks/gateway"
+
+
+def redis_available():
+    try:
+        return get_redis().ping()
+    except redis.RedisError:
+        return False
+
+
+def event(leg, outcome="succeeded", reference="gw_1"):
+    return json.dumps({"posting": str(leg.posting), "status": outcome, "reference": reference}).encode("utf-8")
+
+
+class StreamMixin:
+    def setUp(self):
+        stream = f"test:webhooks:{uuid.uuid4().hex}"
+        settings = override_settings(
+            WALLET_WEBHOOK_STREAM=stream,
+            WALLET_GATEWAY_WEBHOOK_SECRET="whsec_test",
+            WALLET_WEBHOOK_CLAIM_IDLE_MS=60_000,
+            WALLET_WEBHOOK_MAX_DELIVERIES=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(lambda: get_redis().delete(stream, *(f"{stream}:{key}" for key in ("dead", "stats", "errors"))))
+        self.wallet = create_wallet()
+        self.client = APIClient()
+
+    def balances(self):
+        self.wallet.refresh_from_db()
+        return self.wallet.balance, self.wallet.available_balance
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+class WebhooksTestCase(StreamMixin, TestCase):
+    def deliver(self, body, signature=None):
+        signature = webhooks.sign(body) if signature is None else signature
+        return self.client.post(WEBHOOK_URL, body, content_type="application/json", HTTP_GATEWAY_SIGNATURE=signature)
+
+    def test_receiver_only_queues_signed_events(self):
+        """Test a signed event is queued and answered 202, and unsigned, forged or stale ones are refused."""
+        leg, _ = ledger.post(self.wallet, ledger.DEPOSIT, 10)
+        body = event(leg)
+
+        self.assertEqual(self.deliver(body).status_code, status.HTTP_202_ACCEPTED)
+        for signature in ("", webhooks.sign(body, secret="other"), webhooks.sign(body, int(time.time()) - 3600)):
+            self.assertEqual(self.deliver(body, signature).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(webhooks.stats()["waiting"], 1)
+        self.assertEqual(Transaction.objects.get(pk=leg.pk).status, ledger.PENDING)
+
+    def test_receiver_without_redis(self):
+        """Test the gateway is asked to deliver again when the event cannot be queued."""
+        leg, _ = ledger.post(self.wallet, ledger.DEPOSIT, 10)
+
+        with mock.patch("wallet.webhooks.get_redis", side_effect=redis.ConnectionError):
+            res = self.deliver(event(leg))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_batch_settlement(self):
+        """Test a batch settles its postings once each, and dead-letters invalid events and unknown postings."""
+        deposit(self.wallet, 100)
+        withdrawal, _ = ledger.post(self.wallet, ledger.WITHDRAWAL, 30)
+        deposits = [ledger.post(self.wallet, ledger.DEPOSIT, amount)[0] for amount in (5, 7)]
+        for body in (
+            event(withdrawal, reference="gw_w"),
+            event(deposits[0]),
+            event(deposits[1], "failed"),
+            event(deposits[0], "failed"),
+            b"not json",
+            json.dumps({"posting": str(uuid.uuid4()), "status": "succeeded"}).encode("utf-8"),
+        ):
+            webhooks.enqueue(body)
+
+        with self.assertLogs("wallet.webhooks", "WARNING") as logs:
+            self.assertEqual(webhooks.WebhookProcessor("worker-1").process_batch(), 6)
+
+        self.assertEqual(len(logs.records), 2)
+
+        self.assertEqual(self.balances(), (75, 75))
+        self.assertEqual(Transaction.objects.get(pk=deposits[1].pk).status, ledger.FAILED)
+        self.assertEqual(Transaction.objects.get(pk=withdrawal.pk).gateway_ref, "gw_w")
+        stats = webhooks.stats()
+        self.assertEqual(
+            {key: stats[key] for key in ("received", "settled", "duplicates", "dead_lettered", "waiting")},
+            {"received": 6, "settled": 3, "duplicates": 1, "dead_lettered": 2, "waiting": 0},
+        )
+        self.assertEqual(stats["dead_letters"], 2)
+        self.assertEqual(webhooks.WebhookProcessor("worker-1").process_batch(), 0)
+
+    def test_failed_batch_is_retried_event_by_event(self):
+        """Test a failing event is left for retry without holding back the others."""
+        good, _ = ledger.post(self.wallet, ledger.DEPOSIT, 10)
+        bad, _ = ledger.post(self.wallet, ledger.DEPOSIT, 20)
+        webhooks.enqueue(event(good))
+        webhooks.enqueue(event(bad))
+        settle_many = ledger.settle_many
+
+        def failing(settlements):
+            if bad.posting in settlements:
+                raise OperationalError("deadlock detected")
+            return settle_many(settlements)
+
+        with mock.patch("wallet.ledger.settle_many", side_effect=failing), self.assertLogs("wallet.webhooks"):
+            webhooks.WebhookProcessor("worker-1").process_batch()
+
+        self.assertEqual(self.balances(), (10, 10))
+        stats = webhooks.stats()
+        self.assertEqual((stats["settled"], stats["failed"], stats["waiting"], stats["in_progress"]), (1, 1, 1, 1))
+
+    def test_abandoned_events_are_claimed_then_dead_lettered(self):
+        """Test events left pending are retried by another worker, and dead-lettered after too many deliveries."""
+        leg, _ = ledger.post(self.wallet, ledger.DEPOSIT, 10)
+        webhooks.enqueue(event(leg))
+        failing = mock.patch("wallet.ledger.settle_many", side_effect=OperationalError("connection lost"))
+        with failing, self.assertLogs("wallet.webhooks"):
+            webhooks.WebhookProcessor("worker-1").process_batch()
+
+        with override_settings(WALLET_WEBHOOK_CLAIM_IDLE_MS=0):
+            webhooks.WebhookProcessor("worker-2").process_batch()
+            self.assertEqual(self.balances(), (10, 10))
+
+            webhooks.enqueue(event(leg))
+            with failing, self.assertLogs("wallet.webhooks"):
+                for _ in range(3):
+                    webhooks.WebhookProcessor("worker-2").process_batch()
+
+        dead = get_redis().xrange(webhooks._key("dead"))
+        self.assertEqual(len(dead), 1)
+        self.assertIn(b"Gave up after 2 deliveries: OperationalError('connection lost')", dead[0][1][b"error"])
+        self.assertEqual(webhooks.replay_dead_letters(), 1)
+        webhooks.WebhookProcessor("worker-2").process_batch()
+        self.assertEqual(webhooks.stats()["duplicates"], 1)
+
+    def test_stats_api(self):
+        """Test the webhook stats are served to admins only."""
+        self.client.force_authenticate(self.wallet.user)
+        self.assertEqual(self.client.get(f"{WEBHOOK_URL}/stats").status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(email="admin@example.com", password="testpass123")
+        )
+        res = self.client.get(f"{WEBHOOK_URL}/stats")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["waiting"], 0)
+
+
+@unittest.skipUnless(redis_available(), "Redis is not reachable")
+class ProcessWebhooksCommandTestCase(StreamMixin, TransactionTestCase):
+    def test_command(self):
+        """Test the workers drain the stream and report what they processed."""
+        legs = [ledger.post(self.wallet, ledger.DEPOSIT, 10)[0] for _ in range(5)]
+        for leg in legs:
+            webhooks.enqueue(event(leg))
+        out = StringIO()
+
+        call_command("process_webhooks", workers=2, batch_size=2, drain=True, stdout=out)
+
+        self.assertIn("Processed 5 webhook events in", out.getvalue())
+        self.assertEqual(self.balances(), (50, 50))
@@ -12,4 +12,6 @@ urlpatterns = [
     path("", include(router.urls)),
     path("wallets/<int:wallet_id>/deposite", views.deposite_to_wallet),
     path("wallets/<int:wallet_id>/withdraw", views.withdraw_from_wallet),
+    path("webhooks/gateway", views.gateway_webhook),
+    path("webhooks/gateway/stats", views.get_webhook_stats),
 ]
@@ -1,10 +1,20 @@
+import redis
+from django.conf import settings
 from rest_framework import mixins, status, viewsets
-from rest_framework.decorators import api_view
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, schema
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from wallet import ledger, webhooks
 from wallet.models import Transaction, Wallet
+from wallet.pagination import KeysetPagination
 from wallet.permissions import IsOwner
-from wallet.serializers import TransactionSerializer, WalletSerializer
+from wallet.serializers import (
+    BalanceAsOfSerializer,
+    PostingSerializer,
+    TransactionFilterSerializer,
+    TransactionSerializer,
+    WalletSerializer,
+)
 
 
 class WalletViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -18,96 +28,115 @@ class WalletViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.Retri
         queryset = queryset.filter(user=self.request.user).order_by("-created_at")
         return queryset
 
+    @action(detail=True, methods=["get"])
+    def balance(self, request, pk=None):
+        """The wallet's balances at the time given by the ``at`` query parameter, from its ledger."""
+        wallet = self.get_object()
+        serializer = BalanceAsOfSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        at = serializer.validated_data["at"]
+        balance, available_balance = ledger.balance_as_of(wallet, at)
+        return Response(
+            BalanceAsOfSerializer({"at": at, "balance": balance, "available_balance": available_balance}).data
+        )
+
 
 class TransactionViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """The authenticated user's transactions, newest first, keyset paginated and filtered by the query parameters
+    of ``TransactionFilterSerializer``."""
+
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Fiter queryset to authenticated user."""
         queryset = self.queryset
-        queryset = queryset.filter(wallet__user=self.request.user).order_by("-created_at")
+        queryset = queryset.filter(user=self.request.user).order_by("-created_at", "-id")
+        if self.action == "list":
+            serializer = TransactionFilterSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            filters = serializer.validated_data
+            for field in ("type", "status", "currency"):
+                if field in filters:
+                    queryset = queryset.filter(**{field: filters[field]})
+            if "created_after" in filters:
+                queryset = queryset.filter(created_at__gte=filters["created_after"])
+            if "created_before" in filters:
+                queryset = queryset.filter(created_at__lt=filters["created_before"])
         return queryset
 
 
-@api_view(["POST"])
-def deposite_to_wallet(request, wallet_id):
-    # Input Validations:
+def _post_to_wallet(request, wallet_id, type, min_amount):
+    """Validate a deposit or withdrawal request and post it pending to the wallet's ledger."""
     try:
-        wallet = Wallet.objects.get(id=wallet_id)
+        wallet = Wallet.objects.select_related("account_type").get(id=wallet_id)
     except Wallet.DoesNotExist:
         response = {"detail": f"Wallet with id {wallet_id} doesn't exist"}
         return Response(response, status=status.HTTP_404_NOT_FOUND)
 
     # Ensure wallet ID belongs to the authenticated user.
-    if not wallet.user.id == request.user.id:
+    if not wallet.user_id == request.user.id:
         response = {"detail": "You do not have permission to perform this action."}
         return Response(response, status=status.HTTP_403_FORBIDDEN)
 
-    # TODO:
-    # Verify the deposit amount is greater than the minimum required.
-    # (Optional) Check if any deposit limits are in place for the user.
-
-    # Payment Gateway Integration:
-
-    # Initiate a transaction with the selected payment gateway (Stripe, PayPal).
-    # Pass the deposit amount and any metadata needed by the gateway.
-    # Redirect the user to the gateway (if an external redirect flow is used) or get a
-    # payment confirmation token (depending on the gateway method).
-
-    # Transaction Creation:
+    serializer = PostingSerializer(data=request.data, context={"min_amount": min_amount})
+    serializer.is_valid(raise_exception=True)
 
-    # Create a new record in Transactions table.
-    # type: "DEPOSIT"
-    # status: "PENDING"
-    # gateway_ref: Token or relevant ID from the payment gateway.
-
-    # Monitor Payment Gateway:
-
-    # Webhook/Status Check: set up a webhook to receive an update about the transaction for the status.
-
-    # Success:
-    # Update the status in the Transactions table to "SUCCESSFUL".
-    # Increment the wallet's balance (and available_balance) in the database.
+    # Clients retrying a request send the same Idempotency-Key header, so money moves once.
+    try:
+        transaction, created = ledger.post(
+            wallet, type, serializer.validated_data["amount"], idempotency_key=request.headers.get("Idempotency-Key")
+        )
+    except ledger.InsufficientFunds:
+        response = {"detail": "Insufficient available balance."}
+        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+    except ledger.IdempotencyConflict:
+        response = {"detail": "This Idempotency-Key was already used for another request."}
+        return Response(response, status=status.HTTP_409_CONFLICT)
+
+    # TODO: Initiate the transaction with the payment gateway, referencing ``transaction.posting`` so that its
+    # webhook (gateway_webhook) settles it.
+    return Response(
+        TransactionSerializer(transaction).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    )
 
-    # Failure:
-    # Update Transactions table status to "FAILED".
-    # (Optional) Implement a refund mechanism depending on gateway functionality.
 
-    return Response({})
+@api_view(["POST"])
+def deposite_to_wallet(request, wallet_id):
+    """Post a pending deposit; the balances are credited once the gateway confirms it."""
+    return _post_to_wallet(request, wallet_id, ledger.DEPOSIT, settings.WALLET_MIN_DEPOSIT)
 
 
 @api_view(["POST"])
 def withdraw_from_wallet(request, wallet_id):
-    # Input Validations:
-    try:
-        wallet = Wallet.objects.get(id=wallet_id)
-    except Wallet.DoesNotExist:
-        response = {"detail": f"Wallet with id {wallet_id} doesn't exist"}
-        return Response(response, status=status.HTTP_404_NOT_FOUND)
-
-    # Ensure wallet ID belongs to the authenticated user.
-    if not wallet.user.id == request.user.id:
-        response = {"detail": "You do not have permission to perform this action."}
-        return Response(response, status=status.HTTP_403_FORBIDDEN)
+    """Post a pending withdrawal, holding its amount out of the available balance until the gateway settles it."""
+    return _post_to_wallet(request, wallet_id, ledger.WITHDRAWAL, settings.WALLET_MIN_WITHDRAWAL)
 
-    # TODO:
-    # Check if enough available_balance exists.
-    # Verify withdrawal amount meets any minimum/maximum limits.
 
-    # Payment Gateway Integration:
-
-    # Initiate the withdrawal with the selected gateway.
-    # Provide relevant destination information (e.g., bank account).
-
-    # Transaction Creation:
-
-    # Create an entry in Transactions table
-    # type: "WITHDRAWAL"
-    # status: "PENDING"
-    # gateway_ref: Token or relevant ID from the payment gateway
-
-    # Monitor & Update:  Similar monitoring logic as in the deposit flow for success/failure updates.
-
-    return Response({})
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@schema(None)
+def gateway_webhook(request):
+    """Queue a signed event of the payment gateway for the webhook workers (wallet/webhooks.py)."""
+    body = request.body
+    if not webhooks.verify_signature(body, request.headers.get("Gateway-Signature")):
+        response = {"detail": "Invalid signature."}
+        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        webhooks.enqueue(body)
+    except redis.RedisError:
+        # The gateway delivers the event again later.
+        response = {"detail": "The webhook could not be queued."}
+        return Response(response, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response(status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@schema(None)
+def get_webhook_stats(request):
+    """Counters and lag of the payment gateway webhooks queued for the workers."""
+    return Response(webhooks.stats())
@@ -0,0 +1,249 @@
+"""
+Payment gateway webhooks.
+
+The gateway reports the outcome of a deposit or withdrawal by POSTing a signed event naming the posting (see
+``parse_event``). Settling it inline would tie request workers up in database writes during the gateway's bursts,
+so the receiver only checks the signature and appends the raw event to a Redis stream (``enqueue``). Workers of
+the ``process_webhooks`` command, consumers of one group of the stream, read it in batches and settle all the
+postings of a batch in one transaction (``ledger.settle_many``).
+
+Events are delivered at least once, and settling a posting twice moves money once:
+
+- An event is acknowledged and deleted from the stream once its batch is committed, so the stream holds the events
+  not settled yet. Events of a worker that died stay pending in the group; other workers claim the ones pending for
+  ``WALLET_WEBHOOK_CLAIM_IDLE_MS`` and retry them.
+- A batch that fails is retried one event at a time, so a bad event does not hold back the others. An event that
+  cannot be parsed or names an unknown posting, or that was delivered ``WALLET_WEBHOOK_MAX_DELIVERIES`` times
+  without being settled, moves to the dead-letter stream with its error (``replay_dead_letters`` queues them
+  again).
+
+``stats`` returns the counters of the events and the lag: events not settled yet and the age of the oldest.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+
+import redis
+from api_trade.scripts.redis_client import get_redis
+from django.conf import settings
+
+from . import ledger
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+GROUP = "settlers"
+STATS_FIELDS = ("received", "settled", "duplicates", "failed", "dead_lettered")
+# Outcomes reported by the gateway.
+GATEWAY_STATUSES = {"succeeded": ledger.SUCCESSFUL, "failed": ledger.FAILED}
+
+
+def _key(suffix=None):
+    return f"{settings.WALLET_WEBHOOK_STREAM}:{suffix}" if suffix else settings.WALLET_WEBHOOK_STREAM
+
+
+def _digest(secret, timestamp, body):
+    return hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256).hexdigest()
+
+
+def sign(body, timestamp=None, secret=None):
+    """The ``Gateway-Signature`` header of ``body``: ``t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">``."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    secret = settings.WALLET_GATEWAY_WEBHOOK_SECRET if secret is None else secret
+    return f"t={timestamp},v1={_digest(secret, timestamp, body)}"
+
+
+def verify_signature(body, header):
+    """Whether ``header`` signs ``body`` with the shared secret, less than ``WALLET_GATEWAY_WEBHOOK_TOLERANCE``
+    seconds ago (so a captured webhook cannot be replayed later)."""
+    secret = settings.WALLET_GATEWAY_WEBHOOK_SECRET
+    if not secret or not header:
+        return False
+    try:
+        fields = dict(field.split("=", 1) for field in header.split(","))
+        timestamp = int(fields["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > settings.WALLET_GATEWAY_WEBHOOK_TOLERANCE:
+        return False
+    return hmac.compare_digest(_digest(secret, timestamp, body), fields.get("v1", ""))
+
+
+def parse_event(body):
+    """The ``(posting, status, gateway_ref)`` of an event ``{"posting": ..., "status": "succeeded"|"failed",
+    "reference": ...}``. Raises ``ValueError`` if it is not one."""
+    try:
+        event = json.loads(body)
+        posting, status = uuid.UUID(str(event["posting"])), GATEWAY_STATUSES[event["status"]]
+        return posting, status, str(event.get("reference") or "")[:255]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid event: {e!r}") from e
+
+
+def enqueue(body):
+    """Queue a verified webhook for the workers; returns its stream entry id."""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.xadd(_key(), {"body": body})
+    pipe.hincrby(_key("stats"), "received", 1)
+    return pipe.execute()[0]
+
+
+def ensure_group():
+    """Create the workers' consumer group (and the stream) unless they exist."""
+    try:
+        get_redis().xgroup_create(_key(), GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def replay_dead_letters(count=None):
+    """Queue the dead-lettered events again, e.g. once what made them fail is fixed; returns how many."""
+    client = get_redis()
+    entries = client.xrange(_key("dead"), count=count)
+    pipe = client.pipeline()
+    for entry_id, fields in entries:
+        pipe.xadd(_key(), {"body": fields[b"body"]})
+        pipe.xdel(_key("dead"), entry_id)
+    pipe.execute()
+    return len(entries)
+
+
+def stats():
+    """Event counters, events waiting to be settled (``in_progress`` of them read by a worker), the age of the
+    oldest in seconds, and the events in the dead-letter stream."""
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    pipe.time()
+    pipe.xlen(_key())
+    pipe.xrange(_key(), count=1)
+    pipe.xlen(_key("dead"))
+    pipe.hmget(_key("stats"), STATS_FIELDS)
+    (seconds, microseconds), waiting, oldest, dead_letters, counters = pipe.execute()
+    try:
+        in_progress = client.xpending(_key(), GROUP)["pending"]
+    except redis.ResponseError:
+        in_progress = 0
+    lag = 0.0
+    if oldest:
+        lag = max(0.0, seconds + microseconds / 1e6 - int(oldest[0][0].split(b"-")[0]) / 1000)
+    return {
+        **dict(zip(STATS_FIELDS, (int(value or 0) for value in counters))),
+        "waiting": waiting,
+        "in_progress": in_progress,
+        "lag_seconds": round(lag, 3),
+        "dead_letters": dead_letters,
+    }
+
+
+class WebhookProcessor:
+    """A consumer of the webhook stream's group. Several run at once, each with its own ``consumer`` name."""
+
+    def __init__(self, consumer, batch_size=None):
+        self.consumer = consumer
+        self.batch_size = batch_size or settings.WALLET_WEBHOOK_BATCH_SIZE
+        ensure_group()
+
+    def process_batch(self, block_ms=None):
+        """Settle a batch of events: the ones other consumers left pending too long if any, else new ones, waiting
+        up to ``block_ms`` for some. Returns the number of events handled."""
+        client = get_redis()
+        entries = self._claim(client)
+        if not entries:
+            response = client.xreadgroup(GROUP, self.consumer, {_key(): ">"}, count=self.batch_size, block=block_ms)
+            entries = response[0][1] if response else []
+        events = {}
+        for entry_id, fields in entries:
+            try:
+                events[entry_id] = (fields[b"body"], *parse_event(fields[b"body"]))
+            except (KeyError, ValueError) as e:
+                self._dead_letter(client, entry_id, fields.get(b"body", b""), str(e))
+        if events:
+            self._settle(client, events)
+        return len(entries)
+
+    def _claim(self, client):
+        claimed = client.xautoclaim(
+            _key(), GROUP, self.consumer, settings.WALLET_WEBHOOK_CLAIM_IDLE_MS, count=self.batch_size
+        )[1]
+        claimed = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        if not claimed:
+            return []
+        pipe = client.pipeline(transaction=False)
+        for entry_id, _ in claimed:
+            pipe.xpending_range(_key(), GROUP, min=entry_id, max=entry_id, count=1)
+            pipe.hget(_key("errors"), entry_id)
+        replies = pipe.execute()
+        entries = []
+        for (entry_id, fields), pending, error in zip(claimed, replies[::2], replies[1::2]):
+            deliveries = pending[0]["times_delivered"] if pending else 0
+            if deliveries > settings.WALLET_WEBHOOK_MAX_DELIVERIES:
+                error = (error or b"").decode("utf-8")
+                self._dead_letter(
+                    client, entry_id, fields[b"body"], f"Gave up after {deliveries - 1} deliveries: {error}"
+                )
+            else:
+                entries.append((entry_id, fields))
+        return entries
+
+    def _settle(self, client, events):
+        try:
+            self._settle_events(client, events)
+            return
+        except Exception as e:  # noqa: B902
+            if len(events) == 1:
+                self._failed(client, next(iter(events)), e)
+                return
+            logger.warning(
+                "Settling a batch of %s webhooks failed, retrying them one by one", len(events), exc_info=True
+            )
+        for entry_id, event in events.items():
+            try:
+                self._settle_events(client, {entry_id: event})
+            except Exception as e:  # noqa: B902
+                self._failed(client, entry_id, e)
+
+    def _settle_events(self, client, events):
+        settlements = {}
+        for _, posting, status, gateway_ref in events.values():
+            # The first outcome received for a posting wins, as it would have with the events settled one by one.
+            settlements.setdefault(posting, (status, gateway_ref))
+        settled = ledger.settle_many(settlements)
+        unsettled = set(settlements) - settled
+        known = set(Transaction.objects.filter(posting__in=unsettled).values_list("posting", flat=True))
+        done = []
+        for entry_id, (body, posting, _, _) in events.items():
+            if posting in unsettled and posting not in known:
+                self._dead_letter(client, entry_id, body, f"Unknown posting {posting}")
+            else:
+                done.append(entry_id)
+        if done:
+            pipe = client.pipeline(transaction=False)
+            pipe.xack(_key(), GROUP, *done)
+            pipe.xdel(_key(), *done)
+            pipe.hdel(_key("errors"), *done)
+            pipe.hincrby(_key("stats"), "settled", len(settled))
+            pipe.hincrby(_key("stats"), "duplicates", len(done) - len(settled))
+            pipe.execute()
+
+    def _failed(self, client, entry_id, error):
+        """Leave the event pending, to be claimed and retried once idle for long enough."""
+        logger.error("Settling webhook %s failed", entry_id, exc_info=error)
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(_key("errors"), entry_id, repr(error))
+        pipe.hincrby(_key("stats"), "failed", 1)
+        pipe.execute()
+
+    def _dead_letter(self, client, entry_id, body, error):
+        logger.warning("Dead-lettering webhook %s: %s", entry_id, error)
+        pipe = client.pipeline()
+        pipe.xadd(_key("dead"), {"entry": entry_id, "body": body, "error": error})
+        pipe.xack(_key(), GROUP, entry_id)
+        pipe.xdel(_key(), entry_id)
+        pipe.hdel(_key("errors"), entry_id)
+        pipe.hincrby(_key("stats"), "dead_lettered", 1)
+        pipe.execute()
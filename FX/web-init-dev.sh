@@ -7,6 +7,9 @@ python3 manage.py wait_for_redis
 
 python3 manage.py migrate
 
+# Create the transaction partitions of the coming months, which inserts need.
+python3 manage.py manage_transaction_partitions
+
 python3 manage.py collectstatic --no-input --clear
 
 python3 manage.py runserver 0.0.0.0:8000
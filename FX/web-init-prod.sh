@@ -7,6 +7,9 @@ python3 manage.py wait_for_redis
 
 python3 manage.py migrate
 
+# Create the transaction partitions of the coming months (also run daily by the partitions service).
+python3 manage.py manage_transaction_partitions
+
 python3 manage.py collectstatic --no-input --clear
 
-gunicorn FX.wsgi:application -c gunicorn_conf.py
+gunicorn FX.asgi:application -c gunicorn_conf.py